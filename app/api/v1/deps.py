@@ -3,18 +3,28 @@ Dependency injection for DDD services and repositories.
 """
 
 import logging
+from functools import lru_cache
 from typing import AsyncGenerator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings, Settings
 from app.db.mongo import AsyncMongoClient
+from app.db.vector_codec import VectorCodec
+from app.db.vector_index import VectorSearchConfig, dimension_variant
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.local_search_backend import LocalSearchBackend
 from app.repositories.product_repository import ProductRepository
+from app.repositories.search_backend import SearchBackend
+from app.services.embedding_provider import EmbeddingProvider, provider_from_settings
 from app.services.simple_embedding_service import SimpleEmbeddingService
 from app.services.search_service import SearchService
 from app.services.reranker_service import RerankerService
 from app.services.intent_service import LLMIntentService
+from app.services.suggestion_service import SuggestionService
 from app.domain.search.services import SearchDomainService
+from app.domain.search.spelling import SpellingIndex
 
 
 # Configure logger
@@ -53,6 +63,43 @@ async def get_product_collection(
     return database.products
 
 
+@lru_cache(maxsize=1)
+def get_facet_cache() -> Optional[TTLCache]:
+    """Get the process-wide facet cache, or None when caching is disabled.
+    
+    Returns:
+        Shared TTLCache instance
+    """
+    settings = get_settings()
+    if not settings.cache_enabled:
+        return None
+    return TTLCache(
+        ttl_seconds=settings.facet_cache_ttl_seconds,
+        max_entries=settings.facet_cache_max_entries
+    )
+
+
+def get_read_dimensions(settings: Settings) -> int:
+    """Dimension of the vectors searched (and of query embeddings)."""
+    return settings.embedding_read_dimensions or settings.embedding_dimension
+
+
+def get_vector_search_config(settings: Settings) -> VectorSearchConfig:
+    """Vector field and index to search, derived from the read dimension.
+    
+    Query embeddings (get_embedding_service) use the same read dimension, so
+    changing embedding_read_dimensions switches field, index and query vectors
+    together.
+    """
+    dimensions = get_read_dimensions(settings)
+    return VectorSearchConfig(
+        index_name=dimension_variant(settings.vector_index_name, dimensions, settings.embedding_dimension),
+        path=dimension_variant("openai_embedding", dimensions, settings.embedding_dimension),
+        quantization=settings.vector_search_quantization,
+        rescore_factor=settings.vector_rescore_factor
+    )
+
+
 async def get_product_repository(
     collection: AsyncIOMotorCollection = Depends(get_product_collection)
 ) -> ProductRepository:
@@ -64,7 +111,28 @@ async def get_product_repository(
     Returns:
         ProductRepository instance
     """
-    return ProductRepository(collection)
+    settings = get_settings()
+    return ProductRepository(
+        collection,
+        facet_cache=get_facet_cache(),
+        vector_codec=VectorCodec(settings.embedding_storage),
+        vector_search=get_vector_search_config(settings)
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_provider() -> EmbeddingProvider:
+    """Get the process-wide query embedding provider (Settings.embedding_provider).
+    
+    Query vectors use the read dimension, like get_vector_search_config.
+    
+    Returns:
+        Shared EmbeddingProvider instance
+    """
+    settings = get_settings()
+    provider = provider_from_settings(settings, dimensions=get_read_dimensions(settings))
+    logger.info(f"Query embeddings from the {provider.name} provider ({provider.model})")
+    return provider
 
 
 async def get_embedding_service(
@@ -78,10 +146,7 @@ async def get_embedding_service(
     Returns:
         EmbeddingService instance
     """
-    return SimpleEmbeddingService(
-        api_key=settings.openai_api_key,
-        model=settings.embedding_model
-    )
+    return SimpleEmbeddingService(provider=get_embedding_provider())
 
 
 async def get_reranker_service(
@@ -99,13 +164,33 @@ async def get_reranker_service(
     return RerankerService(api_key=api_key)
 
 
+@lru_cache(maxsize=1)
+def get_spelling_index() -> Optional[SpellingIndex]:
+    """Load the memory-mapped spelling index once per process.
+    
+    Returns:
+        SpellingIndex instance or None if disabled or unavailable
+    """
+    settings = get_settings()
+    if not settings.spelling_correction_enabled or not settings.spelling_index_path:
+        return None
+    
+    try:
+        index = SpellingIndex.load(settings.spelling_index_path)
+        logger.info(f"Loaded spelling index with {len(index)} words from {settings.spelling_index_path}")
+        return index
+    except Exception as e:
+        logger.warning(f"Spelling index unavailable, correction disabled: {e}")
+        return None
+
+
 async def get_search_domain_service() -> SearchDomainService:
     """Get search domain service instance.
     
     Returns:
         SearchDomainService instance
     """
-    return SearchDomainService()
+    return SearchDomainService(spelling_index=get_spelling_index())
 
 
 async def get_intent_service(
@@ -128,12 +213,78 @@ async def get_intent_service(
     )
 
 
+async def load_search_backend(settings: Settings, collection: AsyncIOMotorCollection) -> Optional[SearchBackend]:
+    """Build the in-process search backend at startup (search_backend="local").
+    
+    Loads the catalog snapshot when search_snapshot_path is set (warning when it
+    is older than the catalog or its embedding version), else reads the
+    collection. Every app lifespan calls this, so no entry point silently falls
+    back to Atlas.
+    
+    Args:
+        settings: Application settings
+        collection: Products collection
+        
+    Returns:
+        LocalSearchBackend, or None to search through the product repository (Atlas)
+        
+    Raises:
+        RuntimeError: If the backend's vectors differ in size from query vectors
+    """
+    if settings.search_backend != "local":
+        return None
+    read_dimensions = get_read_dimensions(settings)
+    if settings.search_snapshot_path:
+        backend = LocalSearchBackend.from_snapshot(
+            collection,
+            settings.search_snapshot_path,
+            nprobe=settings.search_ann_nprobe,
+            rescore_factor=settings.vector_rescore_factor
+        )
+        latest = await collection.find_one(
+            {"embedding_updated_at": {"$exists": True}},
+            {"embedding_updated_at": 1},
+            sort=[("embedding_updated_at", -1)]
+        )
+        reasons = backend.snapshot.staleness(
+            latest.get("embedding_updated_at") if latest else None,
+            EmbeddingFingerprint.version(get_embedding_provider().model, read_dimensions)
+        )
+        if reasons:
+            logger.warning(f"Catalog snapshot {settings.search_snapshot_path} is stale: {'; '.join(reasons)}")
+    else:
+        backend = await LocalSearchBackend.from_collection(
+            collection,
+            vector_path=get_vector_search_config(settings).path
+        )
+    # Query vectors could not be scored against vectors of another size
+    if backend.snapshot.dimensions and backend.snapshot.dimensions != read_dimensions:
+        raise RuntimeError(
+            f"Search snapshot holds {backend.snapshot.dimensions}-dimensional vectors "
+            f"but queries are embedded with {read_dimensions} dimensions"
+        )
+    return backend
+
+
+def get_search_backend(request: Request) -> Optional[SearchBackend]:
+    """Get the in-process search backend loaded at startup (search_backend="local").
+    
+    Args:
+        request: Incoming request (gives access to app state)
+        
+    Returns:
+        SearchBackend instance, or None to search through the product repository (Atlas)
+    """
+    return getattr(request.app.state, "search_backend", None)
+
+
 async def get_search_service(
     product_repo: ProductRepository = Depends(get_product_repository),
     embedding_service: SimpleEmbeddingService = Depends(get_embedding_service),
     reranker_service: RerankerService = Depends(get_reranker_service),
     domain_service: SearchDomainService = Depends(get_search_domain_service),
     intent_service: Optional[LLMIntentService] = Depends(get_intent_service),
+    search_backend: Optional[SearchBackend] = Depends(get_search_backend),
     settings: Settings = Depends(get_settings)
 ) -> SearchService:
     """Get search service instance with all dependencies injected.
@@ -143,6 +294,7 @@ async def get_search_service(
         embedding_service: Embedding service
         reranker_service: Reranker service
         domain_service: Search domain service
+        search_backend: In-process backend, when configured
         
     Returns:
         SearchService instance
@@ -153,13 +305,26 @@ async def get_search_service(
         embedding_service=embedding_service,
         reranker_service=reranker_service,
         intent_service=intent_service,
-        settings=settings
+        settings=settings,
+        search_backend=search_backend
     )
     
     await search_service.initialize()
     return search_service
 
 
+def get_suggestion_service(request: Request) -> Optional[SuggestionService]:
+    """Get the process-wide suggestion service created at startup.
+    
+    Args:
+        request: Incoming request (gives access to app state)
+        
+    Returns:
+        SuggestionService instance or None if the app did not start one
+    """
+    return getattr(request.app.state, "suggestion_service", None)
+
+
 def get_settings_dependency() -> Settings:
     """Get settings dependency."""
     return get_settings()
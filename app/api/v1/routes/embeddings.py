@@ -7,17 +7,21 @@ import asyncio
 import logging
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
-from app.api.v1.schemas import (
+from app.api.v1.schemas.embeddings import (
     EmbeddingGenerationRequest,
     EmbeddingGenerationResponse,
+    EmbeddingJobResponse,
     EmbeddingStatsResponse,
     SingleEmbeddingRequest,
     SingleEmbeddingResponse,
     ErrorResponse
 )
 from app.services.embedding_service import EmbeddingService
+from app.repositories.embedding_job_repository import JOB_COMPLETED, JOB_RUNNING, live_counters
 from app.repositories.product_repository import ProductRepository
+from app.core.config import get_settings
 from app.db.mongo import AsyncMongoClient
+from app.db.vector_codec import VectorCodec
 
 
 router = APIRouter()
@@ -28,8 +32,9 @@ async def get_embedding_service() -> EmbeddingService:
     """Dependency to get embedding service."""
     mongo_client = AsyncMongoClient()
     await mongo_client.connect()
-    database = mongo_client.get_database()
-    product_repo = ProductRepository(database)
+    product_repo = ProductRepository(
+        mongo_client.get_collection(), vector_codec=VectorCodec(get_settings().embedding_storage)
+    )
     return EmbeddingService(product_repo)
 
 
@@ -49,25 +54,20 @@ async def generate_embeddings(
     """
     Generate embeddings for products in batches.
     
-    This endpoint starts the embedding generation process in the background
-    and returns immediately with a status update.
+    This endpoint starts (or resumes) an embedding job in the background and
+    returns immediately with its id; follow it with GET /jobs/{job_id}.
     """
     try:
-        def progress_callback(overall_stats: Dict[str, Any], batch_stats: Dict[str, Any]):
-            """Callback for progress updates."""
-            logger.info(f"✅ Batch progress: {batch_stats}")
+        job_id = await embedding_service.start_job(request.batch_size, resume=request.resume)
         
-        # Start embedding generation in background
-        background_tasks.add_task(
-            embedding_service.generate_embeddings_batch,
-            batch_size=request.batch_size,
-            progress_callback=progress_callback
-        )
+        # Run the job in background; its checkpoint survives if the process dies
+        background_tasks.add_task(_run_job, embedding_service, job_id)
         
         return EmbeddingGenerationResponse(
             status="started",
-            message=f"Embedding generation started with batch size {request.batch_size}",
-            stats={}
+            message=f"Embedding job {job_id} started with batch size {request.batch_size}",
+            stats={},
+            job_id=job_id
         )
         
     except Exception as e:
@@ -78,6 +78,100 @@ async def generate_embeddings(
         )
 
 
+async def _run_job(embedding_service: EmbeddingService, job_id: str) -> None:
+    """Run an embedding job as a background task, logging its progress."""
+    def progress_callback(metrics: Dict[str, Any]):
+        """Callback for progress updates."""
+        logger.info(f"✅ Job {job_id} progress: {metrics['stages']}")
+    
+    try:
+        await embedding_service.run_job(job_id, progress_callback=progress_callback)
+    except Exception as e:
+        # The job document records the failure; it can be resumed
+        logger.error(f"Embedding job {job_id} failed: {e}")
+
+
+def _job_response(job: Dict[str, Any]) -> EmbeddingJobResponse:
+    return EmbeddingJobResponse(
+        job_id=str(job["_id"]),
+        status=job["status"],
+        source=job.get("source", ""),
+        params=job.get("params") or {},
+        last_id=str(job["last_id"]) if job.get("last_id") is not None else None,
+        counters=live_counters(job),
+        total=job.get("total"),
+        processed=job["processed"],
+        percentage=job["percentage"],
+        throughput=job.get("throughput") or 0.0,
+        eta_seconds=job["eta_seconds"],
+        stale=job["stale"],
+        runs=job.get("runs", 0),
+        error=job.get("error"),
+        created_at=job["created_at"],
+        heartbeat_at=job.get("heartbeat_at"),
+        finished_at=job.get("finished_at")
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=EmbeddingJobResponse,
+    responses={
+        404: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def get_embedding_job(
+    job_id: str,
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+):
+    """Get an embedding job's checkpoint, counters, live throughput and ETA."""
+    job = await embedding_service.get_job_status(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Embedding job not found: {job_id}"
+        )
+    return _job_response(job)
+
+
+@router.post(
+    "/jobs/{job_id}/resume",
+    response_model=EmbeddingGenerationResponse,
+    responses={
+        404: {"model": ErrorResponse},
+        409: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def resume_embedding_job(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+):
+    """Resume an interrupted, failed or stale embedding job from its checkpoint."""
+    job = await embedding_service.get_job_status(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Embedding job not found: {job_id}"
+        )
+    if job["status"] == JOB_COMPLETED or (job["status"] == JOB_RUNNING and not job["stale"]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Embedding job {job_id} is {job['status']} and cannot be resumed"
+        )
+    
+    background_tasks.add_task(_run_job, embedding_service, job_id)
+    
+    return EmbeddingGenerationResponse(
+        status="resumed",
+        message=f"Embedding job {job_id} resumed after _id {job.get('last_id')}",
+        stats=job.get("counters") or {},
+        job_id=job_id
+    )
+
+
 @router.post(
     "/generate/sync",
     response_model=EmbeddingGenerationResponse,
@@ -98,13 +192,15 @@ async def generate_embeddings_sync(
     """
     try:
         stats = await embedding_service.generate_embeddings_batch(
-            batch_size=request.batch_size
+            batch_size=request.batch_size,
+            resume=request.resume
         )
         
         return EmbeddingGenerationResponse(
             status="completed",
             message="Embedding generation completed successfully",
-            stats=stats
+            stats=stats,
+            job_id=stats["job_id"]
         )
         
     except Exception as e:
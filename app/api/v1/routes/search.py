@@ -2,15 +2,23 @@
 Search API endpoints - REST API layer
 """
 
+import json
 import logging
 import time
 import math
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Dict, Any, Optional
 
-from app.api.v1.schemas.search import SearchRequest, SearchResponse, ProductResult
-from app.api.v1.deps import get_search_service, get_product_repository
+from app.api.v1.schemas.search import (
+    SearchRequest, SearchResponse, ProductResult, SuggestResponse,
+    BatchSearchRequest, BatchSearchResponse, BatchSearchItem
+)
+from app.api.v1.deps import get_search_service, get_product_repository, get_suggestion_service, get_settings_dependency
+from app.core.config import Settings
+from app.domain.search.services import SearchDomainService
 from app.services.search_service import SearchService
+from app.services.suggestion_service import SuggestionService
 from app.repositories.product_repository import ProductRepository
 
 
@@ -21,13 +29,15 @@ logger = logging.getLogger(__name__)
 @router.post("/", response_model=SearchResponse)
 async def search_products(
     request: SearchRequest,
-    search_service: SearchService = Depends(get_search_service)
+    search_service: SearchService = Depends(get_search_service),
+    suggestion_service: Optional[SuggestionService] = Depends(get_suggestion_service)
 ) -> SearchResponse:
     """Search products using text, vector, or hybrid search.
     
     Args:
         request: Search request parameters
         search_service: Injected search service
+        suggestion_service: Injected suggestion service (feeds the query log)
         
     Returns:
         Search response with results and metadata
@@ -41,42 +51,16 @@ async def search_products(
             mode=request.mode,
             page=request.page,
             page_size=request.limit,
-            use_reranking=request.use_reranking
-        )
-        
-        results = search_data.get("results", [])
-        total = search_data.get("total", 0)
-        
-        # Calculate pagination metadata using domain service
-        from app.domain.search.services import SearchDomainService
-        domain_service = SearchDomainService()
-        
-        pagination_info = domain_service.calculate_pagination(
-            page=request.page,
-            page_size=request.limit,
-            total=total
+            use_reranking=request.use_reranking,
+            include_facets=request.include_facets
         )
         
-        # Convert to response format
-        product_results = [
-            ProductResult(**product) for product in results
-        ]
-        
         execution_time = time.time() - start_time
         
-        return SearchResponse(
-            results=product_results,
-            total=total,
-            returned=pagination_info["returned"],
-            query=request.query,
-            mode=request.mode,
-            execution_time=execution_time,
-            reranked=request.use_reranking and len(results) > 0,
-            page=pagination_info["page"],
-            total_pages=pagination_info["total_pages"],
-            has_next=pagination_info["has_next"],
-            has_prev=pagination_info["has_prev"]
-        )
+        if suggestion_service and search_data.get("total", 0) > 0:
+            suggestion_service.record_query(request.query)
+        
+        return _build_search_response(request, search_data, execution_time)
         
     except Exception as e:
         logger.error(f"Search failed: {e}")
@@ -86,6 +70,173 @@ async def search_products(
         )
 
 
+@router.post("/stream")
+async def search_products_stream(
+    request: SearchRequest,
+    search_service: SearchService = Depends(get_search_service),
+    suggestion_service: Optional[SuggestionService] = Depends(get_suggestion_service)
+) -> StreamingResponse:
+    """Stream progressively refined search results as NDJSON.
+    
+    Each line is a JSON object with an "event" key. Ranking events ("text",
+    "refined", "vector", "hybrid", "reranked") carry a full SearchResponse
+    payload; the stream ends with a "done" event, or an "error" event if a
+    stage fails.
+    
+    Args:
+        request: Search request parameters
+        search_service: Injected search service
+        suggestion_service: Injected suggestion service (feeds the query log)
+        
+    Returns:
+        Streaming response of newline-delimited JSON events
+    """
+    async def events() -> AsyncIterator[str]:
+        start_time = time.time()
+        total = 0
+        try:
+            async for update in search_service.search_stream(
+                query=request.query,
+                mode=request.mode,
+                page=request.page,
+                page_size=request.limit,
+                use_reranking=request.use_reranking
+            ):
+                response = _build_search_response(request, update["data"], time.time() - start_time)
+                response.reranked = update["stage"] == "reranked"
+                total = response.total
+                payload = {"event": update["stage"], **response.model_dump(by_alias=True, mode="json")}
+                yield json.dumps(payload) + "\n"
+            
+            if suggestion_service and total > 0:
+                suggestion_service.record_query(request.query)
+            
+            yield json.dumps({"event": "done", "execution_time": time.time() - start_time}) + "\n"
+            
+        except Exception as e:
+            logger.error(f"Streaming search failed: {e}")
+            yield json.dumps({"event": "error", "detail": f"Search operation failed: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    search_service: SearchService = Depends(get_search_service),
+    settings: Settings = Depends(get_settings_dependency)
+) -> BatchSearchResponse:
+    """Run several searches in one request.
+    
+    Queries are embedded with a single batched OpenAI call and the MongoDB
+    legs run concurrently. A failed search is reported in its own item and
+    does not fail the batch.
+    
+    Args:
+        request: Batch of search requests
+        search_service: Injected search service
+        settings: Application settings
+        
+    Returns:
+        Per-request results in request order
+    """
+    if len(request.requests) > settings.batch_search_max_queries:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch exceeds {settings.batch_search_max_queries} searches"
+        )
+    
+    start_time = time.time()
+    
+    outcomes = await search_service.search_batch([
+        {
+            "query": item.query,
+            "mode": item.mode,
+            "page": item.page,
+            "page_size": item.limit,
+            "use_reranking": item.use_reranking,
+            "include_facets": item.include_facets
+        }
+        for item in request.requests
+    ])
+    
+    items = []
+    for index, (item, outcome) in enumerate(zip(request.requests, outcomes)):
+        if outcome["status"] == "ok":
+            try:
+                response = _build_search_response(item, outcome["data"], outcome["execution_time"])
+                items.append(BatchSearchItem(index=index, status="ok", response=response))
+                continue
+            except Exception as e:
+                outcome = {"status": "error", "error": str(e)}
+        items.append(BatchSearchItem(index=index, status="error", error=outcome["error"]))
+    
+    failed = sum(1 for item in items if item.status == "error")
+    return BatchSearchResponse(
+        results=items,
+        succeeded=len(items) - failed,
+        failed=failed,
+        execution_time=time.time() - start_time
+    )
+
+
+def _build_search_response(request: SearchRequest, search_data: Dict[str, Any], execution_time: float) -> SearchResponse:
+    """Convert service search data into a SearchResponse with pagination metadata."""
+    results = search_data.get("results", [])
+    total = search_data.get("total", 0)
+    
+    # Calculate pagination metadata using domain service
+    pagination_info = SearchDomainService().calculate_pagination(
+        page=request.page,
+        page_size=request.limit,
+        total=total
+    )
+    
+    return SearchResponse(
+        results=[ProductResult(**product) for product in results],
+        total=total,
+        returned=pagination_info["returned"],
+        query=request.query,
+        corrected_query=search_data.get("corrected_query"),
+        mode=request.mode,
+        execution_time=execution_time,
+        reranked=request.use_reranking and len(results) > 0,
+        page=pagination_info["page"],
+        total_pages=pagination_info["total_pages"],
+        has_next=pagination_info["has_next"],
+        has_prev=pagination_info["has_prev"],
+        facets=search_data.get("facets")
+    )
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    q: str = Query(..., description="Prefix typed so far", min_length=1, max_length=100),
+    limit: int = Query(8, description="Maximum number of suggestions", ge=1, le=20),
+    suggestion_service: Optional[SuggestionService] = Depends(get_suggestion_service)
+) -> SuggestResponse:
+    """Typeahead suggestions served from the in-memory prefix index.
+    
+    Never queries MongoDB or OpenAI, so it is safe to call on every keystroke.
+    
+    Args:
+        q: Prefix typed by the user
+        limit: Maximum number of suggestions
+        suggestion_service: Injected suggestion service
+        
+    Returns:
+        Suggestions ordered by popularity
+    """
+    if not suggestion_service:
+        return SuggestResponse(query=q, suggestions=[])
+    
+    return SuggestResponse(query=q, suggestions=suggestion_service.suggest(q, limit))
+
+
 @router.get("/stats")
 async def get_search_stats(
     product_repo: ProductRepository = Depends(get_product_repository)
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 """
-Pydantic schemas for API request/response models.
+Embedding API Schemas - Request/Response Models
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -17,11 +17,16 @@ class EmbeddingGenerationRequest(BaseModel):
         ge=1,
         le=5000
     )
+    resume: bool = Field(
+        default=True,
+        description="Continue the latest unfinished embedding job instead of starting a new one"
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
-                "batch_size": 1000
+                "batch_size": 1000,
+                "resume": True
             }
         }
 
@@ -32,12 +37,14 @@ class EmbeddingGenerationResponse(BaseModel):
     status: str = Field(description="Operation status")
     message: str = Field(description="Human readable message")
     stats: Dict[str, Any] = Field(description="Processing statistics")
+    job_id: Optional[str] = Field(default=None, description="Embedding job tracking this run")
     
     class Config:
         json_schema_extra = {
             "example": {
                 "status": "success",
                 "message": "Embedding generation completed",
+                "job_id": "66b1f0c2a4e5d7f8a9b0c1d2",
                 "stats": {
                     "total_processed": 1000,
                     "total_updated": 950,
@@ -105,6 +112,51 @@ class SingleEmbeddingResponse(BaseModel):
         }
 
 
+class EmbeddingJobResponse(BaseModel):
+    """Response model for an embedding job's status."""
+    
+    job_id: str = Field(description="Job ID")
+    status: str = Field(description="pending, running, completed, failed or interrupted")
+    source: str = Field(description="What started the job")
+    params: Dict[str, Any] = Field(description="Job parameters")
+    last_id: Optional[str] = Field(default=None, description="Checkpoint: every product up to this _id is handled")
+    counters: Dict[str, int] = Field(description="Cumulative counters across runs, as of the last heartbeat")
+    total: Optional[int] = Field(default=None, description="Products the job is expected to handle")
+    processed: int = Field(description="Products handled so far")
+    percentage: Optional[float] = Field(default=None, description="Completion percentage")
+    throughput: float = Field(description="Products per second in the current run")
+    eta_seconds: Optional[float] = Field(default=None, description="Estimated seconds remaining")
+    stale: bool = Field(description="Running but no heartbeat recently; the job can be resumed")
+    runs: int = Field(description="Number of times the job was started or resumed")
+    error: Optional[str] = Field(default=None, description="Last error")
+    created_at: datetime = Field(description="Creation time")
+    heartbeat_at: Optional[datetime] = Field(default=None, description="Last heartbeat")
+    finished_at: Optional[datetime] = Field(default=None, description="Finish time")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "66b1f0c2a4e5d7f8a9b0c1d2",
+                "status": "running",
+                "source": "api",
+                "params": {"batch_size": 1000},
+                "last_id": "66a0e1b2c3d4e5f6a7b8c9d0",
+                "counters": {"processed": 12000, "written": 11800, "skipped": 190, "dead_lettered": 10},
+                "total": 50000,
+                "processed": 12000,
+                "percentage": 24.0,
+                "throughput": 410.5,
+                "eta_seconds": 92.6,
+                "stale": False,
+                "runs": 2,
+                "error": None,
+                "created_at": "2024-01-01T12:00:00Z",
+                "heartbeat_at": "2024-01-01T12:05:00Z",
+                "finished_at": None
+            }
+        }
+
+
 class ProgressUpdate(BaseModel):
     """Model for progress updates during embedding generation."""
     
@@ -29,6 +29,10 @@ class SearchRequest(BaseModel):
         default=True,
         description="Whether to apply Cohere reranking"
     )
+    include_facets: bool = Field(
+        default=False,
+        description="Whether to return category, brand and price facets"
+    )
 
     class Config:
         json_schema_extra = {
@@ -63,6 +67,30 @@ class ProductResult(BaseModel):
         allow_population_by_field_name = True
 
 
+class FacetValue(BaseModel):
+    """Facet value with its document count"""
+    
+    value: str = Field(..., description="Facet value")
+    count: int = Field(..., description="Number of matching products")
+
+
+class PriceRange(BaseModel):
+    """Price histogram bucket"""
+    
+    min: float = Field(..., description="Bucket lower bound (inclusive)")
+    max: float = Field(..., description="Bucket upper bound")
+    count: int = Field(..., description="Number of matching products")
+
+
+class SearchFacets(BaseModel):
+    """Facets computed over the filtered candidate set"""
+    
+    categories: List[FacetValue] = Field(default_factory=list, description="Top categories")
+    brands: List[FacetValue] = Field(default_factory=list, description="Top brands")
+    price_ranges: List[PriceRange] = Field(default_factory=list, description="Price histogram")
+    total: int = Field(default=0, description="Number of products the facets were computed over")
+
+
 class SearchResponse(BaseModel):
     """Search response model"""
     
@@ -70,6 +98,7 @@ class SearchResponse(BaseModel):
     total: int = Field(..., description="Total number of matching results")
     returned: int = Field(..., description="Number of results returned")
     query: str = Field(..., description="Original search query")
+    corrected_query: Optional[str] = Field(None, description="Spelling-corrected query, if it differs")
     mode: str = Field(..., description="Search mode used")
     execution_time: float = Field(..., description="Search execution time in seconds")
     reranked: bool = Field(default=False, description="Whether results were reranked")
@@ -77,6 +106,7 @@ class SearchResponse(BaseModel):
     total_pages: int = Field(default=1, description="Total number of pages")
     has_next: bool = Field(default=False, description="Whether there are more pages")
     has_prev: bool = Field(default=False, description="Whether there are previous pages")
+    facets: Optional[SearchFacets] = Field(None, description="Facets, when include_facets was requested")
 
     class Config:
         json_schema_extra = {
@@ -104,3 +134,68 @@ class SearchResponse(BaseModel):
                 "has_prev": False
             }
         }
+
+
+class BatchSearchRequest(BaseModel):
+    """Batch search request model"""
+    
+    requests: List[SearchRequest] = Field(
+        ...,
+        description="Searches to run; each is paginated and reranked independently "
+                    "(at most batch_search_max_queries)",
+        min_length=1
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "requests": [
+                    {"query": "blue shirt", "mode": "hybrid", "limit": 10},
+                    {"query": "running shoes under 2000", "mode": "vector", "limit": 5}
+                ]
+            }
+        }
+
+
+class BatchSearchItem(BaseModel):
+    """Result of one search within a batch"""
+    
+    index: int = Field(..., description="Position of the request in the batch")
+    status: Literal["ok", "error"] = Field(..., description="Whether this search succeeded")
+    response: Optional[SearchResponse] = Field(None, description="Search response, when status is ok")
+    error: Optional[str] = Field(None, description="Failure reason, when status is error")
+
+
+class BatchSearchResponse(BaseModel):
+    """Batch search response model"""
+    
+    results: List[BatchSearchItem] = Field(..., description="Per-request results, in request order")
+    succeeded: int = Field(..., description="Number of successful searches")
+    failed: int = Field(..., description="Number of failed searches")
+    execution_time: float = Field(..., description="Total batch execution time in seconds")
+
+
+class Suggestion(BaseModel):
+    """Typeahead suggestion model"""
+    
+    text: str = Field(..., description="Suggested query text")
+    type: str = Field(..., description="Suggestion source (query/brand/category/title)")
+    score: float = Field(..., description="Popularity score")
+
+
+class SuggestResponse(BaseModel):
+    """Typeahead suggestions response model"""
+    
+    query: str = Field(..., description="Prefix typed by the user")
+    suggestions: List[Suggestion] = Field(default_factory=list, description="Suggestions, best first")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "query": "nik",
+                "suggestions": [
+                    {"text": "nike running shoes", "type": "query", "score": 12.4},
+                    {"text": "Nike", "type": "brand", "score": 9.1}
+                ]
+            }
+        }
@@ -0,0 +1,69 @@
+"""
+Small in-process caches shared by repositories and services.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-like parts (dict key order is ignored).
+
+    Args:
+        parts: Query strings, filter documents, limits...
+
+    Returns:
+        Canonical JSON string
+    """
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed time-to-live."""
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 1024):
+        """Initialize cache.
+
+        Args:
+            ttl_seconds: Lifetime of an entry
+            max_entries: Least recently used entries are evicted beyond this size
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
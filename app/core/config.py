@@ -32,6 +32,21 @@ class Settings(BaseSettings):
     openai_api_key: str
     embedding_model: str = "text-embedding-3-small"
     embedding_dimension: int = 1536
+    embedding_storage: str = "array"  # "array" (BSON doubles) or "binary" (packed float32 BinData)
+    # Dimension of the vectors searched. When it differs from embedding_dimension, reads use the
+    # shadow field openai_embedding_<n> and index <vector_index_name>_<n> (see migrate_embedding_dimensions)
+    embedding_read_dimensions: Optional[int] = None
+    # Source of the vectors: openai, local (model directory below; embedding_dimension must not
+    # exceed its hidden size) or hashing (deterministic, offline, with injected latency; for CI,
+    # load tests and benchmarks)
+    embedding_provider: str = "openai"
+    embedding_local_model_path: Optional[str] = None
+    # Model name recorded with local vectors (default: the model directory name)
+    embedding_local_model: Optional[str] = None
+    embedding_fake_latency_ms: float = 0.0
+    embedding_fake_per_text_latency_ms: float = 0.0
+    embedding_fake_latency_jitter: float = 0.0
+    embedding_fake_concurrency: Optional[int] = None
 
     # Intent/LLM
     llm_intent_enabled: bool = True
@@ -44,13 +59,43 @@ class Settings(BaseSettings):
     
     # Processing
     default_batch_size: int = 1000
+    embedding_request_batch_size: int = 256
+    embedding_workers: int = 4
+    embedding_queue_size: int = 8
+    embedding_job_stale_seconds: float = 120.0
     max_retries: int = 3
-    rate_limit_delay: float = 0.5
+    rate_limit_delay: float = 0.5  # unused; OpenAI calls go through the shared RateLimiter
+    openai_requests_per_minute: int = 3000
+    openai_tokens_per_minute: int = 1_000_000
     
     # Search
     default_search_limit: int = 10
     max_search_limit: int = 100
     similarity_threshold: float = 0.7
+    vector_index_name: str = "vector_index"
+    vector_search_quantization: str = "none"  # none, scalar (int8) or binary; quantized indexes are rescored
+    vector_rescore_factor: int = 4
+    # Retrieval legs: "atlas" ($vectorSearch / $text) or "local" (in-process NumPy vectors and BM25,
+    # loaded from the collection at startup; for local MongoDB, staging, CI and benchmarks)
+    search_backend: str = "atlas"
+    # Catalog snapshot the local backend memory-maps instead of loading the collection
+    # (written by scripts/export_catalog_snapshot.py; shared by all workers through the page cache)
+    search_snapshot_path: Optional[str] = None
+    # Inverted lists scanned per query when the snapshot has an IVF index (scripts/build_ann_index.py);
+    # higher is slower and closer to exact search
+    search_ann_nprobe: int = 16
+    batch_search_max_queries: int = 50
+    batch_search_concurrency: int = 8
+    
+    # Spelling correction (index built by scripts/build_spelling_index.py)
+    spelling_correction_enabled: bool = True
+    spelling_index_path: Optional[str] = None
+    
+    # Typeahead suggestions
+    suggest_refresh_interval_seconds: int = 900
+    suggest_max_catalog_terms: int = 50000
+    suggest_catalog_refresh_seconds: int = 86400
+    query_log_collection_name: str = "search_query_log"
     
     # Reranking
     rerank_enabled: bool = True
@@ -62,6 +107,8 @@ class Settings(BaseSettings):
     
     # Caching
     cache_enabled: bool = True
+    facet_cache_ttl_seconds: float = 60.0
+    facet_cache_max_entries: int = 1024
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,484 @@
+"""
+Catalog snapshot: product vectors, ids, filter columns and BM25 postings as
+a directory of memory-mappable files.
+
+Exported once (scripts/export_catalog_snapshot.py) and mapped by every
+process that needs the whole catalog in memory (the local search backend,
+benchmarks, evaluation scripts). Mapped files are shared through the OS page
+cache, so N uvicorn workers hold one copy of the vectors instead of N, and
+startup is a few file opens instead of pulling every vector out of MongoDB.
+
+Layout:
+  manifest.json        counts, dimensions, vector field, embedding model and
+                       version, newest source embedding_updated_at (staleness)
+  vectors.f32          raw row-major float32, L2-normalized (rows x dimensions)
+  has_vector.npy       rows that have an embedding
+  ids.bin, id_offsets.npy, id_kinds.npy
+                       product _id of each row (UTF-8 text + type tag)
+  id_hashes.npy, id_rows.npy
+                       sorted id hashes -> row, for id lookups
+  columns/<field>.*    dictionary-encoded string columns, float64 numeric columns
+  bm25/*               BM25Index postings
+  ivf/*                optional IVFIndex over the vectors (scripts/build_ann_index.py)
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+
+import numpy as np
+from bson import ObjectId
+
+from app.db.vector_codec import vector_to_array
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.domain.search.bm25 import DEFAULT_FIELD_WEIGHTS, BM25Index
+
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+HAS_VECTOR_FILE = "has_vector.npy"
+IDS_FILE = "ids.bin"
+ID_OFFSETS_FILE = "id_offsets.npy"
+ID_KINDS_FILE = "id_kinds.npy"
+ID_HASHES_FILE = "id_hashes.npy"
+ID_ROWS_FILE = "id_rows.npy"
+COLUMNS_DIR = "columns"
+BM25_DIR = "bm25"
+# Optional IVF index over the vectors (scripts/build_ann_index.py)
+ANN_DIR = "ivf"
+
+# Fields referenced by SearchDomainService.build_mongo_filters, and brand
+STRING_FILTER_FIELDS = ("category", "sub_category", "title", "product_details.Color", "brand")
+NUMERIC_FILTER_FIELDS = ("selling_price_numeric", "price_inr")
+
+# Joins the values of a multi-valued field; regexes never match across it
+VALUE_SEPARATOR = "\x1f"
+# Separates the values of a column on disk
+_RECORD_SEPARATOR = "\x1e"
+
+ID_STR, ID_OBJECTID, ID_INT = 0, 1, 2
+
+
+def path_values(document: Dict[str, Any], path: str) -> List[Any]:
+    """Values at a dotted path, traversing arrays like a MongoDB query does."""
+    values: List[Any] = [document]
+    for part in path.split("."):
+        next_values: List[Any] = []
+        for value in values:
+            items = value if isinstance(value, list) else [value]
+            for item in items:
+                if isinstance(item, dict) and item.get(part) is not None:
+                    next_values.append(item[part])
+        values = next_values
+    flat: List[Any] = []
+    for value in values:
+        flat.extend(value if isinstance(value, list) else [value])
+    return flat
+
+
+def _hash_id(value: Any) -> int:
+    """Stable 64-bit hash of a product id (ObjectId and its hex string hash alike)."""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _numeric(values: List[Any]) -> float:
+    for value in values:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return float("nan")
+
+
+class StringColumn:
+    """Dictionary-encoded string field: each distinct value is matched once per query."""
+
+    def __init__(self, values: np.ndarray, codes: np.ndarray):
+        """Wrap an encoded column.
+
+        Args:
+            values: Distinct values ("" for missing)
+            codes: Index into values of each row
+        """
+        self.values = values
+        self.codes = codes
+
+    @classmethod
+    def build(cls, raw: Iterable[str]) -> "StringColumn":
+        values, codes = np.unique(np.asarray(list(raw), dtype=object), return_inverse=True)
+        return cls(values, codes.astype(np.int32))
+
+    def matching_values(self, predicate) -> np.ndarray:
+        """Distinct values (non-empty) satisfying predicate, as a mask over values."""
+        return np.fromiter((bool(value) and predicate(value) for value in self.values), dtype=bool, count=len(self.values))
+
+    def match(self, predicate) -> np.ndarray:
+        """Rows whose (non-empty) value satisfies predicate."""
+        return self.matching_values(predicate)[self.codes]
+
+    def save(self, prefix: str) -> None:
+        with open(f"{prefix}.values", "w", encoding="utf-8", newline="") as f:
+            f.write(_RECORD_SEPARATOR.join(self.values.tolist()))
+        np.save(f"{prefix}.codes.npy", self.codes)
+
+    @classmethod
+    def load(cls, prefix: str) -> "StringColumn":
+        with open(f"{prefix}.values", "r", encoding="utf-8", newline="") as f:
+            values = np.asarray(f.read().split(_RECORD_SEPARATOR), dtype=object)
+        return cls(values, np.asarray(np.load(f"{prefix}.codes.npy", mmap_mode="r")))
+
+
+def _column_file(field: str) -> str:
+    return field.replace(".", "__")
+
+
+class CatalogSnapshotBuilder:
+    """Accumulates product documents into a CatalogSnapshot.
+
+    Vectors are written to vectors.f32 as documents arrive when an output
+    directory is given, so exporting never holds the matrix in memory twice;
+    without one they are collected in memory.
+    """
+
+    def __init__(self, vector_path: str = "openai_embedding", output_dir: Optional[str] = None):
+        """Initialize builder.
+
+        Args:
+            vector_path: Embedding field (array or binary storage)
+            output_dir: Snapshot directory to stream vectors into (None: in memory)
+        """
+        self.vector_path = vector_path
+        self.version_field = EmbeddingFingerprint.version_field(vector_path)
+        self.output_dir = output_dir
+        self.ids: List[Any] = []
+        self.dimensions = 0
+        self.has_vector: List[bool] = []
+        self.strings: Dict[str, List[str]] = {field: [] for field in STRING_FILTER_FIELDS}
+        self.numbers: Dict[str, List[float]] = {field: [] for field in NUMERIC_FILTER_FIELDS}
+        self.texts: List[Dict[str, Any]] = []
+        self.versions: Counter = Counter()
+        self.source_updated_at: Optional[float] = None
+        self._rows: List[np.ndarray] = []
+        self._pending: List[int] = []  # Rows seen before the dimension was known
+        self._file: Optional[BinaryIO] = None
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            self._file = open(os.path.join(output_dir, VECTORS_FILE), "wb")
+
+    @staticmethod
+    def projection(vector_path: str = "openai_embedding") -> Dict[str, int]:
+        """Fields a snapshot reads from each product."""
+        fields = set(STRING_FILTER_FIELDS) | set(NUMERIC_FILTER_FIELDS) | set(DEFAULT_FIELD_WEIGHTS)
+        fields |= {vector_path, EmbeddingFingerprint.version_field(vector_path), "embedding_updated_at"}
+        return {field: 1 for field in fields}
+
+    def _write_row(self, row: np.ndarray) -> None:
+        if self._file is not None:
+            self._file.write(row.astype("<f4").tobytes())
+        else:
+            self._rows.append(row)
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """Append one product (rows keep insertion order)."""
+        self.ids.append(document["_id"])
+        vector = vector_to_array(document.get(self.vector_path))
+        if len(vector) and not self.dimensions:
+            self.dimensions = len(vector)
+            # Rows without vectors seen so far become zero rows
+            for _ in self._pending:
+                self._write_row(np.zeros(self.dimensions, dtype=np.float32))
+            self._pending = []
+        present = bool(len(vector)) and len(vector) == self.dimensions
+        self.has_vector.append(present)
+        if not self.dimensions:
+            self._pending.append(len(self.ids) - 1)
+        elif present:
+            norm = float(np.linalg.norm(vector))
+            self._write_row(vector / norm if norm > 0 else np.asarray(vector, dtype=np.float32))
+        else:
+            self._write_row(np.zeros(self.dimensions, dtype=np.float32))
+
+        for field in STRING_FILTER_FIELDS:
+            self.strings[field].append(
+                VALUE_SEPARATOR.join(str(v).replace(_RECORD_SEPARATOR, " ") for v in path_values(document, field))
+            )
+        for field in NUMERIC_FILTER_FIELDS:
+            self.numbers[field].append(_numeric(path_values(document, field)))
+        self.texts.append({field: document.get(field) for field in DEFAULT_FIELD_WEIGHTS})
+        if present and document.get(self.version_field):
+            self.versions[document[self.version_field]] += 1
+        updated_at = _timestamp(document.get("embedding_updated_at"))
+        if updated_at is not None and (self.source_updated_at is None or updated_at > self.source_updated_at):
+            self.source_updated_at = updated_at
+
+    def finish(self, source: Optional[Dict[str, Any]] = None) -> "CatalogSnapshot":
+        """Build the snapshot (and write it, when streaming to an output directory).
+
+        Args:
+            source: Where the products came from (database, collection...), for the manifest
+
+        Returns:
+            CatalogSnapshot instance
+        """
+        count = len(self.ids)
+        if self._file is not None:
+            self._file.close()
+            vectors = np.zeros((count, self.dimensions), dtype=np.float32)
+            if count and self.dimensions:
+                vectors = np.asarray(np.memmap(os.path.join(self.output_dir, VECTORS_FILE), dtype="<f4", mode="r",
+                                               shape=(count, self.dimensions)))
+        elif self._rows:
+            vectors = np.vstack(self._rows).astype(np.float32, copy=False)
+        else:
+            vectors = np.zeros((count, self.dimensions), dtype=np.float32)
+
+        version, _ = (self.versions.most_common(1) or [(None, 0)])[0]
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "count": count,
+            "dimensions": self.dimensions,
+            "vectors": int(sum(self.has_vector)),
+            "vector_path": self.vector_path,
+            "embedding_version": version,
+            "model": version.split(":", 1)[0] if version else None,
+            "mixed_versions": len(self.versions) > 1,
+            "source": source or {},
+            "source_updated_at": self.source_updated_at,
+            "created_at": time.time(),
+        }
+        snapshot = CatalogSnapshot(
+            ids=self.ids,
+            vectors=vectors,
+            has_vector=np.asarray(self.has_vector, dtype=bool),
+            strings={field: StringColumn.build(values) for field, values in self.strings.items()},
+            numbers={field: np.asarray(values, dtype=np.float64) for field, values in self.numbers.items()},
+            bm25=BM25Index.build(self.texts),
+            manifest=manifest,
+        )
+        if self.output_dir:
+            snapshot.save(self.output_dir, write_vectors=False)
+        return snapshot
+
+
+class CatalogSnapshot:
+    """Product ids, vectors, filter columns and BM25 index of a catalog, row aligned."""
+
+    def __init__(
+        self,
+        ids: List[Any],
+        vectors: np.ndarray,
+        has_vector: np.ndarray,
+        strings: Dict[str, StringColumn],
+        numbers: Dict[str, np.ndarray],
+        bm25: BM25Index,
+        manifest: Optional[Dict[str, Any]] = None,
+        id_hashes: Optional[np.ndarray] = None,
+        id_rows: Optional[np.ndarray] = None
+    ):
+        """Wrap row-aligned arrays (see CatalogSnapshotBuilder and load()).
+
+        Args:
+            ids: Product `_id` of each row
+            vectors: Unit-length embedding of each row (zeros when missing)
+            has_vector: Rows that have an embedding
+            strings: String filter columns by field path
+            numbers: Numeric filter columns (NaN for missing) by field path
+            bm25: Lexical index over the same rows
+            manifest: Metadata written next to the arrays
+            id_hashes: Sorted id hashes (computed when missing)
+            id_rows: Row of each entry of id_hashes
+        """
+        self.ids = ids
+        self.vectors = vectors
+        self.has_vector = has_vector
+        self.strings = strings
+        self.numbers = numbers
+        self.bm25 = bm25
+        self.manifest = manifest or {}
+        if id_hashes is None:
+            hashes = np.fromiter((_hash_id(value) for value in ids), dtype=np.uint64, count=len(ids))
+            id_rows = np.argsort(hashes, kind="stable").astype(np.int64)
+            id_hashes = hashes[id_rows]
+        self.id_hashes = id_hashes
+        self.id_rows = id_rows
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def row_of(self, product_id: Any) -> Optional[int]:
+        """Row of a product id (ObjectId or its string form), or None."""
+        target = np.uint64(_hash_id(product_id))
+        position = int(np.searchsorted(self.id_hashes, target, side="left"))
+        while position < len(self.id_hashes) and self.id_hashes[position] == target:
+            row = int(self.id_rows[position])
+            if str(self.ids[row]) == str(product_id):
+                return row
+            position += 1
+        return None
+
+    def staleness(self, latest_updated_at: Any = None, expected_version: Optional[str] = None) -> List[str]:
+        """Reasons the snapshot no longer matches its source (empty when current).
+
+        Args:
+            latest_updated_at: Newest embedding_updated_at in the collection now
+            expected_version: Embedding version the caller searches with
+
+        Returns:
+            Human-readable reasons
+        """
+        reasons = []
+        latest = _timestamp(latest_updated_at)
+        recorded = self.manifest.get("source_updated_at")
+        if latest is not None and (recorded is None or latest > recorded):
+            reasons.append(f"embeddings updated since export ({latest} > {recorded})")
+        version = self.manifest.get("embedding_version")
+        if expected_version and version and version != expected_version:
+            reasons.append(f"embedding version {version} != {expected_version}")
+        return reasons
+
+    def save(self, path: str, write_vectors: bool = True) -> None:
+        """Write the snapshot to a directory of memory-mappable files.
+
+        Args:
+            path: Target directory (created if missing)
+            write_vectors: Also write vectors.f32 (False when already streamed there)
+        """
+        os.makedirs(os.path.join(path, COLUMNS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(path, BM25_DIR), exist_ok=True)
+        if write_vectors:
+            np.ascontiguousarray(self.vectors, dtype="<f4").tofile(os.path.join(path, VECTORS_FILE))
+        np.save(os.path.join(path, HAS_VECTOR_FILE), np.asarray(self.has_vector))
+
+        kinds = np.array([ID_OBJECTID if isinstance(value, ObjectId) else ID_INT if isinstance(value, int) else ID_STR
+                          for value in self.ids], dtype=np.uint8)
+        encoded = [str(value).encode("utf-8") for value in self.ids]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(e) for e in encoded])
+        with open(os.path.join(path, IDS_FILE), "wb") as f:
+            f.write(b"".join(encoded))
+        np.save(os.path.join(path, ID_OFFSETS_FILE), offsets)
+        np.save(os.path.join(path, ID_KINDS_FILE), kinds)
+        np.save(os.path.join(path, ID_HASHES_FILE), np.asarray(self.id_hashes))
+        np.save(os.path.join(path, ID_ROWS_FILE), np.asarray(self.id_rows))
+
+        for field, column in self.strings.items():
+            column.save(os.path.join(path, COLUMNS_DIR, _column_file(field)))
+        for field, values in self.numbers.items():
+            np.save(os.path.join(path, COLUMNS_DIR, f"{_column_file(field)}.npy"), np.asarray(values))
+        self.bm25.save(os.path.join(path, BM25_DIR))
+
+        manifest = {
+            **self.manifest,
+            "format_version": FORMAT_VERSION,
+            "count": len(self),
+            "dimensions": self.dimensions,
+            "string_fields": list(self.strings),
+            "numeric_fields": list(self.numbers),
+        }
+        with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    @staticmethod
+    def read_manifest(path: str) -> Dict[str, Any]:
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogSnapshot":
+        """Memory-map a snapshot previously written with save().
+
+        Args:
+            path: Snapshot directory
+
+        Returns:
+            CatalogSnapshot whose vectors and postings are backed by the OS page cache
+        """
+        manifest = cls.read_manifest(path)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')} in {path}")
+        count, dimensions = int(manifest["count"]), int(manifest["dimensions"])
+
+        def _map(name: str) -> np.ndarray:
+            # Plain ndarray views over the mapping avoid np.memmap's slicing overhead
+            return np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+
+        if count and dimensions:
+            vectors = np.asarray(np.memmap(os.path.join(path, VECTORS_FILE), dtype="<f4", mode="r",
+                                           shape=(count, dimensions)))
+        else:
+            vectors = np.zeros((count, dimensions), dtype=np.float32)
+
+        offsets = np.load(os.path.join(path, ID_OFFSETS_FILE))
+        kinds = np.load(os.path.join(path, ID_KINDS_FILE))
+        with open(os.path.join(path, IDS_FILE), "rb") as f:
+            raw = f.read()
+        ids: List[Any] = []
+        for row in range(count):
+            text = raw[offsets[row]:offsets[row + 1]].decode("utf-8")
+            kind = kinds[row]
+            ids.append(ObjectId(text) if kind == ID_OBJECTID else int(text) if kind == ID_INT else text)
+
+        return cls(
+            ids=ids,
+            vectors=vectors,
+            has_vector=_map(HAS_VECTOR_FILE),
+            strings={field: StringColumn.load(os.path.join(path, COLUMNS_DIR, _column_file(field)))
+                     for field in manifest.get("string_fields", [])},
+            numbers={field: _map(os.path.join(COLUMNS_DIR, f"{_column_file(field)}.npy"))
+                     for field in manifest.get("numeric_fields", [])},
+            bm25=BM25Index.load(os.path.join(path, BM25_DIR)),
+            manifest=manifest,
+            id_hashes=_map(ID_HASHES_FILE),
+            id_rows=_map(ID_ROWS_FILE),
+        )
+
+
+async def snapshot_from_collection(
+    collection: Any,
+    vector_path: str = "openai_embedding",
+    query: Optional[Dict[str, Any]] = None,
+    batch_size: int = 2000,
+    max_documents: Optional[int] = None,
+    output_dir: Optional[str] = None
+) -> CatalogSnapshot:
+    """Read a snapshot from a product collection, in `_id` order.
+
+    Args:
+        collection: Async (Motor) product collection
+        vector_path: Embedding field (array or binary storage)
+        query: Restrict the snapshot to matching products
+        batch_size: Cursor batch size
+        max_documents: Stop after this many products
+        output_dir: Also write the snapshot to this directory
+
+    Returns:
+        CatalogSnapshot instance
+    """
+    builder = CatalogSnapshotBuilder(vector_path, output_dir=output_dir)
+    cursor = collection.find(query or {}, CatalogSnapshotBuilder.projection(vector_path)).sort("_id", 1).batch_size(batch_size)
+    if max_documents:
+        cursor = cursor.limit(max_documents)
+    async for document in cursor:
+        builder.add(document)
+    database = getattr(collection, "database", None)
+    source = {"database": getattr(database, "name", None), "collection": getattr(collection, "name", None),
+              "query": query or {}}
+    return builder.finish(source=source)
@@ -0,0 +1,229 @@
+"""
+Bitmap filter index over the columns of a catalog snapshot.
+
+Evaluates the MongoDB filter documents of SearchDomainService.build_mongo_filters
+(category, price, color) and equality filters on brand without touching rows
+one by one:
+
+- String fields: rows are grouped by distinct value (CSR postings over the
+  dictionary codes of the snapshot column), and values holding more than
+  1/DENSE_DIVISOR of the rows also get a packed bitset. A regex or $in is
+  evaluated once per distinct value; the matching values are then OR-ed
+  together from their bitsets and postings.
+- Numeric fields (prices): rows sorted by value, so a range is two binary
+  searches and one slice.
+
+Clauses combine as packed bitsets (np.packbits, one bit per row) with
+vectorized AND / OR, and the result unpacks to the boolean row mask that
+vector and BM25 scoring take. Leaf clauses are cached, so a filter repeated
+across queries (the usual category + price buckets) costs a few bitwise ops.
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable
+
+import numpy as np
+
+from app.db.catalog_snapshot import VALUE_SEPARATOR, StringColumn
+
+# Values held by more than 1/DENSE_DIVISOR of the rows get a bitset; a posting
+# list of int32 rows is smaller below that (32 bits per row vs 1 bit per row)
+DENSE_DIVISOR = 32
+
+# Above this many matching values, expand value hits through the codes array
+# instead of OR-ing postings value by value
+_MAX_POSTING_UNION = 64
+
+
+def _regex_predicate(condition: Dict[str, Any]) -> Callable[[str], bool]:
+    flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+    pattern = re.compile(condition["$regex"], flags)
+    return lambda value: pattern.search(value) is not None
+
+
+def _equals_predicate(wanted: Iterable[Any]) -> Callable[[str], bool]:
+    # Multi-valued fields match when any of their values does, as in MongoDB
+    wanted = {str(value) for value in wanted}
+    return lambda value: any(part in wanted for part in value.split(VALUE_SEPARATOR))
+
+
+class _StringPostings:
+    """Rows of each distinct value of a string column, with bitsets for dense values."""
+
+    def __init__(self, column: StringColumn, size: int):
+        self.column = column
+        codes = np.asarray(column.codes)
+        counts = np.bincount(codes, minlength=len(column.values))
+        self.rows = np.argsort(codes, kind="stable").astype(np.int32)
+        self.offsets = np.zeros(len(column.values) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(counts)
+        self.dense: Dict[int, np.ndarray] = {}
+        for code in np.flatnonzero(counts > max(size // DENSE_DIVISOR, 1)):
+            bits = np.zeros(size, dtype=bool)
+            bits[self.rows[self.offsets[code]:self.offsets[code + 1]]] = True
+            self.dense[int(code)] = np.packbits(bits, bitorder="little")
+
+    def bitmap(self, predicate: Callable[[str], bool], size: int) -> np.ndarray:
+        """Packed rows whose (non-empty) value satisfies predicate."""
+        hits = np.flatnonzero(self.column.matching_values(predicate))
+        if len(hits) > _MAX_POSTING_UNION:
+            return np.packbits(self.column.match(predicate), bitorder="little")
+        bits = np.zeros(size, dtype=bool)
+        packed = None
+        for code in hits.tolist():
+            dense = self.dense.get(code)
+            if dense is not None:
+                packed = dense.copy() if packed is None else packed | dense
+            else:
+                bits[self.rows[self.offsets[code]:self.offsets[code + 1]]] = True
+        result = np.packbits(bits, bitorder="little")
+        return result if packed is None else result | packed
+
+
+class _SortedNumbers:
+    """Rows of a numeric column sorted by value (missing values left out)."""
+
+    def __init__(self, values: np.ndarray):
+        values = np.asarray(values)
+        present = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[present], kind="stable")
+        self.rows = present[order].astype(np.int32)
+        self.values = values[self.rows]
+
+    def bitmap(self, condition: Any, size: int, field: str) -> np.ndarray:
+        """Packed rows whose value satisfies every range operator of condition."""
+        operators = condition if isinstance(condition, dict) else {"$eq": condition}
+        low, high = 0, len(self.values)
+        for operator, operand in operators.items():
+            if operator == "$gte":
+                low = max(low, int(np.searchsorted(self.values, operand, side="left")))
+            elif operator == "$gt":
+                low = max(low, int(np.searchsorted(self.values, operand, side="right")))
+            elif operator == "$lte":
+                high = min(high, int(np.searchsorted(self.values, operand, side="right")))
+            elif operator == "$lt":
+                high = min(high, int(np.searchsorted(self.values, operand, side="left")))
+            elif operator == "$eq":
+                low = max(low, int(np.searchsorted(self.values, operand, side="left")))
+                high = min(high, int(np.searchsorted(self.values, operand, side="right")))
+            else:
+                raise ValueError(f"Unsupported operator {operator} on {field}")
+        bits = np.zeros(size, dtype=bool)
+        if low < high:
+            bits[self.rows[low:high]] = True
+        return np.packbits(bits, bitorder="little")
+
+
+class BitmapFilterIndex:
+    """Filter documents evaluated as packed bitsets over snapshot rows."""
+
+    def __init__(self, strings: Dict[str, StringColumn], numbers: Dict[str, np.ndarray], size: int,
+                 cache_size: int = 128):
+        """Index the filter columns of a snapshot.
+
+        Args:
+            strings: String columns by field path
+            numbers: Numeric columns (NaN for missing) by field path
+            size: Number of rows
+            cache_size: Leaf clause bitsets kept (LRU)
+        """
+        self.size = size
+        self.strings = {field: _StringPostings(column, size) for field, column in strings.items()}
+        self.numbers = {field: _SortedNumbers(values) for field, values in numbers.items()}
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._all = np.packbits(np.ones(size, dtype=bool), bitorder="little")
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Any, cache_size: int = 128) -> "BitmapFilterIndex":
+        """Index the string and numeric columns of a CatalogSnapshot."""
+        return cls(snapshot.strings, snapshot.numbers, len(snapshot), cache_size=cache_size)
+
+    def _leaf(self, field: str, condition: Any) -> np.ndarray:
+        """Packed rows matching one field condition (cached)."""
+        key = json.dumps([field, condition], sort_keys=True, default=str)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        if field in self.strings:
+            if isinstance(condition, dict) and "$regex" in condition:
+                predicate = _regex_predicate(condition)
+            elif isinstance(condition, dict) and set(condition) <= {"$in", "$eq"}:
+                predicate = _equals_predicate(condition.get("$in", []) + ([condition["$eq"]] if "$eq" in condition else []))
+            elif isinstance(condition, str):
+                predicate = _equals_predicate([condition])
+            else:
+                raise ValueError(f"Unsupported filter on {field}: {condition!r}")
+            bits = self.strings[field].bitmap(predicate, self.size)
+        elif field in self.numbers:
+            bits = self.numbers[field].bitmap(condition, self.size, field)
+        else:
+            raise ValueError(f"Unsupported filter on {field}: {condition!r}")
+
+        with self._lock:
+            self._cache[key] = bits
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return bits
+
+    def evaluate(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Packed bitset of the rows matching a filter document.
+
+        Supports what build_mongo_filters emits: $and / $or, $regex (with the
+        "i" option) on string fields and $gt / $gte / $lt / $lte / $eq on
+        numeric fields, plus $in / equality on string fields. Missing values
+        never match, as in MongoDB.
+
+        Args:
+            filters: Filter document
+
+        Returns:
+            Packed bits (np.packbits, little bit order), one per row
+        """
+        bits = self._all
+        for key, condition in filters.items():
+            if key == "$and":
+                for clause in condition:
+                    bits = bits & self.evaluate(clause)
+                    if not bits.any():
+                        return bits
+            elif key == "$or":
+                any_bits = np.zeros_like(self._all)
+                for clause in condition:
+                    any_bits |= self.evaluate(clause)
+                bits = bits & any_bits
+            else:
+                bits = bits & self._leaf(key, condition)
+            if not bits.any():
+                return bits
+        return bits
+
+    def mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask of a filter document (see evaluate())."""
+        return np.unpackbits(self.evaluate(filters), count=self.size, bitorder="little").view(bool)
+
+    def count(self, filters: Dict[str, Any]) -> int:
+        """Number of rows matching a filter document."""
+        return int(np.unpackbits(self.evaluate(filters), count=self.size, bitorder="little").sum())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size."""
+        dense = sum(len(postings.dense) for postings in self.strings.values())
+        return {
+            "string_fields": len(self.strings),
+            "numeric_fields": len(self.numbers),
+            "dense_bitsets": dense,
+            "bytes": int(
+                sum(postings.rows.nbytes + postings.offsets.nbytes for postings in self.strings.values())
+                + dense * len(self._all)
+                + sum(numbers.rows.nbytes + numbers.values.nbytes for numbers in self.numbers.values())
+            ),
+            "cached_clauses": len(self._cache),
+        }
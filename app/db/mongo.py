@@ -52,7 +52,7 @@ class AsyncMongoClient:
     
     def get_collection(self, collection_name: Optional[str] = None) -> AsyncIOMotorCollection:
         """Get a collection."""
-        if not self.database:
+        if self.database is None:
             raise RuntimeError("Database not initialized. Call connect() first.")
         
         collection_name = collection_name or settings.collection_name
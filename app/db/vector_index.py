@@ -0,0 +1,134 @@
+"""
+Atlas Vector Search index definitions and query stages.
+
+Besides the full-precision index, the same vector field can be indexed with
+Atlas automatic quantization: "scalar" keeps one int8 per dimension (~4x less
+index memory than float32) and "binary" one bit per dimension (~32x less).
+Quantized indexes lose some ranking accuracy, so searches over them fetch more
+candidates and rescore them against the stored full-precision vectors.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from app.db.vector_codec import vector_to_array
+
+QUANTIZATION_NONE = "none"
+QUANTIZATION_SCALAR = "scalar"
+QUANTIZATION_BINARY = "binary"
+QUANTIZATION_MODES = (QUANTIZATION_NONE, QUANTIZATION_SCALAR, QUANTIZATION_BINARY)
+
+# Atlas caps numCandidates at 10,000
+MAX_NUM_CANDIDATES = 10_000
+
+
+def dimension_variant(name: str, dimensions: Optional[int], primary_dimensions: int) -> str:
+    """Field or index name for vectors of another dimension than the primary ones.
+
+    Reduced-dimension vectors live in a shadow field (openai_embedding_512) with
+    their own index (vector_index_512), so both can be queried side by side.
+    """
+    return name if not dimensions or dimensions == primary_dimensions else f"{name}_{dimensions}"
+
+
+def quantized_index_name(base_name: str, quantization: str) -> str:
+    """Name of the index for a quantization mode (the base name is full precision)."""
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}")
+    return base_name if quantization == QUANTIZATION_NONE else f"{base_name}_{quantization}"
+
+
+def vector_index_definition(
+    name: str,
+    path: str = "openai_embedding",
+    num_dimensions: int = 1536,
+    similarity: str = "cosine",
+    quantization: str = QUANTIZATION_NONE,
+    filter_paths: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Build an Atlas Vector Search index definition.
+
+    Args:
+        name: Index name
+        path: Field storing the vectors (float arrays or float32 BinData)
+        num_dimensions: Vector dimensions
+        similarity: cosine, dotProduct or euclidean
+        quantization: none, scalar (int8) or binary
+        filter_paths: Fields to index for $vectorSearch pre-filtering
+
+    Returns:
+        Search index document for the Atlas Admin API / createSearchIndexes
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}")
+    vector_field: Dict[str, Any] = {
+        "type": "vector",
+        "path": path,
+        "numDimensions": num_dimensions,
+        "similarity": similarity,
+    }
+    if quantization != QUANTIZATION_NONE:
+        vector_field["quantization"] = quantization
+    fields: List[Dict[str, Any]] = [vector_field]
+    fields.extend({"type": "filter", "path": filter_path} for filter_path in filter_paths or [])
+    return {"name": name, "type": "vectorSearch", "definition": {"fields": fields}}
+
+
+def vector_search_stage(
+    index: str,
+    path: str,
+    vector: List[float],
+    limit: int,
+    num_candidates: Optional[int] = None,
+    exact: bool = False,
+    filter: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Build a $vectorSearch stage.
+
+    Args:
+        index: Vector index name
+        path: Indexed vector field
+        vector: Query vector
+        limit: Results returned by the stage (at most MAX_NUM_CANDIDATES)
+        num_candidates: ANN candidates (ignored with exact)
+        exact: Exhaustive (ENN) search over full-precision vectors
+        filter: Pre-filter on indexed filter fields
+
+    Returns:
+        Aggregation stage
+    """
+    # numCandidates may not be below limit, so both share the Atlas cap
+    limit = int(min(limit, MAX_NUM_CANDIDATES))
+    stage: Dict[str, Any] = {"index": index, "path": path, "queryVector": vector, "limit": limit}
+    if exact:
+        stage["exact"] = True
+    else:
+        stage["numCandidates"] = int(min(max(num_candidates or limit, limit), MAX_NUM_CANDIDATES))
+    if filter:
+        stage["filter"] = filter
+    return {"$vectorSearch": stage}
+
+
+def cosine_score(query: Any, vector: Any) -> float:
+    """Cosine similarity on the scale Atlas reports for cosine indexes, (1 + cos) / 2."""
+    query_array = vector_to_array(query)
+    vector_array = vector_to_array(vector)
+    norm = float(np.linalg.norm(query_array) * np.linalg.norm(vector_array))
+    if norm == 0.0 or query_array.shape != vector_array.shape:
+        return 0.0
+    return (1.0 + float(np.dot(query_array, vector_array)) / norm) / 2.0
+
+
+class VectorSearchConfig(BaseModel):
+    """Which vector index to query and how to rescore quantized results."""
+
+    index_name: str = Field(default="vector_index", description="Full-precision index name")
+    path: str = Field(default="openai_embedding", description="Vector field")
+    quantization: str = Field(default=QUANTIZATION_NONE, description="Default mode: none, scalar or binary")
+    rescore_factor: int = Field(default=4, ge=1, description="Quantized candidates fetched per result kept")
+
+    def index_for(self, quantization: Optional[str] = None) -> str:
+        """Index name for a mode (default: the configured one)."""
+        return quantized_index_name(self.index_name, quantization or self.quantization)
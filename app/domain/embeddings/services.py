@@ -3,227 +3,252 @@
 Domain services for embedding text generation and processing.
 """
 
-import re
-from typing import Dict, Any, Optional, List
-from app.domain.embeddings.models import EmbeddingText
+import hashlib
+from typing import Dict, Any, Optional, Sequence
+from app.db.vector_codec import dimensions_expression, vector_dimensions
+from app.domain.embeddings import text_builder
 
 
 class EmbeddingTextService:
-    """Service for generating structured embedding text."""
+    """Service for generating structured embedding text.
     
-    # Boilerplate patterns to remove from descriptions
-    BOILERPLATE_PATTERNS = [
-        r'\b(?:buy|shop|online|store|sale|offer|deal|discount|price|₹|rs\.?|inr)\b',
-        r'\b(?:free|delivery|shipping|return|exchange|warranty|guarantee)\b',
-        r'\b(?:best|top|great|amazing|awesome|fantastic|excellent|quality)\b',
-        r'\b(?:latest|new|trending|popular|hot|featured)\b',
-        r'\s{2,}',  # Multiple spaces
-    ]
+    Delegates to the canonical builder in text_builder, the one the embedding
+    pipelines and scripts use, so every path stores the same text (and the
+    same vector) for a product.
+    """
+    
+    # Every document field build_embedding_text reads (for projections)
+    SOURCE_FIELDS = text_builder.SOURCE_FIELDS
     
     @classmethod
     def build_embedding_text(cls, product_data: Dict[str, Any]) -> str:
         """Build structured embedding text from product data."""
-        
-        # Extract basic fields
-        title = cls._clean_text(product_data.get("title", ""))
-        brand = cls._extract_brand(product_data)
-        category = cls._extract_category(product_data)
-        description = cls._clean_description(product_data.get("description", ""))
-        price = cls._extract_price(product_data)
-        
-        # Extract attributes based on category
-        attributes = cls._extract_attributes(product_data, category)
-        
-        # Create embedding text object
-        embedding_text = EmbeddingText(
-            title=title,
-            brand=brand,
-            category=category,
-            attributes=attributes,
-            price_inr=price,
-            description=description
-        )
-        
-        return embedding_text.to_structured_text()
+        return text_builder.build_embedding_text(product_data)
+
+
+class EmbeddingFingerprint:
+    """Content hash and version that decide whether a stored vector is current.
     
-    @classmethod
-    def _clean_text(cls, text: str) -> str:
-        """Clean and normalize text."""
-        if not text:
-            return ""
-        
-        # Convert to lowercase and strip
-        text = text.lower().strip()
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text
+    Each stored vector carries embedding_text_hash (SHA-256 of the text it was
+    generated from) and embedding_version (model plus text format version).
+    Skip checks then compare a 64-character hash instead of reading the stored
+    text and the vector itself, and "needs embedding" can be pushed into the
+    MongoDB query as a version comparison.
+    
+    Vectors in other fields (e.g. a reduced-dimension shadow field) carry their
+    own <field>_text_hash and <field>_version, and vectors shortened with the
+    API's dimensions parameter record the dimension in their version.
+    
+    The text format version is the canonical builder's EMBEDDING_TEXT_VERSION,
+    also stamped on the document as embedding_text_version. When only it
+    changed and the new text hashes the same, the vector is kept (BACKFILL), so
+    a builder change re-embeds just the documents whose text it changed.
+    """
+    
+    TEXT_VERSION = text_builder.EMBEDDING_TEXT_VERSION
+    TEXT_VERSION_FIELD = text_builder.TEXT_VERSION_FIELD
+    
+    PRIMARY_FIELD = "openai_embedding"
+    HASH_FIELD = "embedding_text_hash"
+    VERSION_FIELD = "embedding_version"
+    
+    # Full vector length of models that accept the API's `dimensions` parameter
+    NATIVE_DIMENSIONS = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+    }
+    
+    SKIP = "skip"
+    BACKFILL = "backfill"
+    EMBED = "embed"
+    
+    # Why a stored vector is re-embedded
+    CONTENT_CHANGE = "content"
+    BUILDER_CHANGE = "builder"
+    
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """SHA-256 hex digest of the embedding text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
     
     @classmethod
-    def _clean_description(cls, description: str) -> str:
-        """Clean product description by removing boilerplate."""
-        if not description:
-            return ""
-        
-        cleaned = description.lower()
-        
-        # Remove boilerplate patterns
-        for pattern in cls.BOILERPLATE_PATTERNS:
-            cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
-        
-        # Clean up whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-        
-        # Remove common prefixes/suffixes
-        cleaned = re.sub(r'^(description|about|details?):\s*', '', cleaned)
-        cleaned = re.sub(r'\s*(read more|view details|see more).*$', '', cleaned)
-        
-        return cleaned[:200] if len(cleaned) > 200 else cleaned
+    def reduced_dimensions(cls, model: str, dimensions: Optional[int]) -> Optional[int]:
+        """The `dimensions` to request from the API.
+        
+        None unless the model is known and dimensions differs from its native size.
+        """
+        native = cls.NATIVE_DIMENSIONS.get(model)
+        if dimensions is None or native is None or dimensions == native:
+            return None
+        return dimensions
     
     @classmethod
-    def _extract_brand(cls, product_data: Dict[str, Any]) -> Optional[str]:
-        """Extract brand from product data."""
-        brand = product_data.get("brand", "").strip()
-        if brand and brand.lower() not in ["unknown", "na", "n/a", ""]:
-            return cls._clean_text(brand)
-        return None
+    def hash_field(cls, embedding_field: str = PRIMARY_FIELD) -> str:
+        """Field holding the text hash of the vector in embedding_field."""
+        return cls.HASH_FIELD if embedding_field == cls.PRIMARY_FIELD else f"{embedding_field}_text_hash"
     
     @classmethod
-    def _extract_category(cls, product_data: Dict[str, Any]) -> str:
-        """Extract hierarchical category."""
-        category = cls._clean_text(product_data.get("category", ""))
-        sub_category = cls._clean_text(product_data.get("sub_category", ""))
-        
-        if category and sub_category:
-            return f"{category}>{sub_category}"
-        elif category:
-            return category
-        else:
-            return "unknown"
+    def version_field(cls, embedding_field: str = PRIMARY_FIELD) -> str:
+        """Field holding the version of the vector in embedding_field."""
+        return cls.VERSION_FIELD if embedding_field == cls.PRIMARY_FIELD else f"{embedding_field}_version"
     
     @classmethod
-    def _extract_price(cls, product_data: Dict[str, Any]) -> Optional[float]:
-        """Extract numeric price."""
-        price_fields = ["selling_price_numeric", "selling_price", "actual_price_numeric", "actual_price"]
-        
-        for field in price_fields:
-            price_value = product_data.get(field)
-            if price_value:
-                if isinstance(price_value, (int, float)):
-                    return float(price_value)
-                elif isinstance(price_value, str):
-                    # Extract numeric value from string
-                    price_match = re.search(r'[\d,]+', price_value.replace(',', ''))
-                    if price_match:
-                        try:
-                            return float(price_match.group())
-                        except ValueError:
-                            continue
-        return None
+    def version(cls, model: str, dimensions: Optional[int] = None) -> str:
+        """Version stored next to vectors generated now with this model (and dimension)."""
+        version = f"{model}:text-v{cls.TEXT_VERSION}"
+        reduced = cls.reduced_dimensions(model, dimensions)
+        return f"{version}:d{reduced}" if reduced else version
+    
+    @staticmethod
+    def _vector_version(version: Optional[str]) -> Optional[str]:
+        """Version without its text format part (model and dimension only)."""
+        if not version:
+            return version
+        return ":".join(part for part in version.split(":") if not part.startswith("text-v"))
     
     @classmethod
-    def _extract_attributes(cls, product_data: Dict[str, Any], category: str) -> Dict[str, str]:
-        """Extract category-specific attributes."""
-        attributes = {}
-        
-        # Get product details
-        product_details = product_data.get("product_details", [])
-        if isinstance(product_details, list):
-            for detail in product_details:
-                if isinstance(detail, dict):
-                    for key, value in detail.items():
-                        key_clean = cls._to_snake_case(key)
-                        value_clean = cls._clean_text(str(value))
-                        if value_clean and value_clean not in ["na", "n/a", "unknown"]:
-                            attributes[key_clean] = value_clean
-        
-        # Category-specific attribute extraction
-        if "clothing" in category.lower():
-            attributes.update(cls._extract_fashion_attributes(product_data))
-        elif "electronics" in category.lower():
-            attributes.update(cls._extract_electronics_attributes(product_data))
-        elif "home" in category.lower():
-            attributes.update(cls._extract_home_attributes(product_data))
-        
-        return attributes
+    def stored_text_version(cls, document: Dict[str, Any], embedding_field: str = PRIMARY_FIELD) -> Optional[int]:
+        """Builder version the stored vector's text was built with (None if unknown)."""
+        if embedding_field == cls.PRIMARY_FIELD and document.get(cls.TEXT_VERSION_FIELD) is not None:
+            return document[cls.TEXT_VERSION_FIELD]
+        for part in (document.get(cls.version_field(embedding_field)) or "").split(":"):
+            if part.startswith("text-v") and part[6:].isdigit():
+                return int(part[6:])
+        return None
     
     @classmethod
-    def _extract_fashion_attributes(cls, product_data: Dict[str, Any]) -> Dict[str, str]:
-        """Extract fashion-specific attributes."""
-        attributes = {}
-        
-        # Common fashion attributes
-        fashion_fields = [
-            "color", "colour", "size", "material", "fabric", "pattern", 
-            "fit", "occasion", "sleeve", "neck", "style"
-        ]
-        
-        for field in fashion_fields:
-            value = product_data.get(field)
-            if value:
-                attributes[field] = cls._clean_text(str(value))
-        
-        return attributes
+    def change_reason(cls, document: Dict[str, Any], embedding_field: str = PRIMARY_FIELD) -> str:
+        """Why a document with a stored vector is being re-embedded.
+        
+        BUILDER_CHANGE when its text was built by another builder version (the
+        new text may differ without the product changing), else CONTENT_CHANGE.
+        """
+        stored = cls.stored_text_version(document, embedding_field)
+        if stored is not None and stored != cls.TEXT_VERSION:
+            return cls.BUILDER_CHANGE
+        return cls.CONTENT_CHANGE
     
     @classmethod
-    def _extract_electronics_attributes(cls, product_data: Dict[str, Any]) -> Dict[str, str]:
-        """Extract electronics-specific attributes."""
-        attributes = {}
-        
-        # Common electronics attributes
-        electronics_fields = [
-            "brand", "model", "color", "storage", "ram", "processor", 
-            "screen_size", "battery", "camera", "connectivity"
-        ]
-        
-        for field in electronics_fields:
-            value = product_data.get(field)
-            if value:
-                attributes[field] = cls._normalize_electronics_value(str(value))
-        
-        return attributes
+    def fields(
+        cls,
+        text: str,
+        model: str,
+        dimensions: Optional[int] = None,
+        embedding_field: str = PRIMARY_FIELD
+    ) -> Dict[str, str]:
+        """Hash and version fields to $set alongside a vector.
+        
+        The primary vector is stored with its text, so it also stamps the
+        document's embedding_text_version.
+        """
+        fields: Dict[str, Any] = {
+            cls.hash_field(embedding_field): cls.text_hash(text),
+            cls.version_field(embedding_field): cls.version(model, dimensions)
+        }
+        if embedding_field == cls.PRIMARY_FIELD:
+            fields[cls.TEXT_VERSION_FIELD] = cls.TEXT_VERSION
+        return fields
     
     @classmethod
-    def _extract_home_attributes(cls, product_data: Dict[str, Any]) -> Dict[str, str]:
-        """Extract home & kitchen attributes."""
-        attributes = {}
-        
-        # Common home attributes
-        home_fields = [
-            "color", "material", "size", "capacity", "power", "warranty",
-            "brand", "type", "style", "finish"
-        ]
-        
-        for field in home_fields:
-            value = product_data.get(field)
-            if value:
-                attributes[field] = cls._clean_text(str(value))
-        
-        return attributes
+    def projection(
+        cls,
+        source_fields: Sequence[str],
+        embedding_field: str = PRIMARY_FIELD,
+        text_field: Optional[str] = "openai_embedding_text"
+    ) -> Dict[str, Any]:
+        """Projection reading only what the skip check needs.
+        
+        The vector (array or binary) is reduced server-side to its length. The stored text is
+        returned only for legacy documents that have no hash yet, so they can
+        be backfilled without re-embedding.
+        
+        Args:
+            source_fields: Fields the text builder reads
+            embedding_field: Field storing the vector
+            text_field: Field storing the embedding text (None: no legacy backfill)
+        
+        Returns:
+            MongoDB find projection (requires MongoDB 4.4+)
+        """
+        hash_field = cls.hash_field(embedding_field)
+        projection: Dict[str, Any] = {field: 1 for field in source_fields}
+        projection.update({
+            hash_field: 1,
+            cls.version_field(embedding_field): 1,
+            cls.TEXT_VERSION_FIELD: 1,
+            "embedding_model": 1,
+            "embedding_dimensions": dimensions_expression(embedding_field),
+        })
+        if text_field:
+            projection["legacy_embedding_text"] = {
+                "$cond": [{"$ifNull": [f"${hash_field}", False]}, "$$REMOVE", f"${text_field}"]
+            }
+        return projection
     
     @classmethod
-    def _normalize_electronics_value(cls, value: str) -> str:
-        """Normalize electronics attribute values."""
-        value = cls._clean_text(value)
-        
-        # Normalize storage units
-        value = re.sub(r'\b(\d+)\s*gb\b', r'\1gb', value)
-        value = re.sub(r'\b(\d+)\s*tb\b', r'\1tb', value)
-        value = re.sub(r'\b(\d+)\s*mb\b', r'\1mb', value)
-        
-        # Normalize RAM
-        value = re.sub(r'\b(\d+)\s*gb\s*ram\b', r'\1gb ram', value)
-        
-        # Normalize screen size
-        value = re.sub(r'\b(\d+(?:\.\d+)?)\s*inch\b', r'\1"', value)
-        
-        return value
+    def needs_embedding_filter(
+        cls,
+        model: str,
+        embedding_field: str = PRIMARY_FIELD,
+        dimensions: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Filter for documents whose vector is missing or from another version."""
+        return {"$or": [
+            {embedding_field: {"$exists": False}},
+            {embedding_field: None},
+            {embedding_field: []},
+            {cls.version_field(embedding_field): {"$ne": cls.version(model, dimensions)}}
+        ]}
     
     @classmethod
-    def _to_snake_case(cls, text: str) -> str:
-        """Convert text to snake_case."""
-        text = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', text)
-        text = re.sub(r'([a-z\d])([A-Z])', r'\1_\2', text)
-        text = re.sub(r'[\s\-\.]+', '_', text)
-        return text.lower().strip('_')
+    def status(
+        cls,
+        document: Dict[str, Any],
+        text: str,
+        model: str,
+        embedding_field: str = PRIMARY_FIELD,
+        text_field: Optional[str] = "openai_embedding_text",
+        dimension: Optional[int] = None
+    ) -> str:
+        """Decide what to do with a document given its freshly built text.
+        
+        Works on documents read with projection() and on full documents.
+        
+        Args:
+            document: Product document
+            text: Embedding text built from the document now
+            model: Embedding model in use
+            embedding_field: Field storing the vector
+            text_field: Field storing the embedding text (None: no legacy backfill)
+            dimension: Expected vector length, if it should be checked
+        
+        Returns:
+            SKIP (vector current), BACKFILL (legacy vector, or one whose text
+            only gained a new builder version, still current; only store hash
+            and version) or EMBED
+        """
+        dimensions = document.get("embedding_dimensions")
+        if dimensions is None:
+            dimensions = vector_dimensions(document.get(embedding_field))
+        has_vector = dimensions > 0 and (dimension is None or dimensions == dimension)
+        if not has_vector:
+            return cls.EMBED
+        
+        stored_hash = document.get(cls.hash_field(embedding_field))
+        if stored_hash:
+            if stored_hash != cls.text_hash(text):
+                return cls.EMBED
+            stored_version = document.get(cls.version_field(embedding_field))
+            current_version = cls.version(model, dimension)
+            if stored_version == current_version:
+                return cls.SKIP
+            if cls._vector_version(stored_version) == cls._vector_version(current_version):
+                return cls.BACKFILL
+            return cls.EMBED
+        
+        if not text_field:
+            return cls.EMBED
+        legacy_text = document.get("legacy_embedding_text", document.get(text_field))
+        if legacy_text == text and document.get("embedding_model", model) == model:
+            return cls.BACKFILL
+        return cls.EMBED
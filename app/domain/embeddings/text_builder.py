@@ -0,0 +1,332 @@
+"""
+Canonical embedding text builder.
+
+Every writer of openai_embedding_text (the embedding pipelines, EmbeddingService,
+the refresh worker and the text migrations) builds its text here, so a vector
+generated by one path is reused by all the others.
+
+Format: {title} | brand:{brand} | category:{main}>{leaf} | {attrs} | price_inr:{price} | desc:{desc}
+
+The output for the documents in tests/unit/golden/embedding_text.json is pinned
+by a regression test. Any change to the output must bump EMBEDDING_TEXT_VERSION
+(and regenerate the golden file): documents record the version their text was
+built with in embedding_text_version, which is how the pipelines tell a builder
+change from a change to the product itself.
+"""
+
+import re
+from typing import Dict, Any, Optional, List
+
+from app.domain.embeddings.text_normalization import (
+    WORD_RE, PatternRemover, flatten_product_details, lowercase_values, to_snake
+)
+
+
+# Bump on any change to the text produced for the same document
+EMBEDDING_TEXT_VERSION = 2
+
+# Field recording the EMBEDDING_TEXT_VERSION a document's text was built with
+TEXT_VERSION_FIELD = "embedding_text_version"
+
+# Every document field build_embedding_text reads (for projections)
+SOURCE_FIELDS = [
+    "title", "brand", "category", "sub_category", "description",
+    "product_details", "selling_price_numeric", "price_inr"
+]
+
+# Boilerplate patterns to remove from descriptions
+BOILERPLATE_PATTERNS = [
+    r"proudly made in [a-z\s]+?(?=\s+[a-z]|$)",  # Less greedy
+    r"great for all year( round)?\s+use",
+    r"best in class\s*",
+    r"perfect for\s*",
+    r"ideal choice\s*",
+    r"must have(\s+item)?\s*",
+    r"specially designed(\s+for)?\s*",
+    r"premium quality\s*",
+    r"high quality\s*",
+    r"excellent quality\s*"
+]
+_BOILERPLATE = PatternRemover(BOILERPLATE_PATTERNS, re.IGNORECASE)
+
+_GB_RE = re.compile(r"(\d+)\s*gb")
+_TITLE_RAM_RE = re.compile(r"(\d+)\s*gb.*ram|ram.*(\d+)\s*gb")
+_TITLE_STORAGE_RE = re.compile(r"(\d+)\s*gb(?!.*ram)")  # GB not followed by RAM
+_TITLE_RAM_STORAGE_RE = re.compile(r"(\d+)\s*gb[^a-z0-9]+(\d+)\s*gb")  # "(8GB,128GB)", "8 gb/128 gb"
+_PRICE_RE = re.compile(r"\d+")
+_INCH_RE = re.compile(r"(\d+\.?\d*)\s*inch")
+_DIMENSIONS_RE = re.compile(r"(\d+\.?\d*)\s*[x×]\s*(\d+\.?\d*)\s*[x×]\s*(\d+\.?\d*)")
+
+
+def _to_snake(s: str) -> str:
+    """Convert string to snake_case format for category normalization."""
+    return to_snake(s)
+
+
+def _pd_to_map(product_details: Optional[List[Dict[str, str]]]) -> Dict[str, str]:
+    """Flatten product_details array to a single dictionary with lowercased keys."""
+    return flatten_product_details(product_details)
+
+
+def _clean_desc(text: Optional[str], max_words: int = 8) -> Optional[str]:
+    """Clean description text by removing boilerplate and limiting words."""
+    if not text or not text.strip():
+        return None
+        
+    # Remove boilerplate patterns
+    t = _BOILERPLATE(text)
+    
+    # Extract meaningful words (alphanumeric, %, +, -, ')
+    # Also handle special characters like % in "100%" properly
+    words = WORD_RE.findall(t.lower())
+    
+    # Return first max_words or None if empty
+    return " ".join(words[:max_words]) if words else None
+
+
+def _parse_price(value: Any) -> Optional[int]:
+    """Whole rupees from a number or a string like "1,299", "₹1,299" or "2,999 INR"."""
+    if value is None:
+        return None
+    text = str(value).replace(",", "")
+    try:
+        return int(float(text))
+    except ValueError:
+        match = _PRICE_RE.search(text)
+        return int(match.group()) if match else None
+
+
+def _normalize_material(pd_lower: Dict[str, str]) -> Optional[str]:
+    """Extract and normalize material from lowercased product details."""
+    # Check multiple possible keys for material/fabric
+    for key in ["fabric", "material", "composition", "material type"]:
+        if key in pd_lower:
+            material = pd_lower[key].strip()
+            if material and material != "n/a" and material != "not specified":
+                return material
+    return None
+
+
+def _normalize_electronics_attrs(pd_lower: Dict[str, str], doc: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Extract electronics-specific attributes like RAM, storage, 5G support.
+    
+    Args:
+        pd_lower: Flattened product details with lowercased values
+        doc: Product document
+    """
+    attrs = {}
+    
+    # RAM - look in product_details and title/description
+    ram_gb = None
+    for key in ["ram", "memory", "ram size"]:
+        if key in pd_lower:
+            ram_match = _GB_RE.search(pd_lower[key])
+            if ram_match:
+                ram_gb = ram_match.group(1)
+                break
+    
+    # Storage
+    storage_gb = None
+    for key in ["storage", "internal storage", "memory"]:
+        if key in pd_lower:
+            storage_match = _GB_RE.search(pd_lower[key])
+            if storage_match and key != "ram":  # Don't confuse RAM with storage
+                storage_gb = storage_match.group(1)
+                break
+    
+    # Fall back to the title (lowercased once for both checks)
+    if not ram_gb or not storage_gb:
+        title = doc.get("title", "").lower()
+        pair = None if ram_gb or storage_gb else _TITLE_RAM_STORAGE_RE.search(title)
+        if pair:
+            ram_gb, storage_gb = pair.groups()
+        if not ram_gb:
+            ram_match = _TITLE_RAM_RE.search(title)
+            if ram_match:
+                ram_gb = ram_match.group(1) or ram_match.group(2)
+        if not storage_gb:
+            storage_match = _TITLE_STORAGE_RE.search(title)
+            if storage_match:
+                storage_gb = storage_match.group(1)
+    
+    attrs["ram_gb"] = ram_gb
+    attrs["storage_gb"] = storage_gb
+    
+    # 5G support
+    supports_5g = None
+    title_desc = f"{doc.get('title', '')} {doc.get('description', '')}".lower()
+    if ("5g" in title_desc or pd_lower.get("5g support") in ("yes", "true", "1")
+            or any("5g" in value for value in pd_lower.values())):
+        supports_5g = "true"
+    
+    attrs["supports_5g"] = supports_5g
+    
+    # Screen size (for phones/tablets)
+    screen_size = None
+    for key in ["screen size", "display size", "display", "screen"]:
+        if key in pd_lower:
+            screen_match = _INCH_RE.search(pd_lower[key])
+            if screen_match:
+                screen_size = screen_match.group(1)
+                break
+    
+    attrs["screen_size_in"] = screen_size
+    
+    return attrs
+
+
+def _is_electronics_category(category: str, sub_category: str = "") -> bool:
+    """Check if this is an electronics product."""
+    electronics_terms = [
+        "electronics", "phone", "mobile", "smartphone", "tablet", "laptop", 
+        "computer", "gadget", "device", "tech", "gaming"
+    ]
+    
+    combined = f"{category} {sub_category}".lower()
+    return any(term in combined for term in electronics_terms)
+
+
+def _extract_dimensions(pd: Dict[str, str]) -> Optional[str]:
+    """Extract dimensions for home decor items."""
+    for key in ["dimensions", "size", "dimension"]:
+        if key in pd:
+            dim_text = pd[key]
+            # Look for LxWxH pattern
+            dim_match = _DIMENSIONS_RE.search(dim_text)
+            if dim_match:
+                l, w, h = dim_match.groups()
+                return f"{l}x{w}x{h}"
+    return None
+
+
+def build_embedding_text(doc: Dict[str, Any]) -> str:
+    """
+    Build structured embedding text for OpenAI text-embedding-3-small.
+    
+    Format: {title} | brand:{brand} | category:{main}>{leaf} | {attrs} | price_inr:{price} | desc:{desc}
+    
+    Args:
+        doc: Product document with fields like title, brand, category, sub_category,
+             product_details, selling_price_numeric, description
+             
+    Returns:
+        Formatted embedding text string following the exact specification
+    """
+    # Extract basic fields
+    title = (doc.get("title") or "").strip()
+    brand = (doc.get("brand") or "").strip().lower() or None
+    
+    # Category normalization
+    category_main = _to_snake(doc.get("category") or "general")
+    category_leaf = _to_snake(doc.get("sub_category") or "") or None
+    
+    # Flatten product_details (values lowercased once for attribute matching)
+    pd = _pd_to_map(doc.get("product_details"))
+    pd_lower = lowercase_values(pd)
+    
+    # Price handling
+    price = _parse_price(doc.get("selling_price_numeric") or doc.get("price_inr"))
+    
+    # Short descriptor from description
+    short_desc = _clean_desc(doc.get("description") or "")
+    
+    # Determine category type for attribute extraction
+    is_electronics = _is_electronics_category(doc.get("category", ""), doc.get("sub_category", ""))
+    
+    # Start building the parts list
+    parts = []
+    
+    # 1. Title (preserve original case)
+    if title:
+        parts.append(title)
+    
+    # 2. Brand
+    if brand:
+        parts.append(f"brand:{brand}")
+    
+    # 3. Category
+    if category_main and category_leaf:
+        parts.append(f"category:{category_main}>{category_leaf}")
+    elif category_main:
+        parts.append(f"category:{category_main}")
+    
+    # 4. Category-specific attributes (maintaining fixed order)
+    if is_electronics:
+        # Electronics: ram_gb, storage_gb, supports_5g, screen_size_in
+        electronics_attrs = _normalize_electronics_attrs(pd_lower, doc)
+        
+        if electronics_attrs.get("ram_gb"):
+            parts.append(f"ram_gb:{electronics_attrs['ram_gb']}")
+        if electronics_attrs.get("storage_gb"):
+            parts.append(f"storage_gb:{electronics_attrs['storage_gb']}")
+        if electronics_attrs.get("supports_5g"):
+            parts.append(f"supports_5g:{electronics_attrs['supports_5g']}")
+        if electronics_attrs.get("screen_size_in"):
+            parts.append(f"screen_size_in:{electronics_attrs['screen_size_in']}")
+        
+        # Color for electronics (if applicable)
+        color = pd_lower.get("color") or None
+        if color:
+            parts.append(f"color:{color}")
+            
+    else:
+        # Fashion/Home-decor: color, material, pattern, size
+        color = pd_lower.get("color") or None
+        material = _normalize_material(pd_lower)
+        pattern = pd_lower.get("pattern") or None
+        size = pd_lower.get("size") or None
+        
+        if color:
+            parts.append(f"color:{color}")
+        if material:
+            parts.append(f"material:{material}")
+        if pattern:
+            parts.append(f"pattern:{pattern}")
+        if size:
+            parts.append(f"size:{size}")
+        
+        # For home decor, add dimensions if available
+        if "home" in category_main or "decor" in category_main:
+            dimensions = _extract_dimensions(pd)
+            if dimensions:
+                parts.append(f"dimensions_cm:{dimensions}")
+    
+    # 5. Price
+    if price is not None:
+        parts.append(f"price_inr:{price}")
+    
+    # 6. Description
+    if short_desc:
+        parts.append(f"desc:{short_desc}")
+    
+    # Join all parts
+    return " | ".join(parts)
+
+
+def build_embedding_text_batch(docs: List[Dict[str, Any]]) -> List[str]:
+    """
+    Build embedding text for multiple documents efficiently.
+    
+    Args:
+        docs: List of product documents
+        
+    Returns:
+        List of formatted embedding text strings in the same order
+    """
+    return [build_embedding_text(doc) for doc in docs]
+
+
+def should_regenerate_embedding(doc: Dict[str, Any], current_embedding_text: str) -> bool:
+    """
+    Check if the embedding should be regenerated by comparing the current
+    stored embedding_text with the newly generated one.
+    
+    Args:
+        doc: Product document
+        current_embedding_text: Currently stored openai_embedding_text
+        
+    Returns:
+        True if regeneration is needed, False otherwise
+    """
+    new_embedding_text = build_embedding_text(doc)
+    return new_embedding_text != current_embedding_text
@@ -0,0 +1,76 @@
+"""
+Compiled text normalization used by the embedding text builder.
+
+Patterns are compiled once at import, a list of removal patterns is screened
+with one alternation, each field is lowercased once, and values that repeat
+across the catalog (category names, product_details keys) are normalized once
+and cached.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+# Informative words kept from descriptions (alphanumerics, %, +, -, ')
+WORD_RE = re.compile(r"[A-Za-z0-9%+\-']+")
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+class PatternRemover:
+    """Removes every match of an ordered list of patterns.
+
+    Same result as applying re.sub(pattern, "", text, flags=flags) for each
+    pattern in turn. All patterns are first searched as one alternation: text
+    without any match (most descriptions) is returned after that single scan.
+    Text with a match still goes through the precompiled patterns one by one,
+    because a removal changes what the next pattern sees (word boundaries,
+    trailing whitespace), so a single substitution pass could differ.
+    """
+
+    def __init__(self, patterns: Sequence[str], flags: int = 0):
+        """Compile the patterns.
+
+        Args:
+            patterns: Regular expressions, in the order they are applied
+            flags: re flags for every pattern
+        """
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+        self.combined = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+
+    def __call__(self, text: str) -> str:
+        if self.combined.search(text) is None:
+            return text
+        for pattern in self.patterns:
+            text = pattern.sub("", text)
+        return text
+
+
+@lru_cache(maxsize=4096)
+def to_snake(value: str) -> str:
+    """Lowercase value and collapse every non-alphanumeric run into "_"."""
+    return _NON_ALNUM_RE.sub("_", value.strip().lower()).strip("_")
+
+
+def flatten_product_details(product_details: Optional[Iterable[Any]]) -> Dict[str, str]:
+    """Flatten product_details (a list of one-key dicts) into a lowercase-keyed dict.
+
+    Non-dict entries and empty keys or values are skipped.
+    """
+    out: Dict[str, str] = {}
+    for kv in product_details or ():
+        if isinstance(kv, dict):
+            for k, v in kv.items():
+                if k and v:
+                    out[_detail_key(k)] = str(v).strip()
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _detail_key(key: str) -> str:
+    return key.strip().lower()
+
+
+def lowercase_values(values: Dict[str, str]) -> Dict[str, str]:
+    """Lowercase every value once, for builders that match several patterns per field."""
+    return {key: value.lower() for key, value in values.items()}
@@ -0,0 +1,194 @@
+"""
+BM25 Index
+In-process lexical ranking over the catalog, standing in for MongoDB $text
+where the local search backend serves queries.
+
+Postings are stored CSR-style (one offsets array over flat doc id and term
+frequency arrays), so a query term is one slice and scoring a query is a few
+vectorized adds into a dense score array, which an optional filter mask then
+restricts. Fields are weighted like the $text index of
+scripts/create_local_indexes.py (BM25F-style: weighted term frequencies and
+lengths are summed across fields before saturation).
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Same field weights as the local $text index
+DEFAULT_FIELD_WEIGHTS = {"title": 5.0, "brand": 3.0, "openai_embedding_text": 2.0}
+
+# Short English stopword list; $text drops these too
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords, with plural "s" stripped.
+
+    A crude stand-in for $text's stemming: enough for "shoes" to match "shoe".
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over weighted document fields."""
+
+    def __init__(
+        self,
+        terms: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        frequencies: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        """Wrap prebuilt postings (see build()).
+
+        Args:
+            terms: Term -> term id
+            offsets: Postings of term t are doc_ids[offsets[t]:offsets[t + 1]]
+            doc_ids: Document positions, grouped by term
+            frequencies: Weighted term frequency of each posting
+            doc_lengths: Weighted length of each document
+            k1: Term frequency saturation
+            b: Length normalization
+        """
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        average = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        # Per-document denominator term, computed once
+        self._length_norm = (k1 * (1.0 - b + b * doc_lengths / average)).astype(np.float32) if average else \
+            np.full(len(doc_lengths), k1, dtype=np.float32)
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[Mapping[str, Optional[str]]],
+        field_weights: Optional[Mapping[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75
+    ) -> "BM25Index":
+        """Index documents in iteration order (position i is document i).
+
+        Args:
+            documents: Field name -> text mappings
+            field_weights: Weight of each indexed field (default: the $text index weights)
+            k1: Term frequency saturation
+            b: Length normalization
+
+        Returns:
+            BM25Index instance
+        """
+        field_weights = field_weights or DEFAULT_FIELD_WEIGHTS
+        terms: Dict[str, int] = {}
+        posting_terms: List[int] = []
+        posting_docs: List[int] = []
+        posting_tfs: List[float] = []
+        lengths: List[float] = []
+        for position, document in enumerate(documents):
+            counts: Counter = Counter()
+            length = 0.0
+            for field, weight in field_weights.items():
+                tokens = tokenize(str(document.get(field) or ""))
+                length += weight * len(tokens)
+                for token in tokens:
+                    counts[token] += weight
+            lengths.append(length)
+            for token, tf in counts.items():
+                posting_terms.append(terms.setdefault(token, len(terms)))
+                posting_docs.append(position)
+                posting_tfs.append(tf)
+
+        term_array = np.asarray(posting_terms, dtype=np.int64)
+        order = np.argsort(term_array, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(term_array, minlength=len(terms)))
+        return cls(
+            terms,
+            offsets,
+            np.asarray(posting_docs, dtype=np.int32)[order],
+            np.asarray(posting_tfs, dtype=np.float32)[order],
+            np.asarray(lengths, dtype=np.float32),
+            k1=k1,
+            b=b,
+        )
+
+    def save(self, path: str) -> None:
+        """Write the postings to a directory of memory-mappable files.
+
+        Args:
+            path: Target directory (created if missing)
+        """
+        os.makedirs(path, exist_ok=True)
+        terms = sorted(self.terms, key=self.terms.get)
+        with open(os.path.join(path, "terms.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+        np.save(os.path.join(path, "offsets.npy"), np.asarray(self.offsets))
+        np.save(os.path.join(path, "doc_ids.npy"), np.asarray(self.doc_ids))
+        np.save(os.path.join(path, "frequencies.npy"), np.asarray(self.frequencies))
+        np.save(os.path.join(path, "doc_lengths.npy"), np.asarray(self.doc_lengths))
+        with open(os.path.join(path, "params.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": len(terms)}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Memory-map postings previously written with save()."""
+        with open(os.path.join(path, "params.json"), "r", encoding="utf-8") as f:
+            params = json.load(f)
+        with open(os.path.join(path, "terms.txt"), "r", encoding="utf-8") as f:
+            text = f.read()
+        terms = {term: term_id for term_id, term in enumerate(text.split("\n"))} if text else {}
+
+        def _map(name: str) -> np.ndarray:
+            return np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+
+        return cls(
+            terms,
+            _map("offsets.npy"),
+            _map("doc_ids.npy"),
+            _map("frequencies.npy"),
+            _map("doc_lengths.npy"),
+            k1=params["k1"],
+            b=params["b"],
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for a query (0 where no term matches)."""
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        total = len(self.doc_lengths)
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.frequencies[start:end]
+            df = end - start
+            idf = np.log1p((total - df + 0.5) / (df + 0.5))
+            # Postings hold each document once per term, so fancy-index add is safe
+            scores[docs] += np.float32(idf) * tf * (self.k1 + 1.0) / (tf + self._length_norm[docs])
+        return scores
@@ -0,0 +1,339 @@
+"""
+IVF Index
+Approximate nearest neighbour search over the catalog snapshot vectors, for
+the local search backend.
+
+Vectors are clustered with spherical k-means; each row goes into the
+inverted list of its nearest centroid. A query scores the centroids and scans
+only the nprobe best lists, so its cost is nprobe / nlist of brute force.
+Inverted lists are stored CSR-style (offsets over a flat row array) and only
+reference rows of the snapshot matrix, which stays the single copy of the
+vectors. With product quantization (pq_subvectors > 0) the scanned lists are
+scored from uint8 codes of each row's residual to its centroid, through a
+per-query lookup table, and the best candidates are rescored exactly against
+the snapshot vectors.
+
+Filtered search takes a row mask: the rows of each list that pass it are
+counted once per query (row_lists), lists without matches are skipped and
+probing continues past nprobe until enough matching rows were scanned, so
+selective filters still fill a page. When fewer rows pass the filter than
+nprobe lists hold, those rows are scored exactly instead.
+
+Persisted as a directory of .npy files next to the snapshot (ivf/) and
+memory-mapped on load.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Centroids of each product quantization subspace (codes are uint8)
+PQ_CENTROIDS = 256
+
+# K-means training sample: enough points per centroid, bounded in memory
+MIN_POINTS_PER_CENTROID = 40
+MAX_TRAINING_SAMPLE = 200_000
+
+_CHUNK = 32_768
+
+
+def default_nlist(count: int) -> int:
+    """Number of inverted lists for a catalog size (about 4 * sqrt(count))."""
+    return max(1, min(count, int(4 * np.sqrt(count))))
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    """Nearest centroid of each row (max inner product, or min L2 distance)."""
+    bias = None if spherical else -0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), _CHUNK):
+        scores = data[start:start + _CHUNK] @ centroids.T
+        if bias is not None:
+            scores += bias
+        labels[start:start + _CHUNK] = scores.argmax(axis=1)
+    return labels
+
+
+def kmeans(data: np.ndarray, clusters: int, iterations: int = 10, spherical: bool = True, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means.
+
+    Args:
+        data: Training rows (float32)
+        clusters: Number of centroids
+        iterations: Assignment / update rounds
+        spherical: Unit-length centroids assigned by inner product (cosine)
+        seed: Random seed for initialization and empty-cluster reseeding
+
+    Returns:
+        Centroids (clusters x dimensions, float32)
+    """
+    rng = np.random.default_rng(seed)
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    centroids = data[rng.choice(len(data), clusters, replace=len(data) < clusters)].copy()
+    for _ in range(iterations):
+        labels = _assign(data, centroids, spherical)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=clusters)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+        sums = np.add.reduceat(data[order], starts, axis=0)
+        centroids[present] = sums / counts[present, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            # Reseed empty clusters from random points
+            centroids[empty] = data[rng.choice(len(data), len(empty))]
+        if spherical:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.where(norms > 0, norms, 1.0)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted file index (IVF-Flat, or IVF-PQ with exact rescoring) over unit vectors."""
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_rows: np.ndarray,
+        row_lists: np.ndarray,
+        codebooks: Optional[np.ndarray] = None,
+        codes: Optional[np.ndarray] = None,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        """Wrap prebuilt lists (see build()).
+
+        Args:
+            centroids: Unit-length list centroids (nlist x dimensions)
+            list_offsets: Rows of list l are list_rows[list_offsets[l]:list_offsets[l + 1]]
+            list_rows: Snapshot rows, grouped by list
+            row_lists: List of each snapshot row (-1 for rows without a vector)
+            codebooks: PQ centroids (subvectors x 256 x subvector dimensions), if quantized
+            codes: PQ codes of the residuals, aligned with list_rows (len(list_rows) x subvectors, uint8)
+            params: Build parameters written next to the arrays
+        """
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.row_lists = row_lists
+        self.codebooks = codebooks
+        self.codes = codes
+        self.params = params or {}
+        self._list_sizes = np.diff(list_offsets)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def pq_subvectors(self) -> int:
+        return 0 if self.codebooks is None else len(self.codebooks)
+
+    def __len__(self) -> int:
+        return len(self.list_rows)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        has_vector: Optional[np.ndarray] = None,
+        nlist: Optional[int] = None,
+        pq_subvectors: int = 0,
+        iterations: int = 10,
+        seed: int = 0
+    ) -> "IVFIndex":
+        """Train centroids (and PQ codebooks) and fill the inverted lists.
+
+        Args:
+            vectors: Unit-length snapshot vectors (rows x dimensions)
+            has_vector: Rows to index (default: all)
+            nlist: Number of inverted lists (default: default_nlist())
+            pq_subvectors: Product quantization subspaces (0: score full vectors);
+                must divide the dimension
+            iterations: K-means rounds
+            seed: Random seed
+
+        Returns:
+            IVFIndex instance
+        """
+        start_time = time.time()
+        rows = np.flatnonzero(has_vector) if has_vector is not None else np.arange(len(vectors))
+        dimensions = vectors.shape[1]
+        if not len(rows):
+            raise ValueError("No vectors to index")
+        if pq_subvectors and dimensions % pq_subvectors:
+            raise ValueError(f"pq_subvectors={pq_subvectors} does not divide {dimensions} dimensions")
+        nlist = min(nlist or default_nlist(len(rows)), len(rows))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(rows), max(MIN_POINTS_PER_CENTROID * nlist, 10_000), MAX_TRAINING_SAMPLE)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, sample_size, replace=False))], dtype=np.float32)
+        centroids = kmeans(sample, nlist, iterations=iterations, spherical=True, seed=seed)
+
+        labels = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), _CHUNK):
+            chunk = rows[start:start + _CHUNK]
+            labels[start:start + _CHUNK] = _assign(np.asarray(vectors[chunk], dtype=np.float32), centroids, True)
+        order = np.argsort(labels, kind="stable")
+        list_rows = rows[order].astype(np.int64)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+        row_lists = np.full(len(vectors), -1, dtype=np.int32)
+        row_lists[rows] = labels
+
+        codebooks = codes = None
+        if pq_subvectors:
+            # Codes encode the residual to the list centroid, which varies far less than the vector
+            width = dimensions // pq_subvectors
+            residuals = sample - centroids[_assign(sample, centroids, True)]
+            codebooks = np.stack([
+                kmeans(residuals[:, j * width:(j + 1) * width], min(PQ_CENTROIDS, len(residuals)),
+                       iterations=iterations, spherical=False, seed=seed + j)
+                for j in range(pq_subvectors)
+            ])
+            codes = np.empty((len(list_rows), pq_subvectors), dtype=np.uint8)
+            list_labels = labels[order]
+            for start in range(0, len(list_rows), _CHUNK):
+                chunk = np.asarray(vectors[list_rows[start:start + _CHUNK]], dtype=np.float32)
+                chunk -= centroids[list_labels[start:start + _CHUNK]]
+                for j in range(pq_subvectors):
+                    codes[start:start + len(chunk), j] = _assign(chunk[:, j * width:(j + 1) * width], codebooks[j], False)
+
+        params = {
+            "nlist": nlist,
+            "dimensions": dimensions,
+            "pq_subvectors": pq_subvectors,
+            "rows": len(vectors),
+            "indexed": len(list_rows),
+            "iterations": iterations,
+            "build_seconds": round(time.time() - start_time, 2),
+        }
+        return cls(centroids, list_offsets, list_rows, row_lists, codebooks, codes, params)
+
+    def save(self, path: str) -> None:
+        """Write the index to a directory of memory-mappable files.
+
+        Args:
+            path: Target directory (created if missing)
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "centroids.npy"), np.asarray(self.centroids))
+        np.save(os.path.join(path, "list_offsets.npy"), np.asarray(self.list_offsets))
+        np.save(os.path.join(path, "list_rows.npy"), np.asarray(self.list_rows))
+        np.save(os.path.join(path, "row_lists.npy"), np.asarray(self.row_lists))
+        if self.codebooks is not None:
+            np.save(os.path.join(path, "pq_codebooks.npy"), np.asarray(self.codebooks))
+            np.save(os.path.join(path, "pq_codes.npy"), np.asarray(self.codes))
+        with open(os.path.join(path, "params.json"), "w", encoding="utf-8") as f:
+            json.dump(self.params, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Memory-map an index previously written with save()."""
+        with open(os.path.join(path, "params.json"), "r", encoding="utf-8") as f:
+            params = json.load(f)
+
+        def _map(name: str) -> np.ndarray:
+            return np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+
+        quantized = params.get("pq_subvectors", 0) > 0
+        return cls(
+            _map("centroids.npy"),
+            _map("list_offsets.npy"),
+            _map("list_rows.npy"),
+            _map("row_lists.npy"),
+            _map("pq_codebooks.npy") if quantized else None,
+            _map("pq_codes.npy") if quantized else None,
+            params,
+        )
+
+    def probe_lists(self, query: np.ndarray, nprobe: int, count: int,
+                    row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Lists to scan, best centroid first, and their row counts.
+
+        Takes the nprobe best lists holding rows that pass row_mask, and more
+        when those hold fewer than count such rows.
+        """
+        if row_mask is None:
+            sizes = self._list_sizes
+        else:
+            lists = self.row_lists[row_mask]
+            sizes = np.bincount(lists[lists >= 0], minlength=self.nlist)
+        order = np.argsort(-(self.centroids @ query), kind="stable")
+        order = order[sizes[order] > 0]
+        covered = np.cumsum(sizes[order])
+        needed = max(nprobe, int(np.searchsorted(covered, count)) + 1)
+        return order[:needed], sizes
+
+    def search(
+        self,
+        query: np.ndarray,
+        vectors: np.ndarray,
+        count: int,
+        nprobe: int = 16,
+        row_mask: Optional[np.ndarray] = None,
+        rescore_factor: int = 4
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top count rows by cosine similarity.
+
+        Args:
+            query: Unit-length query vector
+            vectors: Snapshot vectors the index was built over
+            count: Number of results
+            nprobe: Lists scanned (at least)
+            row_mask: Rows allowed in the results (None: all indexed rows)
+            rescore_factor: PQ candidates rescored exactly per result
+
+        Returns:
+            (rows, cosine similarities), best first
+        """
+        lists, sizes = self.probe_lists(query, nprobe, count, row_mask)
+        if not len(lists):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if row_mask is not None and sizes.sum() <= nprobe * len(self.list_rows) / self.nlist:
+            # Selective filter: fewer rows pass it than nprobe lists hold, scanning them all is exact and cheaper
+            return self._top(np.flatnonzero(row_mask & (self.row_lists >= 0)), query, vectors, count)
+        spans = [np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists]
+        positions = np.concatenate(spans)
+        rows = self.list_rows[positions]
+        if row_mask is not None:
+            keep = row_mask[rows]
+            positions, rows = positions[keep], rows[keep]
+
+        if self.codebooks is not None and len(rows) > count * rescore_factor:
+            # Asymmetric distance: q.x = q.centroid + q.residual, the latter summed through a
+            # (subvector x code) table of query subvectors against the codebooks
+            width = self.codebooks.shape[2]
+            table = np.einsum("jcw,jw->jc", self.codebooks, query.reshape(-1, width))
+            list_scores = np.repeat(self.centroids[lists] @ query, [len(span) for span in spans])
+            if row_mask is not None:
+                list_scores = list_scores[keep]
+            codes = self.codes[positions]
+            approx = list_scores + table[np.arange(self.pq_subvectors), codes].sum(axis=1)
+            shortlist = np.argpartition(-approx, count * rescore_factor)[:count * rescore_factor]
+            rows = rows[np.sort(shortlist)]
+
+        return self._top(rows, query, vectors, count)
+
+    @staticmethod
+    def _top(rows: np.ndarray, query: np.ndarray, vectors: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top count of rows, best first."""
+        similarities = vectors[rows] @ query
+        if count < len(rows):
+            best = np.argpartition(-similarities, count)[:count]
+            rows, similarities = rows[best], similarities[best]
+        order = np.argsort(-similarities, kind="stable")
+        return rows[order], similarities[order]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index shape."""
+        return {
+            "type": "ivf_pq" if self.codebooks is not None else "ivf_flat",
+            "nlist": self.nlist,
+            "indexed": len(self.list_rows),
+            "pq_subvectors": self.pq_subvectors,
+            "largest_list": int(self._list_sizes.max()) if self.nlist else 0,
+        }
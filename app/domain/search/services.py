@@ -4,9 +4,11 @@ Pure business logic for search operations following DDD patterns
 """
 
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set
 import logging
 
+from app.domain.search.spelling import SpellingIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,7 +18,14 @@ class SearchDomainService:
     No dependencies on external services or infrastructure
     """
     
-    def __init__(self):
+    def __init__(self, spelling_index: Optional[SpellingIndex] = None):
+        """Initialize domain service.
+        
+        Args:
+            spelling_index: Optional catalog spelling index used by correct_query
+        """
+        self.spelling_index = spelling_index
+        
         self.category_keywords = {
             'shirt': ['shirt', 'shirts', 'tshirt', 't-shirt', 'top', 'blouse', 'polo'],
             'pant': ['pant', 'pants', 'trouser', 'trousers', 'jeans', 'bottoms', 'chinos'],
@@ -42,6 +51,66 @@ class SearchDomainService:
             'lt_symbol': r'<\s*(\d+)',
             'gt_symbol': r'>\s*(\d+)',
         }
+        
+        self.stop_words = {'for', 'and', 'the', 'a', 'an', 'in', 'on', 'at', 'to', 'is', 'are', 'with'}
+        
+        # Query vocabulary that must survive spelling correction untouched
+        self.protected_words: Set[str] = {
+            'under', 'below', 'less', 'than', 'above', 'over', 'between', 'gift', 'gifts',
+        }
+        self.protected_words.update(self.stop_words)
+        self.protected_words.update(self.color_keywords)
+        for keywords in self.category_keywords.values():
+            self.protected_words.update(keywords)
+    
+    def correct_query(self, query: str) -> str:
+        """
+        Fix misspellings against the catalog vocabulary before intent parsing
+        
+        Args:
+            query: Raw search query string
+            
+        Returns:
+            Corrected query, or the original query when no index is loaded
+        """
+        if not self.spelling_index or not query:
+            return query
+        
+        try:
+            corrected = self.spelling_index.correct_query(query, self.protected_words)
+        except Exception as e:
+            logger.warning(f"Spelling correction failed, using original query: {e}")
+            return query
+        
+        # Only a changed token counts; the index also collapses whitespace
+        if corrected.lower().split() != query.lower().split():
+            logger.info(f"Spelling corrected query: '{query}' -> '{corrected}'")
+            return corrected
+        return query
+    
+    def is_confident_intent(self, query: str, intent: Dict[str, Any]) -> bool:
+        """
+        Whether heuristic parsing fully understood a (corrected) query
+        
+        True when every word is catalog vocabulary, an intent word or a number,
+        and the heuristics found a category to filter on. Such queries gain
+        nothing from LLM intent parsing.
+        
+        Args:
+            query: Corrected search query
+            intent: Heuristic intent parsed from query
+            
+        Returns:
+            True when the LLM intent call can be skipped
+        """
+        if not self.spelling_index or not intent.get('categories'):
+            return False
+        for token in re.findall(r'\b\w+\b', query.lower()):
+            if token.isdigit() or token in self.protected_words:
+                continue
+            if not self.spelling_index.contains(token):
+                return False
+        return True
     
     def parse_search_intent(self, query: str) -> Dict[str, Any]:
         """
@@ -89,8 +158,7 @@ class SearchDomainService:
         
         # Extract keywords (remove stop words)
         words = re.findall(r'\b\w+\b', query_lower)
-        stop_words = {'for', 'and', 'the', 'a', 'an', 'in', 'on', 'at', 'to', 'is', 'are', 'with'}
-        intent['keywords'] = [word for word in words if word not in stop_words and len(word) > 2]
+        intent['keywords'] = [word for word in words if word not in self.stop_words and len(word) > 2]
         
         # Build additional filters
         intent['filters'] = self._build_filters(intent)
@@ -0,0 +1,380 @@
+"""
+Spelling Correction Index
+SymSpell-style symmetric-delete index over the catalog vocabulary.
+
+The index is built offline (see scripts/build_spelling_index.py) and stored as a
+directory of flat arrays so it can be memory-mapped at startup. Known words are a
+single binary search; misspelled words only hash the deletes of the term and
+binary-search them, so correcting a query stays well under a millisecond and never
+calls out to an LLM.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+# Tokens eligible for the vocabulary / correction: purely alphabetic words
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+# Catalog fields that contribute vocabulary, with their frequency weights
+VOCABULARY_FIELDS = {
+    "title": 3,
+    "brand": 5,
+    "category": 5,
+    "sub_category": 5,
+    "openai_embedding_text": 1,
+}
+
+MANIFEST_FILE = "manifest.json"
+WORDS_FILE = "words.bin"
+WORD_OFFSETS_FILE = "word_offsets.npy"
+WORD_COUNTS_FILE = "word_counts.npy"
+DELETE_HASHES_FILE = "delete_hashes.npy"
+DELETE_WORD_IDS_FILE = "delete_word_ids.npy"
+WORD_HASHES_FILE = "word_hashes.npy"
+WORD_HASH_IDS_FILE = "word_hash_ids.npy"
+
+
+def _hash_term(term: str) -> int:
+    """Stable 64-bit hash of a term (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _deletes(term: str, max_distance: int) -> Set[str]:
+    """Generate all strings reachable from term by up to max_distance deletions.
+
+    The term itself is included so exact matches are found through the same path.
+    """
+    results = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for candidate in frontier:
+            if len(candidate) <= 1:
+                continue
+            for i in range(len(candidate)):
+                deleted = candidate[:i] + candidate[i + 1:]
+                if deleted not in results:
+                    results.add(deleted)
+                    next_frontier.add(deleted)
+        frontier = next_frontier
+    return results
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance with early termination.
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Distances above this are reported as max_distance + 1
+
+    Returns:
+        Edit distance (insert, delete, substitute, adjacent transpose)
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def extract_vocabulary(
+    documents: Iterable[Dict[str, Any]],
+    field_weights: Optional[Dict[str, int]] = None,
+    min_length: int = 3,
+) -> Counter:
+    """Count weighted token frequencies across catalog documents.
+
+    Args:
+        documents: Product documents (only the vocabulary fields are read)
+        field_weights: Field name to frequency weight, defaults to VOCABULARY_FIELDS
+        min_length: Shortest token kept in the vocabulary
+
+    Returns:
+        Counter of token -> weighted frequency
+    """
+    weights = field_weights or VOCABULARY_FIELDS
+    counts: Counter = Counter()
+    for doc in documents:
+        for field, weight in weights.items():
+            value = doc.get(field)
+            if not value:
+                continue
+            for token in TOKEN_PATTERN.findall(str(value).lower()):
+                if len(token) >= min_length:
+                    counts[token] += weight
+    return counts
+
+
+class SpellingIndex:
+    """Symmetric-delete spelling corrector backed by (memory-mapped) arrays.
+
+    Every vocabulary word contributes the hashes of all deletes of its prefix.
+    At lookup time the same deletes are generated for the input term, matched by
+    binary search and the surviving candidates are verified with a real edit
+    distance, which also makes hash collisions harmless.
+    """
+
+    def __init__(
+        self,
+        words: Any,
+        word_offsets: np.ndarray,
+        word_counts: np.ndarray,
+        delete_hashes: np.ndarray,
+        delete_word_ids: np.ndarray,
+        word_hashes: np.ndarray,
+        word_hash_ids: np.ndarray,
+        max_edit_distance: int = 2,
+        prefix_length: int = 7,
+    ):
+        """Initialize index from its arrays.
+
+        Args:
+            words: UTF-8 bytes (or uint8 memmap) of all words concatenated
+            word_offsets: Start offset of each word in words, plus a final end offset
+            word_counts: Weighted frequency of each word
+            delete_hashes: Sorted hashes of the prefix deletes
+            delete_word_ids: Word id for each entry of delete_hashes
+            word_hashes: Sorted hashes of the full words, for exact-match checks
+            word_hash_ids: Word id for each entry of word_hashes
+            max_edit_distance: Largest edit distance the index was built for
+            prefix_length: Length of the word prefix used to generate deletes
+        """
+        self.words = words
+        self.word_offsets = word_offsets
+        self.word_counts = word_counts
+        self.delete_hashes = delete_hashes
+        self.delete_word_ids = delete_word_ids
+        self.word_hashes = word_hashes
+        self.word_hash_ids = word_hash_ids
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+
+    @classmethod
+    def build(
+        cls,
+        word_counts: Dict[str, int],
+        max_edit_distance: int = 2,
+        prefix_length: int = 7,
+        min_count: int = 1,
+    ) -> "SpellingIndex":
+        """Build an in-memory index from a word frequency table.
+
+        Args:
+            word_counts: Word -> frequency
+            max_edit_distance: Largest correctable edit distance
+            prefix_length: Prefix length used for delete generation
+            min_count: Words rarer than this are left out
+
+        Returns:
+            SpellingIndex instance
+        """
+        vocabulary = sorted(w for w, c in word_counts.items() if c >= min_count)
+
+        encoded = [w.encode("utf-8") for w in vocabulary]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(e) for e in encoded])
+        counts = np.array([word_counts[w] for w in vocabulary], dtype=np.int64)
+
+        hashes: List[int] = []
+        ids: List[int] = []
+        for word_id, word in enumerate(vocabulary):
+            for deleted in _deletes(word[:prefix_length], max_edit_distance):
+                hashes.append(_hash_term(deleted))
+                ids.append(word_id)
+
+        hash_array = np.array(hashes, dtype=np.uint64)
+        id_array = np.array(ids, dtype=np.uint32)
+        order = np.argsort(hash_array, kind="stable")
+
+        word_hash_array = np.array([_hash_term(w) for w in vocabulary], dtype=np.uint64)
+        word_order = np.argsort(word_hash_array, kind="stable")
+
+        return cls(
+            words=b"".join(encoded),
+            word_offsets=offsets,
+            word_counts=counts,
+            delete_hashes=hash_array[order],
+            delete_word_ids=id_array[order],
+            word_hashes=word_hash_array[word_order],
+            word_hash_ids=word_order.astype(np.uint32),
+            max_edit_distance=max_edit_distance,
+            prefix_length=prefix_length,
+        )
+
+    def save(self, path: str) -> None:
+        """Write the index to a directory of memory-mappable files.
+
+        Args:
+            path: Target directory (created if missing)
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, WORDS_FILE), "wb") as f:
+            f.write(bytes(self.words))
+        np.save(os.path.join(path, WORD_OFFSETS_FILE), np.asarray(self.word_offsets))
+        np.save(os.path.join(path, WORD_COUNTS_FILE), np.asarray(self.word_counts))
+        np.save(os.path.join(path, DELETE_HASHES_FILE), np.asarray(self.delete_hashes))
+        np.save(os.path.join(path, DELETE_WORD_IDS_FILE), np.asarray(self.delete_word_ids))
+        np.save(os.path.join(path, WORD_HASHES_FILE), np.asarray(self.word_hashes))
+        np.save(os.path.join(path, WORD_HASH_IDS_FILE), np.asarray(self.word_hash_ids))
+
+        manifest = {
+            "max_edit_distance": self.max_edit_distance,
+            "prefix_length": self.prefix_length,
+            "word_count": len(self),
+            "delete_count": int(len(self.delete_hashes)),
+            "built_at": time.time(),
+        }
+        with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "SpellingIndex":
+        """Memory-map an index previously written with save().
+
+        Args:
+            path: Index directory
+
+        Returns:
+            SpellingIndex whose arrays are backed by the OS page cache
+        """
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        def _map(name: str) -> np.ndarray:
+            # Plain ndarray views over the mapping avoid np.memmap's slicing overhead
+            return np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+
+        words_path = os.path.join(path, WORDS_FILE)
+        if os.path.getsize(words_path) > 0:
+            words: Any = np.asarray(np.memmap(words_path, dtype=np.uint8, mode="r"))
+        else:
+            words = b""
+
+        return cls(
+            words=words,
+            word_offsets=_map(WORD_OFFSETS_FILE),
+            word_counts=_map(WORD_COUNTS_FILE),
+            delete_hashes=_map(DELETE_HASHES_FILE),
+            delete_word_ids=_map(DELETE_WORD_IDS_FILE),
+            word_hashes=_map(WORD_HASHES_FILE),
+            word_hash_ids=_map(WORD_HASH_IDS_FILE),
+            max_edit_distance=int(manifest["max_edit_distance"]),
+            prefix_length=int(manifest["prefix_length"]),
+        )
+
+    def __len__(self) -> int:
+        return max(0, len(self.word_offsets) - 1)
+
+    def _word(self, word_id: int) -> str:
+        start, end = int(self.word_offsets[word_id]), int(self.word_offsets[word_id + 1])
+        return bytes(self.words[start:end]).decode("utf-8")
+
+    def _candidate_ids(self, term: str, max_distance: int) -> Set[int]:
+        """Find word ids sharing at least one prefix delete with term."""
+        if len(self.delete_hashes) == 0:
+            return set()
+        hashes = np.array(
+            [_hash_term(d) for d in _deletes(term[:self.prefix_length], max_distance)],
+            dtype=np.uint64,
+        )
+        left = np.searchsorted(self.delete_hashes, hashes, side="left")
+        right = np.searchsorted(self.delete_hashes, hashes, side="right")
+        ids: Set[int] = set()
+        for lo, hi in zip(left, right):
+            if hi > lo:
+                ids.update(int(i) for i in self.delete_word_ids[lo:hi])
+        return ids
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int, int]]:
+        """Find the best vocabulary match for a single term.
+
+        Args:
+            term: Lower-cased input term
+            max_distance: Maximum edit distance, capped at the index's build distance
+
+        Returns:
+            (word, distance, frequency) of the closest, most frequent match or None
+        """
+        limit = self.max_edit_distance if max_distance is None else min(max_distance, self.max_edit_distance)
+        best: Optional[Tuple[str, int, int]] = None
+        for word_id in self._candidate_ids(term, limit):
+            word = self._word(word_id)
+            distance = 0 if word == term else damerau_levenshtein(term, word, limit)
+            if distance > limit:
+                continue
+            count = int(self.word_counts[word_id])
+            if best is None or (distance, -count) < (best[1], -best[2]):
+                best = (word, distance, count)
+                if distance == 0:
+                    break
+        return best
+
+    def contains(self, term: str) -> bool:
+        """Check whether term is an exact vocabulary word (single binary search)."""
+        if len(self.word_hashes) == 0:
+            return False
+        term_hash = np.uint64(_hash_term(term))
+        pos = int(np.searchsorted(self.word_hashes, term_hash, side="left"))
+        while pos < len(self.word_hashes) and self.word_hashes[pos] == term_hash:
+            if self._word(int(self.word_hash_ids[pos])) == term:
+                return True
+            pos += 1
+        return False
+
+    def correct_query(self, query: str, protected_words: Optional[Set[str]] = None) -> str:
+        """Correct each misspelled token of a free-text query.
+
+        Tokens that are short, contain digits or punctuation, are protected or
+        already in the vocabulary are left untouched.
+
+        Args:
+            query: Raw user query
+            protected_words: Words that must never be rewritten
+
+        Returns:
+            Query with misspelled tokens replaced by their best correction
+        """
+        protected = protected_words or set()
+        corrected: List[str] = []
+        for token in query.split():
+            lowered = token.lower()
+            if (len(lowered) < 4 or not lowered.isalpha() or lowered in protected
+                    or self.contains(lowered)):
+                corrected.append(token)
+                continue
+
+            # Short words tolerate a single edit only to avoid wild rewrites
+            limit = 1 if len(lowered) <= 5 else self.max_edit_distance
+            match = self.lookup(lowered, max_distance=limit)
+            if match is None:
+                corrected.append(token)
+            else:
+                corrected.append(match[0])
+        return " ".join(corrected)
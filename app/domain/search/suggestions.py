@@ -0,0 +1,125 @@
+"""
+Typeahead Prefix Index
+Compact in-memory prefix structure for search-as-you-type suggestions.
+
+Suggestions live in a sorted array of normalized keys, so every prefix maps to a
+contiguous slice found by binary search. The top-k by score is taken from that
+slice with a partial sort; one- and two-character prefixes, whose slices are the
+largest, are answered from a precomputed table.
+"""
+
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Source weights: a term seen in the query log is worth more than a catalog term
+SOURCE_WEIGHTS = {
+    "query": 3.0,
+    "brand": 2.0,
+    "category": 2.0,
+    "title": 1.0,
+}
+
+# Prefixes up to this length are answered from the precomputed table
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+
+def normalize_suggestion(text: str) -> str:
+    """Lower-case and collapse whitespace so keys compare consistently."""
+    return WHITESPACE_PATTERN.sub(" ", text.lower()).strip()
+
+
+class PrefixIndex:
+    """Immutable sorted-array prefix index.
+
+    Build a new instance to refresh; readers keep using the old one until the
+    reference is swapped, so lookups never need a lock.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, float]], max_results: int = 20):
+        """Build index from suggestion entries.
+
+        Args:
+            entries: (text, source type, frequency) tuples; duplicates are merged
+            max_results: Largest limit a lookup can request
+        """
+        merged: Dict[str, Tuple[str, str, float]] = {}
+        for text, source, frequency in entries:
+            key = normalize_suggestion(text or "")
+            if not key:
+                continue
+            score = SOURCE_WEIGHTS.get(source, 1.0) * float(np.log1p(max(frequency, 0)))
+            previous = merged.get(key)
+            if previous is None:
+                merged[key] = (text.strip(), source, score)
+            else:
+                # Keep the display form and type of the strongest source
+                best = previous if previous[2] >= score else (text.strip(), source, score)
+                merged[key] = (best[0], best[1], previous[2] + score)
+
+        self.keys: List[str] = sorted(merged)
+        self.texts: List[str] = [merged[k][0] for k in self.keys]
+        self.types: List[str] = [merged[k][1] for k in self.keys]
+        self.scores = np.array([merged[k][2] for k in self.keys], dtype=np.float32)
+        self.max_results = max_results
+        self._precomputed: Dict[str, List[int]] = self._precompute_short_prefixes()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _top_positions(self, lo: int, hi: int, limit: int) -> List[int]:
+        if hi - lo <= limit:
+            window = np.arange(lo, hi)
+        else:
+            window = lo + np.argpartition(-self.scores[lo:hi], limit - 1)[:limit]
+        # Highest score first, alphabetical for ties
+        return sorted((int(i) for i in window), key=lambda i: (-self.scores[i], self.keys[i]))
+
+    def _precompute_short_prefixes(self) -> Dict[str, List[int]]:
+        prefixes = set()
+        for key in self.keys:
+            for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+                if len(key) >= length:
+                    prefixes.add(key[:length])
+        table = {}
+        for prefix in prefixes:
+            lo, hi = self._range(prefix)
+            table[prefix] = self._top_positions(lo, hi, self.max_results)
+        return table
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, object]]:
+        """Return the highest-scoring suggestions starting with prefix.
+
+        Args:
+            prefix: What the user has typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of {"text", "type", "score"} dictionaries, best first
+        """
+        key = normalize_suggestion(prefix)
+        if not key or not self.keys:
+            return []
+        limit = max(1, min(limit, self.max_results))
+
+        positions: Optional[List[int]] = self._precomputed.get(key) if len(key) <= PRECOMPUTED_PREFIX_LENGTH else None
+        if positions is None:
+            lo, hi = self._range(key)
+            if lo == hi:
+                return []
+            positions = self._top_positions(lo, hi, limit)
+
+        return [
+            {"text": self.texts[i], "type": self.types[i], "score": round(float(self.scores[i]), 4)}
+            for i in positions[:limit]
+        ]
@@ -3,6 +3,7 @@
 FastAPI application for DDD-based search system.
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -14,6 +15,8 @@ from fastapi import Request
 from app.core.config import get_settings
 from app.core.logging_simple import setup_logging
 from app.db.mongo import AsyncMongoClient
+from app.api.v1.deps import get_spelling_index, load_search_backend
+from app.services.suggestion_service import SuggestionService
 from app.api.v1.routes.search import router as search_router
 
 
@@ -32,12 +35,34 @@ async def lifespan(app: FastAPI):
     await mongo_client.connect()
     app.state.mongo_client = mongo_client
     
+    # Memory-map the spelling index up front instead of on the first search
+    get_spelling_index()
+    
+    # In-process retrieval legs for deployments without Atlas Search
+    app.state.search_backend = await load_search_backend(settings, mongo_client.get_collection())
+    
+    # Typeahead index is built and refreshed in the background
+    suggestion_service = SuggestionService(
+        mongo_client.get_database(),
+        collection_name=settings.collection_name,
+        query_log_collection_name=settings.query_log_collection_name,
+        max_catalog_terms=settings.suggest_max_catalog_terms,
+        catalog_refresh_seconds=settings.suggest_catalog_refresh_seconds
+    )
+    app.state.suggestion_service = suggestion_service
+    suggestion_task = asyncio.create_task(
+        suggestion_service.run_refresh_loop(settings.suggest_refresh_interval_seconds)
+    )
+    
     logger.info("Application startup completed")
     
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    suggestion_task.cancel()
+    # Counts recorded since the last refresh would otherwise be lost
+    await suggestion_service.flush()
     if hasattr(app.state, 'mongo_client'):
         await app.state.mongo_client.disconnect()
     logger.info("Application shutdown completed")
@@ -0,0 +1,120 @@
+"""Embedding batch repository: state of OpenAI Batch API jobs across restarts."""
+
+from typing import Any, Dict, List, Optional
+import logging
+import time
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+BATCH_COLLECTION = "embedding_batches"
+
+CHUNK_PREPARED = "prepared"
+CHUNK_SUBMITTED = "submitted"
+CHUNK_WRITTEN = "written"
+CHUNK_FAILED = "failed"
+
+# Chunks whose vectors have not been written yet
+OPEN_STATUSES = (CHUNK_PREPARED, CHUNK_SUBMITTED)
+
+
+def chunk_id(run: str, sequence: int) -> str:
+    """Id of a run's sequence-th chunk (also the prefix of its request custom_ids)."""
+    return f"{run}:{sequence:06d}"
+
+
+class EmbeddingBatchRepository:
+    """Persists the chunks of a batch-mode embedding run.
+
+    A chunk is a contiguous `_id` range of the collection whose texts are sent
+    as one Batch API job. Its document records the product ids and texts
+    before anything is uploaded, then the file and batch ids once submitted,
+    so a restarted run polls the jobs already in flight instead of paying for
+    them twice, and continues reading after the last chunk's `_id`.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        """Initialize repository with the MongoDB database.
+
+        Args:
+            database: Database holding the batch collection
+        """
+        self.collection = database[BATCH_COLLECTION]
+
+    async def create_chunk(self, run: str, sequence: int, ids: List[Any], texts: List[str],
+                           last_id: Any, final: bool = False) -> Dict[str, Any]:
+        """Record a prepared chunk.
+
+        Args:
+            run: Run name
+            sequence: Position of the chunk in the run
+            ids: Product ids to embed, in order
+            texts: Embedding text of each product
+            last_id: Highest `_id` read for this chunk (including skipped products)
+            final: Whether the reader reached the end of the collection
+
+        Returns:
+            The chunk document
+        """
+        now = time.time()
+        chunk = {
+            "_id": chunk_id(run, sequence),
+            "run": run,
+            "sequence": sequence,
+            "status": CHUNK_PREPARED if ids else CHUNK_WRITTEN,
+            "ids": ids,
+            "texts": texts,
+            "count": len(ids),
+            "last_id": last_id,
+            "final": final,
+            "input_file_id": None,
+            "batch_id": None,
+            "counters": {},
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        await self.collection.insert_one(chunk)
+        return chunk
+
+    async def mark_submitted(self, chunk_key: str, input_file_id: str, batch_id: str) -> None:
+        """Record the uploaded request file and the batch job of a chunk."""
+        await self.collection.update_one(
+            {"_id": chunk_key},
+            {"$set": {"status": CHUNK_SUBMITTED, "input_file_id": input_file_id,
+                      "batch_id": batch_id, "updated_at": time.time()}}
+        )
+
+    async def mark_finished(self, chunk_key: str, status: str, counters: Dict[str, Any],
+                            error: Optional[str] = None) -> None:
+        """Close a chunk once its results are written (or the job failed).
+
+        The ids and texts are dropped: only the counters are kept.
+        """
+        await self.collection.update_one(
+            {"_id": chunk_key},
+            {"$set": {"status": status, "counters": counters, "error": error,
+                      "ids": [], "texts": [], "updated_at": time.time()}}
+        )
+
+    async def open_chunks(self, run: str) -> List[Dict[str, Any]]:
+        """Chunks of a run that are prepared or submitted, in sequence order."""
+        cursor = self.collection.find({"run": run, "status": {"$in": list(OPEN_STATUSES)}}).sort("sequence", 1)
+        return await cursor.to_list(length=None)
+
+    async def last_chunk(self, run: str) -> Optional[Dict[str, Any]]:
+        """Most recently prepared chunk of a run, without its ids and texts."""
+        cursor = self.collection.find({"run": run}, {"ids": 0, "texts": 0}).sort("sequence", -1).limit(1)
+        chunks = await cursor.to_list(length=1)
+        return chunks[0] if chunks else None
+
+    async def summary(self, run: str) -> Dict[str, int]:
+        """Number of chunks of a run per status."""
+        pipeline = [{"$match": {"run": run}}, {"$group": {"_id": "$status", "chunks": {"$sum": 1}}}]
+        return {row["_id"]: row["chunks"] async for row in self.collection.aggregate(pipeline)}
+
+    async def clear(self, run: str) -> int:
+        """Forget every chunk of a run so the next run starts from the first `_id`."""
+        result = await self.collection.delete_many({"run": run})
+        return result.deleted_count
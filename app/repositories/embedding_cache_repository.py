@@ -0,0 +1,133 @@
+"""Embedding cache repository: content-addressed vectors keyed by model, dimensions and text hash."""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import time
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.db.vector_codec import VectorCodec, vector_dimensions
+from app.domain.embeddings.services import EmbeddingFingerprint
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_COLLECTION = "embedding_cache"
+
+
+def cache_key(model: str, dimensions: int, text_hash: str) -> str:
+    """Cache `_id` for a text embedded by a model at a given dimension."""
+    return f"{model}:{dimensions}:{text_hash}"
+
+
+def cache_update(model: str, dimensions: int, text_hash: str, vector: Any) -> Dict[str, Any]:
+    """Build the upsert storing one cached vector.
+
+    The vector is only set on insert: a text hash always maps to the same vector.
+
+    Args:
+        model: Embedding model
+        dimensions: Vector dimensions
+        text_hash: sha256 of the embedding text
+        vector: Embedding vector, already encoded for storage
+
+    Returns:
+        MongoDB update document
+    """
+    return {
+        "$setOnInsert": {
+            "model": model,
+            "dimensions": dimensions,
+            "text_hash": text_hash,
+            "embedding": vector,
+            "created_at": time.time()
+        }
+    }
+
+
+def group_texts_by_hash(texts: List[str]) -> "OrderedDict[str, List[int]]":
+    """Group identical texts so each is embedded once.
+
+    Args:
+        texts: Embedding texts, possibly with duplicates
+
+    Returns:
+        Text hash -> positions of that text in texts, in first-seen order
+    """
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for position, text in enumerate(texts):
+        groups.setdefault(EmbeddingFingerprint.text_hash(text), []).append(position)
+    return groups
+
+
+class EmbeddingCacheRepository:
+    """Stores one vector per distinct embedding text.
+
+    Catalog variants (sizes, colours, reseller copies) often share the same
+    embedding text; looking the text hash up here before calling the API means
+    each distinct text is paid for once across all products and runs.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase, vector_codec: Optional[VectorCodec] = None):
+        """Initialize repository with the MongoDB database.
+
+        Args:
+            database: Database holding the embedding_cache collection
+            vector_codec: Storage format of cached vectors (default: BSON arrays)
+        """
+        self.collection = database[EMBEDDING_CACHE_COLLECTION]
+        self.vector_codec = vector_codec or VectorCodec()
+
+    async def get_many(self, model: str, dimensions: int, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors.
+
+        Args:
+            model: Embedding model
+            dimensions: Vector dimensions
+            text_hashes: Text hashes to look up
+
+        Returns:
+            Text hash -> vector for the hashes found
+        """
+        keys = [cache_key(model, dimensions, text_hash) for text_hash in text_hashes]
+        if not keys:
+            return {}
+        cursor = self.collection.find({"_id": {"$in": keys}}, {"text_hash": 1, "embedding": 1})
+        return {
+            document["text_hash"]: VectorCodec.decode(document["embedding"])
+            async for document in cursor
+            if vector_dimensions(document.get("embedding")) == dimensions
+        }
+
+    async def put_many(self, model: str, dimensions: int, vectors: Dict[str, List[float]]) -> int:
+        """Store vectors; failures are logged, as the cache is only an optimisation.
+
+        Args:
+            model: Embedding model
+            dimensions: Vector dimensions
+            vectors: Text hash -> vector
+
+        Returns:
+            Number of vectors stored
+        """
+        if not vectors:
+            return 0
+        operations = [
+            UpdateOne(
+                {"_id": cache_key(model, dimensions, text_hash)},
+                cache_update(model, dimensions, text_hash, self.vector_codec.encode(vector)),
+                upsert=True
+            )
+            for text_hash, vector in vectors.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Error caching {len(operations)} embeddings: {e}")
+            return 0
+
+    async def count(self, model: str, dimensions: int) -> int:
+        """Count cached vectors for a model and dimension."""
+        return await self.collection.count_documents({"model": model, "dimensions": dimensions})
@@ -0,0 +1,209 @@
+"""Embedding job repository: persistent, resumable embedding runs."""
+
+from typing import Any, Dict, List, Optional
+import logging
+import time
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+JOB_COLLECTION = "embedding_jobs"
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"
+
+# Statuses a job can be resumed from (plus running jobs whose heartbeat went stale)
+RESUMABLE_STATUSES = (JOB_PENDING, JOB_FAILED, JOB_INTERRUPTED)
+
+
+def new_job_document(source: str, params: Dict[str, Any], total: Optional[int] = None) -> Dict[str, Any]:
+    """Build a new job document.
+
+    Job documents hold status, parameters, keyset position and counters of one run.
+    `counters` are only written with the checkpoint, so a resumed run adds to
+    exactly the work before `last_id`; heartbeats write `live_counters`.
+
+    Args:
+        source: What started the job (api, complete_embedding_pipeline, ...)
+        params: Job parameters needed to resume it (batch size, query, ...)
+        total: Documents the job is expected to read
+
+    Returns:
+        Job document ready for insert_one
+    """
+    now = time.time()
+    return {
+        "_id": ObjectId(),
+        "source": source,
+        "status": JOB_PENDING,
+        "params": params,
+        "total": total,
+        "last_id": None,
+        "counters": {},
+        "live_counters": {},
+        "throughput": 0.0,
+        "runs": 0,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "heartbeat_at": now,
+        "finished_at": None
+    }
+
+
+def progress_update(last_id: Any, counters: Dict[str, Any], throughput: Optional[float] = None) -> Dict[str, Any]:
+    """Build the $set recording a checkpoint and heartbeat.
+
+    Args:
+        last_id: High-water mark; every document up to it has been handled
+        counters: Cumulative counters across all runs of the job
+        throughput: Documents per second of the current run
+
+    Returns:
+        MongoDB update document
+    """
+    update = {"last_id": last_id, "counters": counters, "live_counters": counters, "heartbeat_at": time.time()}
+    if throughput is not None:
+        update["throughput"] = throughput
+    return {"$set": update}
+
+
+def live_counters(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Counters as of the last heartbeat, falling back to the checkpointed ones."""
+    return job.get("live_counters") or job.get("counters") or {}
+
+
+def job_progress(job: Dict[str, Any], stale_after_seconds: float = 120.0) -> Dict[str, Any]:
+    """Derive completion, ETA and liveness for a job document.
+
+    Args:
+        job: Job document
+        stale_after_seconds: Heartbeat age after which a running job is considered dead
+
+    Returns:
+        Dictionary with processed, percentage, eta_seconds and stale
+    """
+    processed = live_counters(job).get("processed", 0)
+    total = job.get("total")
+    throughput = job.get("throughput") or 0.0
+    percentage = round(min(processed / total, 1.0) * 100, 2) if total else None
+    eta_seconds = None
+    if job.get("status") == JOB_RUNNING and total and throughput > 0:
+        eta_seconds = round(max(total - processed, 0) / throughput, 1)
+    stale = (
+        job.get("status") == JOB_RUNNING and
+        time.time() - (job.get("heartbeat_at") or 0) > stale_after_seconds
+    )
+    return {"processed": processed, "percentage": percentage, "eta_seconds": eta_seconds, "stale": stale}
+
+
+class EmbeddingJobRepository:
+    """Stores embedding jobs: parameters, `_id` checkpoint, counters and heartbeat.
+
+    A job that dies (process restart, crash, lost background task) keeps its
+    last checkpoint, so it can be resumed instead of rediscovering work by
+    scanning the collection.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        """Initialize repository with the MongoDB database.
+
+        Args:
+            database: Database holding the embedding_jobs collection
+        """
+        self.collection = database[JOB_COLLECTION]
+
+    @staticmethod
+    def _object_id(job_id: Any) -> Any:
+        if isinstance(job_id, str) and ObjectId.is_valid(job_id):
+            return ObjectId(job_id)
+        return job_id
+
+    async def create_job(self, source: str, params: Dict[str, Any], total: Optional[int] = None) -> str:
+        """Create a pending job.
+
+        Args:
+            source: What started the job
+            params: Job parameters
+            total: Documents the job is expected to read
+
+        Returns:
+            Job id
+        """
+        document = new_job_document(source, params, total)
+        await self.collection.insert_one(document)
+        return str(document["_id"])
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Job document or None
+        """
+        return await self.collection.find_one({"_id": self._object_id(job_id)})
+
+    async def find_resumable_job(self, source: str, stale_after_seconds: float = 120.0) -> Optional[Dict[str, Any]]:
+        """Most recent unfinished job from a source, if any.
+
+        Args:
+            source: Job source
+            stale_after_seconds: Heartbeat age after which a running job counts as dead
+
+        Returns:
+            Job document or None
+        """
+        return await self.collection.find_one(
+            {
+                "source": source,
+                "$or": [
+                    {"status": {"$in": list(RESUMABLE_STATUSES)}},
+                    {"status": JOB_RUNNING, "heartbeat_at": {"$lt": time.time() - stale_after_seconds}}
+                ]
+            },
+            sort=[("created_at", -1)]
+        )
+
+    async def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent jobs first."""
+        cursor = self.collection.find({}).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def mark_running(self, job_id: str, total: Optional[int] = None) -> None:
+        """Mark a job as started (or resumed) by this process."""
+        update: Dict[str, Any] = {"status": JOB_RUNNING, "started_at": time.time(),
+                                  "heartbeat_at": time.time(), "error": None}
+        if total is not None:
+            update["total"] = total
+        # Live counters of the previous run may be past its last checkpoint
+        await self.collection.update_one(
+            {"_id": self._object_id(job_id)}, {"$set": update, "$unset": {"live_counters": ""}, "$inc": {"runs": 1}}
+        )
+
+    async def save_progress(self, job_id: str, last_id: Any, counters: Dict[str, Any],
+                            throughput: Optional[float] = None) -> None:
+        """Persist the checkpoint, counters and heartbeat."""
+        await self.collection.update_one(
+            {"_id": self._object_id(job_id)}, progress_update(last_id, counters, throughput)
+        )
+
+    async def heartbeat(self, job_id: str, counters: Dict[str, Any], throughput: float) -> None:
+        """Record liveness and live counters without moving the checkpoint or its counters."""
+        await self.collection.update_one(
+            {"_id": self._object_id(job_id)},
+            {"$set": {"live_counters": counters, "throughput": throughput, "heartbeat_at": time.time()}}
+        )
+
+    async def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        """Mark a job completed, failed or interrupted."""
+        await self.collection.update_one(
+            {"_id": self._object_id(job_id)},
+            {"$set": {"status": status, "error": error, "finished_at": time.time(), "heartbeat_at": time.time()}}
+        )
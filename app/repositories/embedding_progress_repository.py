@@ -0,0 +1,166 @@
+"""Embedding progress repository: keyset checkpoints, resume tokens and dead-lettered products."""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+import logging
+import time
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_COLLECTION = "embedding_checkpoints"
+DEAD_LETTER_COLLECTION = "embedding_dead_letters"
+
+
+def dead_letter_update(stage: str, error: str, embedding_text: Optional[str] = None) -> Dict[str, Any]:
+    """Build the upsert recording one more failed attempt for a product.
+
+    Dead-letter documents hold the failing stage, the last error and the attempt count.
+
+    Args:
+        stage: Pipeline stage that failed (text, embed, write)
+        error: Error message (truncated)
+        embedding_text: Text that was being embedded, if built
+
+    Returns:
+        MongoDB update document
+    """
+    now = time.time()
+    return {
+        "$set": {
+            "stage": stage,
+            "error": error[:500],
+            "embedding_text": embedding_text,
+            "last_failed_at": now
+        },
+        "$inc": {"attempts": 1},
+        "$setOnInsert": {"first_failed_at": now}
+    }
+
+
+class EmbeddingProgressRepository:
+    """Persists the embedding pipeline's `_id` high-water mark and poison documents.
+
+    The checkpoint lets a run resume after the last fully processed `_id`
+    instead of re-reading the collection. Products that fail are upserted into
+    the dead-letter collection with an attempt counter; once a product reaches
+    the maximum attempts, later runs skip it instead of retrying it forever.
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        """Initialize repository with the MongoDB database.
+
+        Args:
+            database: Database holding the checkpoint and dead-letter collections
+        """
+        self.checkpoints = database[CHECKPOINT_COLLECTION]
+        self.dead_letters = database[DEAD_LETTER_COLLECTION]
+
+    async def get_checkpoint(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get a stored checkpoint.
+
+        Args:
+            name: Checkpoint name (one per pipeline/query)
+
+        Returns:
+            Checkpoint document with last_id and completed, or None
+        """
+        return await self.checkpoints.find_one({"_id": name})
+
+    async def save_checkpoint(self, name: str, last_id: Any, completed: bool = False,
+                              stats: Optional[Dict[str, Any]] = None) -> None:
+        """Store the high-water mark below which every product has been handled.
+
+        Args:
+            name: Checkpoint name
+            last_id: Highest `_id` processed (written or dead-lettered)
+            completed: Whether the pass over the collection finished
+            stats: Optional counters to store alongside
+        """
+        update = {"last_id": last_id, "completed": completed, "updated_at": time.time()}
+        if stats is not None:
+            update["stats"] = stats
+        await self.checkpoints.update_one({"_id": name}, {"$set": update}, upsert=True)
+
+    async def clear_checkpoint(self, name: str) -> None:
+        """Delete a checkpoint so the next run starts from the first `_id`."""
+        await self.checkpoints.delete_one({"_id": name})
+
+    async def get_resume_token(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get the change stream resume token stored under a checkpoint name.
+
+        Args:
+            name: Checkpoint name (one per change stream consumer)
+
+        Returns:
+            Resume token, or None if the consumer never saved one
+        """
+        checkpoint = await self.checkpoints.find_one({"_id": name}, {"resume_token": 1})
+        return checkpoint.get("resume_token") if checkpoint else None
+
+    async def save_resume_token(self, name: str, token: Dict[str, Any],
+                                stats: Optional[Dict[str, Any]] = None) -> None:
+        """Store the resume token up to which every change has been handled.
+
+        Args:
+            name: Checkpoint name
+            token: Change stream resume token
+            stats: Optional counters to store alongside
+        """
+        update: Dict[str, Any] = {"resume_token": token, "updated_at": time.time()}
+        if stats is not None:
+            update["stats"] = stats
+        await self.checkpoints.update_one({"_id": name}, {"$set": update}, upsert=True)
+
+    async def record_failures(self, failures: List[Dict[str, Any]]) -> int:
+        """Dead-letter failed products.
+
+        Args:
+            failures: Dicts with _id, stage, error and optional embedding_text
+
+        Returns:
+            Number of products recorded
+        """
+        if not failures:
+            return 0
+        operations = [
+            UpdateOne(
+                {"_id": failure["_id"]},
+                dead_letter_update(failure["stage"], failure["error"], failure.get("embedding_text")),
+                upsert=True
+            )
+            for failure in failures
+        ]
+        try:
+            await self.dead_letters.bulk_write(operations, ordered=False)
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Error recording {len(operations)} dead-lettered products: {e}")
+            return 0
+
+    async def get_exhausted_ids(self, ids: Iterable[Any], max_attempts: int) -> Set[Any]:
+        """Return the products among ids that already failed max_attempts times.
+
+        Args:
+            ids: Candidate product ids
+            max_attempts: Attempts after which a product is no longer retried
+
+        Returns:
+            Set of exhausted product ids
+        """
+        cursor = self.dead_letters.find(
+            {"_id": {"$in": list(ids)}, "attempts": {"$gte": max_attempts}},
+            {"_id": 1}
+        )
+        return {document["_id"] async for document in cursor}
+
+    async def resolve(self, ids: List[Any]) -> None:
+        """Remove products from the dead-letter collection after they succeed."""
+        if ids:
+            await self.dead_letters.delete_many({"_id": {"$in": ids}})
+
+    async def count_dead_letters(self, max_attempts: Optional[int] = None) -> int:
+        """Count dead-lettered products, optionally only the exhausted ones."""
+        query = {"attempts": {"$gte": max_attempts}} if max_attempts else {}
+        return await self.dead_letters.count_documents(query)
@@ -0,0 +1,289 @@
+"""Local search backend: in-process vector and BM25 retrieval over a catalog snapshot."""
+
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.db.catalog_snapshot import ANN_DIR, CatalogSnapshot, StringColumn, snapshot_from_collection
+from app.db.filter_index import BitmapFilterIndex
+from app.domain.search.ivf import IVFIndex
+from app.repositories.search_backend import SearchBackend
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class LocalSearchBackend(SearchBackend):
+    """Search legs served from NumPy arrays instead of Atlas Search.
+
+    Product ids, L2-normalized float32 vectors, the filter fields and a BM25
+    index are loaded from MongoDB once (from_collection) or memory-mapped from
+    an exported CatalogSnapshot (from_snapshot); a query is a filter
+    mask, a matrix-vector product or a BM25 pass, and a top-k selection, run in
+    a worker thread. Filters are evaluated as bitsets (BitmapFilterIndex).
+    Only the page of results is then fetched from MongoDB by
+    `_id`, so results carry the full product documents like the Atlas legs.
+    Vector search is exact (brute force) over the rows passing the filters, or
+    approximate through an IVF index built next to the snapshot
+    (scripts/build_ann_index.py), scanning only the matching rows of the probed
+    lists.
+    Scores use the Atlas scales: vector_score is (1 + cos) / 2 and the text
+    leg's search_score is BM25, like an unbounded textScore.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        snapshot: CatalogSnapshot,
+        ann: Optional[IVFIndex] = None,
+        nprobe: int = 16,
+        rescore_factor: int = 4
+    ):
+        """Wrap a loaded catalog snapshot.
+
+        Args:
+            collection: Product collection results are fetched from
+            snapshot: Row-aligned ids, unit vectors, filter columns and BM25 index
+            ann: IVF index over the snapshot vectors (None: exact search)
+            nprobe: Inverted lists scanned per query
+            rescore_factor: Candidates rescored exactly per result (IVF-PQ)
+        """
+        self.collection = collection
+        self.snapshot = snapshot
+        self.ids = snapshot.ids
+        self.vectors = snapshot.vectors
+        self.has_vector = snapshot.has_vector
+        self.strings: Dict[str, StringColumn] = snapshot.strings
+        self.numbers: Dict[str, np.ndarray] = snapshot.numbers
+        self.bm25 = snapshot.bm25
+        self.filters = BitmapFilterIndex.from_snapshot(snapshot)
+        self.vector_path = snapshot.manifest.get("vector_path", "openai_embedding")
+        self.ann = ann
+        self.nprobe = nprobe
+        self.rescore_factor = rescore_factor
+
+    @classmethod
+    async def from_collection(
+        cls,
+        collection: AsyncIOMotorCollection,
+        vector_path: str = "openai_embedding",
+        query: Optional[Dict[str, Any]] = None,
+        batch_size: int = 2000,
+        max_documents: Optional[int] = None
+    ) -> "LocalSearchBackend":
+        """Load ids, vectors, filter fields and BM25 text from MongoDB.
+
+        Args:
+            collection: Product collection
+            vector_path: Embedding field to search (array or binary storage)
+            query: Restrict the snapshot to matching products
+            batch_size: Cursor batch size
+            max_documents: Stop after this many products
+
+        Returns:
+            LocalSearchBackend instance
+        """
+        start_time = time.time()
+        snapshot = await snapshot_from_collection(
+            collection, vector_path=vector_path, query=query, batch_size=batch_size, max_documents=max_documents
+        )
+        logger.info(
+            f"Loaded local search backend from MongoDB: {len(snapshot)} products, {int(snapshot.has_vector.sum())} "
+            f"vectors ({snapshot.dimensions}d), {len(snapshot.bm25.terms)} terms in {time.time() - start_time:.1f}s"
+        )
+        return cls(collection, snapshot)
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        collection: AsyncIOMotorCollection,
+        path: str,
+        nprobe: int = 16,
+        rescore_factor: int = 4
+    ) -> "LocalSearchBackend":
+        """Memory-map a snapshot written by scripts/export_catalog_snapshot.py.
+
+        The IVF index in the snapshot's ivf/ directory, if any, is mapped too,
+        unless it was built over another export.
+
+        Args:
+            collection: Product collection results are fetched from
+            path: Snapshot directory
+            nprobe: Inverted lists scanned per query
+            rescore_factor: Candidates rescored exactly per result (IVF-PQ)
+
+        Returns:
+            LocalSearchBackend instance
+        """
+        start_time = time.time()
+        snapshot = CatalogSnapshot.load(path)
+        ann = None
+        ann_path = os.path.join(path, ANN_DIR)
+        if os.path.isdir(ann_path):
+            ann = IVFIndex.load(ann_path)
+            if ann.params.get("snapshot_created_at") != snapshot.manifest.get("created_at"):
+                logger.warning(f"Ignoring IVF index {ann_path}: built over another export, rebuild it")
+                ann = None
+        logger.info(
+            f"Mapped catalog snapshot {path}: {len(snapshot)} products, {snapshot.dimensions}d, "
+            f"{snapshot.manifest.get('embedding_version')}, {'IVF' if ann else 'exact'} vector search "
+            f"in {time.time() - start_time:.1f}s"
+        )
+        return cls(collection, snapshot, ann=ann, nprobe=nprobe, rescore_factor=rescore_factor)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows matching a filter document (None: no filter), from the bitmap filter index."""
+        if not filters:
+            return None
+        return self.filters.mask(filters)
+
+    @staticmethod
+    def _top(positions: np.ndarray, scores: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The count best (position, score) pairs, best first."""
+        if count < len(scores):
+            keep = np.argpartition(-scores, count)[:count]
+            positions, scores = positions[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+        return positions[order], scores[order]
+
+    def rank_vector(self, vector: List[float], filters: Optional[Dict[str, Any]], count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best count rows by cosine score among rows passing the filters."""
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.vectors.shape[1],):
+            raise ValueError(f"Query vector has {query.size} dimensions, snapshot has {self.vectors.shape[1]}")
+        norm = float(np.linalg.norm(query))
+        mask = self.has_vector
+        filter_mask = self.filter_mask(filters)
+        if filter_mask is not None:
+            mask = mask & filter_mask
+        if self.ann is not None and norm > 0.0:
+            positions, similarities = self.ann.search(
+                query / norm, self.vectors, count, nprobe=self.nprobe,
+                row_mask=None if filter_mask is None else mask, rescore_factor=self.rescore_factor
+            )
+            return positions, (1.0 + similarities) / 2.0
+        positions = np.flatnonzero(mask)
+        if norm == 0.0 or not len(positions):
+            return positions[:0], np.empty(0, dtype=np.float32)
+        # Gather only when the filter leaves a minority of rows
+        if len(positions) * 2 < len(self.ids):
+            similarities = self.vectors[positions] @ (query / norm)
+        else:
+            similarities = (self.vectors @ (query / norm))[positions]
+        return self._top(positions, (1.0 + similarities) / 2.0, count)
+
+    def rank_text(self, query: str, filters: Optional[Dict[str, Any]], count: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Best count rows by BM25 among rows passing the filters, and the number of matches."""
+        scores = self.bm25.scores(query)
+        mask = scores > 0
+        filter_mask = self.filter_mask(filters)
+        if filter_mask is not None:
+            mask &= filter_mask
+        positions = np.flatnonzero(mask)
+        top_positions, top_scores = self._top(positions, scores[positions], count)
+        return top_positions, top_scores, len(positions)
+
+    async def _fetch(self, positions: np.ndarray, scores: np.ndarray, score_fields: Tuple[str, ...],
+                     search_type: str) -> List[Dict[str, Any]]:
+        """Fetch ranked rows from MongoDB, in rank order, with their scores set."""
+        if not len(positions):
+            return []
+        ids = [self.ids[position] for position in positions]
+        cursor = self.collection.find({"_id": {"$in": ids}}, {self.vector_path: 0})
+        by_id = {document["_id"]: document async for document in cursor}
+        products = []
+        for product_id, score in zip(ids, scores.tolist()):
+            product = by_id.get(product_id)
+            if product is None:
+                # Deleted since the snapshot was loaded
+                continue
+            product["_id"] = str(product["_id"])
+            for field in score_fields:
+                product[field] = score
+            product["search_type"] = search_type
+            products.append(product)
+        return products
+
+    async def search_products_text(self, query: str, limit: int = 20, *, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        search_data = await self.search_products_text_paginated(query, 1, limit, filters=filters)
+        return search_data["results"]
+
+    async def search_products_text_paginated(
+        self,
+        query: str,
+        page: int = 1,
+        page_size: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        try:
+            skip = (page - 1) * page_size
+            positions, scores, total = await asyncio.to_thread(self.rank_text, query, filters, skip + page_size)
+            products = await self._fetch(positions[skip:], scores[skip:], ("score", "search_score"), "text")
+            logger.info(f"Local text search found {len(products)}/{total} products for query: '{query}' (page {page})")
+            return {"results": products, "total": total}
+        except Exception as e:
+            logger.error(f"Error in local text search: {e}")
+            return {"results": [], "total": 0}
+
+    async def search_products_vector(
+        self,
+        vector: List[float],
+        limit: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        try:
+            positions, scores = await asyncio.to_thread(self.rank_vector, vector, filters, limit)
+            products = await self._fetch(positions, scores, ("vector_score",), "vector")
+            logger.info(f"Local vector search found {len(products)} products")
+            return products
+        except Exception as e:
+            logger.error(f"Error in local vector search: {e}")
+            return []
+
+    async def search_products_vector_paginated(
+        self,
+        vector: List[float],
+        page: int = 1,
+        page_size: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None
+    ) -> Dict[str, Any]:
+        try:
+            # Same candidate budget as the Atlas leg, so totals and hybrid samples line up
+            prelimit = max(page * page_size * 3, 100)
+            skip = (page - 1) * page_size
+            positions, scores = await asyncio.to_thread(self.rank_vector, vector, filters, prelimit)
+            products = await self._fetch(positions[skip:skip + page_size], scores[skip:skip + page_size],
+                                         ("vector_score",), "vector")
+            logger.info(f"Local vector search found {len(products)}/{len(positions)} products (page {page})")
+            return {"results": products, "total": len(positions)}
+        except Exception as e:
+            logger.error(f"Error in local paginated vector search: {e}")
+            return {"results": [], "total": 0}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size of the loaded snapshot."""
+        return {
+            "backend": "local",
+            "products": len(self.ids),
+            "vectors": int(self.has_vector.sum()),
+            "dimensions": int(self.vectors.shape[1]),
+            "terms": len(self.bm25.terms),
+            "vector_bytes": int(self.vectors.nbytes),
+            "embedding_version": self.snapshot.manifest.get("embedding_version"),
+            "snapshot_created_at": self.snapshot.manifest.get("created_at"),
+            "filters": self.filters.get_stats(),
+            "ann": {**self.ann.get_stats(), "nprobe": self.nprobe} if self.ann is not None else None,
+        }
@@ -2,28 +2,47 @@
 
 from typing import List, Dict, Any, Optional
 import logging
+import time
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo import TEXT
 
+from app.core.cache import TTLCache, make_cache_key
+from app.db.vector_codec import VectorCodec
+from app.db.vector_index import QUANTIZATION_NONE, VectorSearchConfig, cosine_score, vector_search_stage
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.search_backend import SearchBackend
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
-class ProductRepository:
+class ProductRepository(SearchBackend):
     """Repository for product data operations in MongoDB.
     
+    As a SearchBackend it serves the text legs with $text and the vector legs
+    with Atlas $vectorSearch; hybrid fusion is inherited.
+    
     All aggregation operations use allowDiskUse=True to prevent memory limit errors
     when sorting large result sets. This allows MongoDB to use disk storage for
     operations that exceed the 32MB memory limit.
     """
 
-    def __init__(self, collection: AsyncIOMotorCollection):
+    def __init__(self, collection: AsyncIOMotorCollection, facet_cache: Optional[TTLCache] = None,
+                 vector_codec: Optional[VectorCodec] = None,
+                 vector_search: Optional[VectorSearchConfig] = None):
         """Initialize repository with MongoDB collection.
         
         Args:
             collection: MongoDB collection instance
+            facet_cache: Optional shared cache for facet aggregations
+            vector_codec: Storage format of written embeddings (default: BSON arrays)
+            vector_search: Vector index and quantization settings (default: full precision)
         """
         self.collection = collection
+        self.facet_cache = facet_cache
+        self.vector_codec = vector_codec or VectorCodec()
+        self.vector_search = vector_search or VectorSearchConfig()
 
     async def get_all_products(self, skip: int = 0, limit: int = 10) -> List[Dict[str, Any]]:
         """Get all products with pagination.
@@ -157,51 +176,88 @@ class ProductRepository:
             logger.error(f"Error in paginated text search: {e}")
             return {"results": [], "total": 0}
 
-    async def search_products_vector(self, vector: List[float], limit: int = 20, *, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def _vector_candidates_pipeline(
+        self,
+        vector: List[float],
+        num_candidates: int,
+        limit: int,
+        quantization: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """$vectorSearch (+ score and post filter) on the index for a quantization mode.
+        
+        Quantized modes fetch rescore_factor times more candidates, to be
+        rescored against the full-precision vectors.
+        """
+        if quantization != QUANTIZATION_NONE:
+            factor = self.vector_search.rescore_factor
+            limit, num_candidates = limit * factor, num_candidates * factor
+        pipeline = [
+            vector_search_stage(
+                self.vector_search.index_for(quantization), self.vector_search.path,
+                vector, limit, num_candidates=num_candidates
+            ),
+            {"$addFields": {"vector_score": {"$meta": "vectorSearchScore"}}},
+        ]
+        if filters:
+            pipeline.append({"$match": filters})
+        return pipeline
+
+    def _rescore(self, vector: List[float], products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Re-rank quantized candidates by full-precision cosine score.
+        
+        The quantized score is kept as quantized_score; the stored vectors are
+        dropped from the results.
+        """
+        for product in products:
+            product["quantized_score"] = product.get("vector_score", 0.0)
+            product["vector_score"] = cosine_score(vector, product.pop(self.vector_search.path, None))
+        return sorted(products, key=lambda product: product["vector_score"], reverse=True)
+
+    async def search_products_vector(
+        self,
+        vector: List[float],
+        limit: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """Search products using vector similarity with optional strict filters.
         
         Args:
             vector: Query embedding vector
             limit: Maximum number of results
             filters: Optional MongoDB filter document to enforce category/price/color
+            quantization: Index to search: none, scalar or binary (default: configured mode).
+                Quantized results are rescored with the full-precision vectors.
             
         Returns:
             List of matching products with vector scores
         """
         try:
+            quantization = quantization or self.vector_search.quantization
             # Oversample candidates, then post filter and limit
             num_candidates = max(limit * 60, 200)
             prelimit = max(limit * 5, 50)
-            pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": "vector_index",
-                        "path": "openai_embedding",
-                        "queryVector": vector,
-                        "numCandidates": int(num_candidates),
-                        "limit": int(prelimit)
-                    }
-                },
-                {"$addFields": {"vector_score": {"$meta": "vectorSearchScore"}}},
-            ]
-            
-            if filters:
-                pipeline.append({"$match": filters})
-            
-            pipeline.extend([
-                {"$sort": {"vector_score": -1}},
-                {"$limit": int(limit)}
-            ])
-            
-            cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
-            products = await cursor.to_list(length=limit)
+            pipeline = self._vector_candidates_pipeline(vector, num_candidates, prelimit, quantization, filters)
+            
+            if quantization == QUANTIZATION_NONE:
+                pipeline.extend([
+                    {"$sort": {"vector_score": -1}},
+                    {"$limit": int(limit)}
+                ])
+                cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
+                products = await cursor.to_list(length=limit)
+            else:
+                cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
+                products = self._rescore(vector, await cursor.to_list(length=None))[:limit]
             
             # Convert ObjectId to string and add search metadata
             for product in products:
                 product["_id"] = str(product["_id"])
                 product["search_type"] = "vector"
             
-            logger.info(f"Vector search found {len(products)} products")
+            logger.info(f"Vector search ({quantization}) found {len(products)} products")
             return products
             
         except Exception as e:
@@ -214,7 +270,8 @@ class ProductRepository:
         page: int = 1, 
         page_size: int = 20, 
         *, 
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None
     ) -> Dict[str, Any]:
         """Search products using vector similarity with pagination and total count.
         
@@ -223,197 +280,179 @@ class ProductRepository:
             page: Page number (1-based)
             page_size: Number of results per page
             filters: Optional MongoDB filter document to enforce category/price/color
+            quantization: Index to search: none, scalar or binary (default: configured mode)
             
         Returns:
             Dictionary with results, total count, and pagination metadata
         """
         try:
+            quantization = quantization or self.vector_search.quantization
             # For vector search, we need to oversample and then paginate
             # This is a compromise since we can't easily get exact total counts for vector search
             total_needed = page * page_size
             num_candidates = max(total_needed * 10, 500)
             prelimit = max(total_needed * 3, 100)
-            
-            pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": "vector_index",
-                        "path": "openai_embedding",
-                        "queryVector": vector,
-                        "numCandidates": int(num_candidates),
-                        "limit": int(prelimit)
-                    }
-                },
-                {"$addFields": {"vector_score": {"$meta": "vectorSearchScore"}}},
-            ]
-            
-            if filters:
-                pipeline.append({"$match": filters})
-            
-            # Use facet to get both results and count
             skip = (page - 1) * page_size
-            pipeline.append({
-                "$facet": {
-                    "results": [
-                        {"$sort": {"vector_score": -1}},
-                        {"$skip": skip},
-                        {"$limit": page_size}
-                    ],
-                    "total": [
-                        {"$count": "count"}
-                    ]
-                }
-            })
             
-            cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
-            result = await cursor.to_list(length=1)
+            pipeline = self._vector_candidates_pipeline(vector, num_candidates, prelimit, quantization, filters)
             
-            if not result:
-                return {"results": [], "total": 0}
+            if quantization != QUANTIZATION_NONE:
+                # Rescore every quantized candidate, then keep as many as an unquantized search would
+                cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
+                candidates = self._rescore(vector, await cursor.to_list(length=None))[:prelimit]
+                products = candidates[skip:skip + page_size]
+                total = len(candidates)
+            else:
+                # Use facet to get both results and count
+                pipeline.append({
+                    "$facet": {
+                        "results": [
+                            {"$sort": {"vector_score": -1}},
+                            {"$skip": skip},
+                            {"$limit": page_size}
+                        ],
+                        "total": [
+                            {"$count": "count"}
+                        ]
+                    }
+                })
                 
-            facet_result = result[0]
-            products = facet_result.get("results", [])
-            total_count = facet_result.get("total", [])
-            total = total_count[0]["count"] if total_count else 0
+                cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
+                result = await cursor.to_list(length=1)
+                
+                if not result:
+                    return {"results": [], "total": 0}
+                    
+                facet_result = result[0]
+                products = facet_result.get("results", [])
+                total_count = facet_result.get("total", [])
+                total = total_count[0]["count"] if total_count else 0
             
             # Convert ObjectId to string and add search metadata
             for product in products:
                 product["_id"] = str(product["_id"])
                 product["search_type"] = "vector"
             
-            logger.info(f"Vector search found {len(products)}/{total} products (page {page})")
+            logger.info(f"Vector search ({quantization}) found {len(products)}/{total} products (page {page})")
             return {"results": products, "total": total}
             
         except Exception as e:
             logger.error(f"Error in paginated vector search: {e}")
             return {"results": [], "total": 0}
 
-    async def search_products_hybrid(self, query: str, vector: List[float], limit: int = 20, *, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Search products using hybrid text + vector search with optional strict filters.
+    async def get_facets(
+        self,
+        query: Optional[str] = None,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        ids: Optional[List[Any]] = None,
+        ids_scope: Optional[Any] = None,
+        max_categories: int = 10,
+        max_brands: int = 10,
+        price_buckets: int = 6
+    ) -> Dict[str, Any]:
+        """Compute category, brand and price facets in a single $facet pass.
+        
+        Results are cached for a short TTL keyed by the normalized query and
+        filter document, so paging through results does not re-run the aggregation.
+        Facets restricted to ids are keyed on ids_scope instead of the ids, and
+        not cached without one.
         
         Args:
-            query: Search query string
-            vector: Query embedding vector
-            limit: Maximum number of results
-            filters: Optional MongoDB filter document to enforce category/price/color
+            query: Optional $text query restricting the candidate set
+            filters: Optional MongoDB filter document (same as the search legs)
+            ids: Optional product ids restricting the candidate set (fused hybrid
+                results); ids the search legs stringified match their ObjectIds
+            ids_scope: JSON-like description of the id set to cache on (e.g. query,
+                mode and filters)
+            max_categories: Number of top categories to return
+            max_brands: Number of top brands to return
+            price_buckets: Number of automatically sized price buckets
             
         Returns:
-            List of matching products with combined scores
+            Dictionary with categories, brands, price_ranges and total
         """
+        empty = {"categories": [], "brands": [], "price_ranges": [], "total": 0}
+        normalized_query = " ".join(query.lower().split()) if query else None
+        if ids is not None and not ids:
+            return empty
+        cacheable = ids is None or ids_scope is not None
+        cache_key = make_cache_key(normalized_query, filters, ids_scope, max_categories, max_brands, price_buckets)
+        
+        if self.facet_cache is not None and cacheable:
+            cached = self.facet_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            # Run both searches with filters applied
-            text_results = await self.search_products_text(query, limit=limit, filters=filters)
-            vector_results = await self.search_products_vector(vector, limit=limit, filters=filters)
-            
-            # Combine and deduplicate results
-            combined_results: Dict[str, Dict[str, Any]] = {}
-            
-            # Add text results
-            for product in text_results:
-                pid = product["_id"]
-                combined_results[pid] = product
-                combined_results[pid]["text_score"] = product.get("search_score", 0.0)
-                combined_results[pid]["search_type"] = "hybrid"
-            
-            # Add vector results
-            for product in vector_results:
-                pid = product["_id"]
-                if pid in combined_results:
-                    combined_results[pid]["vector_score"] = product.get("vector_score", 0.0)
-                    text_score = combined_results[pid].get("text_score", 0.0)
-                    vector_score = product.get("vector_score", 0.0)
-                    combined_results[pid]["search_score"] = (text_score * 0.4 + vector_score * 0.6)
-                else:
-                    combined_results[pid] = product
-                    combined_results[pid]["vector_score"] = product.get("vector_score", 0.0)
-                    combined_results[pid]["text_score"] = 0.0
-                    combined_results[pid]["search_score"] = product.get("vector_score", 0.0)
-                    combined_results[pid]["search_type"] = "hybrid"
-            
-            # Sort by combined score and return top results
-            results = list(combined_results.values())
-            results.sort(key=lambda x: x.get("search_score", 0.0), reverse=True)
-            
-            logger.info(f"Hybrid search found {len(results)} products for query: '{query}'")
-            return results[:limit]
+            conditions: List[Dict[str, Any]] = []
+            if normalized_query:
+                conditions.append({"$text": {"$search": normalized_query}})
+            if filters:
+                conditions.append(filters)
+            if ids is not None:
+                # Search results carry str(_id); match the stored ObjectIds as well
+                object_ids = [ObjectId(i) for i in ids if isinstance(i, str) and ObjectId.is_valid(i)]
+                conditions.append({"_id": {"$in": list(ids) + object_ids}})
             
-        except Exception as e:
-            logger.error(f"Error in hybrid search: {e}")
-            return []
-
-    async def search_products_hybrid_paginated(
-        self, 
-        query: str, 
-        vector: List[float], 
-        page: int = 1, 
-        page_size: int = 20, 
-        *, 
-        filters: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """Search products using hybrid text + vector search with pagination.
-        
-        Args:
-            query: Search query string
-            vector: Query embedding vector
-            page: Page number (1-based)
-            page_size: Number of results per page
-            filters: Optional MongoDB filter document to enforce category/price/color
+            pipeline: List[Dict[str, Any]] = []
+            if conditions:
+                pipeline.append({"$match": conditions[0] if len(conditions) == 1 else {"$and": conditions}})
             
-        Returns:
-            Dictionary with results, total count, and pagination metadata
-        """
-        try:
-            # Get larger samples from both searches to ensure good hybrid results
-            sample_size = max(page * page_size * 3, 100)
-            
-            # Run both searches with filters applied
-            text_data = await self.search_products_text_paginated(query, page=1, page_size=sample_size, filters=filters)
-            vector_data = await self.search_products_vector_paginated(vector, page=1, page_size=sample_size, filters=filters)
-            
-            text_results = text_data.get("results", [])
-            vector_results = vector_data.get("results", [])
-            
-            # Combine and deduplicate results
-            combined_results: Dict[str, Dict[str, Any]] = {}
-            
-            # Add text results
-            for product in text_results:
-                pid = product["_id"]
-                combined_results[pid] = product
-                combined_results[pid]["text_score"] = product.get("search_score", 0.0)
-                combined_results[pid]["search_type"] = "hybrid"
-            
-            # Add vector results
-            for product in vector_results:
-                pid = product["_id"]
-                if pid in combined_results:
-                    combined_results[pid]["vector_score"] = product.get("vector_score", 0.0)
-                    text_score = combined_results[pid].get("text_score", 0.0)
-                    vector_score = product.get("vector_score", 0.0)
-                    combined_results[pid]["search_score"] = (text_score * 0.4 + vector_score * 0.6)
-                else:
-                    combined_results[pid] = product
-                    combined_results[pid]["vector_score"] = product.get("vector_score", 0.0)
-                    combined_results[pid]["text_score"] = 0.0
-                    combined_results[pid]["search_score"] = product.get("vector_score", 0.0)
-                    combined_results[pid]["search_type"] = "hybrid"
-            
-            # Sort by combined score
-            all_results = list(combined_results.values())
-            all_results.sort(key=lambda x: x.get("search_score", 0.0), reverse=True)
-            
-            # Apply pagination
-            total = len(all_results)
-            skip = (page - 1) * page_size
-            end = skip + page_size
-            paginated_results = all_results[skip:end]
+            pipeline.append({
+                "$facet": {
+                    "categories": [
+                        {"$match": {"category": {"$type": "string", "$ne": ""}}},
+                        {"$sortByCount": "$category"},
+                        {"$limit": int(max_categories)}
+                    ],
+                    "brands": [
+                        {"$match": {"brand": {"$type": "string", "$ne": ""}}},
+                        {"$sortByCount": "$brand"},
+                        {"$limit": int(max_brands)}
+                    ],
+                    "price_ranges": [
+                        {"$match": {"selling_price_numeric": {"$type": "number"}}},
+                        {"$bucketAuto": {"groupBy": "$selling_price_numeric", "buckets": int(price_buckets)}}
+                    ],
+                    "total": [
+                        {"$count": "count"}
+                    ]
+                }
+            })
+            
+            cursor = self.collection.aggregate(pipeline, allowDiskUse=True)
+            result = await cursor.to_list(length=1)
+            if not result:
+                return empty
+            
+            facet_result = result[0]
+            total_count = facet_result.get("total", [])
+            facets = {
+                "categories": [
+                    {"value": row["_id"], "count": row["count"]}
+                    for row in facet_result.get("categories", [])
+                ],
+                "brands": [
+                    {"value": row["_id"], "count": row["count"]}
+                    for row in facet_result.get("brands", [])
+                ],
+                "price_ranges": [
+                    {"min": row["_id"]["min"], "max": row["_id"]["max"], "count": row["count"]}
+                    for row in facet_result.get("price_ranges", [])
+                ],
+                "total": total_count[0]["count"] if total_count else 0
+            }
+            
+            if self.facet_cache is not None and cacheable:
+                self.facet_cache.set(cache_key, facets)
             
-            logger.info(f"Hybrid search found {len(paginated_results)}/{total} products for query: '{query}' (page {page})")
-            return {"results": paginated_results, "total": total}
+            logger.info(f"Computed facets over {facets['total']} products")
+            return facets
             
         except Exception as e:
-            logger.error(f"Error in paginated hybrid search: {e}")
-            return {"results": [], "total": 0}
+            logger.error(f"Error computing facets: {e}")
+            return empty
 
     async def get_product_count(self) -> int:
         """Get total count of products in collection.
@@ -462,6 +501,117 @@ class ProductRepository:
             logger.error(f"Error retrieving product {product_id}: {e}")
             return None
 
+    @staticmethod
+    def missing_embedding_filter() -> Dict[str, Any]:
+        """Filter matching products that have no stored embedding vector."""
+        return {"$or": [
+            {"openai_embedding": {"$exists": False}},
+            {"openai_embedding": None},
+            {"openai_embedding": []}
+        ]}
+
+    async def count_products_without_embeddings(self, after_id: Any = None) -> int:
+        """Count products without an embedding vector.
+        
+        Args:
+            after_id: Only count products with a larger _id (keyset checkpoint)
+        
+        Returns:
+            Number of products still needing an embedding
+        """
+        try:
+            query = self.missing_embedding_filter()
+            if after_id is not None:
+                query["_id"] = {"$gt": after_id}
+            return await self.collection.count_documents(query)
+        except Exception as e:
+            logger.error(f"Error counting products without embeddings: {e}")
+            return 0
+
+    async def count_products_needing_embeddings(self, model: str, after_id: Any = None,
+                                                dimensions: Optional[int] = None) -> int:
+        """Count products whose vector is missing or from another embedding version.
+        
+        Args:
+            model: Embedding model in use
+            after_id: Only count products with a larger _id (keyset checkpoint)
+            dimensions: Vector dimensions in use
+        
+        Returns:
+            Number of products an incremental embedding run would read
+        """
+        try:
+            query = EmbeddingFingerprint.needs_embedding_filter(model, dimensions=dimensions)
+            if after_id is not None:
+                query["_id"] = {"$gt": after_id}
+            return await self.collection.count_documents(query)
+        except Exception as e:
+            logger.error(f"Error counting products needing embeddings: {e}")
+            return 0
+
+    async def get_embedding_stats(self) -> Dict[str, Any]:
+        """Get embedding coverage statistics.
+        
+        Returns:
+            Dictionary with total_products, with_embeddings, without_embeddings
+            and completion_percentage
+        """
+        try:
+            total_products = await self.collection.count_documents({})
+            without_embeddings = await self.count_products_without_embeddings()
+            with_embeddings = total_products - without_embeddings
+            return {
+                "total_products": total_products,
+                "with_embeddings": with_embeddings,
+                "without_embeddings": without_embeddings,
+                "completion_percentage": round(with_embeddings / total_products * 100, 2) if total_products else 0.0
+            }
+        except Exception as e:
+            logger.error(f"Error getting embedding stats: {e}")
+            return {"total_products": 0, "with_embeddings": 0, "without_embeddings": 0, "completion_percentage": 0.0}
+
+    async def update_product_embedding(
+        self,
+        product_id: Any,
+        embedding_text: str,
+        embedding: List[float],
+        model: str,
+        dimensions: Optional[int] = None
+    ) -> bool:
+        """Store the embedding text and vector for one product.
+        
+        Args:
+            product_id: Product _id (ObjectId or string)
+            embedding_text: Text the vector was generated from
+            embedding: Embedding vector
+            model: Embedding model name
+            dimensions: Vector dimensions, recorded in the version when reduced
+            
+        Returns:
+            True if a product was matched
+        """
+        try:
+            from bson import ObjectId
+            
+            if isinstance(product_id, str) and ObjectId.is_valid(product_id):
+                product_id = ObjectId(product_id)
+            
+            result = await self.collection.update_one(
+                {"_id": product_id},
+                {"$set": {
+                    "openai_embedding_text": embedding_text,
+                    "openai_embedding": self.vector_codec.encode(embedding),
+                    "embedding_updated_at": time.time(),
+                    "embedding_model": model,
+                    **EmbeddingFingerprint.fields(embedding_text, model, dimensions)
+                }}
+            )
+            return result.matched_count > 0
+            
+        except Exception as e:
+            logger.error(f"Error updating embedding for {product_id}: {e}")
+            return False
+
     async def create_text_index(self):
         """Create text search index on relevant fields."""
         try:
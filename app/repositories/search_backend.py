@@ -0,0 +1,184 @@
+"""Search backend interface: the retrieval legs SearchService runs queries through."""
+
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class SearchBackend(ABC):
+    """Text, vector and hybrid product retrieval.
+
+    Implementations provide the text and vector legs; hybrid search fuses them
+    the same way for every backend. Filters are MongoDB filter documents as
+    built by SearchDomainService.build_mongo_filters. Implemented by
+    ProductRepository (Atlas $vectorSearch and $text) and LocalSearchBackend
+    (in-process NumPy vectors and BM25, for deployments without Atlas).
+    """
+
+    @abstractmethod
+    async def search_products_text(self, query: str, limit: int = 20, *, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Text search: products carrying search_score, best first."""
+
+    @abstractmethod
+    async def search_products_text_paginated(
+        self,
+        query: str,
+        page: int = 1,
+        page_size: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Text search page: {"results": [...], "total": matching products}."""
+
+    @abstractmethod
+    async def search_products_vector(
+        self,
+        vector: List[float],
+        limit: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Vector search: products carrying vector_score, best first."""
+
+    @abstractmethod
+    async def search_products_vector_paginated(
+        self,
+        vector: List[float],
+        page: int = 1,
+        page_size: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Vector search page: {"results": [...], "total": candidates}."""
+
+    @staticmethod
+    def hybrid_sample_size(page: int, page_size: int) -> int:
+        """Number of candidates each leg fetches for a hybrid results page."""
+        return max(page * page_size * 3, 100)
+
+    @staticmethod
+    def fuse_hybrid_results(text_results: List[Dict[str, Any]], vector_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge text and vector legs into one ranking (0.4 text + 0.6 vector).
+
+        Args:
+            text_results: Text leg results carrying search_score
+            vector_results: Vector leg results carrying vector_score
+
+        Returns:
+            Deduplicated products sorted by combined search_score
+        """
+        combined_results: Dict[str, Dict[str, Any]] = {}
+
+        # Add text results
+        for product in text_results:
+            pid = product["_id"]
+            combined_results[pid] = dict(product)
+            combined_results[pid]["text_score"] = product.get("search_score", 0.0)
+            combined_results[pid]["search_type"] = "hybrid"
+
+        # Add vector results
+        for product in vector_results:
+            pid = product["_id"]
+            if pid in combined_results:
+                combined_results[pid]["vector_score"] = product.get("vector_score", 0.0)
+                text_score = combined_results[pid].get("text_score", 0.0)
+                vector_score = product.get("vector_score", 0.0)
+                combined_results[pid]["search_score"] = (text_score * 0.4 + vector_score * 0.6)
+            else:
+                combined_results[pid] = dict(product)
+                combined_results[pid]["vector_score"] = product.get("vector_score", 0.0)
+                combined_results[pid]["text_score"] = 0.0
+                combined_results[pid]["search_score"] = product.get("vector_score", 0.0)
+                combined_results[pid]["search_type"] = "hybrid"
+
+        results = list(combined_results.values())
+        results.sort(key=lambda x: x.get("search_score", 0.0), reverse=True)
+        return results
+
+    async def search_products_hybrid(self, query: str, vector: List[float], limit: int = 20, *, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search products using hybrid text + vector search with optional strict filters.
+
+        Args:
+            query: Search query string
+            vector: Query embedding vector
+            limit: Maximum number of results
+            filters: Optional MongoDB filter document to enforce category/price/color
+
+        Returns:
+            List of matching products with combined scores
+        """
+        try:
+            # Run both searches with filters applied
+            text_results = await self.search_products_text(query, limit=limit, filters=filters)
+            vector_results = await self.search_products_vector(vector, limit=limit, filters=filters)
+
+            # Combine, deduplicate and sort by combined score
+            results = self.fuse_hybrid_results(text_results, vector_results)
+
+            logger.info(f"Hybrid search found {len(results)} products for query: '{query}'")
+            return results[:limit]
+
+        except Exception as e:
+            logger.error(f"Error in hybrid search: {e}")
+            return []
+
+    async def search_products_hybrid_paginated(
+        self,
+        query: str,
+        vector: List[float],
+        page: int = 1,
+        page_size: int = 20,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        text_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Search products using hybrid text + vector search with pagination.
+
+        Args:
+            query: Search query string
+            vector: Query embedding vector
+            page: Page number (1-based)
+            page_size: Number of results per page
+            filters: Optional MongoDB filter document to enforce category/price/color
+            text_data: Text leg already fetched with hybrid_sample_size(), if any
+
+        Returns:
+            Dictionary with results, total count, and candidate_ids (every fused
+            product, best first)
+        """
+        try:
+            # Get larger samples from both searches to ensure good hybrid results
+            sample_size = self.hybrid_sample_size(page, page_size)
+
+            # Run both searches with filters applied
+            if text_data is None:
+                text_data = await self.search_products_text_paginated(query, page=1, page_size=sample_size, filters=filters)
+            vector_data = await self.search_products_vector_paginated(vector, page=1, page_size=sample_size, filters=filters)
+
+            text_results = text_data.get("results", [])
+            vector_results = vector_data.get("results", [])
+
+            # Combine, deduplicate and sort by combined score
+            all_results = self.fuse_hybrid_results(text_results, vector_results)
+
+            # Apply pagination
+            total = len(all_results)
+            skip = (page - 1) * page_size
+            end = skip + page_size
+            paginated_results = all_results[skip:end]
+
+            logger.info(f"Hybrid search found {len(paginated_results)}/{total} products for query: '{query}' (page {page})")
+            return {
+                "results": paginated_results,
+                "total": total,
+                "candidate_ids": [product["_id"] for product in all_results]
+            }
+
+        except Exception as e:
+            logger.error(f"Error in paginated hybrid search: {e}")
+            return {"results": [], "total": 0}
@@ -0,0 +1,471 @@
+"""
+Embedding Batch Runner - Application Layer
+Bulk (re-)embedding through the OpenAI Batch API.
+
+    reader ──► text builder ──► JSONL request file ──► batch job ──► poll ──► streamed bulk writer
+
+Batch jobs cost half as much as synchronous embeddings requests and draw on a
+separate, much larger rate limit; results arrive within the completion window
+(usually far sooner). That suits full-catalog re-embeds, where nobody waits on
+an individual product.
+
+The collection is cut into chunks of consecutive `_id`s. For each chunk the
+texts are built and checked against the stored fingerprints exactly like
+EmbeddingPipeline does (unchanged documents are skipped or backfilled, cached
+texts are written at once), and the distinct remaining texts are written to a
+JSONL file of /v1/embeddings requests, uploaded and submitted as one batch
+job. Up to max_in_flight jobs run at a time. A finished job's output file is
+streamed line by line into bulk writes; products whose request failed are
+dead-lettered.
+
+Chunk state (ids and texts, then file and batch ids) is kept in MongoDB
+before each step, so a restarted run polls the jobs already submitted and
+continues reading after the last chunk instead of paying for them twice.
+"""
+
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from app.db.vector_codec import VectorCodec
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_batch_repository import (
+    CHUNK_FAILED, CHUNK_PREPARED, CHUNK_SUBMITTED, CHUNK_WRITTEN, EmbeddingBatchRepository, chunk_id
+)
+from app.repositories.embedding_cache_repository import EmbeddingCacheRepository
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
+from app.services.embedding_pipeline import chunk_for_embedding, embedding_update
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/embeddings"
+
+# Batch statuses after which a job no longer changes
+FINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def batch_request_lines(
+    chunk_key: str,
+    texts: List[str],
+    model: str,
+    dimensions: Optional[int],
+    max_inputs: int,
+    max_tokens: int
+) -> List[Dict[str, Any]]:
+    """Batch file lines embedding texts, several inputs per request.
+
+    The custom_id of each request is "<chunk id>:<index of its first text>".
+
+    Args:
+        chunk_key: Chunk id
+        texts: Distinct texts to embed, in order
+        model: Embedding model
+        dimensions: Reduced dimensions to request, if any
+        max_inputs: Maximum inputs per request
+        max_tokens: Maximum estimated tokens per request
+
+    Returns:
+        One request dict per JSONL line
+    """
+    extra = {"dimensions": dimensions} if dimensions else {}
+    return [
+        {
+            "custom_id": f"{chunk_key}:{start}",
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {"model": model, "input": texts[start:end], "encoding_format": "float", **extra},
+        }
+        for start, end in chunk_for_embedding(texts, max_inputs, max_tokens)
+    ]
+
+
+def parse_result_line(line: Dict[str, Any]) -> Tuple[int, Optional[List[List[float]]], Optional[str]]:
+    """Read one line of a batch output or error file.
+
+    Returns:
+        (index of the request's first text, vectors in input order or None, error or None)
+    """
+    start = int(line["custom_id"].rsplit(":", 1)[1])
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or body.get("error") or f"status {response.get('status_code')}"
+        message = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+        return start, None, message
+    data = sorted(body["data"], key=lambda item: item["index"])
+    return start, [item["embedding"] for item in data], None
+
+
+class EmbeddingBatchConfig(BaseModel):
+    """Chunking and polling knobs for batch-mode embedding."""
+
+    chunk_size: int = Field(default=10_000, ge=1, description="Documents per batch job")
+    embed_batch_size: int = Field(default=256, ge=1, le=2048, description="Texts per embeddings request in the batch file")
+    max_batch_tokens: int = Field(default=200_000, ge=1, description="Estimated tokens per embeddings request")
+    read_batch_size: int = Field(default=500, ge=1, description="Documents per reader batch")
+    write_batch_size: int = Field(default=500, ge=1, description="Updates per bulk_write")
+    max_in_flight: int = Field(default=4, ge=1, description="Batch jobs submitted and not yet written")
+    poll_interval_seconds: float = Field(default=30.0, ge=0, description="Wait between polls of unfinished jobs")
+    completion_window: str = Field(default="24h", description="Batch API completion window")
+    max_documents: Optional[int] = Field(default=None, ge=1, description="Stop reading after this many documents")
+    max_attempts: int = Field(default=3, ge=1, description="Failed attempts before a document is no longer retried")
+
+
+class EmbeddingBatchRunner:
+    """Embed every document matched by a query through Batch API jobs."""
+
+    def __init__(
+        self,
+        collection: Any,
+        client: Any,
+        build_text: Callable[[Dict[str, Any]], str],
+        batch_store: EmbeddingBatchRepository,
+        run_name: str,
+        config: Optional[EmbeddingBatchConfig] = None,
+        query: Optional[Dict[str, Any]] = None,
+        source_fields: Optional[Sequence[str]] = None,
+        model_name: str = "text-embedding-3-small",
+        embedding_field: str = "openai_embedding",
+        text_field: Optional[str] = "openai_embedding_text",
+        dimensions: Optional[int] = None,
+        vector_codec: Optional[VectorCodec] = None,
+        progress_store: Optional[EmbeddingProgressRepository] = None,
+        embedding_cache: Optional[EmbeddingCacheRepository] = None,
+        work_dir: Optional[str] = None,
+        dry_run: bool = False
+    ):
+        """Initialize runner.
+
+        Args:
+            collection: Motor collection holding the products
+            client: AsyncOpenAI client (files and batches endpoints)
+            build_text: Builds the embedding text for a product document
+            batch_store: Stores chunk and job state
+            run_name: Key of the run's chunks; a run with the same name resumes
+            config: Chunking and polling configuration
+            query: Filter selecting documents to process (default: all)
+            source_fields: Fields build_text reads; selects the skip-check projection
+            model_name: Model recorded alongside each vector
+            embedding_field: Field storing the vector
+            text_field: Field storing the embedding text (None: vector and fingerprint only)
+            dimensions: Vector dimensions: checked on stored vectors, requested
+                from the API when reduced (required with embedding_cache)
+            vector_codec: Storage format of written vectors (default: BSON arrays)
+            progress_store: Dead-letters products whose request failed
+            embedding_cache: Vectors by text hash, read before submitting and filled after
+            work_dir: Directory for the JSONL request files (default: a temporary directory)
+            dry_run: Read and build texts only; submit and write nothing
+        """
+        if embedding_cache is not None and dimensions is None:
+            raise ValueError("dimensions is required when an embedding cache is used")
+        self.collection = collection
+        self.client = client
+        self.build_text = build_text
+        self.batch_store = batch_store
+        self.run_name = run_name
+        self.config = config or EmbeddingBatchConfig()
+        self.query = query or {}
+        self.projection = (
+            EmbeddingFingerprint.projection(source_fields, embedding_field, text_field) if source_fields else None
+        )
+        self.model_name = model_name
+        self.embedding_field = embedding_field
+        self.text_field = text_field
+        self.dimensions = dimensions
+        self.reduced_dimensions = EmbeddingFingerprint.reduced_dimensions(model_name, dimensions)
+        self.vector_codec = vector_codec or VectorCodec()
+        self.progress_store = progress_store
+        self.embedding_cache = embedding_cache
+        self.work_dir = Path(work_dir or tempfile.mkdtemp(prefix="embedding_batches_"))
+        self.dry_run = dry_run
+
+        self.counters = {
+            "read": 0, "skipped": 0, "backfilled": 0, "cache_hits": 0, "submitted": 0,
+            "distinct_texts": 0, "requests": 0, "written": 0, "dead_lettered": 0,
+        }
+        self.chunks = {"submitted": 0, "resumed": 0, CHUNK_WRITTEN: 0, CHUNK_FAILED: 0}
+        self._last_id: Any = None
+        self._sequence = 0
+        self._started_at: Optional[float] = None
+
+    def _keyset_query(self) -> Dict[str, Any]:
+        if self._last_id is None:
+            return self.query
+        if "_id" in self.query:
+            return {"$and": [self.query, {"_id": {"$gt": self._last_id}}]}
+        return {**self.query, "_id": {"$gt": self._last_id}}
+
+    async def _write(self, items: List[Tuple[Any, str, Optional[List[float]]]]) -> None:
+        """Store vectors (or, for None, only the fingerprint) with bulk writes."""
+        now = time.time()
+        for start in range(0, len(items), self.config.write_batch_size):
+            part = items[start:start + self.config.write_batch_size]
+            operations = [
+                UpdateOne({"_id": doc_id}, {"$set": embedding_update(
+                    text, vector, self.model_name, self.dimensions, self.embedding_field,
+                    self.text_field, self.vector_codec, now
+                )})
+                for doc_id, text, vector in part
+            ]
+            if self.dry_run:
+                continue
+            await self.collection.bulk_write(operations, ordered=False)
+            written = [doc_id for doc_id, _, vector in part if vector is not None]
+            self.counters["written"] += len(written)
+            if self.progress_store is not None and written:
+                await self.progress_store.resolve(written)
+
+    async def _dead_letter(self, failures: List[Dict[str, Any]]) -> None:
+        self.counters["dead_lettered"] += len(failures)
+        if failures and self.progress_store is not None and not self.dry_run:
+            await self.progress_store.record_failures(failures)
+
+    async def _prepare_chunk(self) -> Dict[str, Any]:
+        """Read the next chunk of documents and record the ones to embed."""
+        ids: List[Any] = []
+        texts: List[str] = []
+        backfills: List[Tuple[Any, str, None]] = []
+        failures: List[Dict[str, Any]] = []
+        final = False
+        while len(ids) < self.config.chunk_size:
+            limit = self.config.read_batch_size
+            if self.config.max_documents:
+                limit = min(limit, self.config.max_documents - self.counters["read"])
+                if limit <= 0:
+                    break
+            cursor = self.collection.find(self._keyset_query(), self.projection).sort("_id", 1).limit(limit)
+            batch = await cursor.to_list(length=limit)
+            if not batch:
+                final = True
+                break
+            self._last_id = batch[-1]["_id"]
+            self.counters["read"] += len(batch)
+
+            exhausted = set()
+            if self.progress_store is not None:
+                exhausted = await self.progress_store.get_exhausted_ids(
+                    [document["_id"] for document in batch], self.config.max_attempts
+                )
+            for document in batch:
+                if document["_id"] in exhausted:
+                    self.counters["skipped"] += 1
+                    continue
+                try:
+                    text = self.build_text(document)
+                except Exception as e:
+                    logger.error(f"Error building embedding text for {document.get('_id')}: {e}")
+                    failures.append({"_id": document["_id"], "stage": "text", "error": str(e)})
+                    continue
+                status = EmbeddingFingerprint.status(
+                    document, text, self.model_name, self.embedding_field, self.text_field, self.dimensions
+                )
+                if status == EmbeddingFingerprint.SKIP:
+                    self.counters["skipped"] += 1
+                elif status == EmbeddingFingerprint.BACKFILL:
+                    self.counters["backfilled"] += 1
+                    backfills.append((document["_id"], text, None))
+                else:
+                    ids.append(document["_id"])
+                    texts.append(text)
+            if len(batch) < limit:
+                final = True
+                break
+
+        await self._write(backfills)
+        await self._dead_letter(failures)
+        ids, texts = await self._write_cached(ids, texts)
+
+        sequence = self._sequence
+        self._sequence += 1
+        if self.dry_run:
+            return {"_id": chunk_id(self.run_name, sequence), "status": CHUNK_PREPARED, "ids": ids,
+                    "texts": texts, "final": final}
+        return await self.batch_store.create_chunk(self.run_name, sequence, ids, texts, self._last_id, final)
+
+    async def _write_cached(self, ids: List[Any], texts: List[str]) -> Tuple[List[Any], List[str]]:
+        """Write the products whose text is already in the embedding cache.
+
+        Returns:
+            The ids and texts still to embed
+        """
+        if self.embedding_cache is None or not texts:
+            return ids, texts
+        hashes = [EmbeddingFingerprint.text_hash(text) for text in texts]
+        try:
+            cached = await self.embedding_cache.get_many(self.model_name, self.dimensions, set(hashes))
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, submitting all texts: {e}")
+            return ids, texts
+        hits = [(doc_id, text, cached[h]) for doc_id, text, h in zip(ids, texts, hashes) if h in cached]
+        self.counters["cache_hits"] += len(hits)
+        await self._write(hits)
+        remaining = [(doc_id, text) for doc_id, text, h in zip(ids, texts, hashes) if h not in cached]
+        return [doc_id for doc_id, _ in remaining], [text for _, text in remaining]
+
+    async def _find_batch(self, chunk_key: str) -> Any:
+        """A batch already created for a chunk (a run stopped before recording it)."""
+        page = await self.client.batches.list(limit=100)
+        for batch in page.data:
+            if (batch.metadata or {}).get("chunk_id") == chunk_key and batch.status != "cancelled":
+                return batch
+        return None
+
+    async def _submit(self, chunk: Dict[str, Any], resumed: bool = False) -> None:
+        """Write a chunk's request file, upload it and create its batch job."""
+        distinct = list(dict.fromkeys(chunk["texts"]))
+        lines = batch_request_lines(
+            chunk["_id"], distinct, self.model_name, self.reduced_dimensions,
+            self.config.embed_batch_size, self.config.max_batch_tokens
+        )
+        batch = await self._find_batch(chunk["_id"]) if resumed else None
+        if batch is None:
+            path = self.work_dir / f"{chunk['_id'].replace(':', '_')}.jsonl"
+            with open(path, "w", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            with open(path, "rb") as f:
+                uploaded = await self.client.files.create(file=f, purpose="batch")
+            batch = await self.client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=self.config.completion_window,
+                metadata={"chunk_id": chunk["_id"]}
+            )
+        await self.batch_store.mark_submitted(chunk["_id"], batch.input_file_id, batch.id)
+        chunk.update({"status": CHUNK_SUBMITTED, "batch_id": batch.id, "input_file_id": batch.input_file_id})
+        self.chunks["submitted"] += 1
+        self.counters["submitted"] += len(chunk["ids"])
+        self.counters["distinct_texts"] += len(distinct)
+        self.counters["requests"] += len(lines)
+        logger.info(f"Submitted batch {batch.id} for chunk {chunk['_id']}: "
+                    f"{len(chunk['ids'])} documents, {len(distinct)} texts in {len(lines)} requests")
+
+    async def _stream_results(self, file_id: str, chunk: Dict[str, Any], distinct: List[str],
+                              done: set, errors: Dict[int, str]) -> Dict[str, List[float]]:
+        """Stream an output (or error) file into bulk writes.
+
+        Returns:
+            New vectors by text hash, for the embedding cache
+        """
+        positions: Dict[str, List[int]] = defaultdict(list)
+        for position, text in enumerate(chunk["texts"]):
+            positions[text].append(position)
+        vectors_by_hash: Dict[str, List[float]] = {}
+        pending: List[Tuple[Any, str, List[float]]] = []
+        async with self.client.files.with_streaming_response.content(file_id) as response:
+            async for raw in response.iter_lines():
+                if not raw.strip():
+                    continue
+                start, vectors, error = parse_result_line(json.loads(raw))
+                if vectors is None:
+                    errors[start] = error
+                    continue
+                for offset, vector in enumerate(vectors):
+                    text = distinct[start + offset]
+                    done.add(start + offset)
+                    vectors_by_hash[EmbeddingFingerprint.text_hash(text)] = vector
+                    pending.extend((chunk["ids"][position], text, vector) for position in positions[text])
+                if len(pending) >= self.config.write_batch_size:
+                    await self._write(pending)
+                    pending = []
+        await self._write(pending)
+        return vectors_by_hash
+
+    async def _poll(self, chunk: Dict[str, Any]) -> bool:
+        """Check a submitted chunk's job and write its results once it finished.
+
+        Returns:
+            Whether the chunk is closed
+        """
+        batch = await self.client.batches.retrieve(chunk["batch_id"])
+        if batch.status not in FINAL_BATCH_STATUSES:
+            return False
+
+        distinct = list(dict.fromkeys(chunk["texts"]))
+        done: set = set()
+        errors: Dict[int, str] = {}
+        new_vectors: Dict[str, List[float]] = {}
+        written_before = self.counters["written"]
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                new_vectors.update(await self._stream_results(file_id, chunk, distinct, done, errors))
+
+        # Texts without a vector: their request failed, or the job ended before running it
+        error = next(iter(errors.values()), None) or f"batch {batch.status}"
+        failed = {text for index, text in enumerate(distinct) if index not in done}
+        await self._dead_letter([
+            {"_id": doc_id, "stage": "batch", "error": error, "embedding_text": text}
+            for doc_id, text in zip(chunk["ids"], chunk["texts"]) if text in failed
+        ])
+        if self.embedding_cache is not None and new_vectors and not self.dry_run:
+            try:
+                await self.embedding_cache.put_many(self.model_name, self.dimensions, new_vectors)
+            except Exception as e:
+                logger.error(f"Failed to cache {len(new_vectors)} embeddings: {e}")
+
+        status = CHUNK_WRITTEN if batch.status == "completed" else CHUNK_FAILED
+        counters = {"batch_status": batch.status, "written": self.counters["written"] - written_before,
+                    "failed_texts": len(failed)}
+        await self.batch_store.mark_finished(chunk["_id"], status, counters, None if status == CHUNK_WRITTEN else error)
+        self.chunks[status] += 1
+        logger.info(f"Batch {batch.id} {batch.status}: chunk {chunk['_id']} {counters}")
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters of the run so far."""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            **self.counters,
+            "chunks": dict(self.chunks),
+            "high_water_mark": str(self._last_id) if self._last_id is not None else None,
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Prepare, submit, poll and write chunks until every document is handled.
+
+        Returns:
+            Metrics dictionary (see get_metrics)
+        """
+        self._started_at = time.perf_counter()
+        in_flight: List[Dict[str, Any]] = []
+        exhausted = False
+        if not self.dry_run:
+            last = await self.batch_store.last_chunk(self.run_name)
+            if last is not None:
+                self._last_id = last["last_id"]
+                self._sequence = last["sequence"] + 1
+                exhausted = bool(last.get("final"))
+            in_flight = await self.batch_store.open_chunks(self.run_name)
+            self.chunks["resumed"] = len(in_flight)
+            for chunk in in_flight:
+                if chunk["status"] == CHUNK_PREPARED:
+                    await self._submit(chunk, resumed=True)
+
+        while True:
+            while not exhausted and len(in_flight) < self.config.max_in_flight:
+                chunk = await self._prepare_chunk()
+                read_all = self.config.max_documents and self.counters["read"] >= self.config.max_documents
+                exhausted = chunk["final"] or bool(read_all)
+                if chunk["status"] == CHUNK_PREPARED and not self.dry_run:
+                    await self._submit(chunk)
+                    in_flight.append(chunk)
+                elif self.dry_run:
+                    self.counters["submitted"] += len(chunk["ids"])
+            if not in_flight:
+                break
+
+            closed = [chunk for chunk in in_flight if await self._poll(chunk)]
+            in_flight = [chunk for chunk in in_flight if chunk not in closed]
+            if in_flight and not closed:
+                await asyncio.sleep(self.config.poll_interval_seconds)
+
+        return self.get_metrics()
@@ -0,0 +1,658 @@
+"""
+Embedding Pipeline - Application Layer
+Staged asyncio producer/consumer pipeline for bulk embedding generation.
+
+    reader ──► text builder ──► N embedding workers ──► bulk writer
+
+Stages are connected by bounded queues, so a slow stage applies backpressure
+upstream instead of buffering the whole collection in memory. Several embedding
+workers keep multiple OpenAI requests in flight while the reader and the writer
+overlap their MongoDB round trips with them.
+
+The reader walks the collection in `_id` order with keyset queries
+(`_id > last_id`), never `skip()`. Every read batch is tracked until all of its
+documents are written, skipped or dead-lettered; the `_id` below which that is
+true is the high-water mark, persisted so an interrupted run resumes there.
+
+Each embedding worker sends every distinct text in its chunk once, and with an
+embedding cache only the texts whose hash has never been embedded before.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import openai
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from app.db.vector_codec import VectorCodec
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_cache_repository import EmbeddingCacheRepository, group_texts_by_hash
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
+from app.services.rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+def chunk_for_embedding(texts: List[str], max_inputs: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """Split texts into consecutive API batches bounded by input count and tokens.
+
+    Args:
+        texts: Texts to embed, in order
+        max_inputs: Maximum inputs per request
+        max_tokens: Maximum estimated tokens per request
+
+    Returns:
+        List of (start, end) index ranges covering texts
+    """
+    ranges = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if i > start and (i - start >= max_inputs or tokens + text_tokens > max_tokens):
+            ranges.append((start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(texts):
+        ranges.append((start, len(texts)))
+    return ranges
+
+
+def embedding_update(
+    text: str,
+    vector: Optional[List[float]],
+    model_name: str,
+    dimensions: Optional[int],
+    embedding_field: str,
+    text_field: Optional[str],
+    vector_codec: VectorCodec,
+    now: float
+) -> Dict[str, Any]:
+    """Build the $set storing a vector with its fingerprint.
+
+    A None vector is a backfill: the stored vector is current, only the
+    fingerprint is new.
+
+    Args:
+        text: Embedding text the vector was generated from
+        vector: New vector, or None for a backfill
+        model_name: Model recorded alongside the vector
+        dimensions: Vector dimensions (recorded in the version when reduced)
+        embedding_field: Field storing the vector
+        text_field: Field storing the embedding text (None: vector and fingerprint only)
+        vector_codec: Storage format of the vector
+        now: Timestamp recorded as embedding_updated_at
+
+    Returns:
+        Fields to $set on the product
+    """
+    fields = EmbeddingFingerprint.fields(text, model_name, dimensions, embedding_field)
+    if vector is not None:
+        fields[embedding_field] = vector_codec.encode(vector)
+        if text_field:
+            fields.update({
+                text_field: text,
+                "embedding_updated_at": now,
+                "embedding_model": model_name
+            })
+    return fields
+
+
+class EmbeddingPipelineConfig(BaseModel):
+    """Concurrency and batching knobs for the embedding pipeline."""
+
+    read_batch_size: int = Field(default=500, ge=1, description="Documents per reader batch")
+    embed_batch_size: int = Field(default=256, ge=1, le=2048, description="Texts per embeddings request")
+    max_batch_tokens: int = Field(default=200_000, ge=1, description="Estimated tokens per embeddings request")
+    embed_workers: int = Field(default=4, ge=1, description="Concurrent embeddings requests")
+    write_batch_size: int = Field(default=500, ge=1, description="Updates per bulk_write")
+    queue_size: int = Field(default=8, ge=1, description="Batches buffered between stages")
+    max_documents: Optional[int] = Field(default=None, ge=1, description="Stop after reading this many documents")
+    log_interval_seconds: float = Field(default=10.0, gt=0, description="Progress log interval")
+    max_attempts: int = Field(default=3, ge=1, description="Failed attempts before a document is no longer retried")
+
+
+class StageMetrics:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def record(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class _MeteredQueue(asyncio.Queue):
+    """Bounded queue that tracks its peak and average depth."""
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize)
+        self.name = name
+        self.peak_depth = 0
+        self._depth_total = 0
+        self._samples = 0
+
+    async def put(self, item: Any) -> None:
+        await super().put(item)
+        depth = self.qsize()
+        self.peak_depth = max(self.peak_depth, depth)
+        self._depth_total += depth
+        self._samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.maxsize,
+            "depth": self.qsize(),
+            "peak_depth": self.peak_depth,
+            "mean_depth": round(self._depth_total / self._samples, 2) if self._samples else 0.0,
+        }
+
+
+class EmbeddingPipeline:
+    """
+    Generate and store embeddings for every document matched by a query.
+
+    Documents whose embedding text hash and version match the stored ones are
+    skipped; with source_fields the reader projects only the builder's inputs
+    and the fingerprint, never the stored vector. Legacy vectors without a hash
+    whose text still matches get their hash backfilled instead of being
+    re-embedded, as do vectors whose text is unchanged under a new text builder
+    version; re-embeds are counted by cause (product or builder change).
+    Documents that fail are dead-lettered (when a progress store is given) and
+    counted as handled, so one poison document neither stops a catalog-wide
+    run nor gets retried forever. A request rejected as invalid is
+    split in half until the offending inputs are isolated. Identical texts are
+    embedded once and fanned back out, and with an embedding cache previously
+    embedded texts never reach the API.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        embed_texts: Callable[[List[str]], Awaitable[List[List[float]]]],
+        build_text: Callable[[Dict[str, Any]], str],
+        config: Optional[EmbeddingPipelineConfig] = None,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        source_fields: Optional[Sequence[str]] = None,
+        model_name: str = "text-embedding-3-small",
+        embedding_field: str = "openai_embedding",
+        text_field: Optional[str] = "openai_embedding_text",
+        dry_run: bool = False,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        progress_store: Optional[EmbeddingProgressRepository] = None,
+        checkpoint_name: Optional[str] = None,
+        resume: bool = True,
+        start_after: Any = None,
+        checkpoint_callback: Optional[Callable[[Any, bool, Dict[str, Any]], Awaitable[None]]] = None,
+        embedding_cache: Optional[EmbeddingCacheRepository] = None,
+        dimensions: Optional[int] = None,
+        vector_codec: Optional[VectorCodec] = None
+    ):
+        """Initialize pipeline.
+
+        Args:
+            collection: Motor collection holding the products
+            embed_texts: Async function returning one vector per input text
+            build_text: Builds the embedding text for a product document
+            config: Batching and concurrency configuration
+            query: Filter selecting documents to process (default: all)
+            projection: Optional projection for the reader
+            source_fields: Fields build_text reads; selects the skip-check projection
+            model_name: Model recorded alongside each vector
+            embedding_field: Field storing the vector
+            text_field: Field storing the embedding text; None writes only the vector and
+                its fingerprint (shadow fields next to the primary embedding)
+            dry_run: Run every stage but skip the database writes
+            progress_callback: Called (and awaited if async) with get_metrics() at every log interval
+            progress_store: Stores the high-water mark and dead-lettered documents
+            checkpoint_name: Checkpoint key; required to persist the high-water mark
+            resume: Start after the stored high-water mark of an unfinished run
+            start_after: Explicit `_id` to start after (overrides the stored checkpoint)
+            checkpoint_callback: Awaited with (high-water mark, completed, metrics)
+                whenever the mark advances, e.g. to update a job document
+            embedding_cache: Vectors by text hash, read before and filled after each request
+            dimensions: Vector dimensions: checked on stored vectors, recorded in the
+                version when reduced, and part of the cache key (required with embedding_cache)
+            vector_codec: Storage format of written vectors (default: BSON arrays)
+        """
+        if embedding_cache is not None and dimensions is None:
+            raise ValueError("dimensions is required when an embedding cache is used")
+        self.collection = collection
+        self.embed_texts = embed_texts
+        self.build_text = build_text
+        self.config = config or EmbeddingPipelineConfig()
+        self.query = query or {}
+        self.projection = projection
+        if projection is None and source_fields:
+            self.projection = EmbeddingFingerprint.projection(source_fields, embedding_field, text_field)
+        self.model_name = model_name
+        self.embedding_field = embedding_field
+        self.text_field = text_field
+        self.dry_run = dry_run
+        self.progress_callback = progress_callback
+        self.progress_store = progress_store
+        self.checkpoint_name = checkpoint_name
+        self.resume = resume
+        self.start_after = start_after
+        self.checkpoint_callback = checkpoint_callback
+        self.embedding_cache = embedding_cache
+        self.dimensions = dimensions
+        self.vector_codec = vector_codec or VectorCodec()
+
+        self.metrics = {name: StageMetrics(name) for name in ("read", "text", "embed", "write")}
+        self.skipped = 0
+        self.backfilled = 0
+        self.dead_lettered = 0
+        # Stored vectors re-embedded because the product or the text builder changed
+        self.reembedded = {EmbeddingFingerprint.CONTENT_CHANGE: 0, EmbeddingFingerprint.BUILDER_CHANGE: 0}
+        self.cache_stats = {"inputs": 0, "api_inputs": 0, "cache_hits": 0, "duplicates": 0}
+        self.high_water_mark: Any = None
+        self.resumed_from: Any = None
+        self._started_at: Optional[float] = None
+        # Read batch sequence -> [documents not yet handled, last _id in batch]
+        self._open_batches: "OrderedDict[int, List[Any]]" = OrderedDict()
+
+        queue_size = self.config.queue_size
+        self._text_queue = _MeteredQueue("text", queue_size)
+        self._embed_queue = _MeteredQueue("embed", queue_size)
+        self._write_queue = _MeteredQueue("write", queue_size)
+
+    def _keyset_query(self, last_id: Any) -> Dict[str, Any]:
+        if last_id is None:
+            return self.query
+        if "_id" in self.query:
+            return {"$and": [self.query, {"_id": {"$gt": last_id}}]}
+        return {**self.query, "_id": {"$gt": last_id}}
+
+    async def _read(self) -> None:
+        """Read documents in `_id` order, one keyset query per batch."""
+        last_id = self.resumed_from
+        sequence = 0
+        read = 0
+        while True:
+            limit = self.config.read_batch_size
+            if self.config.max_documents:
+                limit = min(limit, self.config.max_documents - read)
+                if limit <= 0:
+                    break
+
+            started = time.perf_counter()
+            cursor = self.collection.find(self._keyset_query(last_id), self.projection).sort("_id", 1).limit(limit)
+            batch = await cursor.to_list(length=limit)
+            if not batch:
+                break
+
+            last_id = batch[-1]["_id"]
+            read += len(batch)
+            self._open_batches[sequence] = [len(batch), last_id]
+            self.metrics["read"].record(len(batch), time.perf_counter() - started)
+            await self._text_queue.put((sequence, batch))
+            sequence += 1
+            if len(batch) < limit:
+                break
+        await self._text_queue.put(_DONE)
+
+    async def _handled(self, sequences: List[int]) -> None:
+        """Mark documents as handled and advance the high-water mark."""
+        for sequence in sequences:
+            self._open_batches[sequence][0] -= 1
+
+        advanced = False
+        while self._open_batches:
+            sequence, (remaining, last_id) = next(iter(self._open_batches.items()))
+            if remaining > 0:
+                break
+            self._open_batches.popitem(last=False)
+            self.high_water_mark = last_id
+            advanced = True
+
+        if advanced:
+            await self._save_checkpoint(completed=False)
+
+    async def _save_checkpoint(self, completed: bool) -> None:
+        if self.dry_run or (self.high_water_mark is None and not completed):
+            return
+        if self.checkpoint_callback is not None:
+            try:
+                await self.checkpoint_callback(self.high_water_mark, completed, self.get_metrics())
+            except Exception as e:
+                logger.error(f"Embedding checkpoint callback failed: {e}")
+        if self.progress_store is None or self.checkpoint_name is None:
+            return
+        try:
+            await self.progress_store.save_checkpoint(
+                self.checkpoint_name, self.high_water_mark, completed=completed,
+                stats={"written": self.metrics["write"].items, "skipped": self.skipped,
+                       "dead_lettered": self.dead_lettered}
+            )
+        except Exception as e:
+            logger.error(f"Failed to save embedding checkpoint {self.checkpoint_name}: {e}")
+
+    async def _dead_letter(self, failures: List[Dict[str, Any]]) -> None:
+        """Record failed documents so they are not retried endlessly."""
+        self.dead_lettered += len(failures)
+        if self.progress_store is not None and not self.dry_run:
+            await self.progress_store.record_failures(failures)
+
+    async def _build_texts(self) -> None:
+        """Build embedding texts, drop unchanged documents and re-chunk for the API."""
+        pending_ids: List[Tuple[Any, int]] = []
+        pending_texts: List[str] = []
+
+        async def flush(final: bool) -> None:
+            nonlocal pending_ids, pending_texts
+            ranges = chunk_for_embedding(pending_texts, self.config.embed_batch_size, self.config.max_batch_tokens)
+            # Keep a partial trailing chunk for the next reader batch unless we are done
+            if ranges and not final:
+                start, end = ranges[-1]
+                if end - start < self.config.embed_batch_size:
+                    ranges = ranges[:-1]
+            consumed = 0
+            for start, end in ranges:
+                await self._embed_queue.put((pending_ids[start:end], pending_texts[start:end]))
+                consumed = end
+            pending_ids, pending_texts = pending_ids[consumed:], pending_texts[consumed:]
+
+        while True:
+            item = await self._text_queue.get()
+            if item is _DONE:
+                break
+
+            sequence, batch = item
+            started = time.perf_counter()
+            exhausted = set()
+            if self.progress_store is not None:
+                try:
+                    exhausted = await self.progress_store.get_exhausted_ids(
+                        [document["_id"] for document in batch], self.config.max_attempts
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to read dead-lettered documents: {e}")
+
+            handled: List[int] = []
+            failures: List[Dict[str, Any]] = []
+            backfills: List[Tuple[Any, int, str, None]] = []
+            for document in batch:
+                if document["_id"] in exhausted:
+                    self.skipped += 1
+                    handled.append(sequence)
+                    continue
+                try:
+                    text = self.build_text(document)
+                except Exception as e:
+                    self.metrics["text"].errors += 1
+                    logger.error(f"Error building embedding text for {document.get('_id')}: {e}")
+                    failures.append({"_id": document["_id"], "stage": "text", "error": str(e)})
+                    handled.append(sequence)
+                    continue
+                status = EmbeddingFingerprint.status(
+                    document, text, self.model_name, self.embedding_field, self.text_field, self.dimensions
+                )
+                if status == EmbeddingFingerprint.SKIP:
+                    self.skipped += 1
+                    handled.append(sequence)
+                    continue
+                if status == EmbeddingFingerprint.BACKFILL:
+                    self.backfilled += 1
+                    backfills.append((document["_id"], sequence, text, None))
+                    continue
+                if document.get(EmbeddingFingerprint.hash_field(self.embedding_field)):
+                    self.reembedded[EmbeddingFingerprint.change_reason(document, self.embedding_field)] += 1
+                pending_ids.append((document["_id"], sequence))
+                pending_texts.append(text)
+            self.metrics["text"].record(len(batch), time.perf_counter() - started)
+
+            await self._dead_letter(failures)
+            await self._handled(handled)
+            if backfills:
+                await self._write_queue.put(backfills)
+
+            await flush(final=False)
+
+        await flush(final=True)
+        for _ in range(self.config.embed_workers):
+            await self._embed_queue.put(_DONE)
+
+    async def _embed_isolating(self, texts: List[str]) -> List[Any]:
+        """Embed texts; on an invalid-request error, bisect to isolate the bad inputs.
+
+        Returns:
+            One vector per text, or the exception that failed that text
+        """
+        try:
+            vectors = await self.embed_texts(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"expected {len(texts)} vectors, got {len(vectors)}")
+            return list(vectors)
+        except openai.BadRequestError as e:
+            if len(texts) == 1:
+                return [e]
+            middle = len(texts) // 2
+            return await self._embed_isolating(texts[:middle]) + await self._embed_isolating(texts[middle:])
+        except Exception as e:
+            return [e] * len(texts)
+
+    async def _embed_deduplicated(self, texts: List[str]) -> List[Any]:
+        """Embed each distinct text once, reusing cached vectors.
+
+        Returns:
+            One vector per text, or the exception that failed that text
+        """
+        groups = group_texts_by_hash(texts)
+        cached: Dict[str, List[float]] = {}
+        if self.embedding_cache is not None:
+            try:
+                cached = await self.embedding_cache.get_many(self.model_name, self.dimensions, list(groups))
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed, embedding all texts: {e}")
+
+        misses = [text_hash for text_hash in groups if text_hash not in cached]
+        results: Dict[str, Any] = dict(cached)
+        if misses:
+            vectors = await self._embed_isolating([texts[groups[text_hash][0]] for text_hash in misses])
+            results.update(zip(misses, vectors))
+            fresh = {h: v for h, v in zip(misses, vectors) if not isinstance(v, Exception)}
+            if self.embedding_cache is not None and fresh and not self.dry_run:
+                await self.embedding_cache.put_many(self.model_name, self.dimensions, fresh)
+
+        self.cache_stats["inputs"] += len(texts)
+        self.cache_stats["api_inputs"] += len(misses)
+        self.cache_stats["cache_hits"] += len(cached)
+        self.cache_stats["duplicates"] += len(texts) - len(groups)
+
+        embedded: List[Any] = [None] * len(texts)
+        for text_hash, positions in groups.items():
+            for position in positions:
+                embedded[position] = results[text_hash]
+        return embedded
+
+    async def _embed(self, worker: int) -> None:
+        """Call the embeddings API for one chunk at a time."""
+        while True:
+            item = await self._embed_queue.get()
+            if item is _DONE:
+                break
+
+            ids, texts = item
+            started = time.perf_counter()
+            results = await self._embed_deduplicated(texts)
+
+            embedded = []
+            failures: List[Dict[str, Any]] = []
+            for (doc_id, sequence), text, result in zip(ids, texts, results):
+                if isinstance(result, Exception):
+                    failures.append({"_id": doc_id, "stage": "embed", "error": str(result), "embedding_text": text})
+                else:
+                    embedded.append((doc_id, sequence, text, result))
+
+            if failures:
+                self.metrics["embed"].errors += len(failures)
+                logger.error(f"Embedding worker {worker} failed on {len(failures)}/{len(texts)} texts: {failures[0]['error']}")
+                await self._dead_letter(failures)
+                await self._handled([sequence for (_, sequence), result in zip(ids, results) if isinstance(result, Exception)])
+            if embedded:
+                self.metrics["embed"].record(len(embedded), time.perf_counter() - started)
+                await self._write_queue.put(embedded)
+
+        await self._write_queue.put(_DONE)
+
+    async def _write(self) -> None:
+        """Accumulate updates and flush them with unordered bulk writes."""
+        operations: List[UpdateOne] = []
+        pending: List[Tuple[Any, int, str]] = []
+        workers_done = 0
+
+        async def flush() -> None:
+            nonlocal operations, pending
+            if not operations:
+                return
+            batch, operations = operations, []
+            written, pending = pending, []
+            started = time.perf_counter()
+            try:
+                if not self.dry_run:
+                    await self.collection.bulk_write(batch, ordered=False)
+                    if self.progress_store is not None:
+                        await self.progress_store.resolve([doc_id for doc_id, _, _ in written])
+                self.metrics["write"].record(len(batch), time.perf_counter() - started)
+            except Exception as e:
+                self.metrics["write"].errors += len(batch)
+                logger.error(f"Bulk write of {len(batch)} embeddings failed: {e}")
+                await self._dead_letter([
+                    {"_id": doc_id, "stage": "write", "error": str(e), "embedding_text": text}
+                    for doc_id, _, text in written
+                ])
+            await self._handled([sequence for _, sequence, _ in written])
+
+        while workers_done < self.config.embed_workers:
+            item = await self._write_queue.get()
+            if item is _DONE:
+                workers_done += 1
+                continue
+
+            now = time.time()
+            for doc_id, sequence, text, vector in item:
+                pending.append((doc_id, sequence, text))
+                fields = embedding_update(
+                    text, vector, self.model_name, self.dimensions, self.embedding_field,
+                    self.text_field, self.vector_codec, now
+                )
+                operations.append(UpdateOne({"_id": doc_id}, {"$set": fields}))
+            if len(operations) >= self.config.write_batch_size:
+                await flush()
+
+        await flush()
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.log_interval_seconds)
+            snapshot = self.get_metrics()
+            stages = snapshot["stages"]
+            queues = snapshot["queues"]
+            logger.info(
+                f"Embedding pipeline: read={stages['read']['items']} "
+                f"embedded={stages['embed']['items']} written={stages['write']['items']} "
+                f"skipped={self.skipped} ({stages['write']['items_per_second']}/s written) | "
+                f"queues text={queues['text']['depth']} embed={queues['embed']['depth']} write={queues['write']['depth']}"
+            )
+            if self.progress_callback:
+                try:
+                    result = self.progress_callback(snapshot)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Embedding progress callback failed: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-stage throughput and queue depth.
+
+        Returns:
+            Dictionary with elapsed time, stages, queues and skipped count
+        """
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "skipped": self.skipped,
+            "backfilled": self.backfilled,
+            "reembedded": dict(self.reembedded),
+            "dead_lettered": self.dead_lettered,
+            "embedding_cache": {
+                **self.cache_stats,
+                "api_inputs_saved": self.cache_stats["inputs"] - self.cache_stats["api_inputs"],
+            },
+            "resumed_from": str(self.resumed_from) if self.resumed_from is not None else None,
+            "high_water_mark": str(self.high_water_mark) if self.high_water_mark is not None else None,
+            "stages": {name: m.to_dict(elapsed) for name, m in self.metrics.items()},
+            "queues": {q.name: q.to_dict() for q in (self._text_queue, self._embed_queue, self._write_queue)},
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages to completion.
+
+        Returns:
+            Final metrics (see get_metrics)
+        """
+        self._started_at = time.perf_counter()
+        if self.start_after is not None:
+            self.resumed_from = self.start_after
+        elif self.resume and self.progress_store is not None and self.checkpoint_name:
+            checkpoint = await self.progress_store.get_checkpoint(self.checkpoint_name)
+            # A finished pass starts over so documents updated since are picked up
+            if checkpoint and not checkpoint.get("completed"):
+                self.resumed_from = checkpoint.get("last_id")
+                logger.info(f"Resuming embedding pipeline after _id {self.resumed_from}")
+        self.high_water_mark = self.resumed_from
+        logger.info(f"Starting embedding pipeline: {self.config.model_dump()}")
+
+        tasks = [
+            asyncio.create_task(self._read(), name="embedding-read"),
+            asyncio.create_task(self._build_texts(), name="embedding-text"),
+            *[
+                asyncio.create_task(self._embed(worker), name=f"embedding-embed-{worker}")
+                for worker in range(self.config.embed_workers)
+            ],
+            asyncio.create_task(self._write(), name="embedding-write"),
+        ]
+        reporter = asyncio.create_task(self._report_progress())
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A crashed stage would otherwise leave the others blocked on their queues
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            reporter.cancel()
+
+        # Only a run that read to the end of the collection completes the pass
+        if not self.config.max_documents or self.metrics["read"].items < self.config.max_documents:
+            await self._save_checkpoint(completed=True)
+        metrics = self.get_metrics()
+        logger.info(f"Embedding pipeline finished: {metrics}")
+        return metrics
@@ -0,0 +1,386 @@
+"""
+Embedding Provider - Application Layer
+Interchangeable sources of embedding vectors.
+
+Query embedding (SimpleEmbeddingService), ingestion (EmbeddingService and the
+pipeline scripts) and the benchmarks only call embed() / embed_batch(), so the
+same stack runs against:
+
+- openai:  the OpenAI embeddings API, through the shared RateLimiter
+- local:   a transformer model loaded from disk (mean pooling, no network)
+- hashing: deterministic feature-hashing vectors with injected latency, for
+           CI, load tests and offline benchmarks (no network, no cost)
+
+The provider is picked by Settings.embedding_provider (or a script's
+--provider flag) through create_embedding_provider().
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.domain.embeddings.text_normalization import WORD_RE
+from app.services.rate_limiter import RateLimiter, create_embeddings, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_OPENAI = "openai"
+PROVIDER_LOCAL = "local"
+PROVIDER_HASHING = "hashing"
+PROVIDERS = (PROVIDER_OPENAI, PROVIDER_LOCAL, PROVIDER_HASHING)
+
+HASHING_MODEL = "hashing-v1"
+
+
+class EmbeddingProvider(ABC):
+    """Base class: turns texts into vectors of a fixed model and dimension."""
+
+    name = "base"
+
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        """Initialize provider.
+
+        Args:
+            model: Model name recorded alongside the vectors
+            dimensions: Vector length (None: the model's native length)
+        """
+        self.model = model
+        self.dimensions = dimensions
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed one text."""
+        return (await self.embed_batch([text]))[0]
+
+    @abstractmethod
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, returning one vector per text in input order."""
+
+    def get_stats(self) -> dict:
+        """Provider-specific counters."""
+        return {"provider": self.name, "model": self.model, "dimensions": self.dimensions}
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API, paced by the shared RateLimiter."""
+
+    name = PROVIDER_OPENAI
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "text-embedding-3-small",
+        dimensions: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+        client: Any = None
+    ):
+        """Initialize provider.
+
+        Args:
+            api_key: OpenAI API key (ignored when client is given)
+            model: Embedding model name
+            dimensions: Vector length; sent as `dimensions` only when shorter than the model's native size
+            rate_limiter: Limiter for the embeddings quota (defaults to the shared one)
+            max_retries: Attempts per request on 429 responses
+            client: Existing AsyncOpenAI client (e.g. pointed at another base_url)
+        """
+        super().__init__(model, dimensions)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=api_key)
+        self.client = client
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = max_retries
+        reduced = EmbeddingFingerprint.reduced_dimensions(model, dimensions)
+        self._dimension_kwargs = {"dimensions": reduced} if reduced else {}
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        response = await create_embeddings(
+            self.client, self.rate_limiter, max_retries=self.max_retries,
+            model=self.model, input=texts, **self._dimension_kwargs
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def get_stats(self) -> dict:
+        return {**super().get_stats(), "rate_limiter": self.rate_limiter.get_stats()}
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Transformer encoder loaded from a local directory (Hugging Face format).
+
+    Vectors are the attention-masked mean of the last hidden state, cut to
+    `dimensions` when given and L2-normalized. Inference runs in a worker
+    thread so it does not block the event loop; the model is loaded on first use.
+    Requires the optional torch and transformers packages.
+    """
+
+    name = PROVIDER_LOCAL
+
+    def __init__(
+        self,
+        model_path: str,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 256,
+        device: str = "cpu"
+    ):
+        """Initialize provider.
+
+        Args:
+            model_path: Directory holding the model and tokenizer
+            model: Model name recorded alongside the vectors (default: the directory name);
+                never the OpenAI model name, so local vectors are not taken for OpenAI ones
+            dimensions: Keep only the first n components (Matryoshka-trained models);
+                must not exceed the encoder's hidden size
+            batch_size: Texts per forward pass
+            max_length: Tokens kept per text
+            device: Torch device
+        """
+        model = model or os.path.basename(model_path.rstrip("/"))
+        if model in EmbeddingFingerprint.NATIVE_DIMENSIONS:
+            raise ValueError(f"Local embedding model name {model!r} is an OpenAI model name")
+        super().__init__(model, dimensions)
+        self.model_path = model_path
+        self.native_dimensions = self._config_dimensions(model_path)
+        if self.native_dimensions:
+            self._check_dimensions(self.native_dimensions)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self._tokenizer = None
+        self._encoder = None
+        self._lock = asyncio.Lock()
+
+    def _load(self) -> None:
+        try:
+            import torch  # noqa: F401
+            from transformers import AutoModel, AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError("The local embedding provider requires the torch and transformers packages") from e
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        self._encoder = AutoModel.from_pretrained(self.model_path).to(self.device).eval()
+        self.native_dimensions = self._encoder.config.hidden_size
+        self._check_dimensions(self.native_dimensions)
+        logger.info(f"Loaded local embedding model from {self.model_path}")
+
+    @staticmethod
+    def _config_dimensions(model_path: str) -> Optional[int]:
+        """Hidden size declared in the model's config.json, if readable."""
+        try:
+            with open(os.path.join(model_path, "config.json"), "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            return None
+        size = config.get("hidden_size") or config.get("dim") or config.get("d_model")
+        return int(size) if size else None
+
+    def _check_dimensions(self, native: int) -> None:
+        if self.dimensions is None:
+            self.dimensions = native
+        elif self.dimensions > native:
+            raise ValueError(
+                f"Local embedding model {self.model_path} produces {native}-d vectors, "
+                f"{self.dimensions} dimensions were requested"
+            )
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        import torch
+
+        if self._encoder is None:
+            self._load()
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = self._tokenizer(
+                texts[start:start + self.batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="pt"
+            ).to(self.device)
+            with torch.no_grad():
+                hidden = self._encoder(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = ((hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)).cpu().numpy()
+            if self.dimensions:
+                pooled = pooled[:, :self.dimensions]
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            vectors.extend(pooled.astype(np.float32).tolist())
+        return vectors
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # One forward pass at a time: the model is not shared across threads
+        async with self._lock:
+            return await asyncio.to_thread(self._encode, list(texts))
+
+
+def hashing_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector from signed feature hashing of a text.
+
+    Lowercased words and adjacent word pairs are hashed into the vector, so
+    texts sharing words get similar vectors (unlike a random vector per text)
+    and vector search over them returns meaningful neighbours.
+    """
+    words = [word.lower() for word in WORD_RE.findall(text)]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dimensions, dtype=np.float64)
+    for feature in features or [text]:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        vector[digest % dimensions] += 1.0 if digest >> 63 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).astype(np.float32).tolist()
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic, offline stand-in for a remote embedding API.
+
+    Every call sleeps base + per-text latency plus log-normal jitter (from a
+    seeded generator, so runs are repeatable), at most `concurrency` calls at a
+    time, which reproduces the queueing a real API puts on a pipeline or a
+    search request without the network or the bill.
+    """
+
+    name = PROVIDER_HASHING
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        model: str = HASHING_MODEL,
+        latency_ms: float = 0.0,
+        per_text_latency_ms: float = 0.0,
+        jitter: float = 0.0,
+        concurrency: Optional[int] = None,
+        seed: int = 0
+    ):
+        """Initialize provider.
+
+        Args:
+            dimensions: Vector length
+            model: Model name recorded alongside the vectors
+            latency_ms: Fixed latency of every call
+            per_text_latency_ms: Additional latency per input text
+            jitter: Sigma of the log-normal factor applied to the latency (0: none)
+            concurrency: Calls served at once (None: unlimited)
+            seed: Seed of the jitter generator
+        """
+        super().__init__(model, dimensions)
+        self.latency_ms = latency_ms
+        self.per_text_latency_ms = per_text_latency_ms
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self.calls = 0
+        self.texts = 0
+        self.latency_seconds = 0.0
+
+    def latency(self, count: int) -> float:
+        """Seconds one call with count texts takes."""
+        seconds = (self.latency_ms + self.per_text_latency_ms * count) / 1000.0
+        if self.jitter > 0:
+            seconds *= self._random.lognormvariate(0.0, self.jitter)
+        return seconds
+
+    async def _serve(self, texts: List[str]) -> List[List[float]]:
+        delay = self.latency(len(texts))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.calls += 1
+        self.texts += len(texts)
+        self.latency_seconds += delay
+        return [hashing_embedding(text, self.dimensions) for text in texts]
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if self._semaphore is None:
+            return await self._serve(texts)
+        async with self._semaphore:
+            return await self._serve(texts)
+
+    def get_stats(self) -> dict:
+        return {
+            **super().get_stats(),
+            "calls": self.calls,
+            "texts": self.texts,
+            "mean_latency_ms": round(1000 * self.latency_seconds / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+def create_embedding_provider(
+    provider: str = PROVIDER_OPENAI,
+    model: str = "text-embedding-3-small",
+    dimensions: Optional[int] = None,
+    api_key: Optional[str] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+    local_model_path: Optional[str] = None,
+    local_model: Optional[str] = None,
+    latency_ms: float = 0.0,
+    per_text_latency_ms: float = 0.0,
+    jitter: float = 0.0,
+    concurrency: Optional[int] = None
+) -> EmbeddingProvider:
+    """Build a provider by name.
+
+    Args:
+        provider: openai, local or hashing
+        model: OpenAI model name (local records local_model, hashing HASHING_MODEL)
+        dimensions: Vector length
+        api_key: OpenAI API key
+        rate_limiter: Limiter for the OpenAI quota
+        max_retries: Attempts per OpenAI request on 429 responses
+        local_model_path: Model directory of the local provider
+        local_model: Model name recorded with local vectors (default: the directory name)
+        latency_ms: Hashing provider: fixed latency per call
+        per_text_latency_ms: Hashing provider: latency per text
+        jitter: Hashing provider: log-normal latency jitter
+        concurrency: Hashing provider: calls served at once
+
+    Returns:
+        EmbeddingProvider instance
+    """
+    if provider == PROVIDER_OPENAI:
+        return OpenAIEmbeddingProvider(api_key, model, dimensions, rate_limiter, max_retries)
+    if provider == PROVIDER_LOCAL:
+        if not local_model_path:
+            raise ValueError("local_model_path is required for the local embedding provider")
+        return LocalEmbeddingProvider(local_model_path, local_model, dimensions)
+    if provider == PROVIDER_HASHING:
+        return HashingEmbeddingProvider(
+            dimensions or 1536, latency_ms=latency_ms, per_text_latency_ms=per_text_latency_ms,
+            jitter=jitter, concurrency=concurrency
+        )
+    raise ValueError(f"Unknown embedding provider {provider!r}; expected one of {', '.join(PROVIDERS)}")
+
+
+def provider_from_settings(settings: Any, dimensions: Optional[int] = None) -> EmbeddingProvider:
+    """Build the provider selected by Settings.embedding_provider.
+
+    Args:
+        settings: Application settings
+        dimensions: Vector length (default: settings.embedding_dimension)
+
+    Returns:
+        EmbeddingProvider instance
+    """
+    return create_embedding_provider(
+        settings.embedding_provider,
+        model=settings.embedding_model,
+        dimensions=dimensions or settings.embedding_dimension,
+        api_key=settings.openai_api_key,
+        rate_limiter=get_rate_limiter(
+            requests_per_minute=settings.openai_requests_per_minute,
+            tokens_per_minute=settings.openai_tokens_per_minute
+        ),
+        local_model_path=settings.embedding_local_model_path,
+        local_model=settings.embedding_local_model,
+        latency_ms=settings.embedding_fake_latency_ms,
+        per_text_latency_ms=settings.embedding_fake_per_text_latency_ms,
+        jitter=settings.embedding_fake_latency_jitter,
+        concurrency=settings.embedding_fake_concurrency,
+    )
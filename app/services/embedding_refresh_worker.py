@@ -0,0 +1,224 @@
+"""
+Embedding Refresh Worker - Application Layer
+Keeps embedding texts and vectors current by tailing a change stream.
+
+    change stream ──► per-document coalescing ──► EmbeddingPipeline(_id in batch)
+
+The change stream is filtered server-side to inserts, replacements and updates
+that touch a field the embedding text is built from, so the worker's own
+vector writes (and price-only edits of unrelated fields) never wake it up.
+Changes are collected per `_id` for a short debounce window, so a burst of
+edits to one product costs one re-read and at most one embedding. Each flush
+runs the regular embedding pipeline over the pending ids: the text is rebuilt
+and only documents whose text hash or version changed are re-embedded.
+
+The resume token is persisted only after a flush has written every pending
+document, so a restart replays (at least once) whatever was not yet handled.
+Change streams require a replica set or sharded cluster (any Atlas tier).
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+from pymongo.errors import OperationFailure
+
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
+from app.services.embedding_pipeline import EmbeddingPipeline
+
+logger = logging.getLogger(__name__)
+
+# Server error when the resume token has fallen off the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def source_field_pattern(source_fields: Sequence[str]) -> str:
+    """Regex matching a changed field path that belongs to a source field.
+
+    Matches the field itself and nested paths (product_details.color).
+    """
+    return f"^({'|'.join(re.escape(field) for field in source_fields)})(\\.|$)"
+
+
+def source_change_pipeline(source_fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Change stream pipeline keeping only events that can change the embedding text.
+
+    Args:
+        source_fields: Fields the embedding text is built from
+
+    Returns:
+        Aggregation stages for collection.watch()
+    """
+    changed_paths = {"$concatArrays": [
+        {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+            "in": "$$this.k"
+        }},
+        {"$ifNull": ["$updateDescription.removedFields", []]},
+    ]}
+    touches_source = {"$anyElementTrue": [{"$map": {
+        "input": changed_paths,
+        "in": {"$regexMatch": {"input": "$$this", "regex": source_field_pattern(source_fields)}}
+    }}]}
+    return [
+        {"$match": {"$or": [
+            {"operationType": {"$in": ["insert", "replace"]}},
+            {"operationType": "update", "$expr": touches_source},
+        ]}},
+        # Only the key is needed: documents are re-read in batches at flush time
+        {"$project": {"operationType": 1, "documentKey": 1}},
+    ]
+
+
+class EmbeddingRefreshConfig(BaseModel):
+    """Coalescing and checkpointing knobs for the refresh worker."""
+
+    debounce_seconds: float = Field(default=5.0, ge=0, description="Wait after a document's first change before flushing")
+    max_pending: int = Field(default=500, ge=1, description="Flush once this many distinct documents are pending")
+    max_await_ms: int = Field(default=1000, ge=1, description="Change stream poll timeout")
+    token_save_interval_seconds: float = Field(default=60.0, gt=0, description="Resume token refresh while idle")
+
+
+class EmbeddingRefreshWorker:
+    """
+    Re-embed products shortly after their embedding source fields change.
+
+    build_pipeline receives a query selecting the pending `_id`s and returns a
+    configured EmbeddingPipeline; it decides model, dimensions, cache and
+    storage exactly as a batch run would.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        build_pipeline: Callable[[Dict[str, Any]], EmbeddingPipeline],
+        source_fields: Sequence[str],
+        progress_store: Optional[EmbeddingProgressRepository] = None,
+        name: str = "embedding_refresh_worker",
+        config: Optional[EmbeddingRefreshConfig] = None,
+        resume: bool = True,
+        dry_run: bool = False
+    ):
+        """Initialize worker.
+
+        Args:
+            collection: Motor collection holding the products
+            build_pipeline: Returns the pipeline processing a query over pending ids
+            source_fields: Fields the embedding text is built from
+            progress_store: Stores the resume token
+            name: Checkpoint name of the resume token
+            config: Coalescing and checkpointing configuration
+            resume: Resume after the stored token instead of starting at "now"
+            dry_run: Run pipelines without writes and never save the token
+        """
+        self.collection = collection
+        self.build_pipeline = build_pipeline
+        self.change_pipeline = source_change_pipeline(source_fields)
+        self.progress_store = progress_store
+        self.name = name
+        self.config = config or EmbeddingRefreshConfig()
+        self.resume = resume
+        self.dry_run = dry_run
+
+        # _id -> monotonic time of the first change not yet flushed
+        self._pending: "OrderedDict[Any, float]" = OrderedDict()
+        self._token_saved_at = time.monotonic()
+        self.stats = {
+            "events": 0, "flushes": 0, "documents": 0, "written": 0,
+            "skipped": 0, "backfilled": 0, "dead_lettered": 0,
+        }
+
+    def _add(self, change: Dict[str, Any]) -> None:
+        self.stats["events"] += 1
+        document_id = change["documentKey"]["_id"]
+        if document_id not in self._pending:
+            self._pending[document_id] = time.monotonic()
+
+    def _flush_due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.config.max_pending:
+            return True
+        oldest = next(iter(self._pending.values()))
+        return time.monotonic() - oldest >= self.config.debounce_seconds
+
+    async def _flush(self) -> None:
+        """Run the embedding pipeline over every pending document."""
+        ids = list(self._pending)
+        metrics = await self.build_pipeline({"_id": {"$in": ids}}).run()
+        self._pending.clear()
+        self.stats["flushes"] += 1
+        self.stats["documents"] += len(ids)
+        self.stats["written"] += metrics["stages"]["write"]["items"]
+        for key in ("skipped", "backfilled", "dead_lettered"):
+            self.stats[key] += metrics[key]
+        logger.info(
+            f"Refreshed {len(ids)} changed products: {metrics['stages']['write']['items']} written, "
+            f"{metrics['skipped']} unchanged"
+        )
+
+    async def _save_token(self, token: Optional[Dict[str, Any]]) -> None:
+        self._token_saved_at = time.monotonic()
+        if token is None or self.dry_run or self.progress_store is None:
+            return
+        try:
+            await self.progress_store.save_resume_token(self.name, token, stats=dict(self.stats))
+        except Exception as e:
+            logger.error(f"Failed to save resume token for {self.name}: {e}")
+
+    async def _consume(self, stream: Any, stop: asyncio.Event) -> None:
+        while stream.alive and not stop.is_set():
+            change = await stream.try_next()
+            if change is not None:
+                self._add(change)
+            if self._flush_due():
+                # Every event up to this token is pending, so it is safe once they are written
+                token = stream.resume_token
+                await self._flush()
+                await self._save_token(token)
+            elif (not self._pending and
+                  time.monotonic() - self._token_saved_at >= self.config.token_save_interval_seconds):
+                # Keep the token fresh while idle so it does not fall off the oplog
+                await self._save_token(stream.resume_token)
+
+        if self._pending:
+            token = stream.resume_token
+            await self._flush()
+            await self._save_token(token)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        """Tail the change stream until stop is set or the stream is invalidated.
+
+        Args:
+            stop: Event ending the worker after a final flush
+
+        Returns:
+            Counters accumulated over the run
+        """
+        stop = stop or asyncio.Event()
+        token = None
+        if self.resume and self.progress_store is not None:
+            token = await self.progress_store.get_resume_token(self.name)
+        if token is None:
+            logger.info(f"{self.name}: no resume token, following changes from now on")
+
+        while True:
+            options: Dict[str, Any] = {"max_await_time_ms": self.config.max_await_ms}
+            if token is not None:
+                options["resume_after"] = token
+            try:
+                async with self.collection.watch(self.change_pipeline, **options) as stream:
+                    await self._consume(stream, stop)
+                return dict(self.stats)
+            except OperationFailure as e:
+                if token is None or e.code != CHANGE_STREAM_HISTORY_LOST:
+                    raise
+                logger.error(
+                    f"{self.name}: resume token is no longer in the oplog; changes since it were missed. "
+                    f"Following changes from now on - run scripts/run_embedding_pipeline.py to catch up."
+                )
+                token = None
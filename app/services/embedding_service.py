@@ -5,200 +5,264 @@ Application service for managing embedding generation workflow.
 
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Tuple
-from openai import AsyncOpenAI
-from app.core.config import get_settings
-from app.domain.embeddings.models import ProductEmbedding, EmbeddingMetadata
-from app.domain.embeddings.services import EmbeddingTextService
+from typing import Dict, Any, List, Optional, Callable
+from app.core.config import get_settings, Settings
+from app.db.vector_codec import VectorCodec
+from app.domain.embeddings.models import ProductEmbedding
+from app.domain.embeddings.services import EmbeddingFingerprint, EmbeddingTextService
+from app.repositories.embedding_cache_repository import EmbeddingCacheRepository
+from app.repositories.embedding_job_repository import (
+    EmbeddingJobRepository, JOB_COMPLETED, JOB_FAILED, JOB_INTERRUPTED, job_progress
+)
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
 from app.repositories.product_repository import ProductRepository
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+from app.services.embedding_provider import EmbeddingProvider, provider_from_settings
+
+# Source recorded on jobs started through the API / EmbeddingService
+JOB_SOURCE = "api"
 
 
 class EmbeddingService:
     """Application service for embedding generation and processing."""
     
-    def __init__(self, product_repo: ProductRepository):
+    def __init__(
+        self,
+        product_repo: ProductRepository,
+        settings: Optional[Settings] = None,
+        progress_repo: Optional[EmbeddingProgressRepository] = None,
+        job_repo: Optional[EmbeddingJobRepository] = None,
+        cache_repo: Optional[EmbeddingCacheRepository] = None,
+        provider: Optional[EmbeddingProvider] = None
+    ):
         """
         Initialize embedding service.
         
         Args:
             product_repo: Repository for product data access
+            settings: Application settings
+            progress_repo: Checkpoint and dead-letter storage (defaults to the products database)
+            job_repo: Embedding job storage (defaults to the products database)
+            cache_repo: Embedding cache by text hash (defaults to the products database)
+            provider: Source of the vectors (defaults to Settings.embedding_provider)
         """
         self.product_repo = product_repo
-        self.settings = get_settings()
-        self.openai_client = AsyncOpenAI(api_key=self.settings.openai.api_key)
+        self.settings = settings or get_settings()
+        self.vector_codec = VectorCodec(self.settings.embedding_storage)
+        self.progress_repo = progress_repo or EmbeddingProgressRepository(product_repo.collection.database)
+        self.job_repo = job_repo or EmbeddingJobRepository(product_repo.collection.database)
+        self.cache_repo = cache_repo or EmbeddingCacheRepository(product_repo.collection.database, self.vector_codec)
+        self.provider = provider or provider_from_settings(self.settings)
+        # Fingerprints and cache keys use the provider's model, so vectors of
+        # different providers are never mistaken for one another
+        self.model = self.provider.model
         self.logger = logging.getLogger(__name__)
+
+    def build_pipeline_config(self, batch_size: int = 1000, **overrides: Any) -> EmbeddingPipelineConfig:
+        """
+        Build pipeline configuration from settings.
+
+        Args:
+            batch_size: Documents per read and write batch
+            overrides: Any other EmbeddingPipelineConfig field
+
+        Returns:
+            Pipeline configuration
+        """
+        values = {
+            "read_batch_size": batch_size,
+            "write_batch_size": batch_size,
+            "embed_batch_size": self.settings.embedding_request_batch_size,
+            "embed_workers": self.settings.embedding_workers,
+            "queue_size": self.settings.embedding_queue_size,
+        }
+        values.update(overrides)
+        return EmbeddingPipelineConfig(**values)
+
+    async def start_job(self, batch_size: int = 1000, resume: bool = True) -> str:
+        """
+        Get the job to run: the latest unfinished one, or a new job.
+
+        Args:
+            batch_size: Products per read and write batch for a new job
+            resume: Continue an interrupted, failed or stale job if there is one
+
+        Returns:
+            Job id
+        """
+        if resume:
+            job = await self.job_repo.find_resumable_job(JOB_SOURCE, self.settings.embedding_job_stale_seconds)
+            if job:
+                self.logger.info(f"Resuming embedding job {job['_id']} after _id {job.get('last_id')}")
+                return str(job["_id"])
+
+        total = await self.product_repo.count_products_needing_embeddings(
+            self.model, dimensions=self.settings.embedding_dimension
+        )
+        return await self.job_repo.create_job(JOB_SOURCE, {"batch_size": batch_size}, total)
+
+    @staticmethod
+    def _job_counters(base: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the current run's metrics to the counters of earlier runs."""
+        stages = metrics["stages"]
+        run = {
+            "processed": stages["write"]["items"] + metrics["skipped"] + metrics["dead_lettered"],
+            "written": stages["write"]["items"],
+            "skipped": metrics["skipped"],
+            "dead_lettered": metrics["dead_lettered"],
+        }
+        return {key: base.get(key, 0) + value for key, value in run.items()}
+
+    @staticmethod
+    def _throughput(metrics: Dict[str, Any]) -> float:
+        """Documents handled per second in the current run."""
+        stages = metrics["stages"]
+        handled = stages["write"]["items"] + metrics["skipped"] + metrics["dead_lettered"]
+        elapsed = metrics["elapsed_seconds"]
+        return round(handled / elapsed, 2) if elapsed > 0 else 0.0
+
+    async def run_job(
+        self,
+        job_id: str,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        config: Optional[EmbeddingPipelineConfig] = None
+    ) -> Dict[str, Any]:
+        """
+        Run (or resume) an embedding job from its `_id` checkpoint.
+
+        The job document is updated whenever the high-water mark advances and
+        heartbeats at every progress interval, so a job whose process dies can
+        be resumed and its throughput and ETA read while it runs. Only the
+        counters saved with the checkpoint carry over to a resumed run.
+
+        Args:
+            job_id: Job id from start_job
+            progress_callback: Optional callback receiving pipeline metrics
+            config: Full pipeline configuration (overrides the job's batch size)
+
+        Returns:
+            Dict containing processing statistics and per-stage metrics
+        """
+        job = await self.job_repo.get_job(job_id)
+        if not job:
+            raise ValueError(f"Embedding job not found: {job_id}")
+
+        base = dict(job.get("counters") or {})
+        last_id = job.get("last_id")
+        remaining = await self.product_repo.count_products_needing_embeddings(
+            self.model, after_id=last_id, dimensions=self.settings.embedding_dimension
+        )
+        await self.job_repo.mark_running(job_id, total=base.get("processed", 0) + remaining)
+        self.logger.info(f"Starting embedding job {job_id}: {remaining} products remaining")
+
+        async def on_checkpoint(high_water_mark: Any, completed: bool, metrics: Dict[str, Any]) -> None:
+            await self.job_repo.save_progress(
+                job_id, high_water_mark, self._job_counters(base, metrics), self._throughput(metrics)
+            )
+
+        async def on_progress(metrics: Dict[str, Any]) -> None:
+            await self.job_repo.heartbeat(job_id, self._job_counters(base, metrics), self._throughput(metrics))
+            if progress_callback:
+                progress_callback(metrics)
+
+        pipeline = EmbeddingPipeline(
+            self.product_repo.collection,
+            embed_texts=self._generate_embeddings,
+            build_text=EmbeddingTextService.build_embedding_text,
+            config=config or self.build_pipeline_config(job["params"].get("batch_size", 1000)),
+            # Only missing or outdated vectors are read, and never the vectors themselves
+            query=EmbeddingFingerprint.needs_embedding_filter(
+                self.model, dimensions=self.settings.embedding_dimension
+            ),
+            source_fields=EmbeddingTextService.SOURCE_FIELDS,
+            model_name=self.model,
+            progress_callback=on_progress,
+            progress_store=self.progress_repo,
+            start_after=last_id,
+            checkpoint_callback=on_checkpoint,
+            embedding_cache=self.cache_repo,
+            dimensions=self.settings.embedding_dimension,
+            vector_codec=self.vector_codec
+        )
+        try:
+            metrics = await pipeline.run()
+        except asyncio.CancelledError:
+            await self.job_repo.finish(job_id, JOB_INTERRUPTED)
+            raise
+        except Exception as e:
+            await self.job_repo.finish(job_id, JOB_FAILED, str(e))
+            raise
+        await self.job_repo.finish(job_id, JOB_COMPLETED)
+
+        stages = metrics["stages"]
+        return {
+            "job_id": job_id,
+            "total_processed": stages["read"]["items"],
+            "total_updated": stages["write"]["items"],
+            "total_errors": stages["text"]["errors"] + stages["embed"]["errors"] + stages["write"]["errors"],
+            "batches_processed": stages["write"]["batches"],
+            "dead_lettered": metrics["dead_lettered"],
+            "api_inputs_saved": metrics["embedding_cache"]["api_inputs_saved"],
+            "pipeline": metrics
+        }
     
     async def generate_embeddings_batch(
         self,
         batch_size: int = 1000,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        config: Optional[EmbeddingPipelineConfig] = None,
+        resume: bool = True
     ) -> Dict[str, Any]:
         """
-        Generate embeddings for all products in batches.
-        
+        Generate embeddings for all products without a current one.
+
+        Runs the staged EmbeddingPipeline: a keyset reader, a text-building
+        stage, concurrent OpenAI workers and a bulk writer, connected by
+        bounded queues. The run is tracked as an embedding job, and products
+        that keep failing are dead-lettered rather than re-read on every run.
+
         Args:
-            batch_size: Number of products to process per batch
-            progress_callback: Optional callback for progress updates
-            
+            batch_size: Number of products to read and write per batch
+            progress_callback: Optional callback receiving pipeline metrics
+            config: Full pipeline configuration (overrides batch_size)
+            resume: Continue the latest unfinished job instead of starting a new one
+
         Returns:
-            Dict containing processing statistics
+            Dict containing processing statistics and per-stage metrics
         """
-        stats = {
-            "total_processed": 0,
-            "total_updated": 0,
-            "total_errors": 0,
-            "batches_processed": 0
-        }
-        
-        # Get total count for progress tracking
-        total_products = await self.product_repo.count_products_without_embeddings()
-        self.logger.info(f"Starting embedding generation for {total_products} products")
-        
-        batch_num = 0
-        while True:
-            batch_num += 1
-            
-            # Fetch batch of products without embeddings
-            products = await self.product_repo.get_products_without_embeddings(
-                limit=batch_size,
-                skip=0  # Always skip 0 since we're processing products without embeddings
-            )
-            
-            if not products:
-                self.logger.info("No more products to process")
-                break
-            
-            try:
-                # Process batch
-                batch_stats = await self._process_batch(products, batch_num)
-                
-                # Update overall stats
-                stats["total_processed"] += batch_stats["processed"]
-                stats["total_updated"] += batch_stats["updated"]
-                stats["total_errors"] += batch_stats["errors"]
-                stats["batches_processed"] += 1
-                
-                # Progress callback
-                if progress_callback:
-                    progress_callback(stats, batch_stats)
-                
-                # Log progress every 10 records
-                if stats["total_processed"] % 10 == 0:
-                    self.logger.info(
-                        f"✅ Progress: {stats['total_processed']}/{total_products} products processed "
-                        f"({stats['total_updated']} updated, {stats['total_errors']} errors)"
-                    )
-                
-            except Exception as e:
-                self.logger.error(f"Error processing batch {batch_num}: {e}")
-                stats["total_errors"] += len(products)
-            
-            # Rate limiting pause
-            await asyncio.sleep(0.1)
-        
-        return stats
-    
-    async def _process_batch(
-        self, 
-        products: List[Dict[str, Any]], 
-        batch_num: int
-    ) -> Dict[str, int]:
+        job_id = await self.start_job(batch_size, resume=resume)
+        return await self.run_job(job_id, progress_callback, config)
+
+    async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
-        Process a batch of products to generate embeddings.
-        
+        Get a job with its derived progress, throughput and ETA.
+
         Args:
-            products: List of product documents
-            batch_num: Batch number for logging
-            
+            job_id: Job id
+
         Returns:
-            Dict with batch processing statistics
+            Job document plus processed, percentage, eta_seconds and stale, or None
         """
-        batch_stats = {"processed": 0, "updated": 0, "errors": 0}
-        
-        self.logger.info(f"Processing batch {batch_num} with {len(products)} products")
-        
-        # Generate embedding texts
-        embedding_requests = []
-        product_map = {}
-        
-        for product in products:
-            try:
-                # Generate structured embedding text
-                embedding_text = EmbeddingTextService.build_embedding_text(product)
-                
-                embedding_requests.append(embedding_text)
-                product_map[embedding_text] = product
-                
-            except Exception as e:
-                self.logger.error(f"Error generating text for product {product.get('_id')}: {e}")
-                batch_stats["errors"] += 1
-        
-        if not embedding_requests:
-            return batch_stats
-        
-        try:
-            # Generate embeddings in bulk
-            embeddings = await self._generate_openai_embeddings(embedding_requests)
-            
-            # Prepare updates
-            updates = []
-            for embedding_text, embedding_vector in zip(embedding_requests, embeddings):
-                try:
-                    product = product_map[embedding_text]
-                    
-                    # Create embedding metadata
-                    metadata = EmbeddingMetadata(
-                        model=self.settings.openai.embedding_model,
-                        dimensions=len(embedding_vector),
-                        source_text=embedding_text
-                    )
-                    
-                    # Create product embedding
-                    product_embedding = ProductEmbedding(
-                        product_id=str(product["_id"]),
-                        embedding_vector=embedding_vector,
-                        metadata=metadata
-                    )
-                    
-                    updates.append(product_embedding)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error preparing update for product: {e}")
-                    batch_stats["errors"] += 1
-            
-            # Bulk update database
-            if updates:
-                updated_count = await self.product_repo.bulk_update_embeddings(updates)
-                batch_stats["updated"] = updated_count
-            
-        except Exception as e:
-            self.logger.error(f"Error generating embeddings for batch {batch_num}: {e}")
-            batch_stats["errors"] += len(embedding_requests)
-        
-        batch_stats["processed"] = len(products)
-        return batch_stats
-    
-    async def _generate_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
+        job = await self.job_repo.get_job(job_id)
+        if not job:
+            return None
+        return {**job, **job_progress(job, self.settings.embedding_job_stale_seconds)}
+
+    async def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
-        Generate embeddings using OpenAI API.
+        Generate embeddings with the configured provider.
         
         Args:
             texts: List of texts to embed
             
         Returns:
-            List of embedding vectors
+            List of embedding vectors, in input order
         """
         try:
-            response = await self.openai_client.embeddings.create(
-                model=self.settings.openai.embedding_model,
-                input=texts,
-                encoding_format="float"
-            )
-            
-            return [embedding.embedding for embedding in response.data]
-            
+            return await self.provider.embed_batch(texts)
+
         except Exception as e:
-            self.logger.error(f"OpenAI embedding generation failed: {e}")
+            self.logger.error(f"{self.provider.name} embedding generation failed: {e}")
             raise
     
     async def generate_single_embedding(self, product_id: str) -> Optional[ProductEmbedding]:
@@ -221,35 +285,42 @@ class EmbeddingService:
             # Generate embedding text
             embedding_text = EmbeddingTextService.build_embedding_text(product)
             
-            # Generate embedding
-            embeddings = await self._generate_openai_embeddings([embedding_text])
-            
-            if not embeddings:
-                return None
-            
-            # Create metadata
-            metadata = EmbeddingMetadata(
-                model=self.settings.openai.embedding_model,
-                dimensions=len(embeddings[0]),
-                source_text=embedding_text
+            # Reuse the vector of an identical text before calling the API
+            model = self.model
+            dimensions = self.settings.embedding_dimension
+            text_hash = EmbeddingFingerprint.text_hash(embedding_text)
+            cached = await self.cache_repo.get_many(model, dimensions, [text_hash])
+            if text_hash in cached:
+                embeddings = [cached[text_hash]]
+            else:
+                embeddings = await self._generate_embeddings([embedding_text])
+                if not embeddings:
+                    return None
+                await self.cache_repo.put_many(model, dimensions, {text_hash: embeddings[0]})
+
+            # Update database
+            updated = await self.product_repo.update_product_embedding(
+                product_id, embedding_text, embeddings[0], self.model, dimensions
             )
-            
-            # Create product embedding
-            product_embedding = ProductEmbedding(
-                product_id=product_id,
+            if not updated:
+                return None
+
+            return ProductEmbedding(
+                _id=str(product["_id"]),
+                embedding_text=embedding_text,
                 embedding_vector=embeddings[0],
-                metadata=metadata
+                embedding_model=self.model,
+                title=product.get("title") or "",
+                brand=product.get("brand"),
+                category=product.get("category") or "",
+                sub_category=product.get("sub_category"),
+                description=product.get("description") or ""
             )
             
-            # Update database
-            await self.product_repo.update_product_embedding(product_embedding)
-            
-            return product_embedding
-            
         except Exception as e:
             self.logger.error(f"Error generating single embedding for {product_id}: {e}")
             return None
     
-    async def get_embedding_stats(self) -> Dict[str, int]:
+    async def get_embedding_stats(self) -> Dict[str, Any]:
         """Get embedding generation statistics."""
         return await self.product_repo.get_embedding_stats()
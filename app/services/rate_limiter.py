@@ -0,0 +1,297 @@
+"""
+Rate Limiter - Application Layer
+Shared requests-per-minute / tokens-per-minute limiter for OpenAI calls.
+
+Every caller reserves one request and its estimated tokens before calling the
+API. Both buckets refill continuously at limit/60 per second and may go into
+debt, so a reservation's wait time is decided up front and concurrent callers
+are served in arrival order without polling. After each response the buckets are
+clamped to the server's x-ratelimit-remaining-* view, and a 429 pauses every
+caller until the advertised reset.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+DEFAULT_REQUESTS_PER_MINUTE = 3000
+DEFAULT_TOKENS_PER_MINUTE = 1_000_000
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English product text)."""
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def estimate_input_tokens(inputs: Union[str, List[str]]) -> int:
+    """Estimate tokens for an embeddings request input."""
+    if isinstance(inputs, str):
+        return estimate_tokens(inputs)
+    return sum(estimate_tokens(text) for text in inputs)
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations such as '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimiter:
+    """Dual token bucket for requests and tokens per minute."""
+
+    def __init__(
+        self,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize limiter with both buckets full.
+
+        Args:
+            requests_per_minute: Request limit
+            tokens_per_minute: Token limit
+            clock: Monotonic clock (injectable for tests)
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = float(tokens_per_minute)
+        self._requests = self.requests_per_minute
+        self._tokens = self.tokens_per_minute
+        self._updated = clock()
+        self._paused_until = 0.0
+
+        self.total_requests = 0
+        self.total_tokens = 0
+        self.total_wait_seconds = 0.0
+        self.throttled = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60.0)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def reserve(self, tokens: int, requests: int = 1) -> float:
+        """Reserve capacity and return how long the caller must wait before sending.
+
+        Args:
+            tokens: Estimated tokens for the request
+            requests: Number of requests (normally 1)
+
+        Returns:
+            Seconds to wait
+        """
+        # A single request larger than the whole bucket could never be admitted
+        tokens = min(float(tokens), self.tokens_per_minute)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._requests -= requests
+            self._tokens -= tokens
+
+            wait = max(
+                self._paused_until - now,
+                -self._requests * 60.0 / self.requests_per_minute,
+                -self._tokens * 60.0 / self.tokens_per_minute,
+                0.0
+            )
+            self.total_requests += requests
+            self.total_tokens += int(tokens)
+            self.total_wait_seconds += wait
+            return wait
+
+    async def acquire(self, tokens: int, requests: int = 1) -> None:
+        """Wait (asynchronously) until the request may be sent."""
+        wait = self.reserve(tokens, requests)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: int, requests: int = 1) -> None:
+        """Wait (blocking) until the request may be sent."""
+        wait = self.reserve(tokens, requests)
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapt limits and remaining capacity from OpenAI rate limit headers.
+
+        Args:
+            headers: Response headers (x-ratelimit-limit-*, x-ratelimit-remaining-*)
+        """
+        def number(name: str) -> Optional[float]:
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        limit_requests = number("x-ratelimit-limit-requests")
+        limit_tokens = number("x-ratelimit-limit-tokens")
+        remaining_requests = number("x-ratelimit-remaining-requests")
+        remaining_tokens = number("x-ratelimit-remaining-tokens")
+
+        with self._lock:
+            self._refill(self._clock())
+            if limit_requests:
+                self.requests_per_minute = limit_requests
+            if limit_tokens:
+                self.tokens_per_minute = limit_tokens
+            # Only ever lower local capacity: other processes share the same quota
+            if remaining_requests is not None:
+                self._requests = min(self._requests, remaining_requests)
+            if remaining_tokens is not None:
+                self._tokens = min(self._tokens, remaining_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for the given time (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self.throttled += 1
+
+    def retry_delay_from_headers(self, headers: Mapping[str, str], default: float = 1.0) -> float:
+        """Seconds to back off after a 429, from retry-after or the reset headers."""
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        resets = [
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+        ]
+        resets = [value for value in resets if value is not None]
+        return max(resets) if resets else default
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limits, remaining capacity and totals."""
+        with self._lock:
+            self._refill(self._clock())
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "available_requests": round(self._requests, 2),
+                "available_tokens": round(self._tokens, 2),
+                "total_requests": self.total_requests,
+                "total_tokens": self.total_tokens,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+                "throttled": self.throttled,
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    name: str = "openai-embeddings",
+    requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+    tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE
+) -> RateLimiter:
+    """Get the process-wide limiter for a quota, creating it on first use.
+
+    Args:
+        name: Quota name; every caller of the same quota shares one limiter
+        requests_per_minute: Initial request limit (ignored if it exists)
+        tokens_per_minute: Initial token limit (ignored if it exists)
+
+    Returns:
+        Shared RateLimiter
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _limiters[name] = limiter
+        return limiter
+
+
+def _rate_limit_headers(error: openai.RateLimitError) -> Mapping[str, str]:
+    response = getattr(error, "response", None)
+    return response.headers if response is not None else {}
+
+
+async def create_embeddings(
+    client: Any,
+    limiter: RateLimiter,
+    max_retries: int = 5,
+    **kwargs: Any
+) -> Any:
+    """Call client.embeddings.create under the limiter (async client).
+
+    Waits for capacity, reads the rate limit headers from the raw response and,
+    on a 429, pauses all callers until the advertised reset before retrying.
+
+    Args:
+        client: AsyncOpenAI client
+        limiter: Shared rate limiter
+        max_retries: Attempts on 429 responses
+        kwargs: Arguments for embeddings.create (model, input, ...)
+
+    Returns:
+        Parsed CreateEmbeddingResponse
+    """
+    tokens = estimate_input_tokens(kwargs["input"])
+    for attempt in range(max_retries):
+        await limiter.acquire(tokens)
+        try:
+            raw = await client.embeddings.with_raw_response.create(**kwargs)
+        except openai.RateLimitError as e:
+            headers = _rate_limit_headers(e)
+            limiter.update_from_headers(headers)
+            delay = limiter.retry_delay_from_headers(headers, default=2.0 ** attempt)
+            limiter.pause(delay)
+            logger.warning(f"OpenAI rate limit hit, pausing {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
+            if attempt == max_retries - 1:
+                raise
+            continue
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
+
+
+def create_embeddings_sync(
+    client: Any,
+    limiter: RateLimiter,
+    max_retries: int = 5,
+    **kwargs: Any
+) -> Any:
+    """Call client.embeddings.create under the limiter (sync client).
+
+    Same behaviour as create_embeddings, for the synchronous OpenAI client.
+    """
+    tokens = estimate_input_tokens(kwargs["input"])
+    for attempt in range(max_retries):
+        limiter.acquire_sync(tokens)
+        try:
+            raw = client.embeddings.with_raw_response.create(**kwargs)
+        except openai.RateLimitError as e:
+            headers = _rate_limit_headers(e)
+            limiter.update_from_headers(headers)
+            delay = limiter.retry_delay_from_headers(headers, default=2.0 ** attempt)
+            limiter.pause(delay)
+            logger.warning(f"OpenAI rate limit hit, pausing {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
+            if attempt == max_retries - 1:
+                raise
+            continue
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
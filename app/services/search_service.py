@@ -3,11 +3,13 @@ Search Service - Application Layer
 Orchestrates search operations using domain services and repositories
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import time
 
 from app.repositories.product_repository import ProductRepository
+from app.repositories.search_backend import SearchBackend
 from app.domain.search.services import SearchDomainService
 from app.services.simple_embedding_service import SimpleEmbeddingService
 from app.services.reranker_service import RerankerService
@@ -30,7 +32,8 @@ class SearchService:
         embedding_service: SimpleEmbeddingService,
         reranker_service: RerankerService,
         intent_service: Optional[LLMIntentService] = None,
-        settings: Optional[Settings] = None
+        settings: Optional[Settings] = None,
+        search_backend: Optional[SearchBackend] = None
     ):
         """Initialize search service with injected dependencies.
         
@@ -41,8 +44,11 @@ class SearchService:
             reranker_service: Service for reranking results
             intent_service: Optional LLM-based intent service
             settings: Application settings
+            search_backend: Backend running the text/vector/hybrid legs (default: the
+                product repository, i.e. Atlas); facets always come from the repository
         """
         self.product_repository = product_repository
+        self.search_backend = search_backend or product_repository
         self.search_domain_service = domain_service
         self.embedding_service = embedding_service
         self.reranker_service = reranker_service
@@ -63,12 +69,21 @@ class SearchService:
     async def _parse_search_intent_with_llm_fallback(self, query: str) -> Dict[str, Any]:
         """Parse search intent using LLM with fallback to domain heuristics.
         
+        Queries whose words are all known catalog vocabulary and whose heuristic
+        intent names a category are not sent to the LLM: after local spelling
+        correction the heuristics already understand them.
+        
         Args:
-            query: User's raw search query
+            query: User's search query (spelling-corrected)
             
         Returns:
             Parsed search intent dictionary compatible with domain service format
         """
+        heuristic_intent = self.search_domain_service.parse_search_intent(query)
+        if self.search_domain_service.is_confident_intent(query, heuristic_intent):
+            logger.info(f"Using heuristic intent without LLM call: {heuristic_intent}")
+            return heuristic_intent
+        
         # Try LLM intent parsing first if available
         if (self.intent_service and 
             self.settings and 
@@ -88,9 +103,8 @@ class SearchService:
                 logger.warning(f"LLM intent parsing failed, falling back to heuristics: {e}")
         
         # Fallback to domain service heuristics
-        search_intent = self.search_domain_service.parse_search_intent(query)
-        logger.info(f"Using heuristic intent: {search_intent}")
-        return search_intent
+        logger.info(f"Using heuristic intent: {heuristic_intent}")
+        return heuristic_intent
     
     def _convert_llm_intent_to_domain_intent(self, llm_intent: LLMIntent, original_query: str) -> Dict[str, Any]:
         """Convert LLM intent format to domain service intent format.
@@ -169,7 +183,8 @@ class SearchService:
         mode: str = "hybrid",
         page: int = 1,
         page_size: int = 20,
-        use_reranking: bool = True
+        use_reranking: bool = True,
+        include_facets: bool = False
     ) -> Dict[str, Any]:
         """
         Main paginated search interface
@@ -180,6 +195,7 @@ class SearchService:
             page: Page number (1-based)
             page_size: Number of results per page
             use_reranking: Whether to apply reranking
+            include_facets: Whether to compute category/brand/price facets
         
         Returns:
             Dictionary with results, total count, and pagination metadata
@@ -190,42 +206,313 @@ class SearchService:
             if not query or not query.strip():
                 return {"results": [], "total": 0}
             
-            # Parse search intent using LLM with fallback to heuristics
-            search_intent = await self._parse_search_intent_with_llm_fallback(query)
-            logger.info(f"Parsed search intent: {search_intent}")
-            
-            # Use rephrased query if available from LLM
-            effective_query = search_intent.get('rephrased_query', query)
-            
-            # Execute search based on mode
-            if mode == "text":
-                search_data = await self._execute_text_search_paginated(effective_query, page, page_size, search_intent)
-            elif mode == "vector":
-                search_data = await self._execute_vector_search_paginated(effective_query, page, page_size, search_intent)
-            elif mode == "hybrid":
-                search_data = await self._execute_hybrid_search_paginated(effective_query, page, page_size, search_intent)
-            else:
-                raise ValueError(f"Unsupported search mode: {mode}")
-            
-            results = search_data.get("results", [])
-            total = search_data.get("total", 0)
-            
-            # Apply reranking if requested and we have results
-            if use_reranking and results and len(results) > 1:
-                results = await self._apply_reranking(query, results)
-                search_data["results"] = results
+            corrected_query, search_intent, effective_query = await self._prepare_query(query)
+            search_data = await self._run_prepared_search(
+                query, corrected_query, search_intent, effective_query,
+                mode, page, page_size, use_reranking, include_facets
+            )
             
             # Update analytics
             execution_time = time.time() - start_time
             self._update_analytics(mode, execution_time)
             
-            logger.info(f"Search completed: {len(results)}/{total} results in {execution_time:.3f}s (page {page})")
+            logger.info(f"Search completed: {len(search_data.get('results', []))}/{search_data.get('total', 0)} results in {execution_time:.3f}s (page {page})")
             return search_data
             
         except Exception as e:
             logger.error(f"Search failed: {e}")
             raise
     
+    async def search_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run many searches in one call
+        
+        Intent parsing and the search legs run concurrently under a bounded
+        semaphore, and all vector/hybrid queries are embedded with a single
+        batched OpenAI call. A failing query does not fail the batch.
+        
+        Args:
+            requests: List of dictionaries with query, mode, page, page_size,
+                use_reranking and include_facets keys
+        
+        Returns:
+            One dictionary per request, in order, with status ('ok' or 'error'),
+            execution_time and either data (as from search_paginated) or error
+        """
+        concurrency = self.settings.batch_search_concurrency if self.settings else 8
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        start_time = time.time()
+        
+        async def prepare(item: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+            if item.get("mode", "hybrid") not in ("text", "vector", "hybrid"):
+                raise ValueError(f"Unsupported search mode: {item.get('mode')}")
+            async with semaphore:
+                return await self._prepare_query(item["query"])
+        
+        prepared = await asyncio.gather(*(prepare(item) for item in requests), return_exceptions=True)
+        
+        # One embeddings call for every distinct query that needs a vector leg
+        embeddings: Dict[str, Any] = {}
+        texts = list(dict.fromkeys(
+            p[2] for item, p in zip(requests, prepared)
+            if not isinstance(p, BaseException) and item.get("mode", "hybrid") in ("vector", "hybrid")
+        ))
+        if texts:
+            try:
+                vectors = await self.embedding_service.generate_embeddings_batch(texts)
+                embeddings = dict(zip(texts, vectors))
+            except Exception as e:
+                logger.error(f"Batch embedding failed for {len(texts)} queries: {e}")
+                embeddings = {text: e for text in texts}
+        
+        async def run(item: Dict[str, Any], prep: Any) -> Dict[str, Any]:
+            item_start = time.time()
+            mode = item.get("mode", "hybrid")
+            try:
+                if isinstance(prep, BaseException):
+                    raise prep
+                corrected_query, search_intent, effective_query = prep
+                query_embedding = embeddings.get(effective_query) if mode != "text" else None
+                if isinstance(query_embedding, BaseException):
+                    raise RuntimeError(f"Embedding generation failed: {query_embedding}")
+                async with semaphore:
+                    data = await self._run_prepared_search(
+                        item["query"], corrected_query, search_intent, effective_query, mode,
+                        item.get("page", 1), item.get("page_size", 20),
+                        item.get("use_reranking", True), item.get("include_facets", False),
+                        query_embedding=query_embedding
+                    )
+                execution_time = time.time() - item_start
+                self._update_analytics(mode, execution_time)
+                return {"status": "ok", "data": data, "execution_time": execution_time}
+            except Exception as e:
+                logger.warning(f"Batch search item failed for '{item.get('query')}': {e}")
+                return {"status": "error", "error": str(e), "execution_time": time.time() - item_start}
+        
+        results = await asyncio.gather(*(run(item, prep) for item, prep in zip(requests, prepared)))
+        
+        failed = sum(1 for r in results if r["status"] == "error")
+        logger.info(f"Batch search completed: {len(results) - failed}/{len(results)} succeeded in {time.time() - start_time:.3f}s")
+        return list(results)
+    
+    async def search_stream(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        page: int = 1,
+        page_size: int = 20,
+        use_reranking: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Paginated search that yields progressively refined rankings
+        
+        The first ranking does not wait for the LLM: the text leg runs with the
+        heuristic intent while the LLM intent is parsed, and the query
+        embedding is generated alongside both. Stages, in order, are 'text'
+        (text and hybrid modes, heuristic intent), 'refined' (text mode, when
+        the LLM intent changes the text query or filters), 'hybrid' or 'vector'
+        (final intent), and 'reranked' (when reranking is requested and there
+        is something to rerank).
+        
+        Args:
+            query: Search query string
+            mode: Search mode ('text', 'vector', 'hybrid')
+            page: Page number (1-based)
+            page_size: Number of results per page
+            use_reranking: Whether to apply reranking
+        
+        Yields:
+            Dictionaries with the stage name and search data (results, total,
+            and corrected_query when the query was corrected)
+        """
+        if mode not in ("text", "vector", "hybrid"):
+            raise ValueError(f"Unsupported search mode: {mode}")
+        
+        start_time = time.time()
+        corrected_query = self.search_domain_service.correct_query(query)
+        extra = {"corrected_query": corrected_query} if corrected_query != query else {}
+        
+        # Heuristic intent is immediate; the LLM intent resolves while the first leg runs
+        search_intent = self.search_domain_service.parse_search_intent(corrected_query)
+        intent_task = None
+        if self.intent_service and self.settings and self.settings.llm_intent_enabled:
+            intent_task = asyncio.create_task(self._parse_search_intent_with_llm_fallback(corrected_query))
+        effective_query, filters, actual_query = self._query_plan(corrected_query, search_intent)
+        
+        embedding_task = None
+        if mode != "text":
+            embedding_task = asyncio.create_task(self.embedding_service.generate_embedding(effective_query))
+        
+        # Hybrid fetches the full sample once; its requested page is the text ranking
+        if mode == "text":
+            text_page, text_size = page, page_size
+        else:
+            text_page, text_size = 1, self.search_backend.hybrid_sample_size(page, page_size)
+        skip = (page - 1) * page_size if mode == "hybrid" else 0
+        
+        try:
+            text_data = None
+            if mode != "vector":
+                text_data = await self.search_backend.search_products_text_paginated(
+                    actual_query, text_page, text_size, filters=filters
+                )
+                yield {"stage": "text", "data": {
+                    "results": text_data.get("results", [])[skip:skip + page_size],
+                    "total": text_data.get("total", 0),
+                    **extra
+                }}
+            
+            if intent_task is not None:
+                search_intent = await intent_task
+                plan = self._query_plan(corrected_query, search_intent)
+                if plan[0] != effective_query and embedding_task is not None:
+                    embedding_task.cancel()
+                    embedding_task = asyncio.create_task(self.embedding_service.generate_embedding(plan[0]))
+                if text_data is not None and plan[1:] != (filters, actual_query):
+                    text_data = await self.search_backend.search_products_text_paginated(
+                        plan[2], text_page, text_size, filters=plan[1]
+                    )
+                    if mode == "text":
+                        yield {"stage": "refined", "data": {**text_data, **extra}}
+                effective_query, filters, actual_query = plan
+            
+            if mode == "text":
+                search_data = text_data
+            else:
+                query_embedding = await embedding_task
+                if mode == "vector":
+                    search_data = await self.search_backend.search_products_vector_paginated(
+                        query_embedding, page, page_size, filters=filters
+                    )
+                else:
+                    search_data = await self.search_backend.search_products_hybrid_paginated(
+                        actual_query, query_embedding, page, page_size, filters=filters, text_data=text_data
+                    )
+                    search_data.pop("candidate_ids", None)
+                    search_data["results"] = self._apply_color_boost(search_data.get("results", []), search_intent)
+                yield {"stage": mode, "data": {**search_data, **extra}}
+            
+            results = search_data.get("results", [])
+            if use_reranking and len(results) > 1:
+                reranked = await self._apply_reranking(corrected_query, list(results))
+                yield {"stage": "reranked", "data": {**search_data, "results": reranked, **extra}}
+        finally:
+            for task in (intent_task, embedding_task):
+                if task is not None and not task.done():
+                    task.cancel()
+        
+        execution_time = time.time() - start_time
+        self._update_analytics(mode, execution_time)
+        logger.info(f"Streaming search completed in {execution_time:.3f}s (page {page})")
+    
+    def _query_plan(
+        self, corrected_query: str, search_intent: Dict[str, Any]
+    ) -> Tuple[str, Optional[Dict[str, Any]], str]:
+        """Effective query, filters and text query of a parsed intent.
+        
+        Returns:
+            Tuple of (effective query, MongoDB filters or None, text leg query)
+        """
+        effective_query = search_intent.get('rephrased_query') or corrected_query
+        filters = self.search_domain_service.build_mongo_filters(search_intent, strict_color=False) or None
+        actual_query = self.search_domain_service.build_text_query(search_intent).get("query", effective_query)
+        return effective_query, filters, actual_query
+    
+    async def _prepare_query(self, query: str) -> Tuple[str, Dict[str, Any], str]:
+        """Correct spelling and parse intent for a raw query.
+        
+        Returns:
+            Tuple of (corrected query, search intent, effective query)
+        """
+        # Fix catalog misspellings locally, before intent parsing and the search legs
+        corrected_query = self.search_domain_service.correct_query(query)
+        
+        # Parse search intent using LLM with fallback to heuristics
+        search_intent = await self._parse_search_intent_with_llm_fallback(corrected_query)
+        logger.info(f"Parsed search intent: {search_intent}")
+        
+        # Use rephrased query if available from LLM, else the corrected query
+        effective_query = search_intent.get('rephrased_query') or corrected_query
+        return corrected_query, search_intent, effective_query
+    
+    async def _run_prepared_search(
+        self,
+        query: str,
+        corrected_query: str,
+        search_intent: Dict[str, Any],
+        effective_query: str,
+        mode: str,
+        page: int,
+        page_size: int,
+        use_reranking: bool,
+        include_facets: bool,
+        query_embedding: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """Execute the search leg for a prepared query, then facets and reranking."""
+        # Execute search based on mode
+        if mode == "text":
+            search_leg = self._execute_text_search_paginated(effective_query, page, page_size, search_intent)
+        elif mode == "vector":
+            search_leg = self._execute_vector_search_paginated(effective_query, page, page_size, search_intent, query_embedding)
+        elif mode == "hybrid":
+            search_leg = self._execute_hybrid_search_paginated(effective_query, page, page_size, search_intent, query_embedding)
+        else:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        
+        if include_facets and mode == "hybrid":
+            # The hybrid candidate set is only known once both legs are fused
+            search_data = await search_leg
+            search_data["facets"] = await self._compute_facets(
+                effective_query, mode, search_intent, search_data.get("candidate_ids")
+            )
+        elif include_facets:
+            # Facets run alongside the search leg; repeat pages hit the facet cache
+            search_data, facets = await asyncio.gather(
+                search_leg,
+                self._compute_facets(effective_query, mode, search_intent)
+            )
+            search_data["facets"] = facets
+        else:
+            search_data = await search_leg
+        search_data.pop("candidate_ids", None)
+        
+        results = search_data.get("results", [])
+        
+        # Apply reranking if requested and we have results
+        if use_reranking and results and len(results) > 1:
+            results = await self._apply_reranking(corrected_query, results)
+            search_data["results"] = results
+        
+        if corrected_query != query:
+            search_data["corrected_query"] = corrected_query
+        
+        return search_data
+    
+    async def _compute_facets(
+        self,
+        query: str,
+        mode: str,
+        search_intent: Dict[str, Any],
+        candidate_ids: Optional[List[Any]] = None
+    ) -> Dict[str, Any]:
+        """Compute facets over the same filtered candidate set as the search leg.
+        
+        Text search facets over the $text matches and hybrid search over its fused
+        candidates (candidate_ids), which already passed the filters; vector search
+        has no lexical candidate set, so it facets over the filtered catalog.
+        """
+        filters = self.search_domain_service.build_mongo_filters(search_intent, strict_color=False)
+        if mode == "hybrid":
+            # Cached per query and filters, not per (page-dependent) candidate list
+            return await self.product_repository.get_facets(
+                ids=candidate_ids or [],
+                ids_scope=[" ".join(query.lower().split()), mode, filters or None]
+            )
+        return await self.product_repository.get_facets(
+            query if mode == "text" else None,
+            filters=filters if filters else None
+        )
+    
     async def _execute_text_search(self, query: str, limit: int) -> List[Dict[str, Any]]:
         """Execute text-based search with strict filtering"""
         try:
@@ -242,7 +529,7 @@ class SearchService:
             actual_query = text_query_dict.get("query", query)
             
             # Execute text search via repository with filters
-            results = await self.product_repository.search_products_text(
+            results = await self.search_backend.search_products_text(
                 actual_query, limit, filters=filters if filters else None
             )
             
@@ -270,7 +557,7 @@ class SearchService:
             actual_query = text_query_dict.get("query", query)
             
             # Execute paginated text search via repository with filters
-            search_data = await self.product_repository.search_products_text_paginated(
+            search_data = await self.search_backend.search_products_text_paginated(
                 actual_query, page, page_size, filters=filters if filters else None
             )
             
@@ -297,7 +584,7 @@ class SearchService:
             query_embedding = await self.embedding_service.generate_embedding(query)
             
             # Execute vector search via repository with filters
-            results = await self.product_repository.search_products_vector(
+            results = await self.search_backend.search_products_vector(
                 query_embedding, limit, filters=filters if filters else None
             )
             
@@ -308,7 +595,7 @@ class SearchService:
             logger.error(f"Vector search failed: {e}")
             return []
     
-    async def _execute_vector_search_paginated(self, query: str, page: int, page_size: int, search_intent: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _execute_vector_search_paginated(self, query: str, page: int, page_size: int, search_intent: Optional[Dict[str, Any]] = None, query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
         """Execute paginated vector-based search with strict filtering"""
         try:
             # Use provided search intent or parse it
@@ -318,11 +605,12 @@ class SearchService:
             # Build strict MongoDB filters
             filters = self.search_domain_service.build_mongo_filters(search_intent, strict_color=False)
             
-            # Generate query embedding
-            query_embedding = await self.embedding_service.generate_embedding(query)
+            # Generate query embedding unless the caller batched it
+            if query_embedding is None:
+                query_embedding = await self.embedding_service.generate_embedding(query)
             
             # Execute paginated vector search via repository with filters
-            search_data = await self.product_repository.search_products_vector_paginated(
+            search_data = await self.search_backend.search_products_vector_paginated(
                 query_embedding, page, page_size, filters=filters if filters else None
             )
             
@@ -355,7 +643,7 @@ class SearchService:
             actual_query = text_query_dict.get("query", query)
             
             # Execute hybrid search via repository with filters
-            results = await self.product_repository.search_products_hybrid(
+            results = await self.search_backend.search_products_hybrid(
                 actual_query, query_embedding, limit, filters=filters if filters else None
             )
             
@@ -377,7 +665,7 @@ class SearchService:
             logger.error(f"Hybrid search failed: {e}")
             return []
     
-    async def _execute_hybrid_search_paginated(self, query: str, page: int, page_size: int, search_intent: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _execute_hybrid_search_paginated(self, query: str, page: int, page_size: int, search_intent: Optional[Dict[str, Any]] = None, query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
         """Execute paginated hybrid search combining text and vector with strict filtering"""
         try:
             # Use provided search intent or parse it
@@ -387,8 +675,9 @@ class SearchService:
             # Build strict MongoDB filters
             filters = self.search_domain_service.build_mongo_filters(search_intent, strict_color=False)
             
-            # Generate query embedding
-            query_embedding = await self.embedding_service.generate_embedding(query)
+            # Generate query embedding unless the caller batched it
+            if query_embedding is None:
+                query_embedding = await self.embedding_service.generate_embedding(query)
             
             # Build optimized text query
             text_query_dict = self.search_domain_service.build_text_query(search_intent)
@@ -397,25 +686,14 @@ class SearchService:
             actual_query = text_query_dict.get("query", query)
             
             # Execute paginated hybrid search via repository with filters
-            search_data = await self.product_repository.search_products_hybrid_paginated(
+            search_data = await self.search_backend.search_products_hybrid_paginated(
                 actual_query, query_embedding, page, page_size, filters=filters if filters else None
             )
             
-            results = search_data.get("results", [])
+            results = self._apply_color_boost(search_data.get("results", []), search_intent)
+            search_data["results"] = results
             total = search_data.get("total", 0)
             
-            # Apply additional relevance scoring for color preference
-            if search_intent.get('colors') and results:
-                for result in results:
-                    color_boost = self.search_domain_service.calculate_relevance_score(result, search_intent)
-                    # Boost results that match colors
-                    if color_boost > 0.5:  # High color relevance
-                        result['search_score'] = result.get('search_score', 0.0) * 1.2
-                
-                # Re-sort by updated scores
-                results.sort(key=lambda x: x.get("search_score", 0.0), reverse=True)
-                search_data["results"] = results
-            
             logger.info(f"Hybrid search found {len(results)}/{total} results (page {page})")
             return search_data
             
@@ -423,6 +701,21 @@ class SearchService:
             logger.error(f"Paginated hybrid search failed: {e}")
             return {"results": [], "total": 0}
     
+    def _apply_color_boost(self, results: List[Dict[str, Any]], search_intent: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Boost hybrid results matching the requested colors and re-sort."""
+        if not search_intent.get('colors') or not results:
+            return results
+        
+        for result in results:
+            color_boost = self.search_domain_service.calculate_relevance_score(result, search_intent)
+            # Boost results that match colors
+            if color_boost > 0.5:  # High color relevance
+                result['search_score'] = result.get('search_score', 0.0) * 1.2
+        
+        # Re-sort by updated scores
+        results.sort(key=lambda x: x.get("search_score", 0.0), reverse=True)
+        return results
+    
     async def _apply_reranking(self, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Apply Cohere reranking to results"""
         try:
@@ -466,9 +759,12 @@ class SearchService:
             # Get repository stats
             repo_stats = await self.product_repository.health_check()
             
+            backend_stats = getattr(self.search_backend, "get_stats", None)
+            
             # Combine with search analytics
             return {
                 "repository_stats": repo_stats,
+                "search_backend": backend_stats() if backend_stats else {"backend": "atlas"},
                 "search_analytics": self.search_analytics,
                 "service_status": "healthy"
             }
@@ -4,22 +4,31 @@ Simple embedding service for search operations.
 
 import logging
 from typing import List, Optional
-from openai import AsyncOpenAI
+
+from app.services.embedding_provider import EmbeddingProvider, OpenAIEmbeddingProvider
+from app.services.rate_limiter import RateLimiter
 
 
 class SimpleEmbeddingService:
     """Simple embedding service for generating query embeddings."""
     
-    def __init__(self, api_key: str, model: str = "text-embedding-3-small"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "text-embedding-3-small",
+                 rate_limiter: Optional[RateLimiter] = None, dimensions: Optional[int] = None,
+                 provider: Optional[EmbeddingProvider] = None):
         """Initialize embedding service.
         
         Args:
-            api_key: OpenAI API key
-            model: Embedding model name
+            api_key: OpenAI API key (used when no provider is given)
+            model: Embedding model name (used when no provider is given)
+            rate_limiter: Limiter for the embeddings quota (defaults to the shared one)
+            dimensions: Query vector length; must match the vector field being searched
+            provider: Source of the vectors (defaults to OpenAI)
         """
-        self.api_key = api_key
-        self.model = model
-        self.client = AsyncOpenAI(api_key=api_key)
+        if provider is None:
+            provider = OpenAIEmbeddingProvider(api_key, model, dimensions, rate_limiter)
+        self.provider = provider
+        self.model = provider.model
+        self.dimensions = provider.dimensions
         self.logger = logging.getLogger(__name__)
     
     async def generate_embedding(self, text: str) -> List[float]:
@@ -32,12 +41,7 @@ class SimpleEmbeddingService:
             Embedding vector as list of floats
         """
         try:
-            response = await self.client.embeddings.create(
-                input=text,
-                model=self.model
-            )
-            
-            embedding = response.data[0].embedding
+            embedding = await self.provider.embed(text)
             self.logger.debug(f"Generated embedding for text: {text[:50]}...")
             return embedding
             
@@ -55,12 +59,7 @@ class SimpleEmbeddingService:
             List of embedding vectors
         """
         try:
-            response = await self.client.embeddings.create(
-                input=texts,
-                model=self.model
-            )
-            
-            embeddings = [data.embedding for data in response.data]
+            embeddings = await self.provider.embed_batch(texts)
             self.logger.debug(f"Generated {len(embeddings)} embeddings")
             return embeddings
             
@@ -0,0 +1,172 @@
+"""
+Suggestion Service - Application Layer
+Builds and refreshes the typeahead prefix index from the catalog and the query log
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.domain.search.suggestions import PrefixIndex, normalize_suggestion
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestionService:
+    """
+    Serves search-as-you-type suggestions from an in-memory PrefixIndex.
+
+    Lookups never touch MongoDB or OpenAI: the index is rebuilt in the background
+    from catalog brands/categories/titles and the persisted query log, then swapped
+    in atomically. Catalog terms change slowly and cost a collection scan, so they
+    are cached and only recounted every `catalog_refresh_seconds`; each refresh
+    reloads the query log. Searched queries are counted in memory and flushed to
+    the query log on each refresh so all workers share popularity data.
+    """
+
+    def __init__(
+        self,
+        database: AsyncIOMotorDatabase,
+        collection_name: str = "products",
+        query_log_collection_name: str = "search_query_log",
+        max_catalog_terms: int = 50000,
+        max_logged_queries: int = 20000,
+        catalog_refresh_seconds: float = 86400,
+    ):
+        """Initialize suggestion service.
+
+        Args:
+            database: MongoDB database holding the catalog and query log
+            collection_name: Product collection name
+            query_log_collection_name: Collection storing query counts
+            max_catalog_terms: Cap on titles pulled from the catalog per refresh
+            max_logged_queries: Cap on popular queries pulled per refresh
+            catalog_refresh_seconds: Minimum age before catalog terms are recounted
+        """
+        self.products = database[collection_name]
+        self.query_log = database[query_log_collection_name]
+        self.max_catalog_terms = max_catalog_terms
+        self.max_logged_queries = max_logged_queries
+        self.catalog_refresh_seconds = catalog_refresh_seconds
+
+        self.index = PrefixIndex([])
+        self.last_refresh: Optional[float] = None
+        self._pending_queries: Counter = Counter()
+        self._catalog_entries: List[Tuple[str, str, float]] = []
+        self._catalog_loaded_at: Optional[float] = None
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Return suggestions for a prefix from the current in-memory index.
+
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of suggestion dictionaries
+        """
+        return self.index.suggest(prefix, limit)
+
+    def record_query(self, query: str) -> None:
+        """Count a successful search for the query log (flushed on refresh).
+
+        Args:
+            query: Query that returned results
+        """
+        key = normalize_suggestion(query)
+        if 2 <= len(key) <= 100:
+            self._pending_queries[key] += 1
+
+    async def flush(self) -> None:
+        """Persist pending query counts now, e.g. on shutdown."""
+        await self._flush_query_log()
+
+    async def _flush_query_log(self) -> None:
+        """Persist pending query counts with $inc upserts."""
+        if not self._pending_queries:
+            return
+
+        pending, self._pending_queries = self._pending_queries, Counter()
+        operations = [
+            UpdateOne(
+                {"_id": query},
+                {"$inc": {"count": count}, "$set": {"last_seen": time.time()}},
+                upsert=True,
+            )
+            for query, count in pending.items()
+        ]
+        try:
+            await self.query_log.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Query log flush failed, keeping counts for next refresh: {e}")
+            self._pending_queries.update(pending)
+
+    async def _count_values(self, field: str, limit: int) -> List[Tuple[str, int]]:
+        """Count distinct non-empty values of a catalog field."""
+        pipeline = [
+            {"$match": {field: {"$type": "string", "$ne": ""}}},
+            {"$sortByCount": f"${field}"},
+            {"$limit": int(limit)},
+        ]
+        cursor = self.products.aggregate(pipeline, allowDiskUse=True)
+        rows = await cursor.to_list(length=limit)
+        return [(row["_id"], row["count"]) for row in rows]
+
+    async def _load_catalog_entries(self) -> List[Tuple[str, str, float]]:
+        """Count brands, categories and titles across the catalog."""
+        entries: List[Tuple[str, str, float]] = []
+
+        for field, source in (("brand", "brand"), ("category", "category"), ("sub_category", "category")):
+            for value, count in await self._count_values(field, self.max_catalog_terms):
+                entries.append((value, source, count))
+
+        for value, count in await self._count_values("title", self.max_catalog_terms):
+            entries.append((value, "title", count))
+
+        return entries
+
+    async def _load_entries(self) -> List[Tuple[str, str, float]]:
+        """Collect suggestion candidates from the cached catalog terms and the query log."""
+        now = time.time()
+        if self._catalog_loaded_at is None or now - self._catalog_loaded_at >= self.catalog_refresh_seconds:
+            self._catalog_entries = await self._load_catalog_entries()
+            self._catalog_loaded_at = now
+
+        entries = list(self._catalog_entries)
+        cursor = self.query_log.find({}, {"count": 1}).sort("count", -1).limit(self.max_logged_queries)
+        async for row in cursor:
+            entries.append((row["_id"], "query", row.get("count", 1)))
+
+        return entries
+
+    async def refresh(self) -> None:
+        """Rebuild the prefix index and swap it in."""
+        start = time.perf_counter()
+        await self._flush_query_log()
+        entries = await self._load_entries()
+
+        # Sorting a large vocabulary is CPU-bound; keep it off the event loop
+        index = await asyncio.get_running_loop().run_in_executor(None, PrefixIndex, entries)
+        self.index = index
+        self.last_refresh = time.time()
+        logger.info(f"Suggestion index refreshed: {len(index)} entries in {time.perf_counter() - start:.2f}s")
+
+    async def run_refresh_loop(self, interval_seconds: float) -> None:
+        """Refresh the index forever; meant to run as a background task.
+
+        Args:
+            interval_seconds: Delay between refreshes
+        """
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Suggestion index refresh failed: {e}")
+            await asyncio.sleep(interval_seconds)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark recall@k against QPS of the IVF index versus brute force.
+
+Builds IVF-Flat (and IVF-PQ with --pq-subvectors) over synthetic clustered
+vectors, or over the vectors of an exported catalog snapshot (--snapshot),
+then sweeps nprobe and reports, for each setting, recall@k against the exact
+top k and single-threaded queries per second; brute force is the first row.
+Queries are stored vectors with a little noise. --filter-fraction restricts
+every query to a random subset of rows, like a selective category filter.
+--plot writes the recall / QPS curve (requires matplotlib).
+
+Usage:
+  python -m scripts.benchmark_ann --vectors 200000 --dimensions 1536
+  python -m scripts.benchmark_ann --snapshot data/catalog_snapshot --pq-subvectors 96 --plot ann.png
+"""
+
+import argparse
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.db.catalog_snapshot import CatalogSnapshot
+from app.domain.search.ivf import IVFIndex, default_nlist
+from scripts.benchmark_vector_quantization import make_vectors, recall_at_k
+
+
+def measure(search, queries: np.ndarray, baselines: List[List[int]], k: int) -> Dict[str, float]:
+    """Mean recall@k and queries per second of search(query) -> rows."""
+    recalls = []
+    started = time.perf_counter()
+    for query, baseline in zip(queries, baselines):
+        recalls.append(recall_at_k(list(search(query)), baseline, k))
+    elapsed = time.perf_counter() - started
+    return {"recall": round(float(np.mean(recalls)), 4), "qps": round(len(queries) / elapsed, 1)}
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, k: int, mask: Optional[np.ndarray]) -> np.ndarray:
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(len(vectors))
+    scores = vectors[rows] @ query if mask is not None else vectors @ query
+    best = np.argpartition(-scores, k)[:k] if k < len(scores) else np.arange(len(scores))
+    return rows[best[np.argsort(-scores[best])]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k against QPS of IVF search")
+    parser.add_argument("--k", type=int, default=10, help="Results compared per query")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Synthetic vectors")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Synthetic vector dimensions")
+    parser.add_argument("--snapshot", type=str, help="Catalog snapshot to take vectors from")
+    parser.add_argument("--nlist", type=int, default=0, help="Inverted lists (0 = about 4 * sqrt(vectors))")
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[1, 2, 4, 8, 16, 32, 64], help="nprobe values")
+    parser.add_argument("--pq-subvectors", type=int, default=0, help="Also measure IVF-PQ with this many subspaces")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="IVF-PQ candidates rescored per result")
+    parser.add_argument("--filter-fraction", type=float, default=0.0, help="Restrict queries to this fraction of rows")
+    parser.add_argument("--plot", type=str, help="Write the recall / QPS plot to this image")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        snapshot = CatalogSnapshot.load(args.snapshot)
+        vectors = np.ascontiguousarray(snapshot.vectors[np.asarray(snapshot.has_vector)])
+        source = args.snapshot
+    else:
+        vectors = make_vectors(args.vectors, args.dimensions)
+        source = "synthetic"
+    rng = np.random.default_rng(11)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    mask = rng.random(len(vectors)) < args.filter_fraction if args.filter_fraction else None
+
+    k = args.k
+    baselines = [list(brute_force(vectors, query, k, mask)) for query in queries]
+    curves: Dict[str, List[Dict[str, float]]] = {
+        "brute force": [measure(lambda q: brute_force(vectors, q, k, mask), queries, baselines, k)]
+    }
+
+    nlist = args.nlist or default_nlist(len(vectors))
+    variants = {"ivf-flat": 0}
+    if args.pq_subvectors:
+        variants[f"ivf-pq{args.pq_subvectors}"] = args.pq_subvectors
+    for name, pq_subvectors in variants.items():
+        started = time.perf_counter()
+        index = IVFIndex.build(vectors, nlist=nlist, pq_subvectors=pq_subvectors)
+        print(f"Built {name} ({nlist} lists) in {time.perf_counter() - started:.1f}s")
+        curves[name] = []
+        for nprobe in args.nprobe:
+            def search(query, nprobe=nprobe, index=index):
+                return index.search(query, vectors, k, nprobe=nprobe, row_mask=mask,
+                                    rescore_factor=args.rescore_factor)[0]
+            curves[name].append({"nprobe": nprobe, **measure(search, queries, baselines, k)})
+
+    print(f"{source}: {len(vectors)} x {vectors.shape[1]} vectors, {args.queries} queries"
+          + (f", filter keeps {args.filter_fraction:.1%}" if mask is not None else ""))
+    print(f"{'index':<14} {'nprobe':>7} {f'recall@{k}':>10} {'QPS':>9}")
+    for name, rows in curves.items():
+        for row in rows:
+            print(f"{name:<14} {row.get('nprobe', '-'):>7} {row['recall']:>10.4f} {row['qps']:>9.1f}")
+
+    if args.plot:
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            raise SystemExit("--plot requires matplotlib (pip install matplotlib)")
+        fig, ax = plt.subplots(figsize=(7, 5))
+        for name, rows in curves.items():
+            ax.plot([r["recall"] for r in rows], [r["qps"] for r in rows], marker="o", label=name)
+        ax.set_xlabel(f"recall@{k}")
+        ax.set_ylabel("queries per second")
+        ax.set_yscale("log")
+        ax.set_title(f"{source}: {len(vectors)} x {vectors.shape[1]}")
+        ax.grid(True, which="both", alpha=0.3)
+        ax.legend()
+        fig.savefig(args.plot, dpi=120, bbox_inches="tight")
+        print(f"Wrote {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark complete_embedding_pipeline throughput with and without batched
+embedding requests.
+
+Runs CompletEmbeddingPipeline.process_batch_complete (dry run) over synthetic
+product documents against a simulated embeddings endpoint whose latency is a
+fixed per-request round trip plus a per-token cost, so the numbers reflect
+request overhead rather than OpenAI's queueing on the day.
+
+Usage:
+  python -m scripts.benchmark_embedding_batching --documents 200 --request-latency-ms 150
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from scripts.complete_embedding_pipeline import (
+    CompletEmbeddingPipeline,
+    DEFAULT_EMBEDDING_BATCH_SIZE,
+    estimate_tokens,
+)
+
+
+class SimulatedEmbeddings:
+    """Stand-in for client.embeddings with a request + per-token latency model."""
+
+    def __init__(self, dimension: int, request_latency: float, per_token_latency: float):
+        self.dimension = dimension
+        self.request_latency = request_latency
+        self.per_token_latency = per_token_latency
+        self.requests = 0
+
+    def create(self, model: str, input: Any, encoding_format: str = "float"):
+        texts = [input] if isinstance(input, str) else list(input)
+        tokens = sum(estimate_tokens(t) for t in texts)
+        time.sleep(self.request_latency + tokens * self.per_token_latency)
+        self.requests += 1
+        vector = [0.0] * self.dimension
+        response = SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=list(vector)) for i in range(len(texts))
+        ])
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+    @property
+    def with_raw_response(self):
+        return self
+
+
+def make_documents(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Generate synthetic catalog documents without embeddings."""
+    rng = random.Random(seed)
+    brands = ["puma", "nike", "fabindia", "boat", "woodland", "biba"]
+    categories = [("Footwear", "Sneakers"), ("Clothing", "Kurtas"), ("Electronics", "Headphones")]
+    docs = []
+    for i in range(count):
+        category, sub_category = rng.choice(categories)
+        docs.append({
+            "_id": i,
+            "title": f"{rng.choice(brands).title()} {sub_category} Model {i}",
+            "brand": rng.choice(brands),
+            "category": category,
+            "sub_category": sub_category,
+            "selling_price_numeric": rng.randint(299, 9999),
+            "description": "Comfortable everyday product with durable build and modern styling " * 3,
+            "product_details": [{"Color": rng.choice(["Black", "Blue", "Red"])}, {"Material": "Cotton"}],
+        })
+    return docs
+
+
+def run(documents: List[Dict[str, Any]], batch_size: int, args: argparse.Namespace) -> Dict[str, float]:
+    embeddings = SimulatedEmbeddings(1536, args.request_latency_ms / 1000, args.per_token_us / 1e6)
+    pipeline = CompletEmbeddingPipeline(
+        embedding_batch_size=batch_size,
+        openai_client=SimpleNamespace(embeddings=embeddings),
+        collection=object(),
+    )
+    start = time.perf_counter()
+    results = pipeline.process_batch_complete(documents, dry_run=True)
+    duration = time.perf_counter() - start
+    return {
+        "embedding_batch_size": batch_size,
+        "requests": embeddings.requests,
+        "embedded": results["embeddings_generated"],
+        "seconds": duration,
+        "docs_per_second": len(documents) / duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-document embedding requests")
+    parser.add_argument("--documents", type=int, default=200, help="Number of synthetic documents")
+    parser.add_argument("--request-latency-ms", type=float, default=150.0, help="Simulated round trip per request")
+    parser.add_argument("--per-token-us", type=float, default=2.0, help="Simulated cost per input token")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, DEFAULT_EMBEDDING_BATCH_SIZE],
+                        help="Embedding batch sizes to compare (1 = previous behaviour)")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    print(f"{'batch':>6} {'requests':>9} {'embedded':>9} {'seconds':>9} {'docs/sec':>10}")
+    for batch_size in args.batch_sizes:
+        row = run(documents, batch_size, args)
+        print(f"{row['embedding_batch_size']:>6} {row['requests']:>9} {row['embedded']:>9} "
+              f"{row['seconds']:>9.2f} {row['docs_per_second']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
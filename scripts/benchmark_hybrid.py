@@ -3,26 +3,30 @@
 Benchmark hybrid retrieval strategies (vector, BM25, hybrid fusion) on Atlas.
 
 - Assumes indexes created by scripts/create_indexes.py
-- Uses OpenAI embeddings to vectorize the query
+- Vectorizes the query with the configured embedding provider (OpenAI by
+  default; --provider hashing for offline runs against a collection embedded
+  with the same provider, see run_embedding_pipeline.py --provider hashing)
 - Evaluates latency and result quality (simple heuristics + optional gold labels)
 
 Environment:
-- OPENAI_API_KEY
+- OPENAI_API_KEY (openai provider)
+- EMBEDDING_PROVIDER (default: openai)
 - MONGODB_URI (direct connection string)
 - DB_NAME (default: ecom_data)
 - COLLECTION_NAME (default: products)
 
 Usage:
-  python scripts/benchmark_hybrid.py --query "iphone 13 128gb" --k 10 --runs 5
+  python -m scripts.benchmark_hybrid --query "iphone 13 128gb" --k 10 --runs 5
 
 If you have a labeled gold set, provide a JSONL with fields:
   {"query": "...", "relevant_ids": ["...", "..."], "k": 10}
 Then run:
-  python scripts/benchmark_hybrid.py --gold gold.jsonl --runs 3
+  python -m scripts.benchmark_hybrid --gold gold.jsonl --runs 3
 """
 
 from __future__ import annotations
 import os
+import asyncio
 import json
 import time
 import argparse
@@ -30,7 +34,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from openai import OpenAI
+
+from app.services.embedding_provider import PROVIDER_OPENAI, PROVIDERS, EmbeddingProvider, create_embedding_provider
 
 load_dotenv()
 
@@ -38,9 +43,11 @@ VECTOR_INDEX_NAME = "openai_embedding_vector_index"
 TEXT_INDEX_NAME = "hybrid_text_index"
 
 
-def embed_query(client: OpenAI, text: str, model: str = "text-embedding-3-small") -> List[float]:
-    resp = client.embeddings.create(model=model, input=text, encoding_format="float")
-    return resp.data[0].embedding
+def embed_query(loop: asyncio.AbstractEventLoop, provider: EmbeddingProvider, text: str) -> Tuple[List[float], float]:
+    # One loop for the whole run: the provider's HTTP client is bound to it
+    start = time.perf_counter()
+    qvec = loop.run_until_complete(provider.embed(text))
+    return qvec, (time.perf_counter() - start) * 1000
 
 
 def run_vector_search(coll, qvec: List[float], k: int) -> Tuple[List[Dict[str, Any]], float]:
@@ -120,8 +127,8 @@ def simple_quality_heuristic(query: str, docs: List[Dict[str, Any]]) -> float:
     return float(score)
 
 
-def evaluate_query(coll, client: OpenAI, query: str, k: int) -> Dict[str, Any]:
-    qvec = embed_query(client, query)
+def evaluate_query(coll, loop: asyncio.AbstractEventLoop, provider: EmbeddingProvider, query: str, k: int) -> Dict[str, Any]:
+    qvec, e_ms = embed_query(loop, provider, query)
 
     v_docs, v_ms = run_vector_search(coll, qvec, k)
     t_docs, t_ms = run_bm25_search(coll, query, k)
@@ -131,6 +138,7 @@ def evaluate_query(coll, client: OpenAI, query: str, k: int) -> Dict[str, Any]:
     return {
         "query": query,
         "latency_ms": {
+            "embed": round(e_ms, 2),
             "vector": round(v_ms, 2),
             "bm25": round(t_ms, 2),
             "fused": round(max(v_ms, t_ms), 2),
@@ -155,6 +163,10 @@ def main():
     parser.add_argument("--k", type=int, default=10, help="Top-K results")
     parser.add_argument("--runs", type=int, default=3, help="Repeat runs for averaging")
     parser.add_argument("--model", type=str, default="text-embedding-3-small", help="Embedding model")
+    parser.add_argument("--provider", choices=PROVIDERS, default=os.environ.get("EMBEDDING_PROVIDER", PROVIDER_OPENAI),
+                        help="Query embedding provider (hashing: offline, deterministic)")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Query vector length")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="Hashing provider: latency per query")
     args = parser.parse_args()
 
     uri = os.environ.get("MONGODB_URI", "mongodb://localhost:27017/")
@@ -164,7 +176,12 @@ def main():
     client = MongoClient(uri)
     coll = client[db][coll_name]
 
-    oai = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    provider = create_embedding_provider(
+        args.provider, model=args.model, dimensions=args.dimensions, api_key=os.environ.get("OPENAI_API_KEY"),
+        local_model_path=os.environ.get("EMBEDDING_LOCAL_MODEL_PATH"),
+        local_model=os.environ.get("EMBEDDING_LOCAL_MODEL"), latency_ms=args.fake_latency_ms,
+    )
+    loop = asyncio.new_event_loop()
 
     if args.gold:
         # Evaluate on a labeled gold set
@@ -178,7 +195,7 @@ def main():
 
                 agg = {"vector": [], "bm25": [], "fused": []}
                 for _ in range(args.runs):
-                    out = evaluate_query(coll, oai, q, k)
+                    out = evaluate_query(coll, loop, provider, q, k)
                     for m in ["vector", "bm25", "fused"]:
                         agg[m].append(out["quality"][m])
 
@@ -190,12 +207,13 @@ def main():
         print(json.dumps({m: sum(totals[m])/len(totals[m]) if totals[m] else 0 for m in totals}, indent=2))
     elif args.query:
         # Ad-hoc evaluation
-        lat_agg = {"vector": [], "bm25": [], "fused": []}
+        lat_agg = {"embed": [], "vector": [], "bm25": [], "fused": []}
         qual_agg = {"vector": [], "bm25": [], "fused": []}
         for _ in range(args.runs):
-            out = evaluate_query(coll, oai, args.query, args.k)
-            for m in ["vector", "bm25", "fused"]:
+            out = evaluate_query(coll, loop, provider, args.query, args.k)
+            for m in lat_agg:
                 lat_agg[m].append(out["latency_ms"][m])
+            for m in qual_agg:
                 qual_agg[m].append(out["quality"][m])
         print(json.dumps({
             "query": args.query,
@@ -204,6 +222,7 @@ def main():
         }, indent=2))
     else:
         print("Provide --query or --gold")
+    loop.close()
 
 
 if __name__ == "__main__":
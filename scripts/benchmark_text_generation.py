@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding-text generation throughput.
+
+First reports single-process docs/sec of the canonical embedding text builder
+(app/domain/embeddings/text_builder.py, behind every entry point) over
+synthetic product documents whose descriptions contain boilerplate,
+electronics specs and product_details like the catalog's, and over the
+golden-file documents of the regression tests.
+
+Then builds the texts once per worker count, splitting the documents into
+contiguous chunks handed to a process pool the same way
+migrate_openai_embedding_text.py --workers hands out _id ranges. Only the CPU
+side is measured (no MongoDB), so the curve shows how far text building
+scales before the database becomes the limit.
+
+Usage:
+  python -m scripts.benchmark_text_generation --documents 50000 --workers 1 2 4 8
+  python -m scripts.benchmark_text_generation --workers 1   # builders only
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app.domain.embeddings.text_builder import EMBEDDING_TEXT_VERSION, build_embedding_text
+from scripts.benchmark_embedding_batching import make_documents
+
+GOLDEN_PATH = Path(__file__).resolve().parent.parent / "tests" / "unit" / "golden" / "embedding_text.json"
+
+DESCRIPTIONS = [
+    "Proudly made in India, this premium quality cotton kurta is perfect for festive wear. Best in class stitching.",
+    "Samsung Galaxy with 8GB RAM and 128GB storage, 6.5 inch display and 5G support. Buy now with free delivery!",
+    "Comfortable everyday sneakers with cushioned sole and breathable mesh upper for long walks",
+    "Handcrafted wooden wall shelf 60x20x15 cm, ideal choice for living rooms. Must have item for every home.",
+    "Description: lightweight backpack with laptop sleeve, water resistant fabric  and padded straps. Read more",
+]
+
+
+def make_text_documents(count: int, seed: int = 11) -> List[Dict[str, Any]]:
+    """Synthetic documents with realistic descriptions and product_details."""
+    rng = random.Random(seed)
+    documents = make_documents(count, seed)
+    for document in documents:
+        document["description"] = rng.choice(DESCRIPTIONS)
+        document["product_details"] = document["product_details"] + [
+            {"RAM": "8 GB"}, {"Internal Storage": "128 GB"}, {"Style Code": f"SC{rng.randint(1, 999)}"}
+        ]
+    return documents
+
+
+def golden_documents(count: int) -> List[Dict[str, Any]]:
+    """The regression-test documents, repeated to count."""
+    cases = json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))["cases"]
+    return [cases[i % len(cases)]["document"] for i in range(count)]
+
+
+def builder_rate(builder: Callable[[Dict[str, Any]], str], documents: List[Dict[str, Any]], repeat: int = 3) -> float:
+    """Best docs/sec of one builder over the documents."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for document in documents:
+            builder(document)
+        best = min(best, time.perf_counter() - started)
+    return len(documents) / best
+
+
+def build_chunk(documents: List[Dict[str, Any]]) -> int:
+    """Build the texts of one chunk (runs in a worker process)."""
+    return sum(1 for document in documents if build_embedding_text(document))
+
+
+def run(documents: List[Dict[str, Any]], workers: int, chunks_per_worker: int) -> float:
+    """Seconds to build every text with this many worker processes."""
+    if workers <= 1:
+        started = time.perf_counter()
+        build_chunk(documents)
+        return time.perf_counter() - started
+
+    chunks = workers * chunks_per_worker
+    size = -(-len(documents) // chunks)
+    parts = [documents[i:i + size] for i in range(0, len(documents), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Warm the pool so process start-up is not counted
+        list(pool.map(build_chunk, [[]] * workers))
+        started = time.perf_counter()
+        built = sum(pool.map(build_chunk, parts))
+        elapsed = time.perf_counter() - started
+    assert built == len(documents)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding text generation speedup versus worker processes")
+    parser.add_argument("--documents", type=int, default=20_000, help="Synthetic documents")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to measure")
+    parser.add_argument("--chunks-per-worker", type=int, default=4, help="Ranges handed out per worker")
+    args = parser.parse_args()
+
+    documents = make_text_documents(args.documents)
+    print(f"{args.documents} documents, {os.cpu_count()} CPUs, text builder v{EMBEDDING_TEXT_VERSION}")
+    print(f"{'documents':<34} {'docs/sec':>10}")
+    print(f"{'synthetic catalog':<34} {builder_rate(build_embedding_text, documents):>10.0f}")
+    if GOLDEN_PATH.exists():
+        golden = golden_documents(args.documents)
+        print(f"{'golden file':<34} {builder_rate(build_embedding_text, golden):>10.0f}")
+    print()
+    print(f"{'workers':>7} {'seconds':>9} {'docs/sec':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        seconds = run(documents, workers, args.chunks_per_worker)
+        baseline = baseline or seconds
+        print(f"{workers:>7} {seconds:>9.2f} {args.documents / seconds:>10.0f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
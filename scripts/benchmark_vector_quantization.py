@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Benchmark recall@k and latency of quantized vector search against full precision.
+
+Atlas mode (default) samples stored product vectors as queries and compares,
+for each index (full precision ANN, scalar int8, binary), the top k returned by
+ProductRepository.search_products_vector with the exact (ENN) top k of the
+full-precision index. Quantized modes are reported both raw (quantized scores
+only) and rescored against the stored full-precision vectors. The indexes are
+created by scripts/create_indexes.py --quantization all.
+
+Offline mode emulates int8 scalar and binary quantization with numpy over
+synthetic clustered vectors, to compare the modes without an Atlas cluster;
+--snapshot uses the real vectors of an exported catalog snapshot instead
+(scripts/export_catalog_snapshot.py).
+
+--compare-dimensions adds reduced-dimension vectors to the comparison: in
+Atlas mode the shadow fields built by migrate_embedding_dimensions.py
+(openai_embedding_<dims>, index <index>_<dims>) are queried with the sampled
+documents' own shadow vectors and scored against the same full-dimension
+baseline; offline, the synthetic vectors are truncated and re-normalized
+(synthetic vectors are not trained to keep their meaning when shortened,
+so offline numbers are a lower bound).
+
+Usage:
+  python -m scripts.benchmark_vector_quantization --queries 100 --k 10
+  python -m scripts.benchmark_vector_quantization --offline --vectors 50000 --k 10
+  python -m scripts.benchmark_vector_quantization --offline --snapshot data/catalog_snapshot
+  python -m scripts.benchmark_vector_quantization --compare-dimensions 512 256
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.catalog_snapshot import CatalogSnapshot
+from app.db.vector_codec import vector_to_array
+from app.db.vector_index import (
+    QUANTIZATION_BINARY, QUANTIZATION_MODES, QUANTIZATION_NONE, QUANTIZATION_SCALAR,
+    VectorSearchConfig, dimension_variant, vector_search_stage
+)
+from app.repositories.product_repository import ProductRepository
+
+load_dotenv()
+
+PRIMARY_DIMENSIONS = 1536
+
+
+def recall_at_k(results: Sequence[Any], baseline: Sequence[Any], k: int) -> float:
+    """Fraction of the baseline top k found in the top k results."""
+    if not baseline:
+        return 1.0
+    return len(set(results[:k]) & set(baseline[:k])) / min(k, len(baseline))
+
+
+def summarize(recalls: List[float], latencies: List[float]) -> Dict[str, float]:
+    return {
+        "recall": round(float(np.mean(recalls)), 4) if recalls else 0.0,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2) if latencies else 0.0,
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def print_report(title: str, k: int, rows: Dict[str, Dict[str, float]]) -> None:
+    print(title)
+    print(f"{'mode':<18} {f'recall@{k}':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode, row in rows.items():
+        print(f"{mode:<18} {row['recall']:>10.4f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f}")
+
+
+# --- Offline emulation -------------------------------------------------------
+
+def make_vectors(count: int, dimensions: int, clusters: int = 64, seed: int = 7) -> np.ndarray:
+    """Unit vectors drawn around random centroids, like embeddings of a catalog."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class ScalarQuantizer:
+    """Per-dimension min/max int8 quantization."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.low = vectors.min(axis=0)
+        self.scale = (vectors.max(axis=0) - self.low) / 255.0
+        self.scale[self.scale == 0] = 1.0
+        self.codes = self.encode(vectors)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return (np.round((vectors - self.low) / self.scale) - 128).astype(np.int8)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        # Dot product of the dequantized vectors with the float query
+        return (self.codes.astype(np.float32) + 128) @ (query * self.scale) + float(self.low @ query)
+
+
+class BinaryQuantizer:
+    """One sign bit per dimension, scored by Hamming distance."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.bits = np.packbits(vectors > 0, axis=1)
+        self.popcount = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        query_bits = np.packbits(query > 0)
+        distance = self.popcount[np.bitwise_xor(self.bits, query_bits)].sum(axis=1)
+        return -distance.astype(np.float32)
+
+
+def run_offline(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    if args.snapshot:
+        snapshot = CatalogSnapshot.load(args.snapshot)
+        vectors = np.ascontiguousarray(snapshot.vectors[np.asarray(snapshot.has_vector)])
+    else:
+        vectors = make_vectors(args.vectors, args.dimensions)
+    rng = np.random.default_rng(11)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    quantizers: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+        QUANTIZATION_SCALAR: ScalarQuantizer(vectors).scores,
+        QUANTIZATION_BINARY: BinaryQuantizer(vectors).scores,
+    }
+    k, candidates = args.k, args.k * args.rescore_factor
+    truncated = {}
+    for dimensions in args.compare_dimensions:
+        shortened = vectors[:, :dimensions]
+        truncated[dimensions] = shortened / np.linalg.norm(shortened, axis=1, keepdims=True)
+
+    def top(scores: np.ndarray, n: int) -> np.ndarray:
+        best = np.argpartition(-scores, n)[:n]
+        return best[np.argsort(-scores[best])]
+
+    measurements: Dict[str, List[List[float]]] = {}
+
+    def record(mode: str, recall: float, seconds: float) -> None:
+        recalls, latencies = measurements.setdefault(mode, [[], []])
+        recalls.append(recall)
+        latencies.append(seconds)
+
+    for query in queries:
+        started = time.perf_counter()
+        baseline = top(vectors @ query, k)
+        record(QUANTIZATION_NONE, 1.0, time.perf_counter() - started)
+
+        for mode, scores in quantizers.items():
+            started = time.perf_counter()
+            raw = top(scores(query), k)
+            record(f"{mode} (raw)", recall_at_k(list(raw), list(baseline), k), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            shortlist = top(scores(query), candidates)
+            rescored = shortlist[np.argsort(-(vectors[shortlist] @ query))][:k]
+            record(f"{mode} (rescored)", recall_at_k(list(rescored), list(baseline), k), time.perf_counter() - started)
+
+        for dimensions, shortened in truncated.items():
+            started = time.perf_counter()
+            reduced = top(shortened @ query[:dimensions], k)
+            record(f"{dimensions}d (truncated)", recall_at_k(list(reduced), list(baseline), k), time.perf_counter() - started)
+
+    return {mode: summarize(recalls, latencies) for mode, (recalls, latencies) in measurements.items()}
+
+
+# --- Atlas -------------------------------------------------------------------
+
+async def run_atlas(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    connection_string = (
+        args.connection_string or
+        os.environ.get("MONGODB_URI") or
+        os.environ.get("MONGODB_ATLAS_URI") or
+        "mongodb://localhost:27017/"
+    )
+    client = AsyncIOMotorClient(connection_string)
+    collection = client[os.environ.get("DB_NAME", "ecom_data")][os.environ.get("COLLECTION_NAME", "products")]
+    config = VectorSearchConfig(index_name=args.index_name, rescore_factor=args.rescore_factor)
+    repository = ProductRepository(collection, vector_search=config)
+    reduced_repositories = {
+        dimensions: ProductRepository(collection, vector_search=VectorSearchConfig(
+            index_name=dimension_variant(args.index_name, dimensions, PRIMARY_DIMENSIONS),
+            path=dimension_variant(config.path, dimensions, PRIMARY_DIMENSIONS),
+        ))
+        for dimensions in args.compare_dimensions
+    }
+
+    try:
+        # Documents with every compared field, so each space is queried with the same products
+        paths = [config.path] + [repo.vector_search.path for repo in reduced_repositories.values()]
+        sample = await collection.aggregate([
+            {"$match": {path: {"$exists": True, "$ne": []} for path in paths}},
+            {"$sample": {"size": args.queries}},
+            {"$project": {path: 1 for path in paths}},
+        ]).to_list(length=args.queries)
+
+        measurements: Dict[str, List[List[float]]] = {}
+
+        def record(mode: str, recall: float, seconds: float) -> None:
+            recalls, latencies = measurements.setdefault(mode, [[], []])
+            recalls.append(recall)
+            latencies.append(seconds)
+
+        async def raw_ids(index: str, query: List[float]) -> List[str]:
+            pipeline = [vector_search_stage(index, config.path, query, args.k, num_candidates=args.k * 20),
+                        {"$project": {"_id": 1}}]
+            return [str(document["_id"]) for document in await collection.aggregate(pipeline).to_list(length=args.k)]
+
+        for document in sample:
+            query = vector_to_array(document[config.path]).tolist()
+            exact = [vector_search_stage(config.index_for(QUANTIZATION_NONE), config.path, query, args.k, exact=True),
+                     {"$project": {"_id": 1}}]
+            baseline = [str(document["_id"]) for document in await collection.aggregate(exact).to_list(length=args.k)]
+
+            for mode in QUANTIZATION_MODES:
+                if mode != QUANTIZATION_NONE:
+                    started = time.perf_counter()
+                    raw = await raw_ids(config.index_for(mode), query)
+                    record(f"{mode} (raw)", recall_at_k(raw, baseline, args.k), time.perf_counter() - started)
+
+                started = time.perf_counter()
+                results = await repository.search_products_vector(query, limit=args.k, quantization=mode)
+                label = "none (ANN)" if mode == QUANTIZATION_NONE else f"{mode} (rescored)"
+                record(label, recall_at_k([p["_id"] for p in results], baseline, args.k), time.perf_counter() - started)
+
+            for dimensions, reduced_repository in reduced_repositories.items():
+                reduced_query = vector_to_array(document[reduced_repository.vector_search.path]).tolist()
+                started = time.perf_counter()
+                results = await reduced_repository.search_products_vector(reduced_query, limit=args.k)
+                record(f"{dimensions}d (ANN)", recall_at_k([p["_id"] for p in results], baseline, args.k),
+                       time.perf_counter() - started)
+
+        return {mode: summarize(recalls, latencies) for mode, (recalls, latencies) in measurements.items()}
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and latency of quantized vector search")
+    parser.add_argument("--k", type=int, default=10, help="Results compared per query")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Quantized candidates fetched per result")
+    parser.add_argument("--index-name", default="vector_index", help="Full-precision vector index name")
+    parser.add_argument("--connection-string", type=str, help="MongoDB connection string")
+    parser.add_argument("--compare-dimensions", type=int, nargs="*", default=[],
+                        help="Also measure reduced-dimension vectors (shadow fields) of these sizes")
+    parser.add_argument("--offline", action="store_true", help="Emulate quantization locally on synthetic vectors")
+    parser.add_argument("--vectors", type=int, default=50_000, help="Synthetic vectors (offline)")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Synthetic vector dimensions (offline)")
+    parser.add_argument("--snapshot", type=str, help="Catalog snapshot to take vectors from (offline)")
+    args = parser.parse_args()
+
+    if args.offline:
+        rows = run_offline(args)
+        title = f"Offline emulation: {args.vectors} x {args.dimensions} vectors, {args.queries} queries"
+    else:
+        rows = asyncio.run(run_atlas(args))
+        title = f"Atlas: {args.queries} sampled queries, baseline = exact full-precision top {args.k}"
+    print_report(title, args.k, rows)
+
+
+if __name__ == "__main__":
+    main()
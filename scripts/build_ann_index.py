@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Build the IVF approximate nearest neighbour index of a catalog snapshot.
+
+Clusters the snapshot vectors (spherical k-means) into inverted lists, with
+optional product quantization, and writes the index into the snapshot's ivf/
+directory (app/domain/search/ivf.py). The local search backend maps it with
+the snapshot (SEARCH_SNAPSHOT_PATH) and scans SEARCH_ANN_NPROBE lists per
+query instead of every vector. Re-run after each export: an index built over
+another export is ignored. Measure recall against QPS with
+scripts/benchmark_ann.py before picking nlist / nprobe.
+
+Usage:
+  python -m scripts.build_ann_index --snapshot data/catalog_snapshot
+  python -m scripts.build_ann_index --snapshot data/catalog_snapshot --nlist 4096 --pq-subvectors 96
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import shutil
+import argparse
+
+import numpy as np
+
+# Add project root to path so we can import the domain module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.catalog_snapshot import ANN_DIR, CatalogSnapshot
+from app.domain.search.ivf import IVFIndex, default_nlist
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the IVF index of a catalog snapshot")
+    parser.add_argument("--snapshot", type=str, default="data/catalog_snapshot", help="Snapshot directory")
+    parser.add_argument("--nlist", type=int, default=0, help="Inverted lists (0 = about 4 * sqrt(vectors))")
+    parser.add_argument("--pq-subvectors", type=int, default=0,
+                        help="Product quantization subspaces, dividing the dimension (0 = no quantization)")
+    parser.add_argument("--iterations", type=int, default=10, help="K-means rounds")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    snapshot = CatalogSnapshot.load(args.snapshot)
+    vectors = int(np.count_nonzero(snapshot.has_vector))
+    nlist = args.nlist or default_nlist(vectors)
+    print(f"Indexing {vectors:,} x {snapshot.dimensions}d vectors of {args.snapshot} into {nlist:,} lists...")
+
+    start = time.perf_counter()
+    index = IVFIndex.build(
+        snapshot.vectors,
+        has_vector=snapshot.has_vector,
+        nlist=nlist,
+        pq_subvectors=args.pq_subvectors,
+        iterations=args.iterations,
+        seed=args.seed,
+    )
+    # Ties the index to this export; the backend ignores it after a re-export
+    index.params["snapshot_created_at"] = snapshot.manifest.get("created_at")
+
+    target = os.path.join(args.snapshot, ANN_DIR)
+    staging = f"{target}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    index.save(staging)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    stats = index.get_stats()
+    print(
+        f"Wrote {stats['type']} index ({stats['nlist']:,} lists, largest {stats['largest_list']:,} rows) "
+        f"to {target} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
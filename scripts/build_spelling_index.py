@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Build the SymSpell-style spelling correction index from the catalog vocabulary.
+
+Tokens are collected from title, brand, category, sub_category and
+openai_embedding_text, weighted by field and frequency, and written as a
+directory of flat arrays that the API memory-maps at startup
+(SPELLING_INDEX_PATH).
+
+Env (.env):
+- MONGODB_URI (default: mongodb://localhost:27017/)
+- DB_NAME (default: ecom_data)
+- COLLECTION_NAME (default: products)
+
+Usage:
+  python -m scripts.build_spelling_index --output data/spelling_index
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import argparse
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+# Add project root to path so we can import the domain module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.domain.search.spelling import SpellingIndex, VOCABULARY_FIELDS, extract_vocabulary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the catalog spelling correction index")
+    parser.add_argument("--output", type=str, default="data/spelling_index", help="Output directory")
+    parser.add_argument("--max-edit-distance", type=int, default=2, help="Largest correctable edit distance")
+    parser.add_argument("--prefix-length", type=int, default=7, help="Prefix length used for deletes")
+    parser.add_argument("--min-count", type=int, default=2, help="Drop words rarer than this")
+    parser.add_argument("--limit", type=int, default=0, help="Only scan this many documents (0 = all)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    uri = os.environ.get("MONGODB_URI", "mongodb://localhost:27017/")
+    db_name = os.environ.get("DB_NAME", "ecom_data")
+    coll_name = os.environ.get("COLLECTION_NAME", "products")
+
+    client = MongoClient(uri)
+    coll = client[db_name][coll_name]
+    print(f"Scanning {db_name}.{coll_name} for vocabulary...")
+
+    start = time.perf_counter()
+    projection = {field: 1 for field in VOCABULARY_FIELDS}
+    projection["_id"] = 0
+    cursor = coll.find({}, projection=projection, batch_size=2000)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    counts = extract_vocabulary(cursor)
+    client.close()
+    print(f"Collected {len(counts):,} distinct tokens in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index = SpellingIndex.build(
+        counts,
+        max_edit_distance=args.max_edit_distance,
+        prefix_length=args.prefix_length,
+        min_count=args.min_count,
+    )
+    index.save(args.output)
+    print(
+        f"Wrote {len(index):,} words / {len(index.delete_hashes):,} deletes to {args.output} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,14 @@ Complete Embedding Pipeline: Generate embedding text AND OpenAI embeddings
 
 This script:
 1. Generates structured embedding text using build_embedding_text()
-2. Creates OpenAI embeddings from that text using text-embedding-3-small
+2. Creates OpenAI embeddings from that text using text-embedding-3-small,
+   sending many texts per request (bounded by input count and estimated tokens)
 3. Stores both openai_embedding_text and openai_embedding in MongoDB
 4. Processes in configurable batches for optimal performance
+5. Embeds each distinct text once, reusing vectors from the embedding_cache
+   collection for texts that were embedded before
+6. Records each run as a job in embedding_jobs with an `_id` checkpoint, so an
+   interrupted run is resumed (automatically, or with --resume JOB_ID)
 """
 
 import os
@@ -14,14 +19,30 @@ import sys
 import argparse
 import logging
 import time
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from bson import ObjectId
 from pymongo import MongoClient, UpdateOne
 from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 import openai
 from openai import OpenAI
 
-from scripts.embedding_text_generator import build_embedding_text, should_regenerate_embedding
+from app.core.config import get_settings
+from app.db.vector_codec import STORAGE_ARRAY, STORAGE_FORMATS, VectorCodec, vector_dimensions
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_cache_repository import (
+    EMBEDDING_CACHE_COLLECTION, cache_key, cache_update, group_texts_by_hash
+)
+from app.repositories.embedding_job_repository import (
+    JOB_COLLECTION, JOB_COMPLETED, JOB_FAILED, JOB_INTERRUPTED, JOB_RUNNING, RESUMABLE_STATUSES,
+    new_job_document, progress_update
+)
+from app.repositories.embedding_progress_repository import DEAD_LETTER_COLLECTION, dead_letter_update
+from app.services.embedding_pipeline import chunk_for_embedding
+from app.services.rate_limiter import (
+    DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, RateLimiter, create_embeddings_sync
+)
+from scripts.embedding_text_generator import SOURCE_FIELDS, build_embedding_text
 
 # Load environment variables
 load_dotenv()
@@ -34,20 +55,77 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request;
+# stay below both so one oversized catalog entry cannot fail a whole request
+DEFAULT_EMBEDDING_BATCH_SIZE = 256
+DEFAULT_MAX_BATCH_TOKENS = 200_000
+
+# Failed attempts after which a document stays in the dead-letter collection
+DEFAULT_MAX_ATTEMPTS = 3
+JOB_SOURCE = "complete_embedding_pipeline"
+
+
 class CompletEmbeddingPipeline:
     """Complete pipeline for generating embedding text and OpenAI embeddings."""
     
-    def __init__(self, connection_string: Optional[str] = None):
-        """Initialize the complete embedding pipeline."""
+    def __init__(self, connection_string: Optional[str] = None,
+                 embedding_batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+                 max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 openai_client: Optional[OpenAI] = None,
+                 collection=None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 jobs=None,
+                 dead_letters=None,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 embedding_cache=None,
+                 use_cache: bool = True,
+                 vector_storage: str = STORAGE_ARRAY,
+                 embedding_dimension: int = 1536):
+        """Initialize the complete embedding pipeline.
+        
+        Args:
+            connection_string: MongoDB connection string
+            embedding_batch_size: Maximum inputs per embeddings request
+            max_batch_tokens: Maximum estimated tokens per embeddings request
+            openai_client: Preconfigured OpenAI client (defaults to OPENAI_API_KEY)
+            collection: Preconfigured collection; skips connecting to MongoDB
+            rate_limiter: RPM/TPM limiter for the embeddings quota
+            jobs: embedding_jobs collection storing checkpoints and counters
+            dead_letters: Collection recording documents that failed
+            max_attempts: Failures before a document is no longer retried
+            embedding_cache: Collection of vectors keyed by model, dimensions and text hash
+            use_cache: Read and fill the embedding cache
+            vector_storage: "array" (BSON doubles) or "binary" (packed float32 BinData)
+            embedding_dimension: Vector length; below the model's native size the
+                API returns shortened vectors
+        """
         
         # Initialize OpenAI client
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
+        if openai_client is None:
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is required")
+            openai_client = OpenAI(api_key=api_key)
         
-        self.openai_client = OpenAI(api_key=api_key)
+        self.openai_client = openai_client
         self.model_name = "text-embedding-3-small"
-        self.embedding_dimension = 1536
+        self.embedding_dimension = embedding_dimension
+        reduced = EmbeddingFingerprint.reduced_dimensions(self.model_name, embedding_dimension)
+        self._dimension_kwargs = {"dimensions": reduced} if reduced else {}
+        self.embedding_batch_size = max(1, embedding_batch_size)
+        self.max_batch_tokens = max_batch_tokens
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_attempts = max_attempts
+        self.jobs = jobs
+        self.dead_letters = dead_letters
+        self.embedding_cache = embedding_cache
+        self.use_cache = use_cache
+        self.vector_codec = VectorCodec(vector_storage)
+        
+        if collection is not None:
+            self.client = None
+            self.collection = collection
+            return
         
         # Get MongoDB connection
         if not connection_string:
@@ -65,6 +143,9 @@ class CompletEmbeddingPipeline:
         
         self.db = self.client[self.db_name]
         self.collection = self.db[self.collection_name]
+        self.jobs = self.db[JOB_COLLECTION]
+        self.dead_letters = self.db[DEAD_LETTER_COLLECTION]
+        self.embedding_cache = self.db[EMBEDDING_CACHE_COLLECTION]
         
         logger.info(f"Connected to MongoDB: {self.db_name}.{self.collection_name}")
         logger.info(f"OpenAI Model: {self.model_name}")
@@ -77,53 +158,206 @@ class CompletEmbeddingPipeline:
             logger.error(f"MongoDB connection failed: {e}")
             raise
     
+    def _validate_embedding(self, embedding: Any) -> Optional[List[float]]:
+        """Return the embedding if it is a finite float vector, else None."""
+        if len(embedding) != self.embedding_dimension:
+            logger.warning(f"Unexpected embedding dimension: {len(embedding)}, expected {self.embedding_dimension}")
+        
+        # Validate embedding format
+        if not isinstance(embedding, list) or not all(isinstance(x, (int, float)) for x in embedding):
+            logger.error(f"Invalid embedding format: {type(embedding)}")
+            return None
+        
+        # Ensure all values are finite
+        if not all(isinstance(x, (int, float)) and not (x != x) for x in embedding):  # NaN check
+            logger.error("Embedding contains NaN or infinite values")
+            return None
+        
+        return embedding
+    
     def generate_openai_embedding(self, text: str, max_retries: int = 3) -> Optional[List[float]]:
         """Generate OpenAI embedding with retry logic."""
+        return self.generate_openai_embeddings_batch([text], max_retries)[0]
+    
+    def generate_openai_embeddings_batch(self, texts: List[str], max_retries: int = 3) -> List[Optional[List[float]]]:
+        """Embed several texts in one multi-input request with retry logic.
+        
+        Vectors are mapped back to inputs by the index OpenAI returns. If the
+        request is rejected (e.g. one input is too long) it is split in half so
+        only the offending input fails.
+        
+        Args:
+            texts: Texts to embed
+            max_retries: Attempts per request
+            
+        Returns:
+            One embedding (or None on failure) per input text, in order
+        """
+        if not texts:
+            return []
         
         for attempt in range(max_retries):
             try:
-                response = self.openai_client.embeddings.create(
+                # The limiter paces requests and handles 429s with the server's reset time
+                response = create_embeddings_sync(
+                    self.openai_client,
+                    self.rate_limiter,
                     model=self.model_name,
-                    input=text,
-                    encoding_format="float"
+                    input=texts,
+                    encoding_format="float",
+                    **self._dimension_kwargs
                 )
                 
-                embedding = response.data[0].embedding
-                
-                if len(embedding) != self.embedding_dimension:
-                    logger.warning(f"Unexpected embedding dimension: {len(embedding)}, expected {self.embedding_dimension}")
-                
-                # Validate embedding format
-                if not isinstance(embedding, list) or not all(isinstance(x, (int, float)) for x in embedding):
-                    logger.error(f"Invalid embedding format: {type(embedding)}")
-                    return None
-                
-                # Ensure all values are finite
-                if not all(isinstance(x, (int, float)) and not (x != x) for x in embedding):  # NaN check
-                    logger.error("Embedding contains NaN or infinite values")
-                    return None
-                
-                return embedding
+                embeddings: List[Optional[List[float]]] = [None] * len(texts)
+                for item in response.data:
+                    embeddings[item.index] = self._validate_embedding(item.embedding)
+                return embeddings
                 
             except openai.RateLimitError as e:
-                wait_time = (2 ** attempt) * 1  # Exponential backoff: 1, 2, 4 seconds
-                logger.warning(f"Rate limit hit, waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                time.sleep(wait_time)
+                logger.error(f"Rate limit still exceeded after limiter retries: {e}")
+                return [None] * len(texts)
+                
+            except openai.BadRequestError as e:
+                if len(texts) == 1:
+                    logger.error(f"OpenAI rejected input: {e}")
+                    return [None]
+                middle = len(texts) // 2
+                logger.warning(f"OpenAI rejected a {len(texts)}-input batch, splitting: {e}")
+                return (self.generate_openai_embeddings_batch(texts[:middle], max_retries) +
+                        self.generate_openai_embeddings_batch(texts[middle:], max_retries))
                 
             except openai.APIError as e:
                 logger.error(f"OpenAI API error: {e}")
                 if attempt == max_retries - 1:
-                    return None
+                    return [None] * len(texts)
                 time.sleep(1)
                 
             except Exception as e:
-                logger.error(f"Unexpected error generating embedding: {e}")
+                logger.error(f"Unexpected error generating embeddings: {e}")
                 if attempt == max_retries - 1:
-                    return None
+                    return [None] * len(texts)
                 time.sleep(1)
         
-        logger.error(f"Failed to generate embedding after {max_retries} attempts")
-        return None
+        logger.error(f"Failed to generate {len(texts)} embeddings after {max_retries} attempts")
+        return [None] * len(texts)
+    
+    def dead_letter(self, doc_id: Any, stage: str, error: str, embedding_text: Optional[str] = None,
+                    dry_run: bool = False) -> None:
+        """Record a failed document so later runs stop retrying it after max_attempts."""
+        if self.dead_letters is None or dry_run:
+            return
+        try:
+            self.dead_letters.update_one({"_id": doc_id}, dead_letter_update(stage, error, embedding_text), upsert=True)
+        except Exception as e:
+            logger.error(f"Failed to dead-letter document {doc_id}: {e}")
+    
+    def cached_embeddings(self, text_hashes: List[str]) -> Dict[str, List[float]]:
+        """Vectors already embedded for these text hashes (text hash -> vector)."""
+        if self.embedding_cache is None or not self.use_cache or not text_hashes:
+            return {}
+        keys = [cache_key(self.model_name, self.embedding_dimension, text_hash) for text_hash in text_hashes]
+        try:
+            cursor = self.embedding_cache.find({"_id": {"$in": keys}}, {"text_hash": 1, "embedding": 1})
+            return {
+                doc["text_hash"]: VectorCodec.decode(doc["embedding"])
+                for doc in cursor
+                if vector_dimensions(doc.get("embedding")) == self.embedding_dimension
+            }
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, embedding all texts: {e}")
+            return {}
+    
+    def cache_embeddings(self, vectors: Dict[str, List[float]], dry_run: bool = False) -> None:
+        """Store new vectors by text hash so identical texts are never embedded again."""
+        if self.embedding_cache is None or not self.use_cache or not vectors or dry_run:
+            return
+        try:
+            self.embedding_cache.bulk_write([
+                UpdateOne(
+                    {"_id": cache_key(self.model_name, self.embedding_dimension, text_hash)},
+                    cache_update(self.model_name, self.embedding_dimension, text_hash, self.vector_codec.encode(vector)),
+                    upsert=True
+                )
+                for text_hash, vector in vectors.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to cache {len(vectors)} embeddings: {e}")
+    
+    def exhausted_ids(self, doc_ids: List[Any]) -> set:
+        """Ids among doc_ids that already failed max_attempts times."""
+        if self.dead_letters is None or not doc_ids:
+            return set()
+        cursor = self.dead_letters.find(
+            {"_id": {"$in": doc_ids}, "attempts": {"$gte": self.max_attempts}}, {"_id": 1}
+        )
+        return {doc["_id"] for doc in cursor}
+    
+    def start_job(self, params: Dict[str, Any], total: int, resume_job_id: Optional[str] = None,
+                  restart: bool = False) -> Optional[Dict[str, Any]]:
+        """Load the job to resume, or create a new one.
+        
+        Args:
+            params: Parameters for a new job
+            total: Documents a new job is expected to read
+            resume_job_id: Resume this job explicitly
+            restart: Start a new job even if an unfinished one exists
+        
+        Returns:
+            Job document (None without a jobs collection)
+        """
+        if self.jobs is None:
+            return None
+        
+        job = None
+        if resume_job_id:
+            job = self.jobs.find_one({"_id": ObjectId(resume_job_id) if ObjectId.is_valid(resume_job_id) else resume_job_id})
+            if not job:
+                raise ValueError(f"Embedding job not found: {resume_job_id}")
+            if job["status"] == JOB_COMPLETED:
+                raise ValueError(f"Embedding job {resume_job_id} is already completed")
+        elif not restart:
+            # Heartbeat age after which a "running" job is considered dead and resumable
+            stale_seconds = get_settings().embedding_job_stale_seconds
+            job = self.jobs.find_one(
+                {
+                    "source": JOB_SOURCE,
+                    "$or": [
+                        {"status": {"$in": list(RESUMABLE_STATUSES)}},
+                        {"status": JOB_RUNNING, "heartbeat_at": {"$lt": time.time() - stale_seconds}}
+                    ]
+                },
+                sort=[("created_at", -1)]
+            )
+        
+        if job is None:
+            job = new_job_document(JOB_SOURCE, params, total)
+            self.jobs.insert_one(job)
+            logger.info(f"Created embedding job {job['_id']}")
+        else:
+            logger.info(f"Resuming embedding job {job['_id']} after _id {job.get('last_id')}")
+        
+        self.jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": JOB_RUNNING, "started_at": time.time(), "heartbeat_at": time.time(), "error": None},
+             "$inc": {"runs": 1}}
+        )
+        return job
+    
+    def save_job_progress(self, job: Optional[Dict[str, Any]], last_id: Any, counters: Dict[str, Any],
+                          throughput: float) -> None:
+        """Persist the checkpoint, cumulative counters and heartbeat."""
+        if job is None:
+            return
+        self.jobs.update_one({"_id": job["_id"]}, progress_update(last_id, counters, throughput))
+    
+    def finish_job(self, job: Optional[Dict[str, Any]], status: str, error: Optional[str] = None) -> None:
+        """Mark the job completed, failed or interrupted."""
+        if job is None:
+            return
+        self.jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": status, "error": error, "finished_at": time.time(), "heartbeat_at": time.time()}}
+        )
     
     def process_batch_complete(self, documents: List[Dict[str, Any]], dry_run: bool = False) -> Dict[str, int]:
         """Process a batch with complete embedding generation (text + vectors)."""
@@ -134,70 +368,50 @@ class CompletEmbeddingPipeline:
             "embeddings_generated": 0,
             "updated": 0,
             "skipped": 0,
+            "backfilled": 0,
+            "cache_hits": 0,
+            "duplicates": 0,
+            "api_inputs_saved": 0,
             "errors": 0
         }
         
         updates = []
-        progress_counter = 0
+        update_docs: List[Tuple[Any, str]] = []
+        
+        # 1. Generate embedding text and collect documents that need a new vector
+        pending_ids: List[Any] = []
+        pending_texts: List[str] = []
         
         for doc in documents:
             try:
                 results["processed"] += 1
-                progress_counter += 1
                 doc_id = doc["_id"]
                 
-                # 1. Generate embedding text
                 new_embedding_text = build_embedding_text(doc)
                 results["text_generated"] += 1
                 
-                # 2. Check if we need to update
-                current_embedding_text = doc.get("openai_embedding_text", "")
-                current_embedding = doc.get("openai_embedding", [])
-                
-                # Skip if embedding text hasn't changed and embedding exists
-                if (new_embedding_text == current_embedding_text and 
-                    current_embedding and len(current_embedding) == self.embedding_dimension):
+                # Compare the text hash and version; the stored text and vector are not read
+                status = EmbeddingFingerprint.status(
+                    doc, new_embedding_text, self.model_name, dimension=self.embedding_dimension
+                )
+                if status == EmbeddingFingerprint.SKIP:
                     results["skipped"] += 1
                     logger.debug(f"Skipping {doc_id}: embedding unchanged")
-                    
-                    # Show progress every 10 records (including skipped)
-                    if progress_counter % 10 == 0:
-                        logger.info(f"✅ Progress: {progress_counter}/{len(documents)} records processed (skipped: {doc_id})")
                     continue
-                
-                # 3. Generate OpenAI embedding
-                embedding = self.generate_openai_embedding(new_embedding_text)
-                
-                if embedding:
-                    results["embeddings_generated"] += 1
-                    
+                if status == EmbeddingFingerprint.BACKFILL:
+                    # Legacy vector is current; store its fingerprint instead of re-embedding
+                    results["backfilled"] += 1
                     if not dry_run:
                         updates.append(UpdateOne(
                             {"_id": doc_id},
-                            {
-                                "$set": {
-                                    "openai_embedding_text": new_embedding_text,
-                                    "openai_embedding": embedding,
-                                    "embedding_updated_at": time.time(),
-                                    "embedding_model": self.model_name
-                                }
-                            }
+                            {"$set": EmbeddingFingerprint.fields(new_embedding_text, self.model_name, self.embedding_dimension)}
                         ))
-                    
-                    results["updated"] += 1
-                    logger.debug(f"Generated embedding for {doc_id}: {len(embedding)} dimensions")
-                    
-                    # Show success message every 10 records
-                    if progress_counter % 10 == 0:
-                        logger.info(f"✅ Progress: {progress_counter}/{len(documents)} records processed successfully (latest: {doc_id})")
-                else:
-                    results["errors"] += 1
-                    logger.error(f"Failed to generate embedding for {doc_id}")
-                    
-                    # Show progress even for errors
-                    if progress_counter % 10 == 0:
-                        logger.info(f"⚠️  Progress: {progress_counter}/{len(documents)} records processed (error on: {doc_id})")
-                    
+                        update_docs.append((doc_id, new_embedding_text))
+                    continue
+                
+                pending_ids.append(doc_id)
+                pending_texts.append(new_embedding_text)
+                
             except Exception as e:
                 results["errors"] += 1
                 # Don't include the full document object in error logging to avoid printing embeddings
@@ -207,15 +421,64 @@ class CompletEmbeddingPipeline:
                 if len(error_msg) > 200:
                     error_msg = error_msg[:200] + "... [truncated]"
                 logger.error(f"Error processing document {doc_id}: {error_msg}")
+                self.dead_letter(doc_id, "text", error_msg, dry_run=dry_run)
+        
+        # 2. Embed each distinct text once: identical texts (variants, reseller
+        #    copies) share one vector, and previously embedded texts come from the cache
+        groups = group_texts_by_hash(pending_texts)
+        vectors: Dict[str, Optional[List[float]]] = dict(self.cached_embeddings(list(groups)))
+        misses = [text_hash for text_hash in groups if text_hash not in vectors]
+        miss_texts = [pending_texts[groups[text_hash][0]] for text_hash in misses]
+        results["cache_hits"] += len(vectors)
+        results["duplicates"] += len(pending_texts) - len(groups)
+        results["api_inputs_saved"] += len(pending_texts) - len(misses)
+        
+        chunks = chunk_for_embedding(miss_texts, self.embedding_batch_size, self.max_batch_tokens)
+        for chunk_number, (start, end) in enumerate(chunks, 1):
+            embeddings = self.generate_openai_embeddings_batch(miss_texts[start:end])
+            fresh = {text_hash: embedding for text_hash, embedding in zip(misses[start:end], embeddings) if embedding}
+            vectors.update(zip(misses[start:end], embeddings))
+            self.cache_embeddings(fresh, dry_run)
+            
+            logger.info(f"✅ Embedding request {chunk_number}/{len(chunks)}: {end - start} texts "
+                        f"({end}/{len(miss_texts)} distinct uncached texts embedded)")
+        
+        # 3. Fan each vector back out to every document with that text
+        for text_hash, positions in groups.items():
+            embedding = vectors.get(text_hash)
+            for position in positions:
+                doc_id, new_embedding_text = pending_ids[position], pending_texts[position]
+                if not embedding:
+                    results["errors"] += 1
+                    logger.error(f"Failed to generate embedding for {doc_id}")
+                    self.dead_letter(doc_id, "embed", "embedding request failed", new_embedding_text, dry_run)
+                    continue
                 
-                # Show progress even for exceptions
-                if progress_counter % 10 == 0:
-                    logger.info(f"🔴 Progress: {progress_counter}/{len(documents)} records processed (exception on: {doc_id})")
+                results["embeddings_generated"] += 1
+                
+                if not dry_run:
+                    updates.append(UpdateOne(
+                        {"_id": doc_id},
+                        {
+                            "$set": {
+                                "openai_embedding_text": new_embedding_text,
+                                "openai_embedding": self.vector_codec.encode(embedding),
+                                "embedding_updated_at": time.time(),
+                                "embedding_model": self.model_name,
+                                **EmbeddingFingerprint.fields(new_embedding_text, self.model_name, self.embedding_dimension)
+                            }
+                        }
+                    ))
+                    update_docs.append((doc_id, new_embedding_text))
+                
+                results["updated"] += 1
         
         # Execute batch updates
         if updates and not dry_run:
             try:
                 result = self.collection.bulk_write(updates, ordered=False)
+                if self.dead_letters is not None:
+                    self.dead_letters.delete_many({"_id": {"$in": [doc_id for doc_id, _ in update_docs]}})
                 logger.info(f"✅ Bulk write completed: {result.modified_count}/{len(updates)} documents updated successfully")
                 
                 # Show detailed success for smaller batches
@@ -239,6 +502,10 @@ class CompletEmbeddingPipeline:
                 if len(write_errors) > 5:
                     logger.error(f"... and {len(write_errors) - 5} more write errors")
                 
+                for error in write_errors:
+                    doc_id, text = update_docs[error["index"]]
+                    self.dead_letter(doc_id, "write", str(error.get("errmsg", "write error"))[:100], text)
+                
                 results["errors"] += len(write_errors)
             except Exception as e:
                 # Handle any other database errors safely
@@ -247,12 +514,14 @@ class CompletEmbeddingPipeline:
                     error_msg = error_msg[:200] + "... [truncated]"
                 logger.error(f"❌ Database operation error: {error_msg}")
                 results["errors"] += len(updates)
+                for doc_id, text in update_docs:
+                    self.dead_letter(doc_id, "write", error_msg, text)
         elif updates and dry_run:
             logger.info(f"🔍 Dry run: Would update {len(updates)} documents")
         
         # Final batch summary
-        if progress_counter > 0:
-            logger.info(f"📊 Batch completed: {progress_counter} records processed, {results['updated']} updated, {results['skipped']} skipped, {results['errors']} errors")
+        if results["processed"] > 0:
+            logger.info(f"📊 Batch completed: {results['processed']} records processed, {results['updated']} updated, {results['skipped']} skipped, {results['errors']} errors")
         
         return results
     
@@ -275,12 +544,19 @@ class CompletEmbeddingPipeline:
                 "openai_embedding": {"$exists": True, "$ne": []}
             })
             
+            needs_embedding = self.collection.count_documents(
+                EmbeddingFingerprint.needs_embedding_filter(
+                    self.model_name, dimensions=self.embedding_dimension
+                )
+            )
+            
             return {
                 "total_documents": total_docs,
                 "with_embedding_text": with_embedding_text,
                 "with_embeddings": with_embeddings,
                 "complete_records": complete_records,
-                "needs_processing": total_docs - complete_records
+                "needs_processing": total_docs - complete_records,
+                "needs_embedding": needs_embedding
             }
             
         except Exception as e:
@@ -288,8 +564,18 @@ class CompletEmbeddingPipeline:
             return {}
     
     def run_complete_pipeline(self, batch_size: int = 1000, dry_run: bool = False, 
-                            max_documents: Optional[int] = None) -> Dict[str, Any]:
-        """Run the complete embedding pipeline."""
+                            max_documents: Optional[int] = None, only_missing: bool = False,
+                            restart: bool = False, resume_job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Run the complete embedding pipeline.
+        
+        Args:
+            batch_size: Documents per keyset batch
+            dry_run: Run without writing embeddings or job checkpoints
+            max_documents: Stop after this many documents
+            only_missing: Only read documents whose embedding is missing or outdated
+            restart: Start a new job instead of resuming the latest unfinished one
+            resume_job_id: Resume a specific embedding job
+        """
         
         logger.info("Starting complete embedding pipeline (text + embeddings)")
         logger.info(f"Batch size: {batch_size}")
@@ -311,74 +597,41 @@ class CompletEmbeddingPipeline:
             "embeddings_generated": 0,
             "updated": 0,
             "skipped": 0,
+            "backfilled": 0,
+            "cache_hits": 0,
+            "duplicates": 0,
+            "api_inputs_saved": 0,
             "errors": 0,
             "batches": 0
         }
         
         start_time = time.time()
-        skip = 0
         
-        # Process in batches
-        while True:
-            if max_documents and total_results["processed"] >= max_documents:
-                logger.info(f"Reached maximum documents limit: {max_documents}")
-                break
-                
-            logger.info(f"Processing batch starting at document {skip}")
-            
-            try:
-                # Calculate batch size for this iteration
-                current_batch_size = batch_size
-                if max_documents:
-                    remaining = max_documents - total_results["processed"]
-                    current_batch_size = min(batch_size, remaining)
-                
-                # Fetch batch - prioritize documents without complete embeddings
-                cursor = self.collection.find({
-                    "$or": [
-                        {"openai_embedding_text": {"$exists": False}},
-                        {"openai_embedding": {"$exists": False}},
-                        {"openai_embedding": []}
-                    ]
-                }).skip(skip).limit(current_batch_size)
-                
-                documents = list(cursor)
-                
-                if not documents:
-                    # Try getting any documents if no incomplete ones found
-                    cursor = self.collection.find({}).skip(skip).limit(current_batch_size)
-                    documents = list(cursor)
-                    
-                    if not documents:
-                        logger.info("No more documents to process")
-                        break
-                
-                # Process batch
-                batch_results = self.process_batch_complete(documents, dry_run)
-                
-                # Update totals
-                for key in batch_results:
-                    total_results[key] += batch_results[key]
-                
-                total_results["batches"] += 1
-                
-                logger.info(f"Batch {total_results['batches']} completed: "
-                           f"processed={batch_results['processed']}, "
-                           f"text_generated={batch_results['text_generated']}, "
-                           f"embeddings_generated={batch_results['embeddings_generated']}, "
-                           f"updated={batch_results['updated']}, "
-                           f"skipped={batch_results['skipped']}, "
-                           f"errors={batch_results['errors']}")
-                
-                skip += len(documents)
-                
-                # Rate limiting - small delay between batches
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"Error processing batch starting at {skip}: {e}")
-                total_results["errors"] += current_batch_size
-                skip += current_batch_size
+        # Every run is an embedding job; an unfinished job is resumed from its checkpoint
+        job = None
+        if not dry_run:
+            job = self.start_job(
+                {"batch_size": batch_size, "only_missing": only_missing},
+                initial_stats.get("needs_embedding" if only_missing else "total_documents", 0),
+                resume_job_id=resume_job_id,
+                restart=restart
+            )
+        if job is not None:
+            # A resumed job keeps the parameters it was started with
+            batch_size = job["params"].get("batch_size", batch_size)
+            only_missing = job["params"].get("only_missing", only_missing)
+        
+        try:
+            completed = self._run_batches(job, total_results, batch_size, dry_run, max_documents, only_missing, start_time)
+        except KeyboardInterrupt:
+            self.finish_job(job, JOB_INTERRUPTED)
+            raise
+        except Exception as e:
+            self.finish_job(job, JOB_FAILED, str(e)[:500])
+            raise
+        
+        # Stopping early (max_documents) leaves the job resumable
+        self.finish_job(job, JOB_COMPLETED if completed else JOB_INTERRUPTED)
         
         # Calculate final stats
         end_time = time.time()
@@ -386,6 +639,7 @@ class CompletEmbeddingPipeline:
         final_stats = self.get_collection_stats()
         
         pipeline_results = {
+            "job_id": str(job["_id"]) if job else None,
             "pipeline_summary": total_results,
             "duration_seconds": duration,
             "documents_per_second": total_results["processed"] / duration if duration > 0 else 0,
@@ -401,6 +655,9 @@ class CompletEmbeddingPipeline:
         logger.info(f"OpenAI embeddings generated: {total_results['embeddings_generated']}")
         logger.info(f"Documents updated: {total_results['updated']}")
         logger.info(f"Documents skipped: {total_results['skipped']}")
+        logger.info(f"Fingerprints backfilled: {total_results['backfilled']}")
+        logger.info(f"API inputs saved: {total_results['api_inputs_saved']} "
+                    f"({total_results['cache_hits']} cache hits, {total_results['duplicates']} duplicate texts)")
         logger.info(f"Errors: {total_results['errors']}")
         logger.info(f"Duration: {duration:.2f} seconds")
         logger.info(f"Processing rate: {pipeline_results['documents_per_second']:.2f} docs/sec")
@@ -408,6 +665,98 @@ class CompletEmbeddingPipeline:
         
         return pipeline_results
     
+    def _run_batches(self, job: Optional[Dict[str, Any]], total_results: Dict[str, int], batch_size: int,
+                     dry_run: bool, max_documents: Optional[int], only_missing: bool, start_time: float) -> bool:
+        """Process keyset batches after the job's checkpoint.
+        
+        Each batch is "_id > last_id" in _id order, so it costs one index seek
+        regardless of depth and updated documents never shift later pages. The
+        high-water mark and counters are persisted on the job after every batch.
+        
+        Returns:
+            True if the end of the collection was reached
+        """
+        last_id = job.get("last_id") if job else None
+        base_counters = dict(job.get("counters") or {}) if job else {}
+        # With only_missing the selection happens in MongoDB (missing or outdated
+        # vectors); otherwise every document is read, but only its source fields
+        # and fingerprint, and the hash comparison decides what to re-embed.
+        base_query = EmbeddingFingerprint.needs_embedding_filter(
+            self.model_name, dimensions=self.embedding_dimension
+        ) if only_missing else {}
+        projection = EmbeddingFingerprint.projection(SOURCE_FIELDS)
+        
+        # Process in batches
+        while True:
+            if max_documents and total_results["processed"] >= max_documents:
+                logger.info(f"Reached maximum documents limit: {max_documents}")
+                return False
+                
+            logger.info(f"Processing batch after _id {last_id}")
+            
+            # Calculate batch size for this iteration
+            current_batch_size = batch_size
+            if max_documents:
+                remaining = max_documents - total_results["processed"]
+                current_batch_size = min(batch_size, remaining)
+            
+            query = dict(base_query)
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            
+            documents = list(self.collection.find(query, projection).sort("_id", 1).limit(current_batch_size))
+            if not documents:
+                logger.info("No more documents to process")
+                return True
+            
+            batch_last_id = documents[-1]["_id"]
+            fetched = len(documents)
+            
+            try:
+                # Documents that already failed max_attempts times stay dead-lettered
+                exhausted = self.exhausted_ids([doc["_id"] for doc in documents])
+                if exhausted:
+                    logger.warning(f"Skipping {len(exhausted)} dead-lettered documents")
+                    documents = [doc for doc in documents if doc["_id"] not in exhausted]
+                    total_results["skipped"] += len(exhausted)
+                
+                # Process batch
+                batch_results = self.process_batch_complete(documents, dry_run)
+                
+                # Update totals
+                for key in batch_results:
+                    total_results[key] += batch_results[key]
+                
+                total_results["batches"] += 1
+                
+                logger.info(f"Batch {total_results['batches']} completed: "
+                           f"processed={batch_results['processed']}, "
+                           f"text_generated={batch_results['text_generated']}, "
+                           f"embeddings_generated={batch_results['embeddings_generated']}, "
+                           f"updated={batch_results['updated']}, "
+                           f"skipped={batch_results['skipped']}, "
+                           f"backfilled={batch_results['backfilled']}, "
+                           f"api_inputs_saved={batch_results['api_inputs_saved']}, "
+                           f"errors={batch_results['errors']}")
+                
+            except Exception as e:
+                logger.error(f"Error processing batch after _id {last_id}: {e}")
+                total_results["errors"] += len(documents)
+                for doc in documents:
+                    self.dead_letter(doc["_id"], "batch", str(e)[:200], dry_run=dry_run)
+            
+            last_id = batch_last_id
+            elapsed = time.time() - start_time
+            self.save_job_progress(
+                job, last_id,
+                {key: base_counters.get(key, 0) + total_results[key]
+                 for key in ("processed", "updated", "skipped", "errors")},
+                round(total_results["processed"] / elapsed, 2) if elapsed > 0 else 0.0
+            )
+            
+            if fetched < current_batch_size:
+                return True
+    
     def close(self):
         """Close connections."""
         if self.client:
@@ -423,18 +772,52 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Run without making changes")
     parser.add_argument("--max-documents", type=int, help="Maximum number of documents to process")
     parser.add_argument("--connection-string", type=str, help="MongoDB connection string")
+    parser.add_argument("--embedding-batch-size", type=int, default=DEFAULT_EMBEDDING_BATCH_SIZE,
+                        help="Maximum texts per OpenAI embeddings request (1 = one request per document)")
+    parser.add_argument("--max-batch-tokens", type=int, default=DEFAULT_MAX_BATCH_TOKENS,
+                        help="Maximum estimated tokens per OpenAI embeddings request")
+    parser.add_argument("--only-missing", action="store_true",
+                        help="Only read documents whose embedding is missing or from another version")
+    parser.add_argument("--restart", action="store_true",
+                        help="Start a new job instead of resuming the latest unfinished one")
+    parser.add_argument("--resume", type=str, metavar="JOB_ID",
+                        help="Resume a specific embedding job from its checkpoint")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="Failures before a document is left in the dead-letter collection")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or fill the embedding cache")
+    parser.add_argument("--vector-storage", choices=STORAGE_FORMATS, default=STORAGE_ARRAY,
+                        help="Store vectors as BSON double arrays or packed float32 BinData")
+    parser.add_argument("--dimensions", type=int, default=1536,
+                        help="Embedding dimensions (text-embedding-3 models can return shorter vectors)")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="OpenAI requests-per-minute limit (adapted from response headers)")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                        help="OpenAI tokens-per-minute limit (adapted from response headers)")
     
     args = parser.parse_args()
     
     try:
         # Initialize pipeline
-        pipeline = CompletEmbeddingPipeline(args.connection_string)
+        pipeline = CompletEmbeddingPipeline(
+            args.connection_string,
+            embedding_batch_size=args.embedding_batch_size,
+            max_batch_tokens=args.max_batch_tokens,
+            rate_limiter=RateLimiter(args.rpm, args.tpm),
+            max_attempts=args.max_attempts,
+            use_cache=not args.no_cache,
+            vector_storage=args.vector_storage,
+            embedding_dimension=args.dimensions
+        )
         
         # Run complete pipeline
         results = pipeline.run_complete_pipeline(
             batch_size=args.batch_size,
             dry_run=args.dry_run,
-            max_documents=args.max_documents
+            max_documents=args.max_documents,
+            only_missing=args.only_missing,
+            restart=args.restart,
+            resume_job_id=args.resume
         )
         
         # Print summary
@@ -442,11 +825,14 @@ def main():
             print("\n" + "="*60)
             print("COMPLETE EMBEDDING PIPELINE SUMMARY")
             print("="*60)
+            print(f"Job: {results['job_id'] or 'none (dry run)'}")
             print(f"Documents processed: {results['pipeline_summary']['processed']:,}")
             print(f"Embedding texts generated: {results['pipeline_summary']['text_generated']:,}")
             print(f"OpenAI embeddings generated: {results['pipeline_summary']['embeddings_generated']:,}")
             print(f"Documents updated: {results['pipeline_summary']['updated']:,}")
             print(f"Documents skipped: {results['pipeline_summary']['skipped']:,}")
+            print(f"Fingerprints backfilled: {results['pipeline_summary']['backfilled']:,}")
+            print(f"API inputs saved (cache/duplicates): {results['pipeline_summary']['api_inputs_saved']:,}")
             print(f"Errors: {results['pipeline_summary']['errors']:,}")
             print(f"Duration: {results['duration_seconds']:.2f} seconds")
             print(f"Processing rate: {results['documents_per_second']:.2f} docs/sec")
@@ -4,6 +4,10 @@ Create MongoDB Atlas Vector Search and Text Search indexes for hybrid retrieval.
 
 This script uses the Atlas Admin API to create/update:
 - Vector Search index on `openai_embedding` (1536 dims, cosine)
+- (Optional) int8 scalar / binary quantized vector indexes on the same field,
+  named `<index>_scalar` / `<index>_binary`
+- (Optional, --shadow) an index on a reduced-dimension shadow field such as
+  `openai_embedding_512`, named `<index>_512`
 - Text Search index on `title`, `brand`, `openai_embedding_text` (BM25)
 - (Optional) B-tree indexes via PyMongo for metadata fields
 
@@ -18,6 +22,8 @@ Environment variables (load from .env if present):
 
 Usage:
   python scripts/create_indexes.py --create-btree
+  python scripts/create_indexes.py --no-text --quantization all
+  python scripts/create_indexes.py --no-text --dims 512 --shadow
 """
 
 from __future__ import annotations
@@ -32,6 +38,13 @@ import requests
 from requests.auth import HTTPDigestAuth
 from dotenv import load_dotenv
 
+# Allow running as `python scripts/create_indexes.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.vector_index import (
+    QUANTIZATION_MODES, QUANTIZATION_NONE, dimension_variant, quantized_index_name, vector_index_definition
+)
+
 try:
     from pymongo import MongoClient
     HAVE_PYMONGO = True
@@ -40,6 +53,8 @@ except Exception:
 
 
 VECTOR_INDEX_NAME = "openai_embedding_vector_index"
+VECTOR_FIELD = "openai_embedding"
+PRIMARY_DIMENSIONS = 1536
 TEXT_INDEX_NAME = "hybrid_text_index"
 
 ATLAS_BASE = "https://cloud.mongodb.com/api/atlas/v2"
@@ -82,34 +97,26 @@ def list_search_indexes(env: Dict[str, str], auth: HTTPDigestAuth):
         raise
 
 
-def create_or_update_vector_index(env: Dict[str, str], auth: HTTPDigestAuth, num_dimensions: int = 1536):
-    """Create or update the Vector Search index."""
+def create_or_update_vector_index(env: Dict[str, str], auth: HTTPDigestAuth, num_dimensions: int = 1536,
+                                  quantization: str = QUANTIZATION_NONE, base_name: str = VECTOR_INDEX_NAME,
+                                  path: str = VECTOR_FIELD):
+    """Create or update a Vector Search index (full precision or quantized)."""
+    index_name = quantized_index_name(base_name, quantization)
     existing = list_search_indexes(env, auth)
-    has_vector = any(idx.get("name") == VECTOR_INDEX_NAME for idx in existing)
+    has_vector = any(idx.get("name") == index_name for idx in existing)
 
-    definition = {
-        "name": VECTOR_INDEX_NAME,
-        "type": "vectorSearch",
-        "definition": {
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "openai_embedding",
-                    "numDimensions": num_dimensions,
-                    "similarity": "cosine"
-                }
-            ]
-        }
-    }
+    definition = vector_index_definition(
+        index_name, path=path, num_dimensions=num_dimensions, quantization=quantization
+    )
 
     base = f"{ATLAS_BASE}/groups/{env['group_id']}/clusters/{env['cluster_name']}/fts/indexes/{env['db']}/{env['coll']}"
 
     if not has_vector:
-        print(f"Creating Vector Search index '{VECTOR_INDEX_NAME}'...")
+        print(f"Creating Vector Search index '{index_name}' (quantization: {quantization})...")
         atlas_request("POST", base, auth, payload=definition)
     else:
-        print(f"Updating Vector Search index '{VECTOR_INDEX_NAME}'...")
-        url = f"{base}/{VECTOR_INDEX_NAME}"
+        print(f"Updating Vector Search index '{index_name}' (quantization: {quantization})...")
+        url = f"{base}/{index_name}"
         # PATCH is supported for search indexes updates
         atlas_request("PATCH", url, auth, payload=definition)
 
@@ -174,13 +181,28 @@ def main():
     parser.add_argument("--no-text", action="store_true", help="Skip creating text index")
     parser.add_argument("--create-btree", action="store_true", help="Also create B-tree indexes via PyMongo")
     parser.add_argument("--dims", type=int, default=1536, help="Vector dimensions (default 1536)")
+    parser.add_argument("--index-name", default=VECTOR_INDEX_NAME,
+                        help="Full-precision vector index name; quantized indexes get a _scalar/_binary suffix")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Index the shadow field openai_embedding_<dims> as <index-name>_<dims> "
+                             "(reduced-dimension vectors built next to the primary ones)")
+    parser.add_argument("--quantization", choices=[*QUANTIZATION_MODES, "all"], default=QUANTIZATION_NONE,
+                        help="Also create a scalar (int8) or binary quantized index, or both (all)")
     args = parser.parse_args()
 
     env = get_env()
     auth = HTTPDigestAuth(env["public_key"], env["private_key"])
 
     if not args.no_vector:
-        create_or_update_vector_index(env, auth, num_dimensions=args.dims)
+        path, base_name = VECTOR_FIELD, args.index_name
+        if args.shadow:
+            path = dimension_variant(VECTOR_FIELD, args.dims, PRIMARY_DIMENSIONS)
+            base_name = dimension_variant(args.index_name, args.dims, PRIMARY_DIMENSIONS)
+        # The full-precision index stays: it is the rescore/ENN baseline
+        modes = QUANTIZATION_MODES if args.quantization == "all" else {QUANTIZATION_NONE, args.quantization}
+        for quantization in [mode for mode in QUANTIZATION_MODES if mode in modes]:
+            create_or_update_vector_index(env, auth, num_dimensions=args.dims,
+                                          quantization=quantization, base_name=base_name, path=path)
     if not args.no_text:
         create_or_update_text_index(env, auth)
     if args.create_btree:
@@ -4,12 +4,14 @@ Create local MongoDB indexes for hybrid retrieval (Community/Enterprise server).
 
 This script creates:
 - Text index (MongoDB $text) on: title, brand, openai_embedding_text
-- B-tree indexes for metadata: (embedding_model, embedding_updated_at), openai_embedding_text
+- B-tree indexes for metadata: (embedding_model, embedding_updated_at), embedding_updated_at,
+  openai_embedding_text
 - Optional helper indexes for common filters (category, sub_category, out_of_stock)
 
 Note:
 - Vector Search ($vectorSearch) and Atlas Search ($search) are Atlas-only features.
-  On local MongoDB, use $text for BM25-like search and an external vector index (e.g., FAISS) for vectors.
+  On local MongoDB, run the API with SEARCH_BACKEND=local: the text, vector and hybrid legs are then
+  served in-process (NumPy vectors + BM25, app/repositories/local_search_backend.py); facets still use $text.
 
 Env (.env):
 - MONGODB_URI (default: mongodb://localhost:27017/)
@@ -53,6 +55,8 @@ def main() -> None:
     print("Creating B-tree indexes (metadata/filters)...")
     coll.create_index([("embedding_model", 1), ("embedding_updated_at", -1)], name="model_updatedAt_idx", background=True)
     coll.create_index([("openai_embedding_text", 1)], name="embedding_text_idx", background=True)
+    # Newest embedding_updated_at, read at startup to detect a stale catalog snapshot
+    coll.create_index([("embedding_updated_at", -1)], name="updatedAt_idx", background=True)
 
     # Optional helpful indexes for faceting/filters
     coll.create_index([("category", 1), ("sub_category", 1)], name="category_sub_idx", background=True)
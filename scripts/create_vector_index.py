@@ -11,6 +11,12 @@ Env required:
   COLLECTION_NAME=products
 Optional:
   CREATE_TEXT_INDEX=true # also create a minimal BM25 text index
+  VECTOR_QUANTIZATION=scalar,binary  # also create quantized indexes
+                                     # (<name>_scalar: int8, <name>_binary: 1 bit/dim)
+  VECTOR_INDEX_NAME=openai_embedding_vector_index
+  VECTOR_DIMENSIONS=1536             # vector length of the indexed field
+  VECTOR_SHADOW=true                 # index openai_embedding_<dims> as <name>_<dims>
+                                     # (reduced-dimension shadow field)
 """
 from __future__ import annotations
 
@@ -22,7 +28,16 @@ from typing import Dict, Any, List
 import requests
 from requests.auth import HTTPDigestAuth
 
+# Allow running as `python scripts/create_vector_index.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.vector_index import (
+    QUANTIZATION_MODES, QUANTIZATION_NONE, dimension_variant, quantized_index_name, vector_index_definition
+)
+
 VECTOR_INDEX_NAME = "openai_embedding_vector_index"
+VECTOR_FIELD = "openai_embedding"
+PRIMARY_DIMENSIONS = 1536
 TEXT_INDEX_NAME = "hybrid_text_index"
 ATLAS_BASE = "https://cloud.mongodb.com/api/atlas/v2"
 
@@ -36,6 +51,10 @@ def get_env() -> Dict[str, str]:
         "db": os.getenv("DB_NAME", "ecom_data").strip(),
         "coll": os.getenv("COLLECTION_NAME", "products").strip(),
         "create_text": os.getenv("CREATE_TEXT_INDEX", "false").strip().lower() in ("1", "true", "yes"),
+        "vector_index_name": os.getenv("VECTOR_INDEX_NAME", VECTOR_INDEX_NAME).strip(),
+        "quantization": os.getenv("VECTOR_QUANTIZATION", "").strip(),
+        "dimensions": os.getenv("VECTOR_DIMENSIONS", str(PRIMARY_DIMENSIONS)).strip(),
+        "shadow": os.getenv("VECTOR_SHADOW", "false").strip().lower() in ("1", "true", "yes"),
     }
     missing = [k for k, v in env.items() if k in ("group_id", "cluster_name", "public_key", "private_key") and not v]
     if missing:
@@ -64,32 +83,37 @@ def list_search_indexes(env: Dict[str, str], auth: HTTPDigestAuth) -> List[Dict[
     return res if isinstance(res, list) else []
 
 
-def ensure_vector_index(env: Dict[str, str], auth: HTTPDigestAuth) -> None:
+def quantization_modes(env: Dict[str, str]) -> List[str]:
+    """Full precision plus the quantized modes listed in VECTOR_QUANTIZATION."""
+    requested = {mode.strip() for mode in env["quantization"].split(",") if mode.strip()}
+    unknown = requested - set(QUANTIZATION_MODES)
+    if unknown:
+        print(f"Unknown VECTOR_QUANTIZATION value(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        sys.exit(1)
+    return [mode for mode in QUANTIZATION_MODES if mode == QUANTIZATION_NONE or mode in requested]
+
+
+def ensure_vector_index(env: Dict[str, str], auth: HTTPDigestAuth, quantization: str = QUANTIZATION_NONE) -> None:
+    dimensions = int(env["dimensions"])
+    path, base_name = VECTOR_FIELD, env["vector_index_name"]
+    if env["shadow"]:
+        path = dimension_variant(VECTOR_FIELD, dimensions, PRIMARY_DIMENSIONS)
+        base_name = dimension_variant(base_name, dimensions, PRIMARY_DIMENSIONS)
+    index_name = quantized_index_name(base_name, quantization)
     existing = list_search_indexes(env, auth)
-    has_vector = any(ix.get("name") == VECTOR_INDEX_NAME and ix.get("type") == "vectorSearch" for ix in existing)
+    has_vector = any(ix.get("name") == index_name and ix.get("type") == "vectorSearch" for ix in existing)
 
-    definition = {
-        "name": VECTOR_INDEX_NAME,
-        "type": "vectorSearch",
-        "definition": {
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "openai_embedding",
-                    "numDimensions": 1536,
-                    "similarity": "cosine"
-                }
-            ]
-        }
-    }
+    definition = vector_index_definition(
+        index_name, path=path, num_dimensions=dimensions, quantization=quantization
+    )
 
     base = f"{ATLAS_BASE}/groups/{env['group_id']}/clusters/{env['cluster_name']}/fts/indexes/{env['db']}/{env['coll']}"
     if not has_vector:
-        print(f"Creating Vector Search index '{VECTOR_INDEX_NAME}' on {env['db']}.{env['coll']} ...")
+        print(f"Creating Vector Search index '{index_name}' ({quantization}) on {env['db']}.{env['coll']} ...")
         atlas_request("POST", base, auth, payload=definition)
     else:
-        print(f"Updating Vector Search index '{VECTOR_INDEX_NAME}' ...")
-        url = f"{base}/{VECTOR_INDEX_NAME}"
+        print(f"Updating Vector Search index '{index_name}' ({quantization}) ...")
+        url = f"{base}/{index_name}"
         atlas_request("PATCH", url, auth, payload=definition)
     print("Submitted. Propagation may take ~1–2 minutes.")
 
@@ -128,7 +152,8 @@ def main() -> None:
     env = get_env()
     auth = HTTPDigestAuth(env["public_key"], env["private_key"])
 
-    ensure_vector_index(env, auth)
+    for quantization in quantization_modes(env):
+        ensure_vector_index(env, auth, quantization)
     if env["create_text"]:
         ensure_text_index(env, auth)
 
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Export the catalog as a memory-mappable snapshot for the local search backend.
+
+Writes product ids, L2-normalized float32 vectors (streamed to disk as the
+cursor advances), the filter columns and the BM25 postings to a directory
+(app/db/catalog_snapshot.py). With SEARCH_BACKEND=local and
+SEARCH_SNAPSHOT_PATH pointing at it, API workers map the files at startup
+instead of reading every vector from MongoDB, and share one copy of them
+through the page cache. The manifest records the embedding model/version and
+the newest embedding_updated_at exported; the API logs a warning at startup
+when the collection has moved past either. Re-run after re-embedding.
+
+Env (.env):
+- MONGODB_URI (default: mongodb://localhost:27017/)
+- DB_NAME (default: ecom_data)
+- COLLECTION_NAME (default: products)
+
+Usage:
+  python -m scripts.export_catalog_snapshot --output data/catalog_snapshot
+  python -m scripts.export_catalog_snapshot --vector-path openai_embedding_512 --output data/catalog_snapshot_512
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import shutil
+import argparse
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+# Add project root to path so we can import the db module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.catalog_snapshot import CatalogSnapshotBuilder
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a memory-mappable catalog snapshot")
+    parser.add_argument("--output", type=str, default="data/catalog_snapshot", help="Output directory")
+    parser.add_argument("--vector-path", type=str, default="openai_embedding", help="Embedding field to export")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Cursor batch size")
+    parser.add_argument("--limit", type=int, default=0, help="Only export this many documents (0 = all)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    uri = os.environ.get("MONGODB_URI", "mongodb://localhost:27017/")
+    db_name = os.environ.get("DB_NAME", "ecom_data")
+    coll_name = os.environ.get("COLLECTION_NAME", "products")
+
+    client = MongoClient(uri)
+    coll = client[db_name][coll_name]
+    print(f"Exporting {db_name}.{coll_name} ({args.vector_path}) to {args.output}...")
+
+    # Build next to the target and swap it in, so running workers never map a half-written snapshot
+    staging = f"{args.output.rstrip('/')}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    start = time.perf_counter()
+    builder = CatalogSnapshotBuilder(args.vector_path, output_dir=staging)
+    cursor = coll.find({}, projection=CatalogSnapshotBuilder.projection(args.vector_path),
+                       batch_size=args.batch_size).sort("_id", 1)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    for count, document in enumerate(cursor, start=1):
+        builder.add(document)
+        if count % 50_000 == 0:
+            print(f"  {count:,} products ({time.perf_counter() - start:.0f}s)")
+    client.close()
+    snapshot = builder.finish(source={"database": db_name, "collection": coll_name, "query": {}})
+
+    shutil.rmtree(args.output, ignore_errors=True)
+    os.replace(staging, args.output)
+    manifest = snapshot.manifest
+    print(
+        f"Wrote {len(snapshot):,} products / {manifest['vectors']:,} vectors ({manifest['dimensions']}d, "
+        f"{manifest['embedding_version']}) to {args.output} in {time.perf_counter() - start:.1f}s"
+    )
+    if manifest["mixed_versions"]:
+        print("Warning: the collection mixes embedding versions; finish re-embedding before serving this snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI Files, Batches and Embeddings endpoints.
+
+Implements just enough of the API for the embedding pipelines to run offline:
+file upload and download, batch create/retrieve/list/cancel, and synchronous
+embeddings. Vectors are deterministic (seeded from the text's SHA-256 and unit
+length), so the same text always gets the same vector. A batch moves to
+in_progress on its first retrieve and completes after --polls-to-complete
+retrieves, writing an output file and, for requests whose input contains
+--fail-marker, an error file, like the real service.
+
+Point the openai client at it with OPENAI_BASE_URL (any API key works):
+  python -m scripts.fake_openai_batch_server --port 8089
+  OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python -m scripts.run_embedding_pipeline --mode batch
+
+Tests mount the app in-process through httpx.ASGITransport instead.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import Response
+
+DEFAULT_DIMENSIONS = 1536
+
+# Batch statuses that no longer change
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def fake_embedding(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> List[float]:
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+
+def _embedding_response(body: Dict[str, Any]) -> Dict[str, Any]:
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dimensions = body.get("dimensions") or DEFAULT_DIMENSIONS
+    tokens = sum(max(1, len(str(text)) // 4) for text in inputs)
+    return {
+        "object": "list",
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(str(text), dimensions)}
+            for i, text in enumerate(inputs)
+        ],
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def create_app(polls_to_complete: int = 1, fail_marker: Optional[str] = "FAIL_EMBEDDING") -> FastAPI:
+    """Build the fake API.
+
+    Args:
+        polls_to_complete: Retrieves of an in-progress batch before it completes
+        fail_marker: Requests with an input containing this string fail with a 400
+
+    Returns:
+        FastAPI app serving /v1/files, /v1/batches and /v1/embeddings
+    """
+    app = FastAPI(title="Fake OpenAI batch server")
+    files: Dict[str, Dict[str, Any]] = {}
+    batches: Dict[str, Dict[str, Any]] = {}
+    app.state.files = files
+    app.state.batches = batches
+
+    def store_file(content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        files[file_id] = {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed", "content": content,
+        }
+        return files[file_id]
+
+    def public(file: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in file.items() if key != "content"}
+
+    def process(batch: Dict[str, Any]) -> None:
+        """Run every request of a batch and write its output and error files."""
+        output: List[str] = []
+        errors: List[str] = []
+        lines = files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        for line in filter(None, (line.strip() for line in lines)):
+            request = json.loads(line)
+            body = request["body"]
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            result = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": request["custom_id"]}
+            if fail_marker and any(fail_marker in str(text) for text in inputs):
+                result["response"] = {"status_code": 400, "request_id": uuid.uuid4().hex, "body": {
+                    "error": {"message": "Invalid input", "type": "invalid_request_error"}}}
+                result["error"] = None
+                errors.append(json.dumps(result))
+            else:
+                result["response"] = {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                       "body": _embedding_response(body)}
+                result["error"] = None
+                output.append(json.dumps(result))
+        if output:
+            batch["output_file_id"] = store_file(("\n".join(output) + "\n").encode(), "output.jsonl", "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = store_file(("\n".join(errors) + "\n").encode(), "errors.jsonl", "batch_output")["id"]
+        total = len(output) + len(errors)
+        batch["request_counts"] = {"total": total, "completed": len(output), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    @app.post("/v1/files")
+    async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+        return public(store_file(await file.read(), file.filename or "upload.jsonl", purpose))
+
+    @app.get("/v1/files/{file_id}")
+    async def retrieve_file(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="No such file")
+        return public(files[file_id])
+
+    @app.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="No such file")
+        return Response(content=files[file_id]["content"], media_type="application/octet-stream")
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body.get("input_file_id") not in files:
+            raise HTTPException(status_code=400, detail="Unknown input_file_id")
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"], "completion_window": body["completion_window"],
+            "status": "validating", "output_file_id": None, "error_file_id": None,
+            "created_at": int(time.time()), "metadata": body.get("metadata"),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}, "polls": 0,
+        }
+        return {key: value for key, value in batches[batch_id].items() if key != "polls"}
+
+    @app.get("/v1/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str):
+        batch = batches.get(batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail="No such batch")
+        if batch["status"] not in FINAL_STATUSES:
+            batch["polls"] += 1
+            batch["status"] = "in_progress"
+            if batch["polls"] >= polls_to_complete:
+                process(batch)
+        return {key: value for key, value in batch.items() if key != "polls"}
+
+    @app.post("/v1/batches/{batch_id}/cancel")
+    async def cancel_batch(batch_id: str):
+        batch = batches.get(batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail="No such batch")
+        if batch["status"] not in FINAL_STATUSES:
+            batch["status"] = "cancelled"
+        return {key: value for key, value in batch.items() if key != "polls"}
+
+    @app.get("/v1/batches")
+    async def list_batches(limit: int = 20, after: Optional[str] = None):
+        ordered = sorted(batches.values(), key=lambda batch: batch["created_at"], reverse=True)
+        data = [{key: value for key, value in batch.items() if key != "polls"} for batch in ordered]
+        if after in batches:
+            data = data[[batch["id"] for batch in data].index(after) + 1:]
+        page = data[:limit]
+        return {
+            "object": "list", "data": page, "has_more": len(data) > limit,
+            "first_id": page[0]["id"] if page else None, "last_id": page[-1]["id"] if page else None,
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        return _embedding_response(await request.json())
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI Files/Batches/Embeddings API for offline runs")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8089, help="Port to listen on")
+    parser.add_argument("--polls-to-complete", type=int, default=2, help="Retrieves before a batch completes")
+    parser.add_argument("--fail-marker", default="FAIL_EMBEDDING", help="Inputs containing this string fail")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.polls_to_complete, args.fail_marker), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
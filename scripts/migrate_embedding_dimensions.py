@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Build reduced-dimension embeddings in a shadow field next to the current ones.
+
+text-embedding-3 models can return shortened vectors (the `dimensions`
+parameter); a 512-dimension vector is a third of the storage and index memory
+of the 1536-dimension one. Instead of overwriting `openai_embedding`, this
+script fills `openai_embedding_<dims>` (with its own text hash and version
+fields) using the staged embedding pipeline, so the live index keeps serving
+while the shadow field is built. It is checkpointed by `_id` and only reads
+documents whose shadow vector is missing or outdated, so it can be stopped and
+re-run at any time.
+
+Switch-over:
+  1. python -m scripts.migrate_embedding_dimensions --dimensions 512
+  2. python scripts/create_indexes.py --no-text --dims 512 --shadow
+  3. python -m scripts.benchmark_vector_quantization --compare-dimensions 512
+  4. python -m scripts.migrate_embedding_dimensions --dimensions 512 --status
+     (remaining must be 0), then set EMBEDDING_READ_DIMENSIONS=512 and restart
+     the API: search field, index and query embeddings switch together.
+     Unset it to roll back.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from openai import AsyncOpenAI
+
+from app.db.vector_codec import STORAGE_ARRAY, STORAGE_FORMATS, VectorCodec
+from app.db.vector_index import dimension_variant
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_cache_repository import EmbeddingCacheRepository
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+from app.services.rate_limiter import RateLimiter, create_embeddings
+from scripts.embedding_text_generator import SOURCE_FIELDS, build_embedding_text
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "text-embedding-3-small"
+PRIMARY_FIELD = EmbeddingFingerprint.PRIMARY_FIELD
+PRIMARY_DIMENSIONS = 1536
+
+
+def shadow_field(dimensions: int) -> str:
+    """Field holding the reduced-dimension vectors."""
+    return dimension_variant(PRIMARY_FIELD, dimensions, PRIMARY_DIMENSIONS)
+
+
+async def coverage(collection: Any, model: str, dimensions: int) -> Dict[str, Any]:
+    """Count documents whose shadow vector is current, to gate the read switch.
+
+    Args:
+        collection: Products collection
+        model: Embedding model
+        dimensions: Shadow vector dimensions
+
+    Returns:
+        Totals for the collection and the shadow field
+    """
+    field = shadow_field(dimensions)
+    total = await collection.count_documents({})
+    remaining = await collection.count_documents(
+        EmbeddingFingerprint.needs_embedding_filter(model, field, dimensions)
+    )
+    return {
+        "field": field,
+        "version": EmbeddingFingerprint.version(model, dimensions),
+        "total_documents": total,
+        "current": total - remaining,
+        "remaining": remaining,
+        "ready": remaining == 0,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if EmbeddingFingerprint.reduced_dimensions(MODEL_NAME, args.dimensions) is None:
+        raise ValueError(f"{args.dimensions} is not a reduced dimension for {MODEL_NAME}")
+
+    connection_string = (
+        args.connection_string or
+        os.environ.get("MONGODB_URI") or
+        os.environ.get("MONGODB_ATLAS_URI") or
+        "mongodb://localhost:27017/"
+    )
+    client = AsyncIOMotorClient(connection_string)
+    database = client[os.environ.get("DB_NAME", "ecom_data")]
+    collection = database[os.environ.get("COLLECTION_NAME", "products")]
+
+    try:
+        if args.status:
+            return await coverage(collection, MODEL_NAME, args.dimensions)
+
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is required")
+        openai_client = AsyncOpenAI(api_key=api_key)
+        limiter = RateLimiter(args.rpm, args.tpm)
+        codec = VectorCodec(args.vector_storage)
+        field = shadow_field(args.dimensions)
+
+        async def embed_texts(texts: List[str]) -> List[List[float]]:
+            response = await create_embeddings(
+                openai_client, limiter, max_retries=args.max_retries,
+                model=MODEL_NAME, input=texts, encoding_format="float", dimensions=args.dimensions
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+        config = EmbeddingPipelineConfig(
+            read_batch_size=args.read_batch_size,
+            embed_batch_size=args.embed_batch_size,
+            embed_workers=args.workers,
+            write_batch_size=args.write_batch_size,
+            max_documents=args.max_documents,
+        )
+        pipeline = EmbeddingPipeline(
+            collection,
+            embed_texts=embed_texts,
+            build_text=build_embedding_text,
+            config=config,
+            query=EmbeddingFingerprint.needs_embedding_filter(MODEL_NAME, field, args.dimensions),
+            source_fields=SOURCE_FIELDS,
+            model_name=MODEL_NAME,
+            embedding_field=field,
+            # The embedding text and model fields belong to the primary vector
+            text_field=None,
+            dry_run=args.dry_run,
+            progress_store=EmbeddingProgressRepository(database),
+            checkpoint_name=f"migrate_embedding_dimensions:{field}:{MODEL_NAME}",
+            resume=not args.restart,
+            embedding_cache=None if args.no_cache else EmbeddingCacheRepository(database, codec),
+            dimensions=args.dimensions,
+            vector_codec=codec,
+        )
+        metrics = await pipeline.run()
+        metrics["rate_limiter"] = limiter.get_stats()
+        metrics["coverage"] = await coverage(collection, MODEL_NAME, args.dimensions)
+        return metrics
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build reduced-dimension embeddings in a shadow field")
+    parser.add_argument("--dimensions", type=int, default=512, help="Shadow vector dimensions")
+    parser.add_argument("--status", action="store_true", help="Only report how much of the shadow field is current")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent OpenAI embedding requests")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per embeddings request")
+    parser.add_argument("--read-batch-size", type=int, default=500, help="Documents per cursor batch")
+    parser.add_argument("--write-batch-size", type=int, default=500, help="Updates per bulk_write")
+    parser.add_argument("--max-documents", type=int, help="Maximum number of documents to read")
+    parser.add_argument("--max-retries", type=int, default=5, help="Attempts per request on 429 responses")
+    parser.add_argument("--rpm", type=int, default=3000, help="OpenAI requests-per-minute limit (adapted from headers)")
+    parser.add_argument("--tpm", type=int, default=1_000_000, help="OpenAI tokens-per-minute limit (adapted from headers)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored checkpoint and start from the first _id")
+    parser.add_argument("--vector-storage", choices=STORAGE_FORMATS, default=STORAGE_ARRAY,
+                        help="Store vectors as BSON double arrays or packed float32 BinData")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or fill the embedding cache")
+    parser.add_argument("--dry-run", action="store_true", help="Run without writing to MongoDB")
+    parser.add_argument("--connection-string", type=str, help="MongoDB connection string")
+    args = parser.parse_args()
+
+    try:
+        print(json.dumps(asyncio.run(run(args)), indent=2, default=str))
+    except KeyboardInterrupt:
+        logger.info("Migration interrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,44 @@
 #!/usr/bin/env python3
 """
 Idempotent migration script to update openai_embedding_text field.
-Only updates documents where the generated text has changed.
+Only updates documents where the generated text has changed, or whose
+embedding_text_version predates the current text builder (then only the
+version is restamped).
+
+Building the text is CPU-bound (a dozen regex passes per document), so a full
+rebuild is limited by one core long before MongoDB. With --workers N the
+collection is split into `_id` ranges (boundaries from a $sample of ids) that a
+pool of N processes handles independently: each streams its range with a
+projection of the source fields, builds the texts and bulk-writes the changed
+ones. More ranges than workers keep the pool busy when ranges are uneven.
+MongoDB only compares `_id` values of the same BSON type, so each sampled type
+gets its own ranges, and a last range picks up ids of any type the sample missed.
+
+Usage:
+  python -m scripts.migrate_openai_embedding_text
+  python -m scripts.migrate_openai_embedding_text --workers 8 --partitions 64
 """
 
+import argparse
 import asyncio
 import os
 import sys
-from typing import Any, Dict
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
+from bson import ObjectId
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, UpdateOne
 
 # Add project root to path so we can import our domain services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from domain.embeddings.services import build_embedding_text
+from scripts.embedding_text_generator import (
+    EMBEDDING_TEXT_VERSION, SOURCE_FIELDS, TEXT_VERSION_FIELD, build_embedding_text
+)
 
 load_dotenv()
 
@@ -23,98 +46,269 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME", "ecom_search")
 COLL_NAME = os.getenv("COLLECTION_NAME", "products")
 
-async def process_batch(coll, query: Dict[str, Any], batch_size: int = 500):
+# Ids sampled per partition to place the range boundaries
+SAMPLES_PER_PARTITION = 50
+
+PROJECTION = {"openai_embedding_text": 1, TEXT_VERSION_FIELD: 1, **{field: 1 for field in SOURCE_FIELDS}}
+
+
+def text_update(doc: Dict[str, Any], new_text: str) -> Optional[Dict[str, Any]]:
+    """$set for a document's rebuilt text, or None when it is current."""
+    if not new_text:
+        return None
+    if new_text == doc.get("openai_embedding_text") and doc.get(TEXT_VERSION_FIELD) == EMBEDDING_TEXT_VERSION:
+        return None
+    return {"openai_embedding_text": new_text, TEXT_VERSION_FIELD: EMBEDDING_TEXT_VERSION}
+
+async def process_batch(coll, query: Dict[str, Any], batch_size: int = 500, dry_run: bool = False):
     """
     Compute and upsert openai_embedding_text when it changed.
-    
+
     Args:
         coll: MongoDB collection
         query: Query filter for documents to process
         batch_size: Number of documents to process in each batch
+        dry_run: Build and compare texts without writing
     """
-    projection = {
-        "openai_embedding_text": 1, 
-        "title": 1, 
-        "brand": 1, 
-        "category": 1, 
-        "sub_category": 1, 
-        "description": 1, 
-        "product_details": 1, 
-        "selling_price_numeric": 1, 
-        "price_inr": 1, 
-        "actual_price_numeric": 1
-    }
-    
-    cursor = coll.find(query, projection=projection).batch_size(batch_size)
+    cursor = coll.find(query, projection=PROJECTION).batch_size(batch_size)
     ops = []
     processed_count = 0
     updated_count = 0
-    
+
     async for doc in cursor:
         processed_count += 1
-        
+
         try:
-            new_text = build_embedding_text(doc)
-            current_text = doc.get("openai_embedding_text")
-            
-            if new_text and new_text != current_text:
-                from pymongo import UpdateOne
+            update = text_update(doc, build_embedding_text(doc))
+
+            if update:
                 ops.append(UpdateOne(
                     {"_id": doc["_id"]},
-                    {"$set": {"openai_embedding_text": new_text}},
+                    {"$set": update},
                     upsert=False
                 ))
                 updated_count += 1
-            
+
             # Process batch when it's full
             if len(ops) >= batch_size:
-                if ops:
+                if ops and not dry_run:
                     await coll.bulk_write(ops, ordered=False)
                     print(f"Processed {processed_count} docs, updated {updated_count} so far...")
                 ops.clear()
-                
+
         except Exception as e:
             print(f"Error processing document {doc.get('_id')}: {e}")
             continue
-    
+
     # Process remaining operations
-    if ops:
+    if ops and not dry_run:
         await coll.bulk_write(ops, ordered=False)
-    
+
     print(f"Migration complete: processed {processed_count} docs, updated {updated_count} docs")
     return {"processed": processed_count, "updated": updated_count}
 
-async def main():
+
+def id_type(value: Any) -> Optional[str]:
+    """$type alias of an _id value ranges can be cut over, or None."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        # int, long and double _ids compare with each other
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, datetime):
+        return "date"
+    return None
+
+
+def id_range_query(lower: Any = None, upper: Any = None, type_alias: Optional[str] = None) -> Dict[str, Any]:
+    """Filter for lower <= _id < upper (None leaves that side open), optionally of one $type."""
+    bounds: Dict[str, Any] = {"$type": type_alias} if type_alias else {}
+    if lower is not None:
+        bounds["$gte"] = lower
+    if upper is not None:
+        bounds["$lt"] = upper
+    return {"_id": bounds} if bounds else {}
+
+
+def split_id_ranges(sample_ids: List[Any], partitions: int) -> List[Tuple[Any, Any]]:
+    """Cut the _id space into ranges of roughly equal document counts.
+
+    Args:
+        sample_ids: Randomly sampled ids (their quantiles become the boundaries)
+        partitions: Number of ranges wanted
+
+    Returns:
+        Consecutive (lower, upper) ranges covering every _id; the first lower
+        and last upper are None
+    """
+    ordered = sorted(set(sample_ids))
+    if partitions <= 1 or not ordered:
+        return [(None, None)]
+    boundaries = []
+    for i in range(1, partitions):
+        boundary = ordered[min(len(ordered) - 1, i * len(ordered) // partitions)]
+        if not boundaries or boundary > boundaries[-1]:
+            boundaries.append(boundary)
+    edges = [None, *boundaries, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def partition_id_queries(sample_ids: List[Any], partitions: int) -> List[Dict[str, Any]]:
+    """Range filters covering every _id, whatever mix of BSON types the ids use.
+
+    Ranges are cut per _id type (split_id_ranges), with partitions shared out
+    by each type's share of the sample; a final filter matches the ids of every
+    type that was not sampled.
+
+    Args:
+        sample_ids: Randomly sampled ids
+        partitions: Number of ranges wanted (before the final filter)
+
+    Returns:
+        _id filters matching each document exactly once
+    """
+    by_type: Dict[str, List[Any]] = {}
+    for value in sample_ids:
+        alias = id_type(value)
+        if alias:
+            by_type.setdefault(alias, []).append(value)
+    if partitions <= 1 or not by_type:
+        return [{}]
+
+    queries = []
+    for alias, values in by_type.items():
+        share = max(1, round(partitions * len(values) / len(sample_ids)))
+        queries.extend(id_range_query(lower, upper, alias) for lower, upper in split_id_ranges(values, share))
+    queries.append({"_id": {"$not": {"$type": sorted(by_type)}}})
+    return queries
+
+
+def process_range(uri: str, db_name: str, coll_name: str, query: Dict[str, Any],
+                  batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """Rebuild the texts of one _id range filter (runs in a worker process).
+
+    Each process opens its own client: MongoClient is not fork-safe.
+
+    Returns:
+        Counters for the range
+    """
+    started = time.perf_counter()
+    client = MongoClient(uri)
+    coll = client[db_name][coll_name]
+    ops: List[UpdateOne] = []
+    processed = updated = errors = 0
+    try:
+        for doc in coll.find(query, PROJECTION).batch_size(batch_size):
+            processed += 1
+            try:
+                new_text = build_embedding_text(doc)
+            except Exception as e:
+                errors += 1
+                print(f"Error processing document {doc.get('_id')}: {e}")
+                continue
+            update = text_update(doc, new_text)
+            if update:
+                updated += 1
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+            if len(ops) >= batch_size:
+                if not dry_run:
+                    coll.bulk_write(ops, ordered=False)
+                ops = []
+        if ops and not dry_run:
+            coll.bulk_write(ops, ordered=False)
+    finally:
+        client.close()
+    return {"processed": processed, "updated": updated, "errors": errors,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def run_parallel(uri: str, workers: int, partitions: Optional[int] = None,
+                 batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """Rebuild every text with a process pool over _id ranges.
+
+    Args:
+        uri: MongoDB connection string
+        workers: Worker processes
+        partitions: _id ranges (default: 4 per worker)
+        batch_size: Updates per bulk_write
+        dry_run: Build and compare texts without writing
+
+    Returns:
+        Totals over all ranges
+    """
+    partitions = partitions or workers * 4
+    client = MongoClient(uri)
+    try:
+        sample = client[DB_NAME][COLL_NAME].aggregate([
+            {"$sample": {"size": partitions * SAMPLES_PER_PARTITION}},
+            {"$project": {"_id": 1}},
+        ])
+        ranges = partition_id_queries([doc["_id"] for doc in sample], partitions)
+    finally:
+        client.close()
+
+    print(f"Processing {len(ranges)} _id ranges with {workers} worker processes...")
+    started = time.perf_counter()
+    totals = {"processed": 0, "updated": 0, "errors": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(process_range, uri, DB_NAME, COLL_NAME, query, batch_size, dry_run)
+            for query in ranges
+        ]
+        for done, future in enumerate(futures, 1):
+            result = future.result()
+            for key in totals:
+                totals[key] += result[key]
+            print(f"Range {done}/{len(ranges)}: {result['processed']:,} docs, "
+                  f"{result['updated']:,} updated in {result['seconds']:.1f}s")
+    elapsed = time.perf_counter() - started
+    totals["seconds"] = round(elapsed, 3)
+    totals["documents_per_second"] = round(totals["processed"] / elapsed, 1) if elapsed > 0 else 0.0
+    return totals
+
+async def main(args: argparse.Namespace):
     """Main migration function."""
     assert MONGODB_URI, "MONGODB_URI missing from environment"
-    
+
     print(f"Starting migration to update openai_embedding_text...")
     print(f"Database: {DB_NAME}")
     print(f"Collection: {COLL_NAME}")
-    
+
     client = AsyncIOMotorClient(MONGODB_URI)
     coll = client[DB_NAME][COLL_NAME]
-    
+
     # Check collection exists and get count
     total_docs = await coll.count_documents({})
     print(f"Total documents in collection: {total_docs:,}")
-    
+
     if total_docs == 0:
         print("No documents found. Exiting.")
         client.close()
         return
-    
+
     # Process all documents
-    result = await process_batch(coll, {})
-    
-    client.close()
-    
+    if args.workers > 1:
+        client.close()
+        result = run_parallel(MONGODB_URI, args.workers, args.partitions, args.batch_size, args.dry_run)
+    else:
+        result = await process_batch(coll, {}, args.batch_size, args.dry_run)
+        client.close()
+
     print("\nMigration Summary:")
     print(f"- Documents processed: {result['processed']:,}")
     print(f"- Documents updated: {result['updated']:,}")
     print(f"- Documents unchanged: {result['processed'] - result['updated']:,}")
-    
+
     return result
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Rebuild openai_embedding_text where it changed")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (1 = single async pass)")
+    parser.add_argument("--partitions", type=int, help="_id ranges to split the collection into (default: 4 per worker)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Updates per bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Build and compare texts without writing")
+    asyncio.run(main(parser.parse_args()))
@@ -14,7 +14,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 # Add project root to path so we can import our domain services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from domain.embeddings.services import build_embedding_text
+from domain.embeddings.services import EMBEDDING_TEXT_VERSION, build_embedding_text
 
 load_dotenv()
 
@@ -61,7 +61,7 @@ async def migrate_simple():
                     # Update this document
                     await coll.update_one(
                         {"_id": doc["_id"]},
-                        {"$set": {"openai_embedding_text": new_text}}
+                        {"$set": {"openai_embedding_text": new_text, "embedding_text_version": EMBEDDING_TEXT_VERSION}}
                     )
                     updated_count += 1
                     
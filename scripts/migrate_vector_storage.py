@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Convert stored embeddings between BSON double arrays and packed float32 BinData.
+
+Walks the collection in `_id` order with keyset queries, selecting only the
+documents whose vector is still in the source format, so the migration can be
+stopped and re-run at any time. Before converting, a sample of vectors is
+measured to report the BSON size and decode-time savings; after converting,
+the collection's data size is reported from collStats (on-disk storage shrinks
+as WiredTiger reuses the freed space, or after compact).
+
+Atlas Vector Search indexes both formats with the same index definition.
+
+Usage:
+  python -m scripts.migrate_vector_storage --to binary --dry-run
+  python -m scripts.migrate_vector_storage --to binary --include-cache
+  python -m scripts.migrate_vector_storage --to array   # roll back
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import bson
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from app.db.vector_codec import STORAGE_ARRAY, STORAGE_BINARY, STORAGE_FORMATS, VectorCodec, vector_to_array
+from app.repositories.embedding_cache_repository import EMBEDDING_CACHE_COLLECTION
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_FIELD = "openai_embedding"
+CACHE_EMBEDDING_FIELD = "embedding"
+SAMPLE_SIZE = 200
+
+
+def measure_savings(vectors: List[Any], repeat: int = 3) -> Dict[str, Any]:
+    """Compare BSON size and decode time of vectors in both storage formats.
+
+    Decode time covers what a reader pays: BSON decoding plus turning the
+    value into a float32 array.
+
+    Args:
+        vectors: Sample vectors, in either format
+        repeat: Timing repetitions (the best one is reported)
+
+    Returns:
+        Dictionary with per-vector bytes and per-1000-vector decode milliseconds
+    """
+    if not vectors:
+        return {"sample_size": 0}
+
+    results: Dict[str, Any] = {"sample_size": len(vectors)}
+    for storage in STORAGE_FORMATS:
+        codec = VectorCodec(storage)
+        encoded = [bson.encode({"v": codec.encode(vector)}) for vector in vectors]
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for document in encoded:
+                vector_to_array(bson.decode(document)["v"])
+            best = min(best, time.perf_counter() - started)
+        results[storage] = {
+            "bytes_per_vector": round(sum(len(document) for document in encoded) / len(encoded), 1),
+            "decode_ms_per_1000": round(best / len(encoded) * 1000 * 1000, 3),
+        }
+
+    array, binary = results[STORAGE_ARRAY], results[STORAGE_BINARY]
+    results["bytes_saved_per_vector"] = round(array["bytes_per_vector"] - binary["bytes_per_vector"], 1)
+    results["size_ratio"] = round(binary["bytes_per_vector"] / array["bytes_per_vector"], 3)
+    results["decode_speedup"] = (
+        round(array["decode_ms_per_1000"] / binary["decode_ms_per_1000"], 1)
+        if binary["decode_ms_per_1000"] > 0 else None
+    )
+    return results
+
+
+def source_query(field: str, target: str) -> Dict[str, Any]:
+    """Documents whose vector is not yet in the target format."""
+    return {field: {"$type": "array" if target == STORAGE_BINARY else "binData"}}
+
+
+def migrate(collection: Any, field: str, target: str, batch_size: int = 500,
+            max_documents: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """Rewrite every vector in field into the target storage format.
+
+    Args:
+        collection: pymongo collection
+        field: Field storing the vector
+        target: "binary" or "array"
+        batch_size: Documents per keyset batch and bulk_write
+        max_documents: Stop after this many documents
+        dry_run: Count the documents without writing
+
+    Returns:
+        Counters for the run
+    """
+    codec = VectorCodec(target)
+    query = source_query(field, target)
+    stats = {"converted": 0, "errors": 0, "batches": 0}
+    last_id = None
+    started = time.time()
+
+    while True:
+        limit = batch_size
+        if max_documents:
+            limit = min(limit, max_documents - stats["converted"] - stats["errors"])
+            if limit <= 0:
+                break
+
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+        documents = list(collection.find(batch_query, {field: 1}).sort("_id", 1).limit(limit))
+        if not documents:
+            break
+        last_id = documents[-1]["_id"]
+
+        operations = []
+        for document in documents:
+            try:
+                operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {field: codec.encode(document[field])}}))
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"Cannot convert vector of {document['_id']}: {e}")
+
+        if operations and not dry_run:
+            try:
+                collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                stats["errors"] += len(operations)
+                logger.error(f"Bulk write of {len(operations)} vectors failed: {e}")
+                operations = []
+        stats["converted"] += len(operations)
+        stats["batches"] += 1
+
+        elapsed = time.time() - started
+        logger.info(f"{collection.name}.{field}: {stats['converted']} converted "
+                    f"({stats['converted'] / elapsed if elapsed > 0 else 0:.0f}/s), last _id {last_id}")
+        if len(documents) < limit:
+            break
+
+    stats["duration_seconds"] = round(time.time() - started, 2)
+    return stats
+
+
+def data_size(database: Any, collection_name: str) -> Optional[int]:
+    """Uncompressed data size of a collection in bytes, from collStats."""
+    try:
+        return database.command("collStats", collection_name).get("size")
+    except Exception as e:
+        logger.warning(f"collStats failed for {collection_name}: {e}")
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    connection_string = (
+        args.connection_string or
+        os.environ.get("MONGODB_URI") or
+        os.environ.get("MONGODB_ATLAS_URI") or
+        "mongodb://localhost:27017/"
+    )
+    client = MongoClient(connection_string)
+    database = client[os.environ.get("DB_NAME", "ecom_data")]
+    collection = database[os.environ.get("COLLECTION_NAME", "products")]
+
+    targets = [(collection, EMBEDDING_FIELD)]
+    if args.include_cache:
+        targets.append((database[EMBEDDING_CACHE_COLLECTION], CACHE_EMBEDDING_FIELD))
+
+    report: Dict[str, Any] = {"target": args.to, "dry_run": args.dry_run, "collections": {}}
+    try:
+        for target_collection, field in targets:
+            query = source_query(field, args.to)
+            pending = target_collection.count_documents(query)
+            sample = [
+                document[field]
+                for document in target_collection.find(query, {field: 1}).limit(args.sample_size)
+            ]
+            savings = measure_savings(sample)
+            size_before = data_size(database, target_collection.name)
+
+            stats = migrate(target_collection, field, args.to, args.batch_size, args.max_documents, args.dry_run)
+
+            entry = {"pending": pending, "sample": savings, **stats, "data_size_before": size_before}
+            if not args.dry_run:
+                entry["data_size_after"] = data_size(database, target_collection.name)
+            if savings.get("sample_size"):
+                per_vector = savings["bytes_saved_per_vector"]
+                entry["estimated_bytes_saved"] = int(per_vector * pending if args.to == STORAGE_BINARY else -per_vector * pending)
+            report["collections"][target_collection.name] = entry
+        return report
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert stored embeddings between double arrays and float32 BinData")
+    parser.add_argument("--to", choices=STORAGE_FORMATS, default=STORAGE_BINARY, help="Target storage format")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per keyset batch")
+    parser.add_argument("--max-documents", type=int, help="Maximum number of documents to convert per collection")
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE, help="Vectors measured for the savings report")
+    parser.add_argument("--include-cache", action="store_true", help="Also convert the embedding_cache collection")
+    parser.add_argument("--dry-run", action="store_true", help="Measure and count without writing")
+    parser.add_argument("--connection-string", type=str, help="MongoDB connection string")
+    args = parser.parse_args()
+
+    try:
+        report = run(args)
+        print(json.dumps(report, indent=2, default=str))
+    except KeyboardInterrupt:
+        logger.info("Migration interrupted by user; re-run to continue")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,8 @@ import openai
 from openai import OpenAI
 import json
 
+from app.services.rate_limiter import RateLimiter, create_embeddings_sync
+
 # Load environment variables
 load_dotenv()
 
@@ -26,7 +28,7 @@ logger = logging.getLogger(__name__)
 class OpenAIEmbeddingGenerator:
     """Generate embeddings using OpenAI's text-embedding-3-small model"""
     
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None):
         """Initialize the OpenAI embedding client"""
         self.model_name = "text-embedding-3-small"
         self.embedding_dimension = 1536  # text-embedding-3-small produces 1536-dim embeddings
@@ -41,6 +43,7 @@ class OpenAIEmbeddingGenerator:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
         self.client = OpenAI(api_key=api_key)
+        self.rate_limiter = rate_limiter or RateLimiter()
         
         logger.info(f"✅ OpenAI Embedding Generator initialized successfully")
 
@@ -94,7 +97,9 @@ class OpenAIEmbeddingGenerator:
                 logger.debug(f"Generating embedding for text: {text[:100]}...")
                 
                 # Call OpenAI embedding API
-                response = self.client.embeddings.create(
+                response = create_embeddings_sync(
+                    self.client,
+                    self.rate_limiter,
                     model=self.model_name,
                     input=text
                 )
@@ -138,7 +143,9 @@ class OpenAIEmbeddingGenerator:
                 logger.debug(f"Generating batch embeddings for {len(valid_texts)} texts...")
                 
                 # Call OpenAI embedding API with batch
-                response = self.client.embeddings.create(
+                response = create_embeddings_sync(
+                    self.client,
+                    self.rate_limiter,
                     model=self.model_name,
                     input=valid_texts
                 )
@@ -420,9 +427,7 @@ def main():
             # Show progress
             elapsed_time = time.time() - start_time
             print(f"   ⏱️  Progress: {total_processed} processed, {total_failed} failed, {elapsed_time:.1f}s elapsed")
-            
-            # Small delay to respect API rate limits
-            time.sleep(1)
+
         
         # Final statistics
         print(f"\n🎉 Processing completed!")
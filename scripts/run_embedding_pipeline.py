@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Run the staged async embedding pipeline over the product collection.
+
+Reader -> text builder -> N concurrent OpenAI workers -> bulk writer, connected
+by bounded queues (see app/services/embedding_pipeline.py). Uses the same
+embedding text as complete_embedding_pipeline.py, so documents whose text hash
+and embedding version are unchanged are skipped (the reader never fetches the
+stored vectors), and texts already in the embedding_cache collection are not
+sent to the API again. Progress is checkpointed by `_id`,
+so an interrupted run resumes where it stopped unless --restart is given.
+With --dimensions below the model's native size (text-embedding-3 models),
+the API returns shortened vectors; see migrate_embedding_dimensions.py to
+build them next to the existing ones instead of replacing them.
+
+--mode batch sends the texts as OpenAI Batch API jobs instead (half the price,
+results within --completion-window; see app/services/embedding_batch_runner.py).
+Job state lives in the embedding_batches collection, so rerunning the same
+command after an interruption polls the submitted jobs instead of resubmitting.
+scripts/fake_openai_batch_server.py serves the same endpoints locally
+(OPENAI_BASE_URL=http://127.0.0.1:8089/v1) for offline runs.
+
+--provider hashing (or EMBEDDING_PROVIDER=hashing) embeds with deterministic
+feature-hashing vectors and --fake-latency-ms / --fake-per-text-latency-ms of
+simulated API latency instead, to benchmark the pipeline without network or
+cost; --provider local uses the model in --local-model-path. Vectors are
+versioned with the provider's model, so they never pass for OpenAI ones.
+
+Usage:
+  python -m scripts.run_embedding_pipeline --workers 8 --embed-batch-size 256
+  python -m scripts.run_embedding_pipeline --only-missing --max-documents 5000 --dry-run
+  python -m scripts.run_embedding_pipeline --mode batch --chunk-size 20000 --max-in-flight 4
+  python -m scripts.run_embedding_pipeline --provider hashing --fake-latency-ms 300 --dry-run
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.vector_codec import STORAGE_ARRAY, STORAGE_FORMATS, VectorCodec
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_batch_repository import EmbeddingBatchRepository
+from app.repositories.embedding_cache_repository import EmbeddingCacheRepository
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
+from app.services.embedding_batch_runner import EmbeddingBatchConfig, EmbeddingBatchRunner
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+from app.services.embedding_provider import PROVIDER_OPENAI, PROVIDERS, create_embedding_provider
+from app.services.rate_limiter import RateLimiter
+from scripts.embedding_text_generator import SOURCE_FIELDS, build_embedding_text
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "text-embedding-3-small"
+EMBEDDING_DIMENSION = 1536
+
+
+async def run(args: argparse.Namespace) -> dict:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if args.mode == "batch" and args.provider != PROVIDER_OPENAI:
+        raise ValueError("--mode batch requires the openai provider")
+    if args.provider == PROVIDER_OPENAI and not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+
+    connection_string = (
+        args.connection_string or
+        os.environ.get("MONGODB_URI") or
+        os.environ.get("MONGODB_ATLAS_URI") or
+        "mongodb://localhost:27017/"
+    )
+    client = AsyncIOMotorClient(connection_string)
+    database = client[os.environ.get("DB_NAME", "ecom_data")]
+    collection = database[os.environ.get("COLLECTION_NAME", "products")]
+    provider = create_embedding_provider(
+        args.provider,
+        model=MODEL_NAME,
+        dimensions=args.dimensions,
+        api_key=api_key,
+        rate_limiter=RateLimiter(args.rpm, args.tpm),
+        max_retries=args.max_retries,
+        local_model_path=args.local_model_path,
+        local_model=args.local_model,
+        latency_ms=args.fake_latency_ms,
+        per_text_latency_ms=args.fake_per_text_latency_ms,
+        jitter=args.fake_latency_jitter,
+        concurrency=args.fake_concurrency,
+    )
+    model_name = provider.model
+    codec = VectorCodec(args.vector_storage)
+    reduced = EmbeddingFingerprint.reduced_dimensions(model_name, args.dimensions)
+
+    query = {}
+    if args.only_missing:
+        query = EmbeddingFingerprint.needs_embedding_filter(model_name, dimensions=args.dimensions)
+    run_name = (
+        f"run_embedding_pipeline:{'missing' if args.only_missing else 'all'}:"
+        f"{model_name}{f':d{reduced}' if reduced else ''}"
+    )
+    progress_store = EmbeddingProgressRepository(database)
+    cache = None if args.no_cache else EmbeddingCacheRepository(database, codec)
+
+    if args.mode == "batch":
+        batch_store = EmbeddingBatchRepository(database)
+        if args.restart and not args.dry_run:
+            await batch_store.clear(f"batch:{run_name}")
+        runner = EmbeddingBatchRunner(
+            collection,
+            client=provider.client,
+            build_text=build_embedding_text,
+            batch_store=batch_store,
+            run_name=f"batch:{run_name}",
+            config=EmbeddingBatchConfig(
+                chunk_size=args.chunk_size,
+                embed_batch_size=args.embed_batch_size,
+                max_batch_tokens=args.max_batch_tokens,
+                read_batch_size=args.read_batch_size,
+                write_batch_size=args.write_batch_size,
+                max_in_flight=args.max_in_flight,
+                poll_interval_seconds=args.poll_interval,
+                completion_window=args.completion_window,
+                max_documents=args.max_documents,
+                max_attempts=args.max_attempts,
+            ),
+            query=query,
+            source_fields=SOURCE_FIELDS,
+            model_name=model_name,
+            dimensions=args.dimensions,
+            vector_codec=codec,
+            progress_store=progress_store,
+            embedding_cache=cache,
+            work_dir=args.work_dir,
+            dry_run=args.dry_run,
+        )
+        try:
+            return await runner.run()
+        finally:
+            client.close()
+
+    config = EmbeddingPipelineConfig(
+        read_batch_size=args.read_batch_size,
+        embed_batch_size=args.embed_batch_size,
+        max_batch_tokens=args.max_batch_tokens,
+        embed_workers=args.workers,
+        write_batch_size=args.write_batch_size,
+        queue_size=args.queue_size,
+        max_documents=args.max_documents,
+        log_interval_seconds=args.log_interval,
+        max_attempts=args.max_attempts,
+    )
+    pipeline = EmbeddingPipeline(
+        collection,
+        embed_texts=provider.embed_batch,
+        build_text=build_embedding_text,
+        config=config,
+        query=query,
+        source_fields=SOURCE_FIELDS,
+        model_name=model_name,
+        dry_run=args.dry_run,
+        progress_store=progress_store,
+        checkpoint_name=run_name,
+        resume=not args.restart,
+        embedding_cache=cache,
+        dimensions=args.dimensions,
+        vector_codec=codec,
+    )
+    try:
+        metrics = await pipeline.run()
+        metrics["provider"] = provider.get_stats()
+        return metrics
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Staged async embedding pipeline")
+    parser.add_argument("--mode", choices=["stream", "batch"], default="stream",
+                        help="Synchronous embeddings requests or OpenAI Batch API jobs")
+    parser.add_argument("--provider", choices=PROVIDERS, default=os.environ.get("EMBEDDING_PROVIDER", PROVIDER_OPENAI),
+                        help="Source of the vectors (hashing: offline, deterministic)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per embeddings request")
+    parser.add_argument("--max-batch-tokens", type=int, default=200_000, help="Estimated tokens per embeddings request")
+    parser.add_argument("--read-batch-size", type=int, default=500, help="Documents per cursor batch")
+    parser.add_argument("--write-batch-size", type=int, default=500, help="Updates per bulk_write")
+    parser.add_argument("--queue-size", type=int, default=8, help="Batches buffered between stages")
+    parser.add_argument("--max-documents", type=int, help="Maximum number of documents to read")
+    parser.add_argument("--max-retries", type=int, default=5, help="Attempts per request on 429 responses")
+    parser.add_argument("--rpm", type=int, default=3000, help="OpenAI requests-per-minute limit (adapted from headers)")
+    parser.add_argument("--tpm", type=int, default=1_000_000, help="OpenAI tokens-per-minute limit (adapted from headers)")
+    parser.add_argument("--log-interval", type=float, default=10.0, help="Seconds between progress logs")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Failures before a document is no longer retried")
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored checkpoint and start from the first _id")
+    parser.add_argument("--only-missing", action="store_true", help="Only read documents whose embedding is missing or from another version")
+    parser.add_argument("--vector-storage", choices=STORAGE_FORMATS, default=STORAGE_ARRAY,
+                        help="Store vectors as BSON double arrays or packed float32 BinData")
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSION,
+                        help="Embedding dimensions (text-embedding-3 models can return shorter vectors)")
+    parser.add_argument("--local-model-path", default=os.environ.get("EMBEDDING_LOCAL_MODEL_PATH"),
+                        help="Local provider: model directory")
+    parser.add_argument("--local-model", default=os.environ.get("EMBEDDING_LOCAL_MODEL"),
+                        help="Local provider: model name recorded with the vectors (default: directory name)")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="Hashing provider: latency per request")
+    parser.add_argument("--fake-per-text-latency-ms", type=float, default=0.0, help="Hashing provider: latency per text")
+    parser.add_argument("--fake-latency-jitter", type=float, default=0.0, help="Hashing provider: log-normal latency sigma")
+    parser.add_argument("--fake-concurrency", type=int, help="Hashing provider: requests served at once")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or fill the embedding cache")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Batch mode: documents per batch job")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Batch mode: jobs submitted and not yet written")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Batch mode: seconds between job polls")
+    parser.add_argument("--completion-window", default="24h", help="Batch mode: Batch API completion window")
+    parser.add_argument("--work-dir", type=str, help="Batch mode: directory for the JSONL request files")
+    parser.add_argument("--dry-run", action="store_true", help="Run without writing to MongoDB")
+    parser.add_argument("--connection-string", type=str, help="MongoDB connection string")
+    args = parser.parse_args()
+
+    try:
+        metrics = asyncio.run(run(args))
+        print(json.dumps(metrics, indent=2))
+    except KeyboardInterrupt:
+        logger.info("Pipeline interrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Pipeline failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Keep embedding texts and vectors current as products change.
+
+Long-running worker tailing a MongoDB change stream on the products collection
+(see app/services/embedding_refresh_worker.py). Updates that touch one of the
+embedding source fields are coalesced per product for --debounce seconds, then
+the text is rebuilt and only products whose text hash changed are re-embedded,
+with the same pipeline, cache and storage options as run_embedding_pipeline.py.
+The change stream resume token is stored in embedding_checkpoints, so a
+restarted worker picks up the changes it missed; --restart ignores it.
+
+Requires a replica set or sharded cluster (any Atlas tier).
+
+--provider selects the source of the vectors like in run_embedding_pipeline.py
+(hashing: deterministic and offline, local: a model directory).
+
+Usage:
+  python -m scripts.run_embedding_refresh_worker --debounce 5
+  python -m scripts.run_embedding_refresh_worker --dimensions 512 --vector-storage binary
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.vector_codec import STORAGE_ARRAY, STORAGE_FORMATS, VectorCodec
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_cache_repository import EmbeddingCacheRepository
+from app.repositories.embedding_progress_repository import EmbeddingProgressRepository
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+from app.services.embedding_refresh_worker import EmbeddingRefreshConfig, EmbeddingRefreshWorker
+from app.services.embedding_provider import PROVIDER_OPENAI, PROVIDERS, create_embedding_provider
+from app.services.rate_limiter import RateLimiter
+from scripts.embedding_text_generator import SOURCE_FIELDS, build_embedding_text
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "text-embedding-3-small"
+EMBEDDING_DIMENSION = 1536
+
+
+async def run(args: argparse.Namespace) -> dict:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if args.provider == PROVIDER_OPENAI and not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+
+    connection_string = (
+        args.connection_string or
+        os.environ.get("MONGODB_URI") or
+        os.environ.get("MONGODB_ATLAS_URI") or
+        "mongodb://localhost:27017/"
+    )
+    client = AsyncIOMotorClient(connection_string)
+    database = client[os.environ.get("DB_NAME", "ecom_data")]
+    collection = database[os.environ.get("COLLECTION_NAME", "products")]
+    provider = create_embedding_provider(
+        args.provider,
+        model=MODEL_NAME,
+        dimensions=args.dimensions,
+        api_key=api_key,
+        rate_limiter=RateLimiter(args.rpm, args.tpm),
+        max_retries=args.max_retries,
+        local_model_path=args.local_model_path,
+        local_model=args.local_model,
+    )
+    model_name = provider.model
+    codec = VectorCodec(args.vector_storage)
+    progress_store = EmbeddingProgressRepository(database)
+    cache = None if args.no_cache else EmbeddingCacheRepository(database, codec)
+    reduced = EmbeddingFingerprint.reduced_dimensions(model_name, args.dimensions)
+
+    def build_pipeline(query: Dict[str, Any]) -> EmbeddingPipeline:
+        return EmbeddingPipeline(
+            collection,
+            embed_texts=provider.embed_batch,
+            build_text=build_embedding_text,
+            config=EmbeddingPipelineConfig(embed_batch_size=args.embed_batch_size, embed_workers=args.workers),
+            query=query,
+            source_fields=SOURCE_FIELDS,
+            model_name=model_name,
+            dry_run=args.dry_run,
+            progress_store=progress_store,
+            embedding_cache=cache,
+            dimensions=args.dimensions,
+            vector_codec=codec,
+        )
+
+    worker = EmbeddingRefreshWorker(
+        collection,
+        build_pipeline=build_pipeline,
+        source_fields=SOURCE_FIELDS,
+        progress_store=progress_store,
+        name=f"embedding_refresh_worker:{model_name}{f':d{reduced}' if reduced else ''}",
+        config=EmbeddingRefreshConfig(debounce_seconds=args.debounce, max_pending=args.max_pending),
+        resume=not args.restart,
+        dry_run=args.dry_run,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        stats = await worker.run(stop)
+        stats["provider"] = provider.get_stats()
+        return stats
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change-stream driven embedding refresh worker")
+    parser.add_argument("--debounce", type=float, default=5.0, help="Seconds to coalesce changes to a product")
+    parser.add_argument("--max-pending", type=int, default=500, help="Flush once this many products are pending")
+    parser.add_argument("--provider", choices=PROVIDERS, default=os.environ.get("EMBEDDING_PROVIDER", PROVIDER_OPENAI),
+                        help="Source of the vectors (hashing: offline, deterministic)")
+    parser.add_argument("--local-model-path", default=os.environ.get("EMBEDDING_LOCAL_MODEL_PATH"),
+                        help="Local provider: model directory")
+    parser.add_argument("--local-model", default=os.environ.get("EMBEDDING_LOCAL_MODEL"),
+                        help="Local provider: model name recorded with the vectors (default: directory name)")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent embedding requests per flush")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per embeddings request")
+    parser.add_argument("--max-retries", type=int, default=5, help="Attempts per request on 429 responses")
+    parser.add_argument("--rpm", type=int, default=3000, help="OpenAI requests-per-minute limit (adapted from headers)")
+    parser.add_argument("--tpm", type=int, default=1_000_000, help="OpenAI tokens-per-minute limit (adapted from headers)")
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSION,
+                        help="Embedding dimensions (text-embedding-3 models can return shorter vectors)")
+    parser.add_argument("--vector-storage", choices=STORAGE_FORMATS, default=STORAGE_ARRAY,
+                        help="Store vectors as BSON double arrays or packed float32 BinData")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or fill the embedding cache")
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored resume token and follow changes from now")
+    parser.add_argument("--dry-run", action="store_true", help="Run without writing to MongoDB")
+    parser.add_argument("--connection-string", type=str, help="MongoDB connection string")
+    args = parser.parse_args()
+
+    try:
+        stats = asyncio.run(run(args))
+        print(json.dumps(stats, indent=2))
+    except Exception as e:
+        logger.error(f"Refresh worker failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
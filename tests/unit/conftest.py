@@ -0,0 +1,83 @@
+"""
+Shared test doubles for the unit tests.
+
+FakeCollection stands in for a Motor collection: enough of find / aggregate /
+bulk_write for the repositories and pipelines, recording what they sent.
+"""
+
+
+class FakeCursor:
+    """In-memory Motor cursor over a list of documents."""
+
+    def __init__(self, documents, excluded=()):
+        self.documents = [{k: v for k, v in d.items() if k not in excluded} for d in documents]
+
+    def sort(self, key, direction=1):
+        self.documents = sorted(self.documents, key=lambda d: d[key], reverse=direction == -1)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents if length is None else self.documents[:length]
+
+    def __aiter__(self):
+        self._iterator = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """In-memory Motor collection.
+
+    find() and count_documents() understand `_id` $gt / $in and projections
+    that exclude fields; aggregate() returns the documents as the pipeline
+    result. bulk_write() keeps every batch in `writes`, the last $set per _id
+    in `updates`, and upserts $setOnInsert documents.
+    """
+
+    def __init__(self, documents=None):
+        self.documents = list(documents or [])
+        self.queries = []
+        self.pipelines = []
+        self.writes = []
+        self.updates = {}
+
+    def _matching(self, query):
+        condition = (query or {}).get("_id", {})
+        after, ids = condition.get("$gt"), condition.get("$in")
+        return [
+            d for d in self.documents
+            if (after is None or d["_id"] > after) and (ids is None or d["_id"] in ids)
+        ]
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query)
+        excluded = [field for field, value in (projection or {}).items() if value == 0]
+        return FakeCursor(self._matching(query), excluded)
+
+    async def count_documents(self, query):
+        return len(self._matching(query))
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        return FakeCursor(self.documents)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+        for op in operations:
+            _id = op._filter["_id"]
+            if "$set" in op._doc:
+                self.updates[_id] = op._doc["$set"]
+            if "$setOnInsert" in op._doc and not any(d["_id"] == _id for d in self.documents):
+                self.documents.append({"_id": _id, **op._doc["$setOnInsert"]})
@@ -0,0 +1,81 @@
+"""
+Unit tests for the memory-mapped catalog snapshot.
+"""
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from app.db.catalog_snapshot import CatalogSnapshot, CatalogSnapshotBuilder
+from app.repositories.local_search_backend import LocalSearchBackend
+
+
+IDS = [ObjectId(), ObjectId(), 7, "sku-4"]
+
+PRODUCTS = [
+    {"_id": IDS[0], "title": "Nike Running Shoes", "brand": "Nike", "category": "Footwear",
+     "selling_price_numeric": 2999, "product_details": [{"Color": "Red"}], "openai_embedding": [3.0, 4.0, 0.0],
+     "embedding_version": "text-embedding-3-small:text-v2", "embedding_updated_at": 100.0},
+    {"_id": IDS[1], "title": "Cotton T-Shirt", "brand": "Puma", "category": "Clothing",
+     "price_inr": 799, "openai_embedding": [0.0, 1.0, 0.0],
+     "embedding_version": "text-embedding-3-small:text-v2", "embedding_updated_at": 250.0},
+    {"_id": IDS[2], "title": "Leather Wallet", "category": "Accessories", "openai_embedding": None},
+    {"_id": IDS[3], "title": "Canvas Running Shoe", "category": "Footwear", "openai_embedding": [1.0, 0.0, 0.0],
+     "embedding_version": "text-embedding-3-small:text-v2", "embedding_updated_at": 200.0},
+]
+
+
+def _build(output_dir=None):
+    builder = CatalogSnapshotBuilder(output_dir=output_dir)
+    for product in PRODUCTS:
+        builder.add(product)
+    return builder.finish(source={"collection": "products"})
+
+
+def test_snapshot_roundtrips_through_memory_mapped_files(tmp_path):
+    path = str(tmp_path / "snapshot")
+    built = _build(output_dir=path)
+    loaded = CatalogSnapshot.load(path)
+
+    assert loaded.ids == IDS and isinstance(loaded.ids[0], ObjectId)
+    assert isinstance(np.load(f"{path}/has_vector.npy", mmap_mode="r"), np.memmap)
+    np.testing.assert_allclose(loaded.vectors, built.vectors)
+    np.testing.assert_allclose(loaded.vectors[0], [0.6, 0.8, 0.0], rtol=1e-6)
+    assert loaded.has_vector.tolist() == [True, True, False, True]
+    assert loaded.row_of(str(IDS[1])) == 1 and loaded.row_of(7) == 2 and loaded.row_of("missing") is None
+    assert loaded.strings["product_details.Color"].codes.tolist() == built.strings["product_details.Color"].codes.tolist()
+    assert np.isnan(loaded.numbers["selling_price_numeric"][1])
+    np.testing.assert_allclose(loaded.bm25.scores("running shoes"), built.bm25.scores("running shoes"))
+
+    manifest = loaded.manifest
+    assert manifest["count"] == 4 and manifest["vectors"] == 3 and manifest["dimensions"] == 3
+    assert manifest["model"] == "text-embedding-3-small" and manifest["source_updated_at"] == 250.0
+
+
+def test_staleness_reports_newer_embeddings_and_version_changes():
+    snapshot = _build()
+
+    assert snapshot.staleness(250.0, "text-embedding-3-small:text-v2") == []
+    reasons = snapshot.staleness(300.0, "text-embedding-3-large:text-v2")
+    assert len(reasons) == 2 and "updated since export" in reasons[0]
+
+
+@pytest.mark.asyncio
+async def test_backend_searches_a_mapped_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot")
+    _build().save(path)
+
+    class _Collection:
+        def find(self, query, projection=None):
+            wanted = query["_id"]["$in"]
+            documents = [dict(d) for d in PRODUCTS if d["_id"] in wanted]
+
+            async def _cursor():
+                for document in documents:
+                    yield document
+            return _cursor()
+
+    backend = LocalSearchBackend.from_snapshot(_Collection(), path)
+    results = await backend.search_products_vector([1.0, 0.0, 0.0], limit=2)
+    assert [r["_id"] for r in results] == ["sku-4", str(IDS[0])]
+    assert backend.get_stats()["embedding_version"] == "text-embedding-3-small:text-v2"
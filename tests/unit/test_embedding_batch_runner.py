@@ -0,0 +1,123 @@
+"""
+Unit tests for batch-mode embedding against the local fake batch server.
+"""
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from conftest import FakeCollection
+
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_batch_repository import CHUNK_SUBMITTED, CHUNK_WRITTEN, chunk_id
+from app.services.embedding_batch_runner import EmbeddingBatchConfig, EmbeddingBatchRunner
+from scripts.fake_openai_batch_server import create_app, fake_embedding
+
+MODEL = "text-embedding-3-small"
+
+
+class _FakeBatchStore:
+    def __init__(self, chunks=None):
+        self.chunks = {chunk["_id"]: chunk for chunk in chunks or []}
+
+    async def create_chunk(self, run, sequence, ids, texts, last_id, final=False):
+        chunk = {"_id": chunk_id(run, sequence), "run": run, "sequence": sequence,
+                 "status": "prepared" if ids else CHUNK_WRITTEN, "ids": ids, "texts": texts,
+                 "last_id": last_id, "final": final}
+        self.chunks[chunk["_id"]] = dict(chunk)
+        return chunk
+
+    async def mark_submitted(self, chunk_key, input_file_id, batch_id):
+        self.chunks[chunk_key].update(status=CHUNK_SUBMITTED, input_file_id=input_file_id, batch_id=batch_id)
+
+    async def mark_finished(self, chunk_key, status, counters, error=None):
+        self.chunks[chunk_key].update(status=status, counters=counters, error=error)
+
+    async def open_chunks(self, run):
+        return [dict(c) for c in sorted(self.chunks.values(), key=lambda c: c["sequence"])
+                if c["status"] in ("prepared", CHUNK_SUBMITTED)]
+
+    async def last_chunk(self, run):
+        return max(self.chunks.values(), key=lambda c: c["sequence"], default=None)
+
+
+class _FakeProgressStore:
+    def __init__(self):
+        self.failures = []
+
+    async def record_failures(self, failures):
+        self.failures.extend(failures)
+
+    async def get_exhausted_ids(self, ids, max_attempts):
+        return set()
+
+    async def resolve(self, ids):
+        pass
+
+
+def _client(app):
+    transport = httpx.ASGITransport(app=app)
+    return AsyncOpenAI(api_key="test", base_url="http://fake-openai/v1",
+                       http_client=httpx.AsyncClient(transport=transport, base_url="http://fake-openai/v1"))
+
+
+def _build_text(document):
+    return f"{document['title']} | category:footwear"
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_embeds_through_jobs_and_dead_letters_failures(tmp_path):
+    documents = [{"_id": i, "title": f"Shoe {i % 5}"} for i in range(30)]
+    documents[7]["title"] = "FAIL_EMBEDDING shoe"
+    app = create_app(polls_to_complete=2)
+    collection = FakeCollection(documents)
+    store = _FakeBatchStore()
+    progress = _FakeProgressStore()
+    runner = EmbeddingBatchRunner(
+        collection, _client(app), _build_text, store, "test-run",
+        config=EmbeddingBatchConfig(chunk_size=12, read_batch_size=6, embed_batch_size=4,
+                                    max_in_flight=2, poll_interval_seconds=0),
+        model_name=MODEL, dimensions=8, progress_store=progress, work_dir=str(tmp_path),
+    )
+
+    metrics = await runner.run()
+
+    assert metrics["read"] == 30 and metrics["chunks"]["submitted"] == 3
+    # Duplicate titles are sent once per chunk
+    assert metrics["distinct_texts"] < metrics["submitted"] == 30
+    # The failing request takes the other texts of its input list down with it
+    assert sorted(failure["_id"] for failure in progress.failures) == [4, 7, 9]
+    assert len(collection.updates) == 27
+    update = collection.updates[3]
+    assert update["openai_embedding"] == fake_embedding(_build_text(documents[3]), 8)
+    assert update["embedding_version"] == EmbeddingFingerprint.version(MODEL, 8)
+    assert all(chunk["status"] == CHUNK_WRITTEN for chunk in store.chunks.values())
+    assert len(list(tmp_path.glob("*.jsonl"))) == 3
+
+
+@pytest.mark.asyncio
+async def test_restart_polls_submitted_job_without_resubmitting(tmp_path):
+    documents = [{"_id": i, "title": f"Sandal {i}"} for i in range(5)]
+    app = create_app(polls_to_complete=1)
+    client = _client(app)
+    collection = FakeCollection(documents)
+
+    # A previous run submitted the only chunk, then stopped
+    first = EmbeddingBatchRunner(
+        collection, client, _build_text, _FakeBatchStore(), "test-run",
+        config=EmbeddingBatchConfig(poll_interval_seconds=0), model_name=MODEL, dimensions=8, work_dir=str(tmp_path),
+    )
+    chunk = await first._prepare_chunk()
+    await first._submit(chunk)
+    store = _FakeBatchStore([{**chunk, "sequence": 0}])
+
+    runner = EmbeddingBatchRunner(
+        collection, client, _build_text, store, "test-run",
+        config=EmbeddingBatchConfig(poll_interval_seconds=0), model_name=MODEL, dimensions=8, work_dir=str(tmp_path),
+    )
+    metrics = await runner.run()
+
+    assert metrics["chunks"]["resumed"] == 1 and metrics["chunks"]["submitted"] == 0
+    assert metrics["read"] == 0
+    assert len(app.state.batches) == 1
+    assert sorted(collection.updates) == [0, 1, 2, 3, 4]
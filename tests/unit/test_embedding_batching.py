@@ -0,0 +1,76 @@
+"""
+Unit tests for batched embedding requests in the complete embedding pipeline.
+"""
+
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test-api-key")
+
+from scripts.complete_embedding_pipeline import CompletEmbeddingPipeline, chunk_for_embedding  # noqa: E402
+
+
+class _ShuffledEmbeddings:
+    """Returns items out of order to check vectors are mapped by index."""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input, encoding_format="float"):
+        self.calls.append(list(input))
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text))] * 1536)
+            for i, text in enumerate(input)
+        ]
+        response = SimpleNamespace(data=list(reversed(data)))
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+    @property
+    def with_raw_response(self):
+        return self
+
+
+def test_chunks_bounded_by_inputs_and_tokens():
+    texts = ["a" * 40] * 5  # 10 estimated tokens each
+    assert chunk_for_embedding(texts, max_inputs=2, max_tokens=1000) == [(0, 2), (2, 4), (4, 5)]
+    assert chunk_for_embedding(texts, max_inputs=10, max_tokens=25) == [(0, 2), (2, 4), (4, 5)]
+    # A single oversized text still gets its own request
+    assert chunk_for_embedding(["a" * 400], max_inputs=10, max_tokens=5) == [(0, 1)]
+    assert chunk_for_embedding([], max_inputs=10, max_tokens=5) == []
+
+
+def test_process_batch_sends_multi_input_requests():
+    embeddings = _ShuffledEmbeddings()
+    pipeline = CompletEmbeddingPipeline(
+        embedding_batch_size=2,
+        openai_client=SimpleNamespace(embeddings=embeddings),
+        collection=object(),
+    )
+    documents = [
+        {"_id": i, "title": "Shoe " + "x" * i, "category": "Footwear"}
+        for i in range(5)
+    ]
+
+    results = pipeline.process_batch_complete(documents, dry_run=True)
+
+    assert results["embeddings_generated"] == 5
+    assert [len(call) for call in embeddings.calls] == [2, 2, 1]
+
+    vectors = pipeline.generate_openai_embeddings_batch(["ab", "abcd"])
+    assert [v[0] for v in vectors] == [2.0, 4.0]
+
+
+def test_process_batch_embeds_duplicate_texts_once():
+    embeddings = _ShuffledEmbeddings()
+    pipeline = CompletEmbeddingPipeline(
+        openai_client=SimpleNamespace(embeddings=embeddings),
+        collection=object(),
+    )
+    documents = [{"_id": i, "title": f"Shoe {i % 2}", "category": "Footwear"} for i in range(6)]
+
+    results = pipeline.process_batch_complete(documents, dry_run=True)
+
+    assert results["embeddings_generated"] == 6
+    assert [len(call) for call in embeddings.calls] == [2]
+    assert results["duplicates"] == 4
+    assert results["api_inputs_saved"] == 4
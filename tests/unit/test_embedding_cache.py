@@ -0,0 +1,56 @@
+"""
+Unit tests for the embedding cache and in-batch text deduplication.
+"""
+
+import pytest
+
+from conftest import FakeCollection
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.repositories.embedding_cache_repository import (
+    EmbeddingCacheRepository, cache_key, group_texts_by_hash
+)
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+
+
+def test_group_texts_by_hash_keeps_first_seen_order():
+    groups = group_texts_by_hash(["b", "a", "b", "c", "a"])
+
+    assert list(groups.values()) == [[0, 2], [1, 4], [3]]
+    assert list(groups)[0] == EmbeddingFingerprint.text_hash("b")
+
+
+@pytest.mark.asyncio
+async def test_pipeline_embeds_each_distinct_text_once_and_reuses_cache():
+    # Six size variants share two texts; one text was embedded by an earlier run
+    documents = [{"_id": i, "title": "Runner" if i % 2 else "Sandal", "category": "Footwear"} for i in range(6)]
+    cache = EmbeddingCacheRepository({"embedding_cache": FakeCollection()})
+    await cache.put_many("m", 2, {EmbeddingFingerprint.text_hash("Sandal | Footwear"): [0.0, 1.0]})
+
+    requests = []
+
+    async def embed_texts(texts):
+        requests.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    products = FakeCollection(documents)
+    pipeline = EmbeddingPipeline(
+        products,
+        embed_texts=embed_texts,
+        build_text=lambda d: f"{d['title']} | {d['category']}",
+        config=EmbeddingPipelineConfig(read_batch_size=10, embed_batch_size=10, embed_workers=1),
+        model_name="m",
+        embedding_cache=cache,
+        dimensions=2,
+    )
+    metrics = await pipeline.run()
+
+    assert requests == [["Runner | Footwear"]]
+    vectors = {_id: update["openai_embedding"] for _id, update in products.updates.items()}
+    assert vectors == {i: [1.0, 0.0] if i % 2 else [0.0, 1.0] for i in range(6)}
+    assert metrics["embedding_cache"] == {
+        "inputs": 6, "api_inputs": 1, "cache_hits": 1, "duplicates": 4, "api_inputs_saved": 5
+    }
+    runner_key = cache_key("m", 2, EmbeddingFingerprint.text_hash("Runner | Footwear"))
+    assert runner_key in [d["_id"] for d in cache.collection.documents]
+    # Vectors of another dimension are not served for this key
+    assert await cache.get_many("m", 3, [EmbeddingFingerprint.text_hash("Runner | Footwear")]) == {}
@@ -0,0 +1,54 @@
+"""
+Unit tests for embedding fingerprint (text hash + version) change detection.
+"""
+
+from app.db.vector_codec import dimensions_expression
+from app.domain.embeddings.services import EmbeddingFingerprint
+
+MODEL = "text-embedding-3-small"
+
+
+def test_status_uses_hash_and_version():
+    text = "Blue Shirt | brand:york"
+    current = {**EmbeddingFingerprint.fields(text, MODEL), "embedding_dimensions": 1536}
+
+    assert EmbeddingFingerprint.status(current, text, MODEL, dimension=1536) == EmbeddingFingerprint.SKIP
+    assert EmbeddingFingerprint.status(current, text + " | color:red", MODEL) == EmbeddingFingerprint.EMBED
+    assert EmbeddingFingerprint.status(current, text, "text-embedding-3-large") == EmbeddingFingerprint.EMBED
+    assert EmbeddingFingerprint.status({**current, "embedding_dimensions": 0}, text, MODEL) == EmbeddingFingerprint.EMBED
+
+    legacy = {"legacy_embedding_text": text, "embedding_dimensions": 1536, "embedding_model": MODEL}
+    assert EmbeddingFingerprint.status(legacy, text, MODEL) == EmbeddingFingerprint.BACKFILL
+    assert EmbeddingFingerprint.status(legacy, "changed", MODEL) == EmbeddingFingerprint.EMBED
+
+
+def test_projection_never_reads_the_vector():
+    projection = EmbeddingFingerprint.projection(["title", "brand"])
+
+    assert projection["title"] == 1
+    assert "openai_embedding" not in projection
+    assert "openai_embedding_text" not in projection
+    assert projection["embedding_dimensions"] == dimensions_expression("openai_embedding")
+
+
+def test_builder_version_change_reembeds_only_changed_texts():
+    text = "Blue Shirt | brand:york"
+    stale_version = MODEL + ":text-v" + str(EmbeddingFingerprint.TEXT_VERSION - 1)
+    stale = {
+        **EmbeddingFingerprint.fields(text, MODEL),
+        "embedding_version": stale_version,
+        "embedding_text_version": EmbeddingFingerprint.TEXT_VERSION - 1,
+        "embedding_dimensions": 1536,
+    }
+
+    # Same text under the new builder: keep the vector, restamp the fingerprint
+    assert EmbeddingFingerprint.status(stale, text, MODEL) == EmbeddingFingerprint.BACKFILL
+    assert EmbeddingFingerprint.status(stale, text + " | color:red", MODEL) == EmbeddingFingerprint.EMBED
+    assert EmbeddingFingerprint.change_reason(stale) == EmbeddingFingerprint.BUILDER_CHANGE
+    # Documents without the stamp fall back to the version string
+    unstamped = {key: value for key, value in stale.items() if key != "embedding_text_version"}
+    assert EmbeddingFingerprint.change_reason(unstamped) == EmbeddingFingerprint.BUILDER_CHANGE
+
+    current = {**EmbeddingFingerprint.fields(text, MODEL), "embedding_dimensions": 1536}
+    assert current["embedding_text_version"] == EmbeddingFingerprint.TEXT_VERSION
+    assert EmbeddingFingerprint.change_reason(current) == EmbeddingFingerprint.CONTENT_CHANGE
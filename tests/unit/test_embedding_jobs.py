@@ -0,0 +1,101 @@
+"""
+Unit tests for resumable embedding jobs.
+"""
+
+import os
+import time
+
+import pytest
+
+from conftest import FakeCollection
+
+os.environ.setdefault("OPENAI_API_KEY", "test-api-key")
+
+from app.repositories.embedding_job_repository import job_progress, new_job_document  # noqa: E402
+from app.repositories.product_repository import ProductRepository  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+
+class _FakeJobRepository:
+    def __init__(self, job):
+        self.job = job
+
+    async def get_job(self, job_id):
+        return self.job
+
+    async def mark_running(self, job_id, total=None):
+        self.job.update(status="running", total=total)
+        self.job["runs"] += 1
+
+    async def save_progress(self, job_id, last_id, counters, throughput=None):
+        self.job.update(last_id=last_id, counters=counters)
+
+    async def heartbeat(self, job_id, counters, throughput):
+        self.job.update(live_counters=counters, throughput=throughput)
+
+    async def finish(self, job_id, status, error=None):
+        self.job.update(status=status, error=error)
+
+
+class _FakeProgressRepository:
+    async def get_exhausted_ids(self, ids, max_attempts):
+        return set()
+
+    async def record_failures(self, failures):
+        return len(failures)
+
+    async def resolve(self, ids):
+        pass
+
+
+class _FakeCacheRepository:
+    async def get_many(self, model, dimensions, text_hashes):
+        return {}
+
+    async def put_many(self, model, dimensions, vectors):
+        return len(vectors)
+
+
+def test_job_progress_reports_eta_and_staleness():
+    job = new_job_document("api", {"batch_size": 100}, total=1000)
+    job.update(status="running", counters={"processed": 400}, throughput=50.0)
+
+    progress = job_progress(job)
+    assert progress["percentage"] == 40.0
+    assert progress["eta_seconds"] == 12.0
+    assert progress["stale"] is False
+    # Heartbeats count past the checkpoint
+    job["live_counters"] = {"processed": 500}
+    assert job_progress(job)["percentage"] == 50.0
+
+    job["heartbeat_at"] = time.time() - 600
+    assert job_progress(job, stale_after_seconds=120)["stale"] is True
+
+
+@pytest.mark.asyncio
+async def test_run_job_resumes_after_checkpoint_and_accumulates_counters():
+    collection = FakeCollection([{"_id": i, "title": f"Shoe {i}", "category": "Footwear"} for i in range(10)])
+    job = new_job_document("api", {"batch_size": 3}, total=10)
+    job.update(status="interrupted", last_id=5, counters={"processed": 6, "written": 6, "skipped": 0, "dead_lettered": 0})
+    # The last heartbeat counted two documents past the checkpoint; they are re-read
+    job["live_counters"] = {"processed": 8, "written": 8, "skipped": 0, "dead_lettered": 0}
+    jobs = _FakeJobRepository(job)
+
+    service = EmbeddingService(
+        ProductRepository(collection), progress_repo=_FakeProgressRepository(), job_repo=jobs,
+        cache_repo=_FakeCacheRepository()
+    )
+
+    async def embed_texts(texts):
+        return [[0.5] for _ in texts]
+
+    service._generate_embeddings = embed_texts
+    stats = await service.run_job(str(job["_id"]))
+
+    assert sorted(collection.updates) == [6, 7, 8, 9]
+    assert stats["total_updated"] == 4
+    assert job["status"] == "completed"
+    assert job["last_id"] == 9
+    assert job["total"] == 10
+    assert job["counters"]["processed"] == 10
+    assert job["counters"]["written"] == 10
@@ -0,0 +1,155 @@
+"""
+Unit tests for the staged async embedding pipeline.
+"""
+
+import asyncio
+
+import pytest
+
+from conftest import FakeCollection
+from app.domain.embeddings.services import EmbeddingFingerprint
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingPipelineConfig
+
+
+class _FakeProgressStore:
+    def __init__(self, checkpoint=None, attempts=None):
+        self.checkpoint = checkpoint
+        self.attempts = dict(attempts or {})
+        self.saved = []
+
+    async def get_checkpoint(self, name):
+        return self.checkpoint
+
+    async def save_checkpoint(self, name, last_id, completed=False, stats=None):
+        self.saved.append((last_id, completed))
+
+    async def record_failures(self, failures):
+        for failure in failures:
+            self.attempts[failure["_id"]] = self.attempts.get(failure["_id"], 0) + 1
+        return len(failures)
+
+    async def get_exhausted_ids(self, ids, max_attempts):
+        return {i for i in ids if self.attempts.get(i, 0) >= max_attempts}
+
+    async def resolve(self, ids):
+        for i in ids:
+            self.attempts.pop(i, None)
+
+
+def _build_text(document):
+    return f"{document['title']} | category:{document['category']}"
+
+
+def _documents(count):
+    return [{"_id": i, "title": f"Product {i}", "category": "footwear"} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_embeds_and_writes_every_document():
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def embed_texts(texts):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [[float(len(t))] for t in texts]
+
+    collection = FakeCollection(_documents(100))
+    config = EmbeddingPipelineConfig(read_batch_size=30, embed_batch_size=8, embed_workers=4, write_batch_size=25)
+    metrics = await EmbeddingPipeline(collection, embed_texts, _build_text, config).run()
+
+    written = [op._doc["$set"] for batch in collection.writes for op in batch]
+    assert len(written) == 100
+    assert all(update["openai_embedding"] == [float(len(update["openai_embedding_text"]))] for update in written)
+    assert metrics["stages"]["embed"]["batches"] == 13
+    assert metrics["queues"]["embed"]["peak_depth"] <= config.queue_size
+    assert peak_in_flight > 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_unchanged_and_survives_failed_batch():
+    documents = _documents(10)
+    # 0 has a current fingerprint; 1 is a legacy vector whose stored text still matches
+    documents[0].update(EmbeddingFingerprint.fields(_build_text(documents[0]), "text-embedding-3-small"))
+    documents[0]["embedding_dimensions"] = 1536
+    documents[1]["openai_embedding_text"] = _build_text(documents[1])
+    documents[1]["openai_embedding"] = [1.0]
+
+    async def embed_texts(texts):
+        if any(t.startswith("Product 5 ") for t in texts):
+            raise RuntimeError("upstream error")
+        return [[0.0] for _ in texts]
+
+    collection = FakeCollection(documents)
+    config = EmbeddingPipelineConfig(embed_batch_size=3, embed_workers=2)
+    metrics = await EmbeddingPipeline(collection, embed_texts, _build_text, config).run()
+
+    updates = {op._filter["_id"]: op._doc["$set"] for batch in collection.writes for op in batch}
+    assert metrics["skipped"] == 1
+    assert metrics["backfilled"] == 1
+    assert metrics["stages"]["embed"]["errors"] == 3
+    assert sorted(updates) == [1, 2, 3, 4, 8, 9]
+    # The backfill stores only the fingerprint; re-embedded documents store it with the vector
+    assert set(updates[1]) == {"embedding_text_hash", "embedding_version", "embedding_text_version"}
+    assert updates[2]["embedding_text_hash"] == EmbeddingFingerprint.text_hash(_build_text(documents[2]))
+
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_checkpoint_and_dead_letters_poison_documents():
+    async def embed_texts(texts):
+        if any(t.startswith("Product 6 ") for t in texts):
+            raise RuntimeError("poison")
+        return [[0.0] for _ in texts]
+
+    store = _FakeProgressStore(checkpoint={"last_id": 3, "completed": False}, attempts={8: 3})
+    collection = FakeCollection(_documents(10))
+    config = EmbeddingPipelineConfig(read_batch_size=2, embed_batch_size=1, embed_workers=2)
+    metrics = await EmbeddingPipeline(
+        collection, embed_texts, _build_text, config,
+        progress_store=store, checkpoint_name="test"
+    ).run()
+
+    written_ids = sorted(op._filter["_id"] for batch in collection.writes for op in batch)
+    # Resumed after _id 3 with keyset queries; 8 is exhausted, 6 fails and is dead-lettered
+    assert collection.queries[0] == {"_id": {"$gt": 3}}
+    assert written_ids == [4, 5, 7, 9]
+    assert store.attempts == {6: 1, 8: 3}
+    assert metrics["dead_lettered"] == 1
+    # The high-water mark only advances in order and the pass ends completed
+    assert [last_id for last_id, _ in store.saved] == sorted(last_id for last_id, _ in store.saved)
+    assert store.saved[-1] == (9, True)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_fills_reduced_dimension_shadow_field():
+    # The primary vector is current; only the 512-d shadow field is built
+    text = _build_text(_documents(1)[0])
+    document = {**_documents(1)[0], **EmbeddingFingerprint.fields(text, "m"), "openai_embedding": [0.0] * 1536}
+    collection = FakeCollection([document])
+    sent = []
+
+    async def embed(texts):
+        sent.extend(texts)
+        return [[0.5] * 512 for _ in texts]
+
+    pipeline = EmbeddingPipeline(
+        collection, embed, _build_text, model_name="text-embedding-3-small",
+        embedding_field="openai_embedding_512", text_field=None, dimensions=512,
+    )
+    await pipeline.run()
+
+    assert sent == [text]
+    update = collection.writes[0][0]._doc["$set"]
+    assert update["openai_embedding_512"] == [0.5] * 512
+    assert update["openai_embedding_512_version"] == f"text-embedding-3-small:text-v{EmbeddingFingerprint.TEXT_VERSION}:d512"
+    assert update["openai_embedding_512_text_hash"] == EmbeddingFingerprint.text_hash(text)
+    assert "openai_embedding_text" not in update and "embedding_model" not in update
+    assert "embedding_text_version" not in update
+
+    shadow = {**document, **update}
+    assert EmbeddingFingerprint.status(
+        shadow, text, "text-embedding-3-small", dimension=512, embedding_field="openai_embedding_512"
+    ) == EmbeddingFingerprint.SKIP
@@ -0,0 +1,105 @@
+"""
+Unit tests for the embedding providers.
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from app.core.config import Settings
+from app.services.embedding_provider import (
+    HASHING_MODEL,
+    EmbeddingProvider,
+    HashingEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    create_embedding_provider,
+    hashing_embedding,
+    provider_from_settings,
+)
+from app.services.simple_embedding_service import SimpleEmbeddingService
+
+
+def test_hashing_embedding_is_deterministic_unit_and_similarity_preserving():
+    vector = hashing_embedding("Nike Air Zoom running shoes", 256)
+    assert vector == hashing_embedding("Nike Air Zoom running shoes", 256)
+    assert len(vector) == 256
+    assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+
+    related = np.dot(vector, hashing_embedding("nike air zoom shoes for running", 256))
+    unrelated = np.dot(vector, hashing_embedding("stainless steel pressure cooker 5 litre", 256))
+    assert related > 0.5 > abs(unrelated)
+    assert np.linalg.norm(hashing_embedding("", 64)) == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_hashing_provider_injects_latency_and_counts_calls():
+    provider = HashingEmbeddingProvider(dimensions=32, latency_ms=20, per_text_latency_ms=5)
+
+    start = time.perf_counter()
+    vectors = await provider.embed_batch(["red shoes", "blue shirt"])
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.029
+    assert vectors == [hashing_embedding("red shoes", 32), hashing_embedding("blue shirt", 32)]
+    assert await provider.embed("red shoes") == vectors[0]
+    stats = provider.get_stats()
+    assert stats["calls"] == 2 and stats["texts"] == 3 and stats["model"] == HASHING_MODEL
+
+
+def test_hashing_latency_jitter_is_seeded():
+    first = HashingEmbeddingProvider(latency_ms=100, jitter=0.5, seed=7)
+    second = HashingEmbeddingProvider(latency_ms=100, jitter=0.5, seed=7)
+    delays = [first.latency(1) for _ in range(5)]
+    assert delays == [second.latency(1) for _ in range(5)]
+    assert len(set(delays)) == 5
+
+
+def test_provider_from_settings_selects_provider():
+    settings = Settings(openai_api_key="test-key", embedding_provider="hashing", embedding_dimension=384)
+    provider = provider_from_settings(settings, dimensions=128)
+    assert isinstance(provider, HashingEmbeddingProvider)
+    assert provider.dimensions == 128 and provider.model == HASHING_MODEL
+
+    openai_provider = provider_from_settings(Settings(openai_api_key="test-key", embedding_dimension=512))
+    assert isinstance(openai_provider, OpenAIEmbeddingProvider)
+    assert openai_provider._dimension_kwargs == {"dimensions": 512}
+
+    with pytest.raises(ValueError):
+        create_embedding_provider("local")
+    with pytest.raises(ValueError):
+        create_embedding_provider("sentence-magic")
+
+
+def test_incomplete_provider_fails_at_construction():
+    class NoBatch(EmbeddingProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        NoBatch("model")
+
+
+def test_local_provider_records_its_own_model_and_checks_dimensions(tmp_path):
+    model_path = tmp_path / "bge-small"
+    model_path.mkdir()
+    (model_path / "config.json").write_text('{"hidden_size": 384}')
+
+    provider = create_embedding_provider("local", model="text-embedding-3-small", local_model_path=str(model_path))
+    assert provider.model == "bge-small" and provider.dimensions == 384
+    assert create_embedding_provider("local", dimensions=256, local_model_path=str(model_path)).dimensions == 256
+    with pytest.raises(ValueError):
+        create_embedding_provider("local", dimensions=1536, local_model_path=str(model_path))
+    with pytest.raises(ValueError):
+        create_embedding_provider("local", local_model="text-embedding-3-small", local_model_path=str(model_path))
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_service_uses_provider():
+    service = SimpleEmbeddingService(provider=HashingEmbeddingProvider(dimensions=16))
+
+    assert service.model == HASHING_MODEL and service.dimensions == 16
+    assert await service.generate_embedding("wireless earbuds") == hashing_embedding("wireless earbuds", 16)
+    assert len(await service.generate_embeddings_batch(["a", "b", "c"])) == 3
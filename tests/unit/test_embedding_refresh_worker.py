@@ -0,0 +1,102 @@
+"""
+Unit tests for the change-stream driven embedding refresh worker.
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from app.services.embedding_refresh_worker import (
+    EmbeddingRefreshConfig, EmbeddingRefreshWorker, source_change_pipeline, source_field_pattern
+)
+
+
+class _FakeStream:
+    def __init__(self, events, stop):
+        self.events = list(events)
+        self.stop = stop
+        self.resume_token = None
+        self.alive = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def try_next(self):
+        if not self.events:
+            self.stop.set()
+            return None
+        event = self.events.pop(0)
+        self.resume_token = event["_id"]
+        return event
+
+
+class _FakeCollection:
+    def __init__(self, events, stop):
+        self.events = events
+        self.stop = stop
+        self.watch_calls = []
+
+    def watch(self, pipeline, **options):
+        self.watch_calls.append(options)
+        return _FakeStream(self.events, self.stop)
+
+
+class _FakePipeline:
+    def __init__(self, query, queries):
+        queries.append(query)
+
+    async def run(self):
+        return {"skipped": 1, "backfilled": 0, "dead_lettered": 0, "stages": {"write": {"items": 1}}}
+
+
+class _FakeProgressStore:
+    def __init__(self, token=None):
+        self.token = token
+        self.saved = []
+
+    async def get_resume_token(self, name):
+        return self.token
+
+    async def save_resume_token(self, name, token, stats=None):
+        self.saved.append(token)
+
+
+def _event(token, document_id):
+    return {"_id": {"_data": token}, "operationType": "update", "documentKey": {"_id": document_id}}
+
+
+def test_change_filter_only_matches_source_fields():
+    pattern = source_field_pattern(["title", "product_details"])
+
+    assert re.search(pattern, "title") and re.search(pattern, "product_details.color")
+    assert not re.search(pattern, "openai_embedding") and not re.search(pattern, "title_hash")
+    match = source_change_pipeline(["title"])[0]["$match"]["$or"]
+    assert match[0] == {"operationType": {"$in": ["insert", "replace"]}}
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_coalesced_and_token_saved_after_flush():
+    stop = asyncio.Event()
+    events = [_event("t1", 1), _event("t2", 1), _event("t3", 2), _event("t4", 1)]
+    collection = _FakeCollection(events, stop)
+    queries = []
+    store = _FakeProgressStore(token={"_data": "t0"})
+    worker = EmbeddingRefreshWorker(
+        collection,
+        build_pipeline=lambda query: _FakePipeline(query, queries),
+        source_fields=["title"],
+        progress_store=store,
+        config=EmbeddingRefreshConfig(debounce_seconds=60, max_pending=10),
+    )
+
+    stats = await worker.run(stop)
+
+    # Four events for two products: one pipeline run over both, flushed on stop
+    assert queries == [{"_id": {"$in": [1, 2]}}]
+    assert collection.watch_calls[0]["resume_after"] == {"_data": "t0"}
+    assert store.saved == [{"_data": "t4"}]
+    assert stats["events"] == 4 and stats["documents"] == 2 and stats["flushes"] == 1
@@ -1,9 +1,5 @@
 """
-Unit tests for embedding text     assert "desc:" in out
-    assert "proudly made" not in out.lower()  # boilerplate removed
-    assert len(out) <= 220  # Increased slightly to accommodate the content
-
-def test_missing_pattern_is_omitted():eration service.
+Unit tests for embedding text generation service.
 Tests all the examples and edge cases from the specification.
 """
 import pytest
@@ -0,0 +1,53 @@
+"""
+Golden-file regression tests for the canonical embedding text builder.
+
+Every stored vector is keyed on the exact text it was built from, so any change
+to the builder's output re-embeds the affected products. A failure here means
+the output changed: if intended, bump EMBEDDING_TEXT_VERSION and regenerate the
+golden file with
+
+    python -m tests.unit.test_embedding_text_golden
+"""
+
+import json
+from pathlib import Path
+
+from app.domain.embeddings.services import EmbeddingTextService
+from app.domain.embeddings.text_builder import EMBEDDING_TEXT_VERSION, build_embedding_text
+from domain.embeddings.services import build_embedding_text as build_domain_text
+from scripts.embedding_text_generator import build_embedding_text as build_script_text
+
+GOLDEN_PATH = Path(__file__).parent / "golden" / "embedding_text.json"
+
+
+def _golden():
+    return json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+
+
+def test_builder_output_matches_golden_file():
+    golden = _golden()
+
+    assert golden["version"] == EMBEDDING_TEXT_VERSION, "regenerate the golden file after bumping the version"
+    for case in golden["cases"]:
+        assert build_embedding_text(case["document"]) == case["text"], case["name"]
+
+
+def test_every_entry_point_builds_the_same_text():
+    for case in _golden()["cases"]:
+        document = case["document"]
+        assert build_script_text(document) == case["text"]
+        assert build_domain_text(document) == case["text"]
+        assert EmbeddingTextService.build_embedding_text(document) == case["text"]
+
+
+def write_golden() -> None:
+    """Rebuild the expected texts of the golden documents with the current builder."""
+    golden = _golden()
+    golden["version"] = EMBEDDING_TEXT_VERSION
+    for case in golden["cases"]:
+        case["text"] = build_embedding_text(case["document"])
+    GOLDEN_PATH.write_text(json.dumps(golden, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    write_golden()
@@ -0,0 +1,78 @@
+"""
+Unit tests for cached $facet aggregations.
+"""
+
+import asyncio
+
+from bson import ObjectId
+
+from conftest import FakeCollection
+from app.core.cache import TTLCache, make_cache_key
+from app.repositories.product_repository import ProductRepository
+
+
+FACET_ROW = {
+    "categories": [{"_id": "Footwear", "count": 7}],
+    "brands": [{"_id": "Puma", "count": 4}, {"_id": "Nike", "count": 3}],
+    "price_ranges": [{"_id": {"min": 499.0, "max": 1299.0}, "count": 7}],
+    "total": [{"count": 7}],
+}
+
+
+def test_cache_key_ignores_dict_order():
+    assert make_cache_key("shoes", {"a": 1, "b": 2}) == make_cache_key("shoes", {"b": 2, "a": 1})
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(ttl_seconds=-1)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+
+def test_get_facets_single_pass_and_cached():
+    collection = FakeCollection([FACET_ROW])
+    repository = ProductRepository(collection, facet_cache=TTLCache(ttl_seconds=60))
+    filters = {"category": {"$regex": "footwear", "$options": "i"}}
+
+    facets = asyncio.run(repository.get_facets("Running  Shoes", filters=filters))
+    assert facets["brands"] == [{"value": "Puma", "count": 4}, {"value": "Nike", "count": 3}]
+    assert facets["price_ranges"] == [{"min": 499.0, "max": 1299.0, "count": 7}]
+    assert facets["total"] == 7
+
+    pipeline = collection.pipelines[0]
+    assert pipeline[0]["$match"]["$and"][0] == {"$text": {"$search": "running shoes"}}
+    assert set(pipeline[1]["$facet"]) == {"categories", "brands", "price_ranges", "total"}
+
+    # Same normalized query and filters are served from the cache
+    asyncio.run(repository.get_facets("running shoes", filters=dict(reversed(list(filters.items())))))
+    assert len(collection.pipelines) == 1
+
+
+def test_get_facets_restricted_to_candidate_ids():
+    products = [{"_id": ObjectId(), "category": "Footwear"} for _ in range(3)] + [{"_id": "sku-1", "category": "Bags"}]
+    collection = FakeCollection([FACET_ROW])
+    repository = ProductRepository(collection, facet_cache=TTLCache(ttl_seconds=60))
+
+    # The search legs return str(_id); the match must still hit the stored ObjectIds
+    ids = [str(product["_id"]) for product in products[1:]]
+    asyncio.run(repository.get_facets(ids=ids, ids_scope=["bags", "hybrid", None]))
+    wanted = collection.pipelines[0][0]["$match"]["_id"]["$in"]
+    assert [product["_id"] for product in products if product["_id"] in wanted] == [p["_id"] for p in products[1:]]
+
+    # Cached on the scope, whatever the (page-dependent) candidate list
+    asyncio.run(repository.get_facets(ids=ids[:1], ids_scope=["bags", "hybrid", None]))
+    assert len(collection.pipelines) == 1
+    asyncio.run(repository.get_facets(ids=ids))
+    asyncio.run(repository.get_facets(ids=ids))
+    assert len(collection.pipelines) == 3
+
+    empty = asyncio.run(repository.get_facets(ids=[]))
+    assert empty["total"] == 0 and len(collection.pipelines) == 3
@@ -0,0 +1,100 @@
+"""
+Unit tests for the bitmap filter index.
+"""
+
+import re
+
+import numpy as np
+import pytest
+
+from app.db.catalog_snapshot import CatalogSnapshotBuilder
+from app.db.filter_index import BitmapFilterIndex
+from app.domain.search.services import SearchDomainService
+
+CATEGORIES = ["Footwear", "Clothing", "Accessories", "Home Decor", "Kitchen"]
+COLORS = ["Red", "Blue", "Black", "White", "Navy Blue", "Olive"]
+
+
+def _products(count=2000, seed=4):
+    rng = np.random.default_rng(seed)
+    products = []
+    for row in range(count):
+        # A few categories hold most rows (bitsets), the rest are rare (postings)
+        category = CATEGORIES[min(int(rng.exponential(0.7)), len(CATEGORIES) - 1)]
+        product = {"_id": f"p{row}", "title": f"{rng.choice(COLORS)} item {row}", "category": category,
+                   "brand": f"Brand{rng.integers(0, 40)}",
+                   "product_details": [{"Color": list(rng.choice(COLORS, rng.integers(0, 3), replace=False))}]}
+        if rng.random() < 0.9:
+            product["selling_price_numeric"] = int(rng.integers(100, 10000))
+        else:
+            product["price_inr"] = int(rng.integers(100, 10000))
+        products.append(product)
+    return products
+
+
+def _index(products):
+    builder = CatalogSnapshotBuilder()
+    for product in products:
+        builder.add(product)
+    return BitmapFilterIndex.from_snapshot(builder.finish())
+
+
+def _reference(product, intent, strict_color):
+    """Row by row evaluation of build_mongo_filters semantics."""
+    def matches(pattern, *values):
+        return any(re.search(pattern, value, re.IGNORECASE) for value in values if value)
+
+    colors = [c for detail in product["product_details"] for c in detail.get("Color", [])]
+    if intent.get("categories"):
+        pattern = "|".join(map(re.escape, intent["categories"]))
+        if not matches(pattern, product["category"], product["title"]):
+            return False
+    price = product.get("selling_price_numeric", product.get("price_inr"))
+    constraints = intent.get("price_constraints", {})
+    if "under" in constraints and not price <= constraints["under"]:
+        return False
+    if "above" in constraints and not price >= constraints["above"]:
+        return False
+    if strict_color and intent.get("colors"):
+        if not matches("|".join(map(re.escape, intent["colors"])), product["title"], *colors):
+            return False
+    return True
+
+
+@pytest.mark.parametrize("intent", [
+    {"categories": ["footwear"]},
+    {"categories": ["kitchen", "decor"], "price_constraints": {"above": 2000, "under": 4000}},
+    {"price_constraints": {"under": 500}},
+    {"categories": ["clothing"], "colors": ["blue"], "price_constraints": {"above": 9000}},
+    {"categories": ["nothing-matches"], "colors": ["red"]},
+])
+def test_bitmaps_match_row_by_row_evaluation(intent):
+    products = _products()
+    index = _index(products)
+    filters = SearchDomainService().build_mongo_filters(intent, strict_color=True)
+
+    expected = [_reference(product, intent, strict_color=True) for product in products]
+    assert index.mask(filters).tolist() == expected
+    assert index.count(filters) == sum(expected)
+
+
+def test_equality_filters_and_clause_cache():
+    products = _products()
+    index = _index(products)
+    stats = index.get_stats()
+    assert stats["dense_bitsets"] > 0 and stats["string_fields"] == 5
+
+    brands = index.mask({"brand": {"$in": ["Brand3", "Brand7"]}})
+    assert brands.tolist() == [p["brand"] in ("Brand3", "Brand7") for p in products]
+    navy = index.mask({"product_details.Color": "Navy Blue"})
+    assert navy.tolist() == ["Navy Blue" in p["product_details"][0]["Color"] for p in products]
+    assert index.mask({"selling_price_numeric": 999}).sum() == sum(p.get("selling_price_numeric") == 999 for p in products)
+
+    assert index.get_stats()["cached_clauses"] == 3
+    assert np.array_equal(index.mask({"brand": {"$in": ["Brand3", "Brand7"]}}), brands)
+    assert index.get_stats()["cached_clauses"] == 3
+
+    with pytest.raises(ValueError):
+        index.mask({"selling_price_numeric": {"$ne": 5}})
+    with pytest.raises(ValueError):
+        index.mask({"out_of_stock": False})
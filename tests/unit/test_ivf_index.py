@@ -0,0 +1,100 @@
+"""
+Unit tests for the IVF approximate nearest neighbour index.
+"""
+
+import numpy as np
+import pytest
+
+from app.db.catalog_snapshot import ANN_DIR, CatalogSnapshotBuilder
+from app.domain.search.ivf import IVFIndex
+from app.repositories.local_search_backend import LocalSearchBackend
+
+
+def _vectors(count=3000, dimensions=32, clusters=16, seed=3):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _exact(vectors, query, k, rows=None):
+    rows = np.arange(len(vectors)) if rows is None else rows
+    scores = vectors[rows] @ query
+    return rows[np.argsort(-scores)[:k]].tolist()
+
+
+def _recall(index, vectors, queries, nprobe, **kwargs):
+    hits = [len(set(index.search(q, vectors, 10, nprobe=nprobe, **kwargs)[0].tolist()) & set(_exact(vectors, q, 10)))
+            for q in queries]
+    return sum(hits) / (10 * len(queries))
+
+
+def test_ivf_flat_recall_grows_with_nprobe_and_is_exact_over_all_lists():
+    vectors = _vectors()
+    index = IVFIndex.build(vectors, nlist=32)
+    queries = vectors[:20]
+
+    assert len(index) == len(vectors) and index.list_offsets[-1] == len(vectors)
+    assert _recall(index, vectors, queries, nprobe=32) == 1.0
+    assert _recall(index, vectors, queries, nprobe=8) >= 0.9
+    assert _recall(index, vectors, queries, nprobe=1) <= _recall(index, vectors, queries, nprobe=8)
+
+    rows, similarities = index.search(queries[0], vectors, 5, nprobe=32)
+    assert rows[0] == 0 and similarities[0] == pytest.approx(1.0, abs=1e-5)
+    assert np.all(np.diff(similarities) <= 0)
+
+
+def test_ivf_pq_roundtrips_through_memory_mapped_files(tmp_path):
+    vectors = _vectors()
+    has_vector = np.ones(len(vectors), dtype=bool)
+    has_vector[::10] = False
+    index = IVFIndex.build(vectors, has_vector=has_vector, nlist=16, pq_subvectors=8)
+    index.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+
+    assert loaded.get_stats()["type"] == "ivf_pq" and loaded.codes.dtype == np.uint8
+    assert isinstance(np.load(tmp_path / "pq_codes.npy", mmap_mode="r"), np.memmap)
+    assert loaded.row_lists[0] == -1 and len(loaded) == int(has_vector.sum())
+    query = vectors[1]
+    np.testing.assert_array_equal(loaded.search(query, vectors, 10, nprobe=4)[0], index.search(query, vectors, 10, nprobe=4)[0])
+    assert 0 not in loaded.search(vectors[0], vectors, 10, nprobe=16)[0]
+    assert _recall(loaded, vectors, vectors[1:21], nprobe=16, rescore_factor=8) >= 0.8
+
+
+def test_filtered_search_only_returns_matching_rows():
+    vectors = _vectors()
+    index = IVFIndex.build(vectors, nlist=32)
+    rng = np.random.default_rng(5)
+    query = vectors[7]
+
+    broad = rng.random(len(vectors)) < 0.5
+    rows, _ = index.search(query, vectors, 10, nprobe=4, row_mask=broad)
+    assert len(rows) == 10 and broad[rows].all()
+
+    # Fewer matching rows than four lists hold: scored exactly
+    selective = np.zeros(len(vectors), dtype=bool)
+    selective[rng.choice(len(vectors), 30, replace=False)] = True
+    rows, _ = index.search(query, vectors, 10, nprobe=4, row_mask=selective)
+    assert rows.tolist() == _exact(vectors, query, 10, np.flatnonzero(selective))
+
+
+def test_backend_maps_the_snapshot_ivf_index(tmp_path):
+    vectors = _vectors(count=500)
+    builder = CatalogSnapshotBuilder()
+    for row, vector in enumerate(vectors):
+        builder.add({"_id": f"p{row}", "title": f"product {row}", "openai_embedding": vector.tolist()})
+    snapshot = builder.finish()
+    path = str(tmp_path / "snapshot")
+    snapshot.save(path)
+    index = IVFIndex.build(snapshot.vectors, has_vector=snapshot.has_vector, nlist=8)
+    index.params["snapshot_created_at"] = snapshot.manifest["created_at"]
+    index.save(str(tmp_path / "snapshot" / ANN_DIR))
+
+    backend = LocalSearchBackend.from_snapshot(None, path, nprobe=8)
+    assert backend.get_stats()["ann"]["nlist"] == 8
+    positions, scores = backend.rank_vector(vectors[3].tolist(), None, 5)
+    assert positions[0] == 3 and scores[0] == pytest.approx(1.0, abs=1e-5)
+
+    index.params["snapshot_created_at"] = 0
+    index.save(str(tmp_path / "snapshot" / ANN_DIR))
+    assert LocalSearchBackend.from_snapshot(None, path).ann is None
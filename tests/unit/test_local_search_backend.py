@@ -0,0 +1,122 @@
+"""
+Unit tests for the in-process search backend and its BM25 index.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from conftest import FakeCollection
+
+os.environ.setdefault("OPENAI_API_KEY", "test-api-key")
+
+from app.api.v1.deps import load_search_backend  # noqa: E402
+from app.core.config import Settings  # noqa: E402
+from app.domain.search.bm25 import BM25Index, tokenize  # noqa: E402
+from app.domain.search.services import SearchDomainService  # noqa: E402
+from app.db.catalog_snapshot import path_values  # noqa: E402
+from app.repositories.local_search_backend import LocalSearchBackend  # noqa: E402
+from app.repositories.search_backend import SearchBackend  # noqa: E402
+
+
+def _vector(*components):
+    return list(components) + [0.0] * (4 - len(components))
+
+
+PRODUCTS = [
+    {"_id": "p1", "title": "Nike Running Shoes", "brand": "Nike", "category": "Footwear",
+     "selling_price_numeric": 2999, "product_details": [{"Color": "Red"}], "openai_embedding": _vector(1.0)},
+    {"_id": "p2", "title": "Adidas Running Shoe", "brand": "Adidas", "category": "Footwear",
+     "selling_price_numeric": 4999, "product_details": [{"Color": "Blue"}], "openai_embedding": _vector(0.9, 0.1)},
+    {"_id": "p3", "title": "Cotton T-Shirt", "brand": "Puma", "category": "Clothing",
+     "price_inr": 799, "product_details": [{"Color": "Red"}], "openai_embedding": _vector(0.0, 1.0)},
+    {"_id": "p4", "title": "Leather Wallet", "brand": "Tommy", "category": "Accessories",
+     "selling_price_numeric": 1499, "openai_embedding": None},
+]
+
+
+async def _backend():
+    return await LocalSearchBackend.from_collection(FakeCollection(PRODUCTS))
+
+
+def test_bm25_ranks_rarer_and_heavier_fields_higher():
+    index = BM25Index.build([
+        {"title": "running shoes", "openai_embedding_text": "lightweight"},
+        {"title": "leather shoes"},
+        {"title": "wallet", "openai_embedding_text": "running errands"},
+    ])
+    scores = index.scores("Running Shoes")
+
+    assert tokenize("The shoes, and dresses") == ["shoe", "dresse"]
+    assert scores[0] > scores[1] > 0 and scores[0] > scores[2] > 0
+    assert index.scores("sandals").sum() == 0
+
+
+def test_incomplete_backend_fails_at_construction():
+    class TextOnly(SearchBackend):
+        async def search_products_text(self, query, limit=20, *, filters=None):
+            return []
+
+    with pytest.raises(TypeError):
+        TextOnly()
+
+
+def test_path_values_traverses_arrays():
+    document = {"product_details": [{"Color": "Red"}, {"Size": "9"}, {"Color": ["Blue", "Navy"]}]}
+    assert path_values(document, "product_details.Color") == ["Red", "Blue", "Navy"]
+    assert path_values(document, "missing.field") == []
+
+
+@pytest.mark.asyncio
+async def test_vector_search_filters_and_uses_atlas_score_scale():
+    backend = await _backend()
+    assert len(backend) == 4 and backend.get_stats()["vectors"] == 3
+
+    results = await backend.search_products_vector(_vector(1.0), limit=10)
+    assert [r["_id"] for r in results] == ["p1", "p2", "p3"]
+    assert results[0]["vector_score"] == pytest.approx(1.0)
+    assert results[2]["vector_score"] == pytest.approx(0.5)
+    assert "openai_embedding" not in results[0]
+
+    filters = SearchDomainService().build_mongo_filters(
+        {"categories": ["footwear"], "price_constraints": {"under": 3500}}
+    )
+    page = await backend.search_products_vector_paginated(_vector(0.0, 1.0), filters=filters)
+    assert [r["_id"] for r in page["results"]] == ["p1"] and page["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_text_and_hybrid_search_with_filters():
+    backend = await _backend()
+
+    page = await backend.search_products_text_paginated("running shoes", page_size=1)
+    assert page["total"] == 2 and len(page["results"]) == 1
+    assert page["results"][0]["search_type"] == "text" and page["results"][0]["search_score"] > 0
+
+    colors = SearchDomainService().build_mongo_filters({"colors": ["red"]}, strict_color=True)
+    assert backend.filter_mask(colors).tolist() == [True, False, True, False]
+    cheap = {"$or": [{"selling_price_numeric": {"$lte": 1000}}, {"price_inr": {"$lte": 1000}}]}
+    assert backend.filter_mask(cheap).tolist() == [False, False, True, False]
+
+    hybrid = await backend.search_products_hybrid_paginated("running shoes", _vector(0.0, 1.0), filters=colors)
+    assert [r["_id"] for r in hybrid["results"]] == ["p1", "p3"]
+    assert hybrid["results"][0]["search_type"] == "hybrid"
+
+    brand = await backend.search_products_text_paginated("shoes", filters={"brand": {"$in": ["Nike"]}})
+    assert [r["_id"] for r in brand["results"]] == ["p1"]
+    unsupported = await backend.search_products_text_paginated("shoes", filters={"out_of_stock": False})
+    assert unsupported == {"results": [], "total": 0}
+    assert np.all(backend.vectors[3] == 0)
+
+
+@pytest.mark.asyncio
+async def test_load_search_backend_checks_query_dimensions():
+    collection = FakeCollection(PRODUCTS)
+    assert await load_search_backend(Settings(openai_api_key="k"), collection) is None
+
+    backend = await load_search_backend(Settings(openai_api_key="k", search_backend="local", embedding_dimension=4), collection)
+    assert backend.snapshot.dimensions == 4
+    with pytest.raises(RuntimeError, match="4-dimensional"):
+        await load_search_backend(Settings(openai_api_key="k", search_backend="local"), collection)
+
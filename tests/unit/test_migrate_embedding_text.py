@@ -0,0 +1,50 @@
+"""
+Unit tests for the _id range partitioning of the embedding text migration.
+"""
+
+from bson import ObjectId
+
+from scripts.migrate_openai_embedding_text import id_range_query, id_type, partition_id_queries, split_id_ranges
+
+
+def test_ranges_cover_every_id_once():
+    ranges = split_id_ranges(list(range(0, 1000, 7)), partitions=4)
+
+    assert len(ranges) == 4
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    assert all(upper == next_lower for (_, upper), (next_lower, _) in zip(ranges, ranges[1:]))
+
+    def owners(document_id):
+        return [r for r in ranges if (r[0] is None or document_id >= r[0]) and (r[1] is None or document_id < r[1])]
+
+    assert all(len(owners(i)) == 1 for i in range(-5, 1100))
+    # Duplicate boundaries collapse instead of producing empty ranges
+    assert split_id_ranges([1, 1, 1], partitions=3) == [(None, 1), (1, None)]
+    assert split_id_ranges([], partitions=8) == [(None, None)]
+    assert id_range_query(3, None) == {"_id": {"$gte": 3}} and id_range_query() == {}
+
+
+def _matches(query, value):
+    """MongoDB semantics of the range filters: bounds only compare values of one type."""
+    condition = query.get("_id")
+    if condition is None:
+        return True
+    if "$not" in condition:
+        return id_type(value) not in condition["$not"]["$type"]
+    if id_type(value) != condition["$type"]:
+        return False
+    return ("$gte" not in condition or value >= condition["$gte"]) and ("$lt" not in condition or value < condition["$lt"])
+
+
+def test_mixed_id_types_are_partitioned_per_type():
+    object_ids = [ObjectId() for _ in range(60)]
+    strings = [f"sku-{i:04d}" for i in range(40)]
+    queries = partition_id_queries(object_ids + strings, partitions=5)
+
+    types = [q["_id"].get("$type") for q in queries[:-1]]
+    assert types.count("objectId") == 3 and types.count("string") == 2
+    # Unsampled types (here numbers) fall into the final range
+    for value in object_ids + strings + [ObjectId(), "zzz", 7, 3.5]:
+        assert sum(_matches(q, value) for q in queries) == 1, value
+    assert partition_id_queries(strings, partitions=1) == [{}]
+
@@ -0,0 +1,85 @@
+"""
+Unit tests for the shared OpenAI RPM/TPM rate limiter.
+"""
+
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.services.rate_limiter import RateLimiter, create_embeddings, parse_reset_duration
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reserve_waits_on_request_and_token_budgets():
+    clock = _FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600, clock=clock)
+
+    # 60 RPM bucket starts full; the 61st request waits one refill interval
+    assert all(limiter.reserve(1) == 0.0 for _ in range(60))
+    assert limiter.reserve(1) == pytest.approx(1.0)
+
+    clock.now = 120.0  # both buckets full again
+    assert limiter.reserve(600) == 0.0
+    # 300 tokens of debt at 10 tokens/s
+    assert limiter.reserve(300) == pytest.approx(30.0)
+
+
+def test_headers_lower_capacity_and_pause_holds_callers():
+    clock = _FakeClock()
+    limiter = RateLimiter(requests_per_minute=3000, tokens_per_minute=1_000_000, clock=clock)
+
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-limit-tokens": "6000",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-remaining-tokens": "5000",
+    })
+    stats = limiter.get_stats()
+    assert stats["requests_per_minute"] == 60
+    assert stats["available_requests"] == 0
+    assert limiter.reserve(10) == pytest.approx(1.0)
+
+    clock.now = 100.0
+    limiter.pause(5.0)
+    assert limiter.reserve(10) == pytest.approx(5.0)
+
+    assert parse_reset_duration("6m0s") == 360.0
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert limiter.retry_delay_from_headers({"x-ratelimit-reset-tokens": "1.5s"}) == 1.5
+
+
+@pytest.mark.asyncio
+async def test_create_embeddings_retries_after_429():
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    rate_limited = httpx.Response(429, headers={"retry-after": "0.01"}, request=request)
+    response = SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.1])])
+
+    class _Embeddings:
+        calls = 0
+
+        @property
+        def with_raw_response(self):
+            return self
+
+        async def create(self, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise openai.RateLimitError("rate limited", response=rate_limited, body=None)
+            return SimpleNamespace(headers={"x-ratelimit-remaining-requests": "10"}, parse=lambda: response)
+
+    embeddings = _Embeddings()
+    limiter = RateLimiter()
+    result = await create_embeddings(SimpleNamespace(embeddings=embeddings), limiter, model="m", input=["hello"])
+
+    assert result is response
+    assert embeddings.calls == 2
+    assert limiter.get_stats()["throttled"] == 1
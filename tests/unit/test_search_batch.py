@@ -0,0 +1,93 @@
+"""
+Unit tests for multi-query batch search
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-api-key")
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+
+from app.domain.search.services import SearchDomainService
+from app.services.search_service import SearchService
+
+
+@pytest.fixture
+def product_repository():
+    repository = Mock()
+    repository.search_products_text_paginated = AsyncMock(return_value={"results": [{"_id": "t"}], "total": 1})
+    repository.search_products_vector_paginated = AsyncMock(return_value={"results": [{"_id": "v"}], "total": 1})
+    repository.search_products_hybrid_paginated = AsyncMock(return_value={"results": [{"_id": "h"}], "total": 1})
+    return repository
+
+
+@pytest.fixture
+def embedding_service():
+    service = Mock()
+    service.generate_embeddings_batch = AsyncMock(side_effect=lambda texts: [[float(i)] for i in range(len(texts))])
+    service.generate_embedding = AsyncMock(return_value=[9.0])
+    return service
+
+
+@pytest.fixture
+def search_service(product_repository, embedding_service):
+    return SearchService(
+        product_repository=product_repository,
+        domain_service=SearchDomainService(),
+        embedding_service=embedding_service,
+        reranker_service=Mock()
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_embeds_all_queries_in_one_call(search_service, embedding_service, product_repository):
+    outcomes = await search_service.search_batch([
+        {"query": "blue shirt", "mode": "hybrid", "use_reranking": False},
+        {"query": "red dress", "mode": "vector", "use_reranking": False},
+        {"query": "blue shirt", "mode": "vector", "use_reranking": False},
+        {"query": "wallet", "mode": "text", "use_reranking": False},
+    ])
+
+    assert [o["status"] for o in outcomes] == ["ok", "ok", "ok", "ok"]
+    assert [o["data"]["results"][0]["_id"] for o in outcomes] == ["h", "v", "v", "t"]
+
+    # Duplicate and text-only queries are not embedded; no per-query calls are made
+    embedding_service.generate_embeddings_batch.assert_awaited_once()
+    assert len(embedding_service.generate_embeddings_batch.await_args.args[0]) == 2
+    embedding_service.generate_embedding.assert_not_awaited()
+
+    vector_embedding = product_repository.search_products_vector_paginated.await_args_list[0].args[0]
+    assert vector_embedding == [1.0]
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_failures_per_item(search_service, embedding_service):
+    embedding_service.generate_embeddings_batch.side_effect = RuntimeError("quota exceeded")
+
+    outcomes = await search_service.search_batch([
+        {"query": "wallet", "mode": "text", "use_reranking": False},
+        {"query": "red dress", "mode": "vector", "use_reranking": False},
+        {"query": "socks", "mode": "fuzzy"},
+    ])
+
+    assert outcomes[0]["status"] == "ok"
+    assert outcomes[1]["status"] == "error"
+    assert "quota exceeded" in outcomes[1]["error"]
+    assert outcomes[2]["status"] == "error"
+    assert "Unsupported search mode" in outcomes[2]["error"]
+
+
+async def test_batch_route_enforces_configured_limit(search_service):
+    from fastapi import HTTPException
+
+    from app.api.v1.routes.search import search_batch
+    from app.api.v1.schemas.search import BatchSearchRequest
+    from app.core.config import Settings
+
+    request = BatchSearchRequest(requests=[{"query": f"shirt {i}"} for i in range(3)])
+
+    with pytest.raises(HTTPException) as excinfo:
+        await search_batch(request, search_service, Settings(batch_search_max_queries=2))
+
+    assert excinfo.value.status_code == 422
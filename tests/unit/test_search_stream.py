@@ -0,0 +1,143 @@
+"""
+Unit tests for progressively refined streaming search
+"""
+
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-api-key")
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+
+from app.core.config import Settings
+from app.domain.search.services import SearchDomainService
+from app.domain.search.spelling import SpellingIndex, extract_vocabulary
+from app.repositories.product_repository import ProductRepository
+from app.services.intent_service import LLMIntent
+from app.services.search_service import SearchService
+
+
+def _text_hits():
+    return {"results": [{"_id": "a", "search_score": 2.0}, {"_id": "b", "search_score": 1.0}], "total": 2}
+
+
+@pytest.fixture
+def product_repository():
+    repository = ProductRepository(Mock())
+    repository.search_products_text_paginated = AsyncMock(side_effect=lambda *args, **kwargs: _text_hits())
+    repository.search_products_vector_paginated = AsyncMock(
+        return_value={"results": [{"_id": "c", "vector_score": 0.9}, {"_id": "a", "vector_score": 0.5}], "total": 2}
+    )
+    return repository
+
+
+@pytest.fixture
+def reranker_service():
+    service = Mock()
+    service.rerank = AsyncMock(side_effect=lambda query, results: list(reversed(results)))
+    return service
+
+
+@pytest.fixture
+def search_service(product_repository, reranker_service):
+    embedding_service = Mock()
+    embedding_service.generate_embedding = AsyncMock(return_value=[0.1, 0.2])
+    return SearchService(
+        product_repository=product_repository,
+        domain_service=SearchDomainService(),
+        embedding_service=embedding_service,
+        reranker_service=reranker_service
+    )
+
+
+async def _collect(stream):
+    return [update async for update in stream]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_stream_emits_text_then_fused_then_reranked(search_service, product_repository):
+    updates = await _collect(search_service.search_stream("leather wallet", mode="hybrid", page_size=10))
+
+    assert [u["stage"] for u in updates] == ["text", "hybrid", "reranked"]
+    assert [p["_id"] for p in updates[0]["data"]["results"]] == ["a", "b"]
+    assert [p["_id"] for p in updates[1]["data"]["results"]] == ["a", "b", "c"]
+    assert [p["_id"] for p in updates[2]["data"]["results"]] == ["c", "b", "a"]
+
+    # The text leg is fetched once and reused for fusion
+    assert product_repository.search_products_text_paginated.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_text_stream_without_reranking(search_service, reranker_service):
+    updates = await _collect(search_service.search_stream("wallet", mode="text", use_reranking=False))
+
+    assert [u["stage"] for u in updates] == ["text"]
+    reranker_service.rerank.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_facets_cover_fused_candidates(search_service, product_repository):
+    product_repository.get_facets = AsyncMock(return_value={"total": 3})
+    data = await search_service.search_paginated("leather wallet", mode="hybrid", use_reranking=False, include_facets=True)
+
+    # Vector-only candidate "c" is faceted too, not just the $text matches
+    product_repository.get_facets.assert_awaited_once_with(ids=["a", "b", "c"], ids_scope=["leather wallet", "hybrid", None])
+    assert data["facets"] == {"total": 3}
+    assert "candidate_ids" not in data
+
+
+@pytest.mark.asyncio
+async def test_first_event_does_not_wait_for_llm_intent(product_repository, reranker_service):
+    released = asyncio.Event()
+
+    async def parse_intent(query):
+        await released.wait()
+        return LLMIntent(rephrased_query="brown leather wallet", categories=["accessories"], confidence=0.95)
+
+    intent_service = Mock()
+    intent_service.parse_intent = AsyncMock(side_effect=parse_intent)
+    embedding_service = Mock()
+    embedding_service.generate_embedding = AsyncMock(return_value=[0.1, 0.2])
+    service = SearchService(
+        product_repository=product_repository,
+        domain_service=SearchDomainService(),
+        embedding_service=embedding_service,
+        reranker_service=reranker_service,
+        intent_service=intent_service,
+        settings=Settings(openai_api_key="test-api-key")
+    )
+
+    stream = service.search_stream("wallet", mode="text", use_reranking=False)
+    first = await stream.__anext__()
+    assert first["stage"] == "text" and not released.is_set()
+
+    released.set()
+    rest = [update async for update in stream]
+    assert [u["stage"] for u in rest] == ["refined"]
+    # The refined text leg runs with the LLM's query and category filter
+    refined_call = product_repository.search_products_text_paginated.await_args_list[1]
+    assert refined_call.args[0] == "brown leather wallet"
+    assert refined_call.kwargs["filters"] is not None
+
+
+@pytest.mark.asyncio
+async def test_known_vocabulary_query_skips_llm_intent(product_repository, reranker_service):
+    catalog = [{"title": "Running Sneakers", "brand": "Adidas", "category": "Footwear"}]
+    intent_service = Mock()
+    intent_service.parse_intent = AsyncMock()
+    embedding_service = Mock()
+    embedding_service.generate_embedding = AsyncMock(return_value=[0.1, 0.2])
+    service = SearchService(
+        product_repository=product_repository,
+        domain_service=SearchDomainService(spelling_index=SpellingIndex.build(extract_vocabulary(catalog))),
+        embedding_service=embedding_service,
+        reranker_service=reranker_service,
+        intent_service=intent_service,
+        settings=Settings(openai_api_key="test-api-key")
+    )
+
+    await service.search_paginated("runing sneakers", mode="text", use_reranking=False)
+    intent_service.parse_intent.assert_not_awaited()
+    await service.search_paginated("sneakers for my brother", mode="text", use_reranking=False)
+    intent_service.parse_intent.assert_awaited_once()
@@ -0,0 +1,74 @@
+"""
+Unit tests for the SymSpell-style spelling correction index.
+"""
+
+from app.domain.search.services import SearchDomainService
+from app.domain.search.spelling import SpellingIndex, damerau_levenshtein, extract_vocabulary
+
+
+CATALOG = [
+    {"title": "Casual Shoes for Men", "brand": "Puma", "category": "Footwear"},
+    {"title": "Running Sneakers", "brand": "Adidas", "category": "Footwear"},
+    {"title": "Cotton Kurta", "brand": "Fabindia", "category": "Clothing"},
+    {"title": "Leather Wallet", "brand": "Woodland", "category": "Accessories",
+     "openai_embedding_text": "Leather Wallet | brand:woodland | category:accessories"},
+]
+
+
+def _build_index():
+    return SpellingIndex.build(extract_vocabulary(CATALOG), max_edit_distance=2)
+
+
+def test_damerau_levenshtein_transposition():
+    assert damerau_levenshtein("casual", "casual", 2) == 0
+    assert damerau_levenshtein("csaual", "casual", 2) == 1
+    assert damerau_levenshtein("kurta", "wallet", 2) == 3  # capped at max + 1
+
+
+def test_extract_vocabulary_weights_fields():
+    counts = extract_vocabulary(CATALOG)
+    # brand weight (5) + embedding text weight (1)
+    assert counts["woodland"] == 6
+    assert counts["footwear"] == 10
+    assert "for" in counts
+
+
+def test_lookup_exact_and_misspelled():
+    index = _build_index()
+    assert index.contains("sneakers")
+    assert index.lookup("sneekers")[0] == "sneakers"
+    assert index.lookup("adiddas")[0] == "adidas"
+    assert index.lookup("zzzzzz") is None
+
+
+def test_correct_query_keeps_known_and_numeric_tokens():
+    index = _build_index()
+    assert index.correct_query("casaul shoes under 1500") == "casual shoes under 1500"
+    assert index.correct_query("leathr walet") == "leather wallet"
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    _build_index().save(str(tmp_path))
+    loaded = SpellingIndex.load(str(tmp_path))
+    assert len(loaded) == len(_build_index())
+    assert loaded.lookup("fabindai")[0] == "fabindia"
+
+
+def test_domain_service_protects_intent_words():
+    service = SearchDomainService(spelling_index=_build_index())
+    assert service.correct_query("runing sneakers under 999") == "running sneakers under 999"
+    assert SearchDomainService().correct_query("runing") == "runing"
+    # Collapsed whitespace alone is not a correction
+    assert service.correct_query("running  sneakers ") == "running  sneakers "
+
+
+def test_confident_intent_needs_known_words_and_a_category():
+    service = SearchDomainService(spelling_index=_build_index())
+
+    def confident(query):
+        return service.is_confident_intent(query, service.parse_search_intent(query))
+
+    assert confident("running sneakers under 999")
+    assert not confident("sneakers my girlfriend would love")  # unknown words
+    assert not confident("leather wallet under 999")  # no category keyword
+    assert not SearchDomainService().is_confident_intent("sneakers", {"categories": ["footwear"]})
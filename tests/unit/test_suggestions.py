@@ -0,0 +1,80 @@
+"""
+Unit tests for the typeahead prefix index.
+"""
+
+from conftest import FakeCollection
+
+from app.domain.search.suggestions import PrefixIndex, normalize_suggestion
+from app.services.suggestion_service import SuggestionService
+
+
+ENTRIES = [
+    ("nike running shoes", "query", 40),
+    ("Nike", "brand", 120),
+    ("nike air max", "title", 3),
+    ("Nivea Men Face Wash", "title", 5),
+    ("Footwear", "category", 300),
+    ("NIKE  running shoes", "title", 2),
+]
+
+
+def test_normalize_suggestion():
+    assert normalize_suggestion("  NIKE   Running ") == "nike running"
+
+
+def test_suggest_orders_by_score_and_merges_duplicates():
+    index = PrefixIndex(ENTRIES)
+    results = index.suggest("ni", limit=10)
+    texts = [r["text"] for r in results]
+
+    # Duplicate "nike running shoes" entries are merged into one suggestion
+    assert texts.count("nike running shoes") == 1
+    # Popular logged queries outrank catalog terms
+    assert texts[:2] == ["nike running shoes", "Nike"]
+    assert set(texts) == {"Nike", "nike running shoes", "nike air max", "Nivea Men Face Wash"}
+    assert all(results[i]["score"] >= results[i + 1]["score"] for i in range(len(results) - 1))
+
+
+def test_suggest_long_prefix_and_limit():
+    index = PrefixIndex(ENTRIES)
+    assert [r["text"] for r in index.suggest("nike r")] == ["nike running shoes"]
+    assert len(index.suggest("n", limit=2)) == 2
+    assert index.suggest("foot")[0]["type"] == "category"
+
+
+def test_suggest_no_match_or_empty():
+    index = PrefixIndex(ENTRIES)
+    assert index.suggest("zzz") == []
+    assert index.suggest("   ") == []
+    assert PrefixIndex([]).suggest("ni") == []
+
+
+async def test_refresh_recounts_catalog_only_when_stale():
+    products = FakeCollection([{"_id": "Nike", "count": 120}])
+    query_log = FakeCollection([{"_id": "nike running shoes", "count": 40}])
+    service = SuggestionService({"products": products, "search_query_log": query_log})
+
+    await service.refresh()
+    await service.refresh()
+
+    # brand, category, sub_category and title are counted once, the query log twice
+    assert len(products.pipelines) == 4
+    assert len(query_log.queries) == 2
+    assert {r["text"] for r in service.suggest("ni")} == {"nike running shoes", "Nike"}
+
+    service.catalog_refresh_seconds = 0
+    await service.refresh()
+    assert len(products.pipelines) == 8
+
+
+async def test_flush_persists_pending_queries():
+    query_log = FakeCollection()
+    service = SuggestionService({"products": FakeCollection(), "search_query_log": query_log})
+    service.record_query("Nike  Shoes")
+    service.record_query("nike shoes")
+
+    await service.flush()
+    await service.flush()
+
+    assert len(query_log.writes) == 1
+    assert query_log.writes[0][0]._doc["$inc"] == {"count": 2}
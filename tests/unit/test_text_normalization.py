@@ -0,0 +1,44 @@
+"""
+Unit tests for the shared compiled text normalization.
+"""
+
+import re
+
+from app.domain.embeddings.text_normalization import PatternRemover, flatten_product_details, to_snake
+from scripts.embedding_text_generator import BOILERPLATE_PATTERNS
+
+
+# Word-removal patterns (plus a whitespace collapse) like the ones builders strip
+WORD_PATTERNS = [
+    r'\b(?:buy|shop|online|store|sale|offer|deal|discount|price|₹|rs\.?|inr)\b',
+    r'\b(?:free|delivery|shipping|return|exchange|warranty|guarantee)\b',
+    r'\b(?:best|top|great|amazing|awesome|fantastic|excellent|quality)\b',
+    r'\b(?:latest|new|trending|popular|hot|featured)\b',
+    r'\s{2,}',
+]
+
+
+def _sequential(patterns, text, flags):
+    for pattern in patterns:
+        text = re.sub(pattern, "", text, flags=flags)
+    return text
+
+
+def test_pattern_remover_matches_sequential_substitution():
+    # Inputs where one removal changes what later patterns match
+    cases = [
+        (BOILERPLATE_PATTERNS, "Great roundmust havePROUDLY MADE IN top quality usequality5inr"),
+        (BOILERPLATE_PATTERNS, "Proudly made in India. Perfect for daily use, high quality cotton"),
+        (WORD_PATTERNS, "xdealhot top quality₹quality"),
+        (WORD_PATTERNS, "comfortable  shoes,   free delivery"),
+        (BOILERPLATE_PATTERNS, "plain description without boilerplate"),
+    ]
+    for patterns, text in cases:
+        assert PatternRemover(patterns, re.IGNORECASE)(text) == _sequential(patterns, text, re.IGNORECASE)
+
+
+def test_shared_field_normalizers():
+    assert to_snake(" Clothing and Accessories ") == "clothing_and_accessories"
+    assert flatten_product_details([{" Color ": " Blue "}, {"Size": ""}, None, {"RAM": 8}]) == {
+        "color": "Blue", "ram": "8"
+    }
@@ -0,0 +1,53 @@
+"""
+Unit tests for the packed float32 vector storage codec.
+"""
+
+import bson
+import numpy as np
+import pytest
+from bson.binary import Binary
+
+from app.db.vector_codec import (
+    FLOAT32_DTYPE, VECTOR_SUBTYPE, VectorCodec, vector_dimensions, vector_to_array
+)
+from app.domain.embeddings.services import EmbeddingFingerprint
+from scripts.migrate_vector_storage import measure_savings
+
+
+def test_binary_round_trip_and_layout():
+    vector = [0.25, -1.5, 3.0]
+    packed = VectorCodec("binary").encode(vector)
+
+    assert isinstance(packed, Binary) and packed.subtype == VECTOR_SUBTYPE
+    assert packed[:2] == bytes([FLOAT32_DTYPE, 0]) and len(packed) == 2 + 4 * len(vector)
+    # Survives a BSON round trip and decodes without a per-element loop
+    stored = bson.decode(bson.encode({"v": packed}))["v"]
+    assert vector_to_array(stored).tolist() == vector
+    assert VectorCodec.decode(stored) == vector
+    assert vector_dimensions(stored) == vector_dimensions(vector) == 3
+
+    # Converting back to arrays (rollback) and passing stored values through
+    assert VectorCodec("array").encode(stored) == vector
+    assert VectorCodec("binary").encode(stored) is stored
+    with pytest.raises(ValueError):
+        VectorCodec("float16")
+
+
+def test_fingerprint_status_reads_binary_vectors():
+    text = "Runner | Footwear"
+    document = {
+        **EmbeddingFingerprint.fields(text, "m"),
+        "openai_embedding": VectorCodec("binary").encode(np.zeros(1536)),
+    }
+
+    assert EmbeddingFingerprint.status(document, text, "m", dimension=1536) == EmbeddingFingerprint.SKIP
+    assert EmbeddingFingerprint.status(document, text, "m", dimension=768) == EmbeddingFingerprint.EMBED
+
+
+def test_measure_savings_reports_smaller_binary_vectors():
+    rng = np.random.default_rng(0)
+    report = measure_savings([rng.standard_normal(1536).tolist() for _ in range(5)], repeat=1)
+
+    assert report["binary"]["bytes_per_vector"] < report["array"]["bytes_per_vector"] / 2
+    assert report["size_ratio"] < 0.5
+    assert report["bytes_saved_per_vector"] > 8000
@@ -0,0 +1,75 @@
+"""
+Unit tests for quantized vector index definitions and full-precision rescoring.
+"""
+
+import os
+
+import pytest
+
+from conftest import FakeCollection
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from app.api.v1.deps import get_vector_search_config
+from app.core.config import Settings
+
+from app.db.vector_codec import VectorCodec
+from app.db.vector_index import (
+    MAX_NUM_CANDIDATES, VectorSearchConfig, dimension_variant, vector_index_definition, vector_search_stage
+)
+from app.repositories.product_repository import ProductRepository
+
+
+def test_index_definitions_and_stage():
+    definition = vector_index_definition("vector_index_scalar", quantization="scalar", filter_paths=["category"])
+    fields = definition["definition"]["fields"]
+
+    assert definition["type"] == "vectorSearch"
+    assert fields[0]["quantization"] == "scalar" and fields[0]["numDimensions"] == 1536
+    assert fields[1] == {"type": "filter", "path": "category"}
+    assert "quantization" not in vector_index_definition("vector_index")["definition"]["fields"][0]
+    with pytest.raises(ValueError):
+        vector_index_definition("x", quantization="int4")
+
+    assert VectorSearchConfig().index_for("binary") == "vector_index_binary"
+    stage = vector_search_stage("i", "p", [0.1], limit=50, num_candidates=20_000)["$vectorSearch"]
+    assert stage["numCandidates"] == MAX_NUM_CANDIDATES
+    stage = vector_search_stage("i", "p", [0.1], limit=40_000, num_candidates=20_000)["$vectorSearch"]
+    assert stage["limit"] == stage["numCandidates"] == MAX_NUM_CANDIDATES
+    assert "numCandidates" not in vector_search_stage("i", "p", [0.1], limit=5, exact=True)["$vectorSearch"]
+
+
+@pytest.mark.asyncio
+async def test_quantized_search_rescores_with_full_precision_vectors():
+    # Quantized scores rank "b" first; the stored vectors say "a" is closer
+    binary = VectorCodec("binary")
+    collection = FakeCollection([
+        {"_id": "b", "vector_score": 0.99, "openai_embedding": binary.encode([0.0, 1.0])},
+        {"_id": "a", "vector_score": 0.90, "openai_embedding": [1.0, 0.1]},
+        {"_id": "c", "vector_score": 0.80, "openai_embedding": [-1.0, 0.0]},
+    ])
+    repository = ProductRepository(collection, vector_search=VectorSearchConfig(rescore_factor=3))
+
+    results = await repository.search_products_vector([1.0, 0.0], limit=2, quantization="binary")
+
+    assert [p["_id"] for p in results] == ["a", "b"]
+    assert results[0]["vector_score"] == pytest.approx((1 + 1 / (1.01 ** 0.5)) / 2)
+    assert results[0]["quantized_score"] == 0.90
+    assert "openai_embedding" not in results[0]
+    stage = collection.pipelines[0][0]["$vectorSearch"]
+    assert stage["index"] == "vector_index_binary"
+    assert stage["limit"] == 50 * 3
+
+    page = await repository.search_products_vector_paginated([1.0, 0.0], page=2, page_size=1, quantization="scalar")
+    assert [p["_id"] for p in page["results"]] == ["b"]
+    assert page["total"] == 3
+
+
+def test_read_dimensions_switch_field_and_index_together():
+    assert dimension_variant("openai_embedding", 1536, 1536) == "openai_embedding"
+    assert dimension_variant("openai_embedding", None, 1536) == "openai_embedding"
+
+    config = get_vector_search_config(Settings(embedding_read_dimensions=512, vector_search_quantization="scalar"))
+    assert config.path == "openai_embedding_512"
+    assert config.index_for() == "vector_index_512_scalar"
+    assert get_vector_search_config(Settings()).path == "openai_embedding"